@@ -3,26 +3,90 @@ import { Command } from 'commander'
 
 import emails from './emails'
 
-const program = new Command()
+const renderTemplate = (template: string, props: unknown): Promise<string> => {
+  const TemplateComponent = emails[template]
+  if (!TemplateComponent) {
+    throw new Error(`Template ${template} not found`)
+  }
+  return render(<TemplateComponent {...(props as object)} />)
+}
 
-program
-  .argument('<template>', 'name of the email template')
-  .argument('<props>', 'props to pass to the email template, as a JSON string')
-  .action((template: string, props: string) => {
+/**
+ * Render emails requested on stdin, until it's closed.
+ *
+ * Requests and responses are JSON messages, each one prefixed by its length
+ * in bytes as a 32-bit big-endian integer. Requests are rendered concurrently:
+ * responses are matched to their request by `id`, not by order.
+ *
+ * Request: `{"id": 1, "template": "login_code", "props": {...}}`
+ * Response: `{"id": 1, "html": "..."}` or `{"id": 1, "error": "..."}`
+ */
+const serve = () => {
+  const write = (response: object) => {
+    const body = Buffer.from(JSON.stringify(response), 'utf-8')
+    const header = Buffer.alloc(4)
+    header.writeUInt32BE(body.length)
+    process.stdout.write(Buffer.concat([header, body]))
+  }
+
+  const handle = async (frame: Buffer) => {
+    let id: number | null = null
     try {
-      const parsedProps = JSON.parse(props)
-      const TemplateComponent = emails[template]
-      if (!TemplateComponent) {
-        console.error(`Template ${template} not found`)
-        process.exit(1)
-      }
-      render(<TemplateComponent {...parsedProps} />).then((html) =>
-        console.log(html),
-      )
+      const request = JSON.parse(frame.toString('utf-8'))
+      id = request.id
+      write({ id, html: await renderTemplate(request.template, request.props) })
     } catch (error) {
-      console.error('Error parsing JSON string:', error)
-      process.exit(1)
+      write({ id, error: String(error) })
+    }
+  }
+
+  let buffer = Buffer.alloc(0)
+  process.stdin.on('data', (chunk: Buffer) => {
+    buffer = Buffer.concat([buffer, chunk])
+    while (buffer.length >= 4) {
+      const length = buffer.readUInt32BE(0)
+      if (buffer.length < 4 + length) {
+        break
+      }
+      const frame = buffer.subarray(4, 4 + length)
+      buffer = buffer.subarray(4 + length)
+      void handle(frame)
     }
   })
+  process.stdin.on('end', () => process.exit(0))
+}
+
+const program = new Command()
+
+program
+  .argument('[template]', 'name of the email template')
+  .argument('[props]', 'props to pass to the email template, as a JSON string')
+  .option('--serve', 'render emails requested on stdin, until it is closed')
+  .action(
+    (
+      template: string | undefined,
+      props: string | undefined,
+      options: { serve?: boolean },
+    ) => {
+      if (options.serve) {
+        serve()
+        return
+      }
+      if (!template || !props) {
+        program.help({ error: true })
+      }
+      try {
+        const parsedProps = JSON.parse(props)
+        if (!emails[template]) {
+          console.error(`Template ${template} not found`)
+          process.exit(1)
+        }
+        renderTemplate(template, parsedProps).then((html) => console.log(html))
+      } catch (error) {
+        console.error('Error parsing JSON string:', error)
+        process.exit(1)
+      }
+    },
+  )
 
 program.parse(process.argv)
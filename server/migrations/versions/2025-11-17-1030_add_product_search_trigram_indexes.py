@@ -0,0 +1,45 @@
+"""Add trigram indexes for product search
+
+Revision ID: 3b8f2c1d9e47
+Revises: 16322c272e89
+Create Date: 2025-11-17 10:30:12.418529
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "3b8f2c1d9e47"
+down_revision = "16322c272e89"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_products_name_trgm",
+            "products",
+            [sa.text("(name::text) gin_trgm_ops")],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_products_description_trgm",
+            "products",
+            ["description"],
+            unique=False,
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_products_description_trgm", table_name="products")
+    op.drop_index("ix_products_name_trgm", table_name="products")
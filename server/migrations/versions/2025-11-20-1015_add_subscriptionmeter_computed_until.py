@@ -0,0 +1,29 @@
+"""Add SubscriptionMeter.computed_until
+
+Revision ID: 7c2d4e9a1f3b
+Revises: 3b8f2c1d9e47
+Create Date: 2025-11-20 10:15:42.117306
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# Polar Custom Imports
+
+# revision identifiers, used by Alembic.
+revision = "7c2d4e9a1f3b"
+down_revision = "3b8f2c1d9e47"
+branch_labels: tuple[str] | None = None
+depends_on: tuple[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "subscription_meters",
+        sa.Column("computed_until", sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("subscription_meters", "computed_until")
@@ -33,6 +33,11 @@ CREATE TABLE product_embeddings (
     -- Metadata (JSONB for flexible schema)
     metadata JSONB DEFAULT '{}'::jsonb,
 
+    -- Typed filter columns, denormalized from metadata for indexed filtering
+    organization_id UUID,
+    price INTEGER,
+    category TEXT,
+
     -- RecordModel fields (Polar pattern)
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
     modified_at TIMESTAMP WITH TIME ZONE,
@@ -55,6 +60,16 @@ CREATE INDEX idx_product_embeddings_deleted_at
     ON product_embeddings(deleted_at)
     WHERE deleted_at IS NULL;
 
+-- Indexes on filter columns, so filtered searches on small organizations
+-- can be answered exactly without the vector index
+CREATE INDEX product_embeddings_organization_id_category_idx
+    ON product_embeddings(organization_id, category)
+    WHERE deleted_at IS NULL;
+
+CREATE INDEX product_embeddings_organization_id_price_idx
+    ON product_embeddings(organization_id, price)
+    WHERE deleted_at IS NULL;
+
 -- Vector similarity index (ivfflat)
 -- lists = 100 for <10K products
 -- Adjust to 1000 for 100K+ products
@@ -72,10 +87,9 @@ CREATE INDEX idx_product_embeddings_vector
 -- STEP 4: Set query parameters
 -- ============================================================================
 
--- Set ivfflat probes for query accuracy (session-level)
--- Higher probes = more accurate but slower
--- 10 is a good balance
--- SET ivfflat.probes = 10;
+-- ivfflat.probes / hnsw.ef_search are set per query by PgvectorStore.search,
+-- with SET LOCAL. Higher values = more accurate but slower.
+-- 10 probes / 40 ef_search is a good balance
 
 -- ============================================================================
 -- STEP 5: Grant permissions
@@ -146,6 +160,8 @@ LIMIT 5;
 -- To rollback this migration:
 /*
 DROP INDEX IF EXISTS idx_product_embeddings_vector;
+DROP INDEX IF EXISTS product_embeddings_organization_id_price_idx;
+DROP INDEX IF EXISTS product_embeddings_organization_id_category_idx;
 DROP INDEX IF EXISTS idx_product_embeddings_deleted_at;
 DROP INDEX IF EXISTS idx_product_embeddings_product_id;
 DROP TABLE IF EXISTS product_embeddings;
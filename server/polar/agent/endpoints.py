@@ -237,14 +237,18 @@ async def websocket_endpoint(
         "context": {}
     }
 
-    Response format:
+    Response format, streamed as the response is generated:
+    {"type": "content", "content": "I'd be happy..."}
+    ...
     {
         "type": "agent_message",
         "message": {...}
     }
     """
-    from polar.agent.websocket import websocket_handler
+    from polar.agent.websocket import WebSocketHandler, get_manager
 
+    manager = await get_manager(websocket.state.redis)
+    websocket_handler = WebSocketHandler(websocket.state.async_sessionmaker, manager)
     await websocket_handler.handle_connection(websocket, id)
 
 
@@ -269,9 +273,9 @@ async def send_message_stream(
 
     data: {"type": "intent", "content": "product_query"}
 
-    data: {"type": "content", "chunk": "I'd be happy..."}
+    data: {"type": "content", "content": "I'd be happy..."}
 
-    data: {"type": "done", "message_id": "..."}
+    data: {"type": "done", "message_id": "...", "message": {...}}
 
     """
     from fastapi.responses import StreamingResponse
@@ -3,19 +3,27 @@
 import asyncio
 import json
 import logging
+import time
 from typing import AsyncIterator, Any
-from uuid import UUID
 
+import logfire
 from fastapi import WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from polar.agent.service import conversation_service, message_service
-from polar.agent_core.orchestrator import agent_orchestrator
-from polar.agent_llm.base import LLMMessage
+from polar.agent.schemas import MessagePublic
+from polar.agent.service import message_service
+from polar.agent_core.orchestrator import TurnContext, agent_orchestrator
+from polar.agent_llm.base import LLMResponse
 from polar.models import Conversation, Message
 
 logger = logging.getLogger(__name__)
 
+time_to_first_token_histogram = logfire.metric_histogram(
+    "polar.agent.time_to_first_token",
+    unit="ms",
+    description="Time from a user message to the first streamed token of the reply.",
+)
+
 
 class StreamingHandler:
     """
@@ -26,36 +34,50 @@ class StreamingHandler:
     - WebSocket streaming with chunks
     - Progress indicators
     - Partial response updates
+
+    Text deltas are forwarded as soon as the LLM provider sends them. The
+    agent message is persisted once, when the response is complete.
     """
 
-    async def stream_agent_response(
+    async def stream_agent_events(
         self,
         session: AsyncSession,
         conversation: Conversation,
         user_message: Message,
-    ) -> AsyncIterator[str]:
+    ) -> AsyncIterator[dict[str, Any]]:
         """
-        Stream agent response generation.
+        Stream agent response generation, as events.
 
         Yields:
-            JSON-encoded chunks as they're generated
+            Events as they're generated
 
         Flow:
             1. Understanding → {"type": "thinking", "content": "Understanding your message..."}
             2. Context enrichment → {"type": "thinking", "content": "Gathering context..."}
             3. Tool execution → {"type": "tool", "tool": "product_lookup", "status": "running"}
-            4. Response streaming → {"type": "content", "chunk": "I'd be happy..."}
-            5. Complete → {"type": "done", "message_id": "..."}
+            4. Response streaming → {"type": "content", "content": "I'd be happy..."}
+            5. Complete → {"type": "done", "message_id": "...", "message": {...}}
         """
+        start = time.perf_counter()
+        turn = TurnContext(
+            session=session, conversation=conversation, user_message=user_message
+        )
+        knowledge_task = agent_orchestrator._start_knowledge_retrieval(turn)
+
         try:
             # Step 1: Understanding
-            yield self._format_chunk("thinking", "Understanding your message...")
+            yield self._event("thinking", "Understanding your message...")
 
-            understanding = await agent_orchestrator._understand_conversation(
-                session, conversation, user_message
-            )
+            with turn.span("load_context"):
+                turn.messages, turn.customer_profile = await asyncio.gather(
+                    agent_orchestrator._load_history(turn),
+                    agent_orchestrator._get_customer_profile(turn),
+                )
 
-            yield self._format_chunk(
+            with turn.span("understand"):
+                understanding = await agent_orchestrator._understand_conversation(turn)
+
+            yield self._event(
                 "intent",
                 understanding["intent"].value,
                 {
@@ -65,18 +87,20 @@ class StreamingHandler:
             )
 
             # Step 2: Context Enrichment
-            yield self._format_chunk("thinking", "Gathering relevant context...")
+            yield self._event("thinking", "Gathering relevant context...")
 
-            enriched_context = await agent_orchestrator._enrich_context(
-                session, conversation, understanding
-            )
+            with turn.span("enrich"):
+                enriched_context = await agent_orchestrator._enrich_context(
+                    turn, understanding, knowledge_task
+                )
 
             # Step 3: Decision
-            decision = await agent_orchestrator._make_decision(
-                session, conversation, understanding, enriched_context
-            )
+            with turn.span("decide"):
+                decision = await agent_orchestrator._make_decision(
+                    session, conversation, understanding, enriched_context
+                )
 
-            yield self._format_chunk(
+            yield self._event(
                 "action",
                 decision["action"].value,
                 {"parameters": decision["parameters"]},
@@ -84,97 +108,119 @@ class StreamingHandler:
 
             # Step 4: Tool Invocation
             if decision["action"] != "general_response":
-                yield self._format_chunk(
+                yield self._event(
                     "tool",
-                    f"Executing {decision['action']}...",
+                    f"Executing {decision['action'].value}...",
                     {"action": decision["action"].value},
                 )
 
-            tool_results = await agent_orchestrator._invoke_tools(session, decision)
+            with turn.span("invoke_tools"):
+                tool_results = await agent_orchestrator._invoke_tools(session, decision)
 
             if tool_results:
-                yield self._format_chunk(
+                yield self._event(
                     "tool_result",
                     "Tools executed",
                     {"results": [r["tool"] for r in tool_results]},
                 )
 
             # Step 5: Stream Response Generation
-            yield self._format_chunk("generating", "Generating response...")
+            yield self._event("generating", "Generating response...")
 
-            # Build system prompt
-            system_prompt = agent_orchestrator._build_system_prompt(
-                conversation.agent, enriched_context
+            agent = conversation.agent
+            llm_model = agent.config.get("llm_model", "claude-3-5-sonnet-20241022")
+            llm_messages = agent_orchestrator._build_llm_messages(
+                agent, enriched_context, tool_results
             )
 
-            # Build conversation history
-            llm_messages = [LLMMessage(role="system", content=system_prompt)]
-
-            # Add recent history
-            for msg in enriched_context["history"][-5:]:
-                llm_messages.append(
-                    LLMMessage(role=msg["role"], content=msg["content"])
-                )
+            # Not traced with `turn.span`: a span can't be left open across yields
+            generation_start = time.perf_counter()
+            response = await agent_orchestrator.llm_client.chat(
+                messages=llm_messages,
+                model=llm_model,
+                temperature=agent.personality.get("temperature", 0.7),
+                max_tokens=agent.config.get("max_tokens", 1024),
+                stream=True,
+            )
 
-            # Add tool results context
-            if tool_results:
-                tool_context = agent_orchestrator._format_tool_results(tool_results)
-                llm_messages.append(
-                    LLMMessage(
-                        role="system",
-                        content=f"Tool execution results:\n{tool_context}",
+            chunks: list[str] = []
+            async for chunk in self._iter_chunks(response):
+                if not chunks:
+                    time_to_first_token = (time.perf_counter() - start) * 1000
+                    time_to_first_token_histogram.record(
+                        time_to_first_token, attributes={"llm_model": llm_model}
                     )
-                )
+                    turn.timings["time_to_first_token"] = int(time_to_first_token)
+                chunks.append(chunk)
+                yield self._event("content", chunk)
 
-            # Stream from LLM
-            full_content = ""
-            async for chunk in agent_orchestrator.llm_client.chat(
-                messages=llm_messages,
-                model=conversation.agent.config.get(
-                    "llm_model", "claude-3-5-sonnet-20241022"
-                ),
-                temperature=conversation.agent.personality.get("temperature", 0.7),
-                max_tokens=conversation.agent.config.get("max_tokens", 1024),
-                stream=True,
-            ):
-                full_content += chunk
-                yield self._format_chunk("content", chunk)
+            turn.timings["generate_response"] = int(
+                (time.perf_counter() - generation_start) * 1000
+            )
 
             # Step 6: Update State
-            await agent_orchestrator._update_state(
-                session, conversation, understanding, decision
-            )
+            with turn.span("update_state"):
+                await agent_orchestrator._update_state(
+                    session, conversation, understanding, decision
+                )
 
-            # Create agent message
+            # Create agent message, once the response is complete
             agent_message = await message_service.create_agent_message(
                 session=session,
                 conversation=conversation,
-                content=full_content,
+                content="".join(chunks),
                 intent=understanding["intent"].value,
                 action=decision["action"].value,
                 llm_provider="anthropic",
-                llm_model=conversation.agent.config.get(
-                    "llm_model", "claude-3-5-sonnet-20241022"
-                ),
+                llm_model=llm_model,
                 tool_calls=tool_results,
             )
 
-            # Final chunk with complete message
-            yield self._format_chunk(
+            logger.info(
+                f"Message streamed: conversation={conversation.id}, timings={turn.timings}"
+            )
+
+            # Final event with complete message
+            yield self._event(
                 "done",
                 "Complete",
                 {
                     "message_id": str(agent_message.id),
+                    "message": MessagePublic.model_validate(agent_message).model_dump(
+                        mode="json"
+                    ),
                     "conversation": {
                         "stage": conversation.stage,
                         "hesitation_signals": conversation.hesitation_signals,
                     },
+                    "time_to_first_token_ms": turn.timings.get("time_to_first_token"),
                 },
             )
 
         except Exception as e:
             logger.error(f"Error in streaming response: {e}", exc_info=True)
-            yield self._format_chunk("error", str(e))
+            yield self._event("error", str(e))
+
+        finally:
+            if knowledge_task is not None:
+                knowledge_task.cancel()
+
+    async def stream_agent_response(
+        self,
+        session: AsyncSession,
+        conversation: Conversation,
+        user_message: Message,
+    ) -> AsyncIterator[str]:
+        """
+        Stream agent response generation.
+
+        Yields:
+            JSON-encoded events as they're generated
+        """
+        async for event in self.stream_agent_events(
+            session, conversation, user_message
+        ):
+            yield json.dumps(event)
 
     async def stream_to_websocket(
         self,
@@ -215,7 +261,7 @@ class StreamingHandler:
             SSE-formatted chunks
 
         Format:
-            data: {"type": "content", "chunk": "Hello"}
+            data: {"type": "content", "content": "Hello"}
 
             data: {"type": "done"}
 
@@ -229,19 +275,30 @@ class StreamingHandler:
         # Send final SSE event
         yield "data: [DONE]\n\n"
 
-    def _format_chunk(
-        self, chunk_type: str, content: str, metadata: dict[str, Any] | None = None
-    ) -> str:
-        """Format chunk as JSON string."""
-        chunk = {
-            "type": chunk_type,
+    async def _iter_chunks(
+        self, response: LLMResponse | AsyncIterator[str]
+    ) -> AsyncIterator[str]:
+        """Iterate text chunks, from clients which may not support streaming."""
+        if isinstance(response, LLMResponse):
+            if response.content:
+                yield response.content
+            return
+        async for chunk in response:
+            yield chunk
+
+    def _event(
+        self, event_type: str, content: str, metadata: dict[str, Any] | None = None
+    ) -> dict[str, Any]:
+        """Build a streamed event."""
+        event = {
+            "type": event_type,
             "content": content,
         }
 
         if metadata:
-            chunk.update(metadata)
+            event.update(metadata)
 
-        return json.dumps(chunk)
+        return event
 
 
 # Global streaming handler
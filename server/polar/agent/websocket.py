@@ -1,7 +1,11 @@
 """WebSocket handler for real-time agent chat."""
 
+import asyncio
+import contextlib
 import json
 import logging
+import uuid
+from enum import StrEnum
 from typing import Any
 from uuid import UUID
 
@@ -10,25 +14,84 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from polar.agent.schemas import MessageCreate, MessagePublic
 from polar.agent.service import conversation_service, message_service
-from polar.postgres import async_session_maker
+from polar.eventstream.multiplexer import EventStreamMultiplexer, SubscriptionClosed
+from polar.kit.db.postgres import AsyncSessionMaker
+from polar.redis import Redis
 
 logger = logging.getLogger(__name__)
 
 
+class SlowConsumerPolicy(StrEnum):
+    """What to do with a client whose send queue is full."""
+
+    drop = "drop"
+    """Drop its oldest queued message."""
+
+    disconnect = "disconnect"
+    """Close its connection: the client reconnects and reloads the conversation."""
+
+
+class _Connection:
+    """A WebSocket client, with its queue of messages to send."""
+
+    def __init__(self, websocket: WebSocket, maxsize: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.sender: asyncio.Task[None] | None = None
+
+
 class ConnectionManager:
     """
     Manages WebSocket connections for real-time chat.
 
     Features:
     - Connection pooling per conversation
-    - Broadcast to multiple clients
+    - Broadcast to multiple clients, on every API replica
     - Automatic reconnection handling
+
+    Broadcasts are delivered to the clients of this process right away, and
+    published on a Redis channel of the conversation, through which the
+    other processes deliver them to their own clients. Each process holds a
+    single pub/sub connection, subscribed to the conversations it serves.
+
+    Messages are serialized once per broadcast, then queued for each client
+    and sent by a task per connection, so clients don't wait for each other.
+    When a client's queue is full, the `slow_consumer_policy` applies. Clients
+    which don't accept a message within `send_timeout` seconds are
+    disconnected.
     """
 
-    def __init__(self):
-        """Initialize connection manager."""
-        # conversation_id -> list of WebSocket connections
-        self.active_connections: dict[UUID, list[WebSocket]] = {}
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        send_queue_size: int = 256,
+        send_timeout: float = 5.0,
+        slow_consumer_policy: SlowConsumerPolicy = SlowConsumerPolicy.disconnect,
+    ):
+        """
+        Initialize connection manager.
+
+        Args:
+            redis: Redis client, relaying broadcasts between processes
+            send_queue_size: Max messages queued for a client
+            send_timeout: Max seconds for a client to accept a message
+            slow_consumer_policy: What to do with clients whose queue is full
+        """
+        self.redis = redis
+        self.multiplexer = EventStreamMultiplexer(self.redis)
+        self.send_queue_size = send_queue_size
+        self.send_timeout = send_timeout
+        self.slow_consumer_policy = slow_consumer_policy
+        # Prefix of the messages published by this process, so they're not
+        # delivered twice to its clients
+        self.origin = uuid.uuid4().hex
+
+        # conversation_id -> WebSocket connections of this process
+        self.active_connections: dict[UUID, dict[WebSocket, _Connection]] = {}
+        self._subscribers: dict[UUID, asyncio.Task[None]] = {}
+        self._closing: set[asyncio.Task[None]] = set()
 
     async def connect(self, websocket: WebSocket, conversation_id: UUID) -> None:
         """
@@ -40,10 +103,18 @@ class ConnectionManager:
         """
         await websocket.accept()
 
-        if conversation_id not in self.active_connections:
-            self.active_connections[conversation_id] = []
+        connection = _Connection(websocket, self.send_queue_size)
+        connection.sender = asyncio.create_task(
+            self._run_sender(connection, conversation_id)
+        )
+        self.active_connections.setdefault(conversation_id, {})[websocket] = connection
+
+        # Receive the broadcasts of other processes
+        if conversation_id not in self._subscribers:
+            self._subscribers[conversation_id] = asyncio.create_task(
+                self._run_subscriber(conversation_id)
+            )
 
-        self.active_connections[conversation_id].append(websocket)
         logger.info(f"WebSocket connected: conversation={conversation_id}")
 
     def disconnect(self, websocket: WebSocket, conversation_id: UUID) -> None:
@@ -54,12 +125,25 @@ class ConnectionManager:
             websocket: WebSocket connection
             conversation_id: Conversation ID
         """
-        if conversation_id in self.active_connections:
-            self.active_connections[conversation_id].remove(websocket)
+        connections = self.active_connections.get(conversation_id)
+        if connections is None:
+            return
+
+        connection = connections.pop(websocket, None)
+        if connection is None:
+            return
+
+        # The sender may be disconnecting its own client
+        sender = connection.sender
+        if sender is not None and sender is not asyncio.current_task():
+            sender.cancel()
 
-            # Clean up empty pools
-            if not self.active_connections[conversation_id]:
-                del self.active_connections[conversation_id]
+        # Clean up empty pools
+        if not connections:
+            del self.active_connections[conversation_id]
+            subscriber = self._subscribers.pop(conversation_id, None)
+            if subscriber is not None:
+                subscriber.cancel()
 
         logger.info(f"WebSocket disconnected: conversation={conversation_id}")
 
@@ -67,37 +151,156 @@ class ConnectionManager:
         self, message: dict[str, Any], conversation_id: UUID
     ) -> None:
         """
-        Send message to specific conversation.
+        Send message to the clients of the conversation, in this process only.
 
         Args:
             message: Message data
             conversation_id: Conversation ID
         """
-        if conversation_id not in self.active_connections:
-            return
-
-        for connection in self.active_connections[conversation_id]:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Failed to send message: {e}")
-                # Don't disconnect here, let the main loop handle it
+        self._fan_out(conversation_id, json.dumps(message))
 
-    async def broadcast(
-        self, message: dict[str, Any], conversation_id: UUID
+    async def send_to(
+        self, websocket: WebSocket, message: dict[str, Any], conversation_id: UUID
     ) -> None:
         """
-        Broadcast message to all clients in conversation.
+        Send message to a single client, after the messages queued for it.
 
         Args:
+            websocket: WebSocket connection
             message: Message data
             conversation_id: Conversation ID
         """
-        await self.send_message(message, conversation_id)
+        connection = self.active_connections.get(conversation_id, {}).get(websocket)
+        if connection is None:
+            await websocket.send_json(message)
+            return
+        self._enqueue(connection, conversation_id, json.dumps(message))
+
+    async def broadcast(self, message: dict[str, Any], conversation_id: UUID) -> None:
+        """
+        Broadcast message to all clients in conversation, on every process.
+
+        Args:
+            message: Message data
+            conversation_id: Conversation ID
+        """
+        data = json.dumps(message)
+        self._fan_out(conversation_id, data)
+        try:
+            await self.redis.publish(
+                self._get_channel(conversation_id), f"{self.origin}:{data}"
+            )
+        except Exception as e:
+            logger.error(f"Failed to publish message: {e}")
+
+    async def aclose(self) -> None:
+        """Stop sending messages, and close the pub/sub connection."""
+        tasks = [*self._subscribers.values(), *self._closing]
+        for connections in self.active_connections.values():
+            tasks.extend(
+                connection.sender
+                for connection in connections.values()
+                if connection.sender is not None
+            )
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.active_connections.clear()
+        self._subscribers.clear()
+        await self.multiplexer.aclose()
+
+    def _fan_out(self, conversation_id: UUID, data: str) -> None:
+        connections = self.active_connections.get(conversation_id)
+        if not connections:
+            return
+        for connection in list(connections.values()):
+            self._enqueue(connection, conversation_id, data)
+
+    def _enqueue(
+        self, connection: _Connection, conversation_id: UUID, data: str
+    ) -> None:
+        if connection.queue.full():
+            if self.slow_consumer_policy == SlowConsumerPolicy.drop:
+                connection.queue.get_nowait()
+                connection.dropped += 1
+            else:
+                logger.warning(
+                    "Disconnecting slow WebSocket client: "
+                    f"conversation={conversation_id}"
+                )
+                self.disconnect(connection.websocket, conversation_id)
+                task = asyncio.create_task(self._close_slow(connection.websocket))
+                self._closing.add(task)
+                task.add_done_callback(self._closing.discard)
+                return
+        connection.queue.put_nowait(data)
+
+    async def _run_sender(self, connection: _Connection, conversation_id: UUID) -> None:
+        websocket = connection.websocket
+        while True:
+            data = await connection.queue.get()
+            try:
+                await asyncio.wait_for(websocket.send_text(data), self.send_timeout)
+            except TimeoutError:
+                logger.warning(
+                    "Disconnecting slow WebSocket client: "
+                    f"conversation={conversation_id}"
+                )
+                self.disconnect(websocket, conversation_id)
+                await self._close_slow(websocket)
+                return
+            except Exception as e:
+                logger.error(f"Failed to send message: {e}")
+                # Don't disconnect here, let the main loop handle it
+
+    async def _run_subscriber(self, conversation_id: UUID) -> None:
+        try:
+            async with self.multiplexer.subscribe(
+                [self._get_channel(conversation_id)]
+            ) as subscription:
+                while True:
+                    message = await subscription.get()
+                    if message is None:
+                        continue
+                    origin, _, data = message.partition(":")
+                    if origin != self.origin:
+                        self._fan_out(conversation_id, data)
+        except SubscriptionClosed:
+            pass
+        except Exception as e:
+            logger.error(f"WebSocket backplane error: {e}", exc_info=True)
+        finally:
+            # Let the next client of the conversation start a new subscriber
+            if self._subscribers.get(conversation_id) is asyncio.current_task():
+                del self._subscribers[conversation_id]
+
+    async def _close_slow(self, websocket: WebSocket) -> None:
+        with contextlib.suppress(Exception):
+            await websocket.close(code=1013, reason="Client too slow")
 
+    def _get_channel(self, conversation_id: UUID) -> str:
+        return f"agent:conversation:{conversation_id}"
 
-# Global connection manager
-manager = ConnectionManager()
+
+_manager: ConnectionManager | None = None
+
+
+async def get_manager(redis: Redis) -> ConnectionManager:
+    global _manager
+    if _manager is not None and _manager.redis is not redis:
+        await close_manager()
+    if _manager is None:
+        _manager = ConnectionManager(redis)
+    return _manager
+
+
+async def close_manager() -> None:
+    """Disconnect the clients and pub/sub connection of the connection manager."""
+    global _manager
+    if _manager is not None:
+        manager, _manager = _manager, None
+        await manager.aclose()
 
 
 class WebSocketHandler:
@@ -111,7 +314,10 @@ class WebSocketHandler:
         "context": {}
     }
 
-    Response format:
+    Response format, streamed as the response is generated:
+    {"type": "thinking", "content": "Understanding your message..."}
+    {"type": "content", "content": "I'd be happy..."}
+    ...
     {
         "type": "agent_message",
         "message": {...},
@@ -119,9 +325,10 @@ class WebSocketHandler:
     }
     """
 
-    def __init__(self, session_maker):
+    def __init__(self, session_maker: AsyncSessionMaker, manager: ConnectionManager):
         """Initialize WebSocket handler."""
         self.session_maker = session_maker
+        self.manager = manager
 
     async def handle_connection(
         self, websocket: WebSocket, conversation_id: UUID
@@ -141,16 +348,18 @@ class WebSocketHandler:
                 return
 
             # Accept connection
-            await manager.connect(websocket, conversation_id)
+            await self.manager.connect(websocket, conversation_id)
 
             try:
                 # Send connection acknowledgment
-                await websocket.send_json(
+                await self.manager.send_to(
+                    websocket,
                     {
                         "type": "connected",
                         "conversation_id": str(conversation_id),
                         "message": "Connected to agent",
-                    }
+                    },
+                    conversation_id,
                 )
 
                 # Message loop
@@ -170,7 +379,7 @@ class WebSocketHandler:
                 logger.error(f"WebSocket error: {e}")
                 await websocket.close(code=1011, reason="Internal error")
             finally:
-                manager.disconnect(websocket, conversation_id)
+                self.manager.disconnect(websocket, conversation_id)
 
     async def handle_message(
         self,
@@ -196,10 +405,10 @@ class WebSocketHandler:
             )
         elif message_type == "ping":
             # Heartbeat
-            await websocket.send_json({"type": "pong"})
+            await self.manager.send_to(websocket, {"type": "pong"}, conversation_id)
         elif message_type == "typing":
             # Broadcast typing indicator
-            await manager.broadcast(
+            await self.manager.broadcast(
                 {
                     "type": "typing",
                     "conversation_id": str(conversation_id),
@@ -208,8 +417,10 @@ class WebSocketHandler:
                 conversation_id,
             )
         else:
-            await websocket.send_json(
-                {"type": "error", "error": f"Unknown message type: {message_type}"}
+            await self.manager.send_to(
+                websocket,
+                {"type": "error", "error": f"Unknown message type: {message_type}"},
+                conversation_id,
             )
 
     async def handle_user_message(
@@ -232,8 +443,10 @@ class WebSocketHandler:
             # Get conversation
             conversation = await conversation_service.get(session, conversation_id)
             if not conversation:
-                await websocket.send_json(
-                    {"type": "error", "error": "Conversation not found"}
+                await self.manager.send_to(
+                    websocket,
+                    {"type": "error", "error": "Conversation not found"},
+                    conversation_id,
                 )
                 return
 
@@ -248,7 +461,7 @@ class WebSocketHandler:
             )
 
             # Broadcast user message to all clients
-            await manager.broadcast(
+            await self.manager.broadcast(
                 {
                     "type": "user_message",
                     "message": MessagePublic.model_validate(user_message).model_dump(
@@ -258,32 +471,29 @@ class WebSocketHandler:
                 conversation_id,
             )
 
-            # Process with Agent Core (6-layer orchestration)
-            from polar.agent_core import agent_orchestrator
+            # Process with Agent Core (6-layer orchestration), broadcasting
+            # progress and text deltas as they're generated
+            from polar.agent.streaming import streaming_handler
 
-            agent_message = await agent_orchestrator.process_message(
+            async for event in streaming_handler.stream_agent_events(
                 session, conversation, user_message
-            )
-
-            # Broadcast agent response
-            await manager.broadcast(
-                {
-                    "type": "agent_message",
-                    "message": MessagePublic.model_validate(agent_message).model_dump(
-                        mode="json"
-                    ),
-                },
-                conversation_id,
-            )
+            ):
+                if event["type"] == "done":
+                    # Broadcast the persisted agent response
+                    event = {
+                        "type": "agent_message",
+                        "message": event["message"],
+                        "conversation": event["conversation"],
+                        "time_to_first_token_ms": event["time_to_first_token_ms"],
+                    }
+                await self.manager.broadcast(event, conversation_id)
 
             await session.commit()
 
         except Exception as e:
             logger.error(f"Error handling user message: {e}")
-            await websocket.send_json(
-                {"type": "error", "error": "Failed to process message"}
+            await self.manager.send_to(
+                websocket,
+                {"type": "error", "error": "Failed to process message"},
+                conversation_id,
             )
-
-
-# Global WebSocket handler
-websocket_handler = WebSocketHandler(async_session_maker)
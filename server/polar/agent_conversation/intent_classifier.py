@@ -1,10 +1,25 @@
 """Intent classification - hybrid rule-based + LLM approach."""
 
+import hashlib
+import json
 import re
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from polar.agent.enums import Intent
 from polar.agent.schemas import IntentResult
+from polar.agent_conversation.pattern_matcher import MultiPatternMatcher
+from polar.kit.cache import LRUCache
+
+if TYPE_CHECKING:
+    from polar.agent_llm.anthropic_client import AnthropicClient
+
+
+_PRICE_REGEX = re.compile(r"\$?(\d+(?:\.\d{2})?)")
+_QUANTITY_REGEX = re.compile(r"(\d+)\s*(pcs?|pieces?|items?)")
+_WORD_REGEX = re.compile(r"\w+")
+_COLORS = ["blue", "red", "green", "black", "white", "yellow", "pink", "gray"]
+_COLOR_MATCHER = MultiPatternMatcher(_COLORS)
+_SIZES = ["xs", "s", "m", "l", "xl", "xxl", "small", "medium", "large"]
 
 
 class IntentClassifier:
@@ -15,6 +30,10 @@ class IntentClassifier:
     1. Fast rule-based classification for common patterns (80% of cases)
     2. LLM fallback for complex/ambiguous cases
     3. Entity extraction from user message
+
+    Rule patterns are compiled into a single multi-pattern matcher, so a
+    message is scanned once whatever the number of rules. LLM
+    classifications are cached in memory.
     """
 
     # Rule-based patterns (fast path)
@@ -73,11 +92,34 @@ class IntentClassifier:
         ],
     }
 
-    def __init__(self, llm_provider: str = "anthropic"):
-        """Initialize intent classifier."""
+    def __init__(
+        self,
+        llm_provider: str = "anthropic",
+        llm_cache_size: int = 10_000,
+        llm_cache_ttl: float = 3600.0,
+    ):
+        """
+        Initialize intent classifier.
+
+        Args:
+            llm_provider: LLM provider of the fallback classification
+            llm_cache_size: Max LLM classifications kept in memory
+            llm_cache_ttl: Seconds LLM classifications are kept in memory
+        """
         self.llm_provider = llm_provider
-        # TODO: Initialize LLM client in Week 2-3
-        self.llm_client = None
+        self.llm_client: AnthropicClient | None = None
+        self._llm_cache = LRUCache[str, IntentResult](
+            maxsize=llm_cache_size, ttl=llm_cache_ttl
+        )
+
+        # All rule patterns, matched in a single scan of the message
+        self._rule_intents: list[Intent] = []
+        rule_patterns: list[str] = []
+        for intent, patterns in self.PATTERNS.items():
+            for pattern in patterns:
+                self._rule_intents.append(intent)
+                rule_patterns.append(pattern)
+        self._rules = MultiPatternMatcher(rule_patterns, ignore_case=True)
 
     async def classify(
         self,
@@ -117,48 +159,57 @@ class IntentClassifier:
             reasoning="No clear pattern matched",
         )
 
+    def match_rules(self, message: str) -> Intent | None:
+        """
+        Intent resolved by the rules, without extracting entities.
+
+        Cheap enough to run ahead of the classification, to decide which
+        work can start speculatively.
+        """
+        index = self._rules.first(message.lower().strip())
+        if index is None:
+            return None
+        return self._rule_intents[index]
+
     def _classify_rules(self, message: str) -> IntentResult | None:
         """Rule-based classification using regex patterns."""
-        for intent, patterns in self.PATTERNS.items():
-            for pattern in patterns:
-                if re.search(pattern, message, re.IGNORECASE):
-                    # Extract entities
-                    entities = self._extract_entities(message, intent)
-
-                    return IntentResult(
-                        intent=intent,
-                        confidence=0.9,  # High confidence for rule match
-                        entities=entities,
-                        reasoning=f"Rule pattern matched: {pattern}",
-                    )
+        index = self._rules.first(message)
+        if index is None:
+            return None
 
-        return None
+        intent = self._rule_intents[index]
+        return IntentResult(
+            intent=intent,
+            confidence=0.9,  # High confidence for rule match
+            entities=self._extract_entities(message, intent),
+            reasoning=f"Rule pattern matched: {self._rules.patterns[index]}",
+        )
 
     def _extract_entities(self, message: str, intent: Intent) -> dict[str, Any]:
         """Extract entities from message based on intent."""
         entities = {}
+        message = message.lower()
 
         # Price extraction
-        price_match = re.search(r"\$?(\d+(?:\.\d{2})?)", message)
-        if price_match and intent in (Intent.PRICE_NEGOTIATION, Intent.PRICE_QUERY):
-            entities["proposed_price"] = int(float(price_match.group(1)) * 100)
+        if intent in (Intent.PRICE_NEGOTIATION, Intent.PRICE_QUERY):
+            price_match = _PRICE_REGEX.search(message)
+            if price_match:
+                entities["proposed_price"] = int(float(price_match.group(1)) * 100)
 
         # Color extraction
-        colors = ["blue", "red", "green", "black", "white", "yellow", "pink", "gray"]
-        for color in colors:
-            if color in message.lower():
-                entities["color"] = color
-                break
+        color_index = _COLOR_MATCHER.first(message)
+        if color_index is not None:
+            entities["color"] = _COLORS[color_index]
 
-        # Size extraction
-        sizes = ["xs", "s", "m", "l", "xl", "xxl", "small", "medium", "large"]
-        for size in sizes:
-            if re.search(rf"\b{size}\b", message.lower()):
+        # Size extraction: sizes are whole words of the message
+        words = set(_WORD_REGEX.findall(message))
+        for size in _SIZES:
+            if size in words:
                 entities["size"] = size.upper() if len(size) <= 3 else size
                 break
 
         # Quantity extraction
-        qty_match = re.search(r"(\d+)\s*(pcs?|pieces?|items?)", message.lower())
+        qty_match = _QUANTITY_REGEX.search(message)
         if qty_match:
             entities["quantity"] = int(qty_match.group(1))
 
@@ -171,12 +222,20 @@ class IntentClassifier:
         LLM-based classification (fallback for complex cases).
 
         Uses Anthropic Claude Haiku for fast, cheap classification.
+
+        Results are cached in memory by normalized message and a hash of
+        the context they depend on.
         """
         from polar.agent_llm.anthropic_client import AnthropicClient
         from polar.agent_llm.base import LLMMessage
 
-        # Initialize Claude client
-        claude = AnthropicClient()
+        cache_key = self._get_llm_cache_key(message, conversation_history, context)
+        cached = self._llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if self.llm_client is None:
+            self.llm_client = AnthropicClient()
 
         # Convert conversation history
         llm_history = [
@@ -185,7 +244,7 @@ class IntentClassifier:
         ]
 
         # Classify with LLM
-        result = await claude.classify_intent(message, llm_history, context)
+        result = await self.llm_client.classify_intent(message, llm_history, context)
 
         # Convert to IntentResult
         try:
@@ -193,12 +252,37 @@ class IntentClassifier:
         except ValueError:
             intent = Intent.UNKNOWN
 
-        return IntentResult(
+        intent_result = IntentResult(
             intent=intent,
             confidence=result.get("confidence", 0.5),
             entities=result.get("entities", {}),
             reasoning="LLM classification",
         )
+        self._llm_cache.set(cache_key, intent_result)
+        return intent_result
+
+    def _get_llm_cache_key(
+        self, message: str, conversation_history: list[dict], context: dict
+    ) -> str:
+        """
+        Build the LLM cache key of a message.
+
+        The context hash covers what the classification prompt depends on
+        besides the message: cart, stage and the last 3 messages of the history,
+        the window included in the prompt.
+        """
+        normalized = " ".join(message.lower().split())
+        history = [
+            (msg.get("role", "user"), msg.get("content", ""))
+            for msg in conversation_history[-3:]
+        ]
+        context_data = json.dumps(
+            [context.get("cart"), context.get("stage"), history],
+            sort_keys=True,
+            default=str,
+        )
+        context_hash = hashlib.blake2b(context_data.encode(), digest_size=8).hexdigest()
+        return f"{normalized}:{context_hash}"
 
 
 # Singleton instance
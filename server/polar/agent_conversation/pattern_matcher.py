@@ -0,0 +1,243 @@
+"""Multi-pattern matching of regex rules, in a single pass over the text."""
+
+import re
+from collections import deque
+from collections.abc import Sequence
+
+_SPECIAL_CHARACTERS = frozenset(".^$*+?{}[]|()\\")
+
+
+class _NotLiteral(Exception):
+    pass
+
+
+class _LiteralParser:
+    """
+    Expand a regex into the finite set of strings it matches.
+
+    Only literals, escaped punctuation, groups, alternations and `?` are
+    supported: any other construct raises `_NotLiteral`.
+    """
+
+    def __init__(self, pattern: str, limit: int):
+        self.pattern = pattern
+        self.limit = limit
+        self.position = 0
+
+    def parse(self) -> set[str]:
+        literals = self._alternation()
+        if self.position != len(self.pattern):
+            raise _NotLiteral()
+        return literals
+
+    def _peek(self) -> str | None:
+        if self.position < len(self.pattern):
+            return self.pattern[self.position]
+        return None
+
+    def _alternation(self) -> set[str]:
+        literals = self._sequence()
+        while self._peek() == "|":
+            self.position += 1
+            literals |= self._sequence()
+        self._check_limit(literals)
+        return literals
+
+    def _sequence(self) -> set[str]:
+        literals = {""}
+        while (char := self._peek()) is not None and char not in "|)":
+            atom = self._atom()
+            if self._peek() == "?":
+                self.position += 1
+                if self._peek() in ("?", "+"):
+                    raise _NotLiteral()
+                atom = atom | {""}
+            literals = {prefix + suffix for prefix in literals for suffix in atom}
+            self._check_limit(literals)
+        return literals
+
+    def _atom(self) -> set[str]:
+        char = self.pattern[self.position]
+        self.position += 1
+
+        if char == "(":
+            if self._peek() == "?":
+                raise _NotLiteral()
+            literals = self._alternation()
+            if self._peek() != ")":
+                raise _NotLiteral()
+            self.position += 1
+            return literals
+
+        if char == "\\":
+            escaped = self._peek()
+            # Escapes of letters and digits are classes or special sequences
+            if escaped is None or escaped.isalnum():
+                raise _NotLiteral()
+            self.position += 1
+            return {escaped}
+
+        if char in _SPECIAL_CHARACTERS:
+            raise _NotLiteral()
+        return {char}
+
+    def _check_limit(self, literals: set[str]) -> None:
+        if len(literals) > self.limit:
+            raise _NotLiteral()
+
+
+def _expand_literals(pattern: str, limit: int) -> tuple[bool, set[str]] | None:
+    """
+    Expand a regex into the strings it matches, if they're finitely many.
+
+    Returns:
+        Whether the pattern is anchored at the start of the text, and the
+        strings it matches; or `None` if the pattern can't be expanded
+    """
+    anchored = pattern.startswith("^")
+    try:
+        literals = _LiteralParser(pattern[1:] if anchored else pattern, limit).parse()
+    except _NotLiteral:
+        return None
+    # A pattern matching the empty string matches any text
+    if "" in literals:
+        return None
+    return anchored, literals
+
+
+class MultiPatternMatcher:
+    """
+    Find the first of many regex patterns matching a text, in a single pass.
+
+    Patterns which match a finite set of strings, like `(hi|hello)` or
+    `that'?s all`, are compiled into an Aho-Corasick automaton, which finds
+    all their occurrences in a single scan of the text, whatever their number.
+    Other patterns are searched with their compiled regex, and only when they
+    have priority over the first literal match.
+
+    The result is the same as searching each pattern in turn with `re.search`,
+    and returning the first one matching.
+    """
+
+    MAX_EXPANSION = 256
+    """Max strings a pattern may expand to, to be compiled into the automaton."""
+
+    def __init__(self, patterns: Sequence[str], *, ignore_case: bool = False):
+        """
+        Compile the patterns.
+
+        Args:
+            patterns: Patterns, by decreasing priority
+            ignore_case: Whether to match patterns case-insensitively
+        """
+        self.patterns = list(patterns)
+        self.ignore_case = ignore_case
+
+        self._transitions: list[dict[str, int]] = [{}]
+        # Per state: patterns ending there, as (index, length, anchored)
+        self._outputs: list[list[tuple[int, int, bool]]] = [[]]
+        self._residual: list[tuple[int, re.Pattern[str]]] = []
+
+        for index, pattern in enumerate(self.patterns):
+            expansion = _expand_literals(pattern, self.MAX_EXPANSION)
+            if expansion is None:
+                flags = re.IGNORECASE if ignore_case else 0
+                self._residual.append((index, re.compile(pattern, flags)))
+                continue
+            anchored, literals = expansion
+            for literal in literals:
+                self._add(literal.lower() if ignore_case else literal, index, anchored)
+
+        self._compile()
+
+    def first(self, text: str) -> int | None:
+        """
+        Find the first pattern matching the text.
+
+        Returns:
+            Index of the pattern, or `None` if none matches
+        """
+        if self.ignore_case:
+            text = text.lower()
+
+        first: int | None = None
+        transitions = self._transitions
+        outputs = self._outputs
+        state = 0
+        for position, char in enumerate(text, 1):
+            state = transitions[state].get(char, 0)
+            for index, length, anchored in outputs[state]:
+                if first is not None and index >= first:
+                    break
+                if anchored and position != length:
+                    continue
+                first = index
+                break
+            if first == 0:
+                return first
+
+        for index, regex in self._residual:
+            if first is not None and index >= first:
+                break
+            if regex.search(text):
+                return index
+
+        return first
+
+    def _add(self, literal: str, index: int, anchored: bool) -> None:
+        state = 0
+        for char in literal:
+            next_state = self._transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self._transitions)
+                self._transitions.append({})
+                self._outputs.append([])
+                self._transitions[state][char] = next_state
+            state = next_state
+        self._outputs[state].append((index, len(literal), anchored))
+
+    def _compile(self) -> None:
+        """
+        Turn the trie into a deterministic automaton.
+
+        Failure links are computed breadth-first, then folded into the
+        transitions, so scanning a character is a single dictionary lookup.
+        """
+        trie = [dict(transitions) for transitions in self._transitions]
+        alphabet = {char for transitions in trie for char in transitions}
+        failures = [0] * len(trie)
+
+        queue = deque(trie[0].values())
+        while queue:
+            state = queue.popleft()
+            self._outputs[state] = sorted(
+                self._outputs[state] + self._outputs[failures[state]]
+            )
+            for char, next_state in trie[state].items():
+                queue.append(next_state)
+                failure = failures[state]
+                while failure and char not in trie[failure]:
+                    failure = failures[failure]
+                failures[next_state] = trie[failure].get(char, 0)
+
+        # States are numbered in insertion order, not breadth-first: transitions
+        # of a state are built from those of its failure, which is shallower
+        for state in self._breadth_first(trie):
+            transitions = self._transitions[state]
+            for char in alphabet:
+                if char not in trie[state]:
+                    transitions[char] = (
+                        self._transitions[failures[state]].get(char, 0) if state else 0
+                    )
+            # Unknown characters restart from the root: drop those transitions
+            for char in [c for c, s in transitions.items() if s == 0]:
+                del transitions[char]
+
+    def _breadth_first(self, trie: list[dict[str, int]]) -> list[int]:
+        order = [0]
+        for state in order:
+            order.extend(trie[state].values())
+        return order
+
+
+__all__ = ["MultiPatternMatcher"]
@@ -1,10 +1,15 @@
 """Agent Core Orchestrator - 6-layer system for conversational commerce."""
 
+import asyncio
+import contextlib
 import logging
 import time
+from collections.abc import Iterator
+from dataclasses import dataclass, field
 from typing import Any
 from uuid import UUID
 
+import logfire
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from polar.agent.enums import Action, Intent
@@ -12,11 +17,44 @@ from polar.agent.service import conversation_service, message_service
 from polar.agent_conversation.intent_classifier import intent_classifier
 from polar.agent_llm.anthropic_client import AnthropicClient
 from polar.agent_llm.base import LLMMessage, LLMTool
-from polar.agent_tools.registry import tool_registry
+from polar.agent_tools.registry import ToolCall, tool_registry
+from polar.kit.db.postgres import AsyncSessionMaker
 from polar.models import Agent, Conversation, Message
 
 logger = logging.getLogger(__name__)
 
+# Intents for which the knowledge base is queried
+KNOWLEDGE_INTENTS = (Intent.PRODUCT_QUERY, Intent.RECOMMENDATION_REQUEST)
+
+
+@dataclass
+class TurnContext:
+    """
+    State of a single conversation turn, shared by the layers.
+
+    The conversation history is loaded once per turn, and each layer records
+    its duration in `timings`.
+    """
+
+    session: AsyncSession
+    conversation: Conversation
+    user_message: Message
+    messages: list[Message] = field(default_factory=list)
+    customer_profile: dict[str, Any] = field(default_factory=dict)
+    timings: dict[str, int] = field(default_factory=dict)
+
+    @contextlib.contextmanager
+    def span(self, layer: str) -> Iterator[None]:
+        """Trace a layer, and record its duration in milliseconds."""
+        start = time.perf_counter()
+        with logfire.span(
+            "agent.{layer}", layer=layer, conversation_id=self.conversation.id
+        ):
+            try:
+                yield
+            finally:
+                self.timings[layer] = int((time.perf_counter() - start) * 1000)
+
 
 class AgentOrchestrator:
     """
@@ -31,10 +69,23 @@ class AgentOrchestrator:
 
     Flow:
     User Message → Understand → Enrich → Decide → Execute Tools → Generate Response → Update State → Agent Response
+
+    Work that doesn't depend on the intent starts right away: the knowledge
+    base lookup runs concurrently with history loading and classification,
+    and is cancelled if the intent doesn't need it. It's skipped altogether
+    when the rules already resolve the intent to one that doesn't need it.
     """
 
-    def __init__(self):
-        """Initialize orchestrator."""
+    def __init__(self, session_maker: AsyncSessionMaker | None = None):
+        """
+        Initialize orchestrator.
+
+        Args:
+            session_maker: Sessionmaker of the knowledge base lookups, which run
+                concurrently with the turn session. Without it, no knowledge
+                context is retrieved.
+        """
+        self.session_maker = session_maker
         self.llm_client = AnthropicClient()
         self.intent_classifier = intent_classifier
         self.tool_registry = tool_registry
@@ -61,37 +112,54 @@ class AgentOrchestrator:
             f"Processing message: conversation={conversation.id}, message={user_message.id}"
         )
 
+        turn = TurnContext(
+            session=session, conversation=conversation, user_message=user_message
+        )
+        knowledge_task = self._start_knowledge_retrieval(turn)
+
         try:
+            # Load history and customer profile, while knowledge is retrieved
+            with turn.span("load_context"):
+                turn.messages, turn.customer_profile = await asyncio.gather(
+                    self._load_history(turn), self._get_customer_profile(turn)
+                )
+
             # Layer 1: Conversation Understanding
-            understanding = await self._understand_conversation(
-                session, conversation, user_message
-            )
+            with turn.span("understand"):
+                understanding = await self._understand_conversation(turn)
 
             # Layer 2: Context Enrichment
-            enriched_context = await self._enrich_context(
-                session, conversation, understanding
-            )
+            with turn.span("enrich"):
+                enriched_context = await self._enrich_context(
+                    turn, understanding, knowledge_task
+                )
 
             # Layer 3: Decision Engine
-            decision = await self._make_decision(
-                session, conversation, understanding, enriched_context
-            )
+            with turn.span("decide"):
+                decision = await self._make_decision(
+                    session, conversation, understanding, enriched_context
+                )
 
             # Layer 4: Tool Invocation
-            tool_results = await self._invoke_tools(session, decision)
+            with turn.span("invoke_tools"):
+                tool_results = await self._invoke_tools(session, decision)
 
             # Layer 5: Response Generation
-            response_content = await self._generate_response(
-                session,
-                conversation,
-                understanding,
-                enriched_context,
-                decision,
-                tool_results,
-            )
+            with turn.span("generate_response"):
+                response_content = await self._generate_response(
+                    session,
+                    conversation,
+                    understanding,
+                    enriched_context,
+                    decision,
+                    tool_results,
+                )
 
             # Layer 6: State Memory
-            await self._update_state(session, conversation, understanding, decision)
+            with turn.span("update_state"):
+                await self._update_state(
+                    session, conversation, understanding, decision
+                )
 
             # Create agent message
             agent_message = await message_service.create_agent_message(
@@ -107,7 +175,7 @@ class AgentOrchestrator:
 
             processing_time = int((time.time() - start_time) * 1000)
             logger.info(
-                f"Message processed: {processing_time}ms, intent={understanding['intent']}, action={decision['action']}"
+                f"Message processed: {processing_time}ms, intent={understanding['intent']}, action={decision['action']}, timings={turn.timings}"
             )
 
             return agent_message
@@ -127,21 +195,77 @@ class AgentOrchestrator:
 
             return agent_message
 
-    async def _understand_conversation(
-        self,
-        session: AsyncSession,
-        conversation: Conversation,
-        user_message: Message,
-    ) -> dict[str, Any]:
+        finally:
+            if knowledge_task is not None:
+                knowledge_task.cancel()
+
+    async def _load_history(self, turn: TurnContext) -> list[Message]:
+        """Load the last 10 messages of the conversation, once per turn."""
+        return await message_service.get_conversation_messages(
+            turn.session, turn.conversation.id, limit=10
+        )
+
+    async def _get_customer_profile(self, turn: TurnContext) -> dict[str, Any]:
+        """Get the customer profile, if available."""
+        if not turn.conversation.customer_id:
+            return {}
+        # TODO: Fetch customer profile in Week 3
+        return {
+            "id": str(turn.conversation.customer_id),
+            "is_repeat": True,  # Placeholder
+        }
+
+    def _start_knowledge_retrieval(
+        self, turn: TurnContext
+    ) -> asyncio.Task[dict[str, Any]] | None:
+        """
+        Start the knowledge base lookup, ahead of classification.
+
+        The lookup costs an embedding call: it's not started when the rules
+        already resolve the intent to one that doesn't need knowledge.
+        """
+        rule_intent = self.intent_classifier.match_rules(turn.user_message.content)
+        if rule_intent is not None and rule_intent not in KNOWLEDGE_INTENTS:
+            return None
+        return asyncio.create_task(self._retrieve_knowledge(turn))
+
+    async def _retrieve_knowledge(self, turn: TurnContext) -> dict[str, Any]:
+        """
+        RAG retrieval of product context for the user message.
+
+        Uses its own database sessions, so it can run concurrently with
+        the other layers. Failures are logged and result in no context.
+        """
+        from polar.agent_knowledge.service import get_knowledge_service
+
+        if self.session_maker is None:
+            return {}
+
+        with turn.span("retrieve_knowledge"):
+            try:
+                knowledge_service = get_knowledge_service(self.session_maker)
+                rag_context = await knowledge_service.get_context_for_query(
+                    query=turn.user_message.content,
+                    organization_id=turn.conversation.organization_id,
+                    top_k=3,
+                )
+            except Exception as e:
+                logger.warning(f"Knowledge retrieval failed: {e}", exc_info=True)
+                return {}
+
+        return {
+            "rag_context": rag_context,
+            "relevant_products": [],  # Will be populated by tool execution
+        }
+
+    async def _understand_conversation(self, turn: TurnContext) -> dict[str, Any]:
         """
         Layer 1: Conversation Understanding.
 
         Classify intent and extract entities from user message.
 
         Args:
-            session: Database session
-            conversation: Current conversation
-            user_message: User's message
+            turn: Current turn, with conversation history loaded
 
         Returns:
             {
@@ -151,22 +275,17 @@ class AgentOrchestrator:
                 "reasoning": "..."
             }
         """
-        # Get conversation history
-        messages = await message_service.get_conversation_messages(
-            session, conversation.id, limit=10
-        )
-
         history = [
             {"role": msg.role, "content": msg.content}
-            for msg in messages
-            if msg.id != user_message.id
+            for msg in turn.messages
+            if msg.id != turn.user_message.id
         ]
 
         # Classify intent
         result = await self.intent_classifier.classify(
-            message=user_message.content,
+            message=turn.user_message.content,
             conversation_history=history,
-            context=conversation.context,
+            context=turn.conversation.context,
         )
 
         return {
@@ -178,9 +297,9 @@ class AgentOrchestrator:
 
     async def _enrich_context(
         self,
-        session: AsyncSession,
-        conversation: Conversation,
+        turn: TurnContext,
         understanding: dict[str, Any],
+        knowledge_task: asyncio.Task[dict[str, Any]] | None,
     ) -> dict[str, Any]:
         """
         Layer 2: Context Enrichment.
@@ -188,18 +307,14 @@ class AgentOrchestrator:
         Enrich with conversation history, customer profile, and knowledge base.
 
         Args:
-            session: Database session
-            conversation: Current conversation
+            turn: Current turn, with history and customer profile loaded
             understanding: Understanding from Layer 1
+            knowledge_task: Knowledge base lookup, if started with the turn
 
         Returns:
             Enriched context with history, profile, knowledge
         """
-        # Get conversation history (last 10 messages)
-        messages = await message_service.get_conversation_messages(
-            session, conversation.id, limit=10
-        )
-
+        conversation = turn.conversation
         history = [
             {
                 "role": msg.role,
@@ -207,47 +322,21 @@ class AgentOrchestrator:
                 "intent": msg.intent,
                 "timestamp": msg.created_at.isoformat(),
             }
-            for msg in messages
+            for msg in turn.messages
         ]
 
-        # Customer profile (if available)
-        customer_profile = {}
-        if conversation.customer_id:
-            # TODO: Fetch customer profile in Week 3
-            customer_profile = {
-                "id": str(conversation.customer_id),
-                "is_repeat": True,  # Placeholder
-            }
-
         # Knowledge base context (if product query)
-        knowledge_context = {}
-        if understanding["intent"] in (
-            Intent.PRODUCT_QUERY,
-            Intent.RECOMMENDATION_REQUEST,
-        ):
-            # RAG retrieval for product context
-            from polar.agent_knowledge.service import get_knowledge_service
-            from polar.kit.db.postgres import async_session_maker
-
-            knowledge_service = get_knowledge_service(async_session_maker)
-
-            # Get last user message for query
-            recent_messages = [msg for msg in messages if msg.role == "user"]
-            if recent_messages:
-                query = recent_messages[-1].content
-                rag_context = await knowledge_service.get_context_for_query(
-                    query=query,
-                    organization_id=conversation.organization_id,
-                    top_k=3,
-                )
-                knowledge_context = {
-                    "rag_context": rag_context,
-                    "relevant_products": [],  # Will be populated by tool execution
-                }
+        knowledge_context: dict[str, Any] = {}
+        if understanding["intent"] in KNOWLEDGE_INTENTS:
+            if knowledge_task is None:
+                knowledge_task = asyncio.create_task(self._retrieve_knowledge(turn))
+            knowledge_context = await knowledge_task
+        elif knowledge_task is not None:
+            knowledge_task.cancel()
 
         return {
             "history": history,
-            "customer_profile": customer_profile,
+            "customer_profile": turn.customer_profile,
             "knowledge": knowledge_context,
             "conversation_stage": conversation.stage,
             "cart": conversation.context.get("cart", {}),
@@ -304,6 +393,7 @@ class AgentOrchestrator:
         parameters = {}
 
         if action == Action.SEARCH_PRODUCTS:
+            parameters["organization_id"] = str(conversation.organization_id)
             parameters["query"] = entities.get("product_type", "")
             parameters["max_price"] = entities.get("max_price")
             parameters["color"] = entities.get("color")
@@ -352,17 +442,17 @@ class AgentOrchestrator:
         }
 
         tool_name = ACTION_TOOL_MAP.get(action)
-        if tool_name:
-            # Invoke tool
-            result = await self.tool_registry.invoke(
-                session=session,
-                tool_name=tool_name,
-                parameters=parameters,
-            )
+        calls = [ToolCall(tool_name, parameters)] if tool_name else []
+        if not calls:
+            return tool_results
 
+        # Independent tools run concurrently, each within its timeout
+        results = await self.tool_registry.invoke_many(session, calls)
+
+        for call, result in zip(calls, results):
             tool_results.append(
                 {
-                    "tool": tool_name,
+                    "tool": call.tool_name,
                     "success": result.success,
                     "data": result.data,
                     "error": result.error,
@@ -397,30 +487,8 @@ class AgentOrchestrator:
         Returns:
             Response text
         """
-        # Get agent configuration
         agent = conversation.agent
-
-        # Build system prompt
-        system_prompt = self._build_system_prompt(agent, enriched_context)
-
-        # Build conversation history for LLM
-        llm_messages = [LLMMessage(role="system", content=system_prompt)]
-
-        # Add recent conversation history
-        for msg in enriched_context["history"][-5:]:
-            llm_messages.append(
-                LLMMessage(role=msg["role"], content=msg["content"])
-            )
-
-        # Add tool results context
-        if tool_results:
-            tool_context = self._format_tool_results(tool_results)
-            llm_messages.append(
-                LLMMessage(
-                    role="system",
-                    content=f"Tool execution results:\n{tool_context}",
-                )
-            )
+        llm_messages = self._build_llm_messages(agent, enriched_context, tool_results)
 
         # Generate response with Claude
         response = await self.llm_client.chat(
@@ -492,6 +560,34 @@ class AgentOrchestrator:
         # Mark conversation as modified
         session.add(conversation)
 
+    def _build_llm_messages(
+        self,
+        agent: Agent,
+        enriched_context: dict[str, Any],
+        tool_results: list[dict[str, Any]],
+    ) -> list[LLMMessage]:
+        """Build the LLM conversation: system prompt, history and tool results."""
+        system_prompt = self._build_system_prompt(agent, enriched_context)
+        llm_messages = [LLMMessage(role="system", content=system_prompt)]
+
+        # Add recent conversation history
+        for msg in enriched_context["history"][-5:]:
+            llm_messages.append(
+                LLMMessage(role=msg["role"], content=msg["content"])
+            )
+
+        # Add tool results context
+        if tool_results:
+            tool_context = self._format_tool_results(tool_results)
+            llm_messages.append(
+                LLMMessage(
+                    role="system",
+                    content=f"Tool execution results:\n{tool_context}",
+                )
+            )
+
+        return llm_messages
+
     def _build_system_prompt(
         self, agent: Agent, enriched_context: dict[str, Any]
     ) -> str:
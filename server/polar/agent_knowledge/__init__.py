@@ -4,13 +4,18 @@ from polar.agent_knowledge.base import (
     EmbeddingResult,
     EmbeddingService,
     SearchResult,
+    VectorRecord,
     VectorStore,
 )
 from polar.agent_knowledge.embedding_service import (
     OpenAIEmbeddingService,
     ProductEmbeddingGenerator,
 )
-from polar.agent_knowledge.service import KnowledgeService, get_knowledge_service
+from polar.agent_knowledge.service import (
+    IndexingReport,
+    KnowledgeService,
+    get_knowledge_service,
+)
 from polar.agent_knowledge.vector_store import (
     PgvectorStore,
     ProductVectorStore,
@@ -21,6 +26,7 @@ __all__ = [
     "EmbeddingResult",
     "EmbeddingService",
     "SearchResult",
+    "VectorRecord",
     "VectorStore",
     # Implementations
     "OpenAIEmbeddingService",
@@ -28,6 +34,7 @@ __all__ = [
     "PgvectorStore",
     "ProductVectorStore",
     # Service
+    "IndexingReport",
     "KnowledgeService",
     "get_knowledge_service",
 ]
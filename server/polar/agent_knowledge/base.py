@@ -1,6 +1,7 @@
 """Base classes for agent knowledge system (RAG)."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from dataclasses import dataclass
 from typing import Any
 
@@ -24,6 +25,16 @@ class EmbeddingResult:
     dimensions: int
 
 
+@dataclass
+class VectorRecord:
+    """Vector to store, with its content and metadata."""
+
+    id: str
+    embedding: list[float]
+    content: str
+    metadata: dict[str, Any]
+
+
 class VectorStore(ABC):
     """
     Abstract interface for vector storage.
@@ -72,6 +83,23 @@ class VectorStore(ABC):
         """
         pass
 
+    async def upsert_many(self, records: Sequence[VectorRecord]) -> None:
+        """
+        Insert or update many vectors.
+
+        Implementations should override this to write them in bulk.
+
+        Args:
+            records: Vectors to upsert
+        """
+        for record in records:
+            await self.upsert(
+                id=record.id,
+                embedding=record.embedding,
+                content=record.content,
+                metadata=record.metadata,
+            )
+
     @abstractmethod
     async def delete(self, id: str) -> None:
         """Delete vector by ID."""
@@ -1,11 +1,37 @@
 """Embedding service using OpenAI API."""
 
 import hashlib
-from typing import Any
+from array import array
+from typing import TYPE_CHECKING, Any
 
 from polar.agent_knowledge.base import EmbeddingResult, EmbeddingService
 from polar.config import settings
-from polar.redis import Redis
+from polar.kit.cache import LRUCache
+from polar.models.product_price import ProductPriceAmountType
+from polar.redis import BinaryRedis, create_binary_redis
+
+if TYPE_CHECKING:
+    from polar.agent_llm.openai_client import OpenAIClient
+
+_openai_client: "OpenAIClient | None" = None
+
+
+def get_openai_client() -> "OpenAIClient":
+    """OpenAI client shared by the embedding services, pooling connections."""
+    global _openai_client
+    if _openai_client is None:
+        from polar.agent_llm.openai_client import OpenAIClient
+
+        _openai_client = OpenAIClient()
+    return _openai_client
+
+
+async def close_openai_client() -> None:
+    """Close the connections of the shared OpenAI client."""
+    global _openai_client
+    if _openai_client is not None:
+        openai_client, _openai_client = _openai_client, None
+        await openai_client.aclose()
 
 
 class OpenAIEmbeddingService(EmbeddingService):
@@ -15,14 +41,21 @@ class OpenAIEmbeddingService(EmbeddingService):
     Features:
     - 1536 dimensions
     - $0.02 per 1M tokens (~$0.20 for 10K products)
-    - Redis caching (1 hour TTL)
+    - Two-tier caching: in-process LRU, then Redis (1 hour TTL)
+
+    Vectors are cached as packed float32 (6 KB for 1536 dimensions), and Redis
+    is queried with MGET and pipelined SET, in chunks of `CHUNK_SIZE` keys.
     """
 
+    CHUNK_SIZE = 1000
+
     def __init__(
         self,
         model: str = "text-embedding-3-small",
         dimensions: int = 1536,
         cache_ttl: int = 3600,
+        local_cache_size: int = 4096,
+        redis: BinaryRedis | None = None,
     ):
         """
         Initialize embedding service.
@@ -31,11 +64,16 @@ class OpenAIEmbeddingService(EmbeddingService):
             model: OpenAI embedding model
             dimensions: Embedding dimensions
             cache_ttl: Cache TTL in seconds (default 1 hour)
+            local_cache_size: Max vectors kept in process memory
+            redis: Redis client, must not decode responses
         """
         self.model = model
         self.dimensions = dimensions
         self.cache_ttl = cache_ttl
-        self.redis = Redis()
+        self.redis = redis or create_binary_redis("app")
+        self._local_cache = LRUCache[str, bytes](
+            maxsize=local_cache_size, ttl=cache_ttl
+        )
 
         # TODO: Initialize OpenAI client in Week 2-3
         # from openai import AsyncOpenAI
@@ -53,22 +91,13 @@ class OpenAIEmbeddingService(EmbeddingService):
         """
         # Check cache first
         cache_key = self._cache_key(text)
-        cached = await self._get_cached(cache_key)
-        if cached:
-            return EmbeddingResult(
-                embedding=cached,
-                model=self.model,
-                dimensions=self.dimensions,
-            )
-
-        # Generate embedding with OpenAI
-        from polar.agent_llm.openai_client import OpenAIClient
+        [embedding] = await self._get_cached([cache_key])
+        if embedding is None:
+            # Generate embedding with OpenAI
+            embedding = await get_openai_client().embed(text, model=self.model)
 
-        openai_client = OpenAIClient()
-        embedding = await openai_client.embed(text, model=self.model)
-
-        # Cache result
-        await self._set_cached(cache_key, embedding)
+            # Cache result
+            await self._set_cached({cache_key: embedding})
 
         return EmbeddingResult(
             embedding=embedding,
@@ -92,63 +121,85 @@ class OpenAIEmbeddingService(EmbeddingService):
             return []
 
         # Check cache for all texts
-        results: list[EmbeddingResult | None] = [None] * len(texts)
-        uncached_indices: list[int] = []
-        uncached_texts: list[str] = []
-
-        for i, text in enumerate(texts):
-            cache_key = self._cache_key(text)
-            cached = await self._get_cached(cache_key)
-            if cached:
-                results[i] = EmbeddingResult(
-                    embedding=cached,
-                    model=self.model,
-                    dimensions=self.dimensions,
-                )
-            else:
-                uncached_indices.append(i)
-                uncached_texts.append(text)
+        cache_keys = [self._cache_key(text) for text in texts]
+        embeddings = await self._get_cached(cache_keys)
+
+        # Texts to embed, deduplicated by cache key
+        uncached: dict[str, str] = {}
+        for cache_key, text, embedding in zip(cache_keys, texts, embeddings):
+            if embedding is None:
+                uncached[cache_key] = text
 
         # Generate embeddings for uncached texts
-        if uncached_texts:
+        if uncached:
             # Batch embed with OpenAI
-            from polar.agent_llm.openai_client import OpenAIClient
-
-            openai_client = OpenAIClient()
-            embeddings = await openai_client.embed_batch(uncached_texts, model=self.model)
-
-            # Cache and populate results
-            for i, embedding in zip(uncached_indices, embeddings):
-                cache_key = self._cache_key(texts[i])
-                await self._set_cached(cache_key, embedding)
-                results[i] = EmbeddingResult(
-                    embedding=embedding,
-                    model=self.model,
-                    dimensions=self.dimensions,
+            generated = dict(
+                zip(
+                    uncached.keys(),
+                    await get_openai_client().embed_batch(
+                        list(uncached.values()), model=self.model
+                    ),
                 )
+            )
 
-        return results  # type: ignore
+            # Cache and populate results
+            await self._set_cached(generated)
+            embeddings = [
+                embedding if embedding is not None else generated[cache_key]
+                for cache_key, embedding in zip(cache_keys, embeddings)
+            ]
+
+        return [
+            EmbeddingResult(
+                embedding=embedding,  # type: ignore[arg-type]
+                model=self.model,
+                dimensions=self.dimensions,
+            )
+            for embedding in embeddings
+        ]
 
     def _cache_key(self, text: str) -> str:
         """Generate cache key for text."""
         text_hash = hashlib.sha256(text.encode()).hexdigest()[:16]
-        return f"embedding:{self.model}:{text_hash}"
-
-    async def _get_cached(self, key: str) -> list[float] | None:
-        """Get embedding from cache."""
-        cached = await self.redis.get(key)
-        if cached:
-            # Parse JSON string back to list
-            import json
-
-            return json.loads(cached)
-        return None
-
-    async def _set_cached(self, key: str, embedding: list[float]) -> None:
-        """Set embedding in cache."""
-        import json
-
-        await self.redis.set(key, json.dumps(embedding), ex=self.cache_ttl)
+        return f"embedding:f32:{self.model}:{self.dimensions}:{text_hash}"
+
+    def _pack(self, embedding: list[float]) -> bytes:
+        return array("f", embedding).tobytes()
+
+    def _unpack(self, value: bytes) -> list[float] | None:
+        # Ignore values of an unexpected size, e.g. from another encoding
+        if len(value) != self.dimensions * 4:
+            return None
+        vector = array("f")
+        vector.frombytes(value)
+        return vector.tolist()
+
+    async def _get_cached(self, keys: list[str]) -> list[list[float] | None]:
+        """Get embeddings from cache, local tier first, then Redis."""
+        values: list[bytes | None] = [self._local_cache.get(key) for key in keys]
+
+        missing = [i for i, value in enumerate(values) if value is None]
+        for chunk_start in range(0, len(missing), self.CHUNK_SIZE):
+            chunk = missing[chunk_start : chunk_start + self.CHUNK_SIZE]
+            cached = await self.redis.mget([keys[i] for i in chunk])
+            for i, value in zip(chunk, cached):
+                if value is not None:
+                    self._local_cache.set(keys[i], value)
+                    values[i] = value
+
+        return [self._unpack(value) if value is not None else None for value in values]
+
+    async def _set_cached(self, embeddings: dict[str, list[float]]) -> None:
+        """Set embeddings in cache."""
+        items = [(key, self._pack(embedding)) for key, embedding in embeddings.items()]
+        for key, value in items:
+            self._local_cache.set(key, value)
+
+        for chunk_start in range(0, len(items), self.CHUNK_SIZE):
+            async with self.redis.pipeline(transaction=False) as pipeline:
+                for key, value in items[chunk_start : chunk_start + self.CHUNK_SIZE]:
+                    pipeline.set(key, value, ex=self.cache_ttl)
+                await pipeline.execute()
 
 
 class ProductEmbeddingGenerator:
@@ -181,12 +232,36 @@ class ProductEmbeddingGenerator:
         # if product.category:
         #     parts.append(f"Category: {product.category}")
 
-        # TODO: Add price from ProductPrice relationship
-        # if product.price:
-        #     parts.append(f"Price: ${product.price / 100}")
+        price_amount = self.get_price_amount(product)
+        if price_amount is not None:
+            parts.append(f"Price: ${price_amount / 100:.2f}")
 
         return "\n".join(parts)
 
+    def get_price_amount(self, product: Any) -> int | None:
+        """
+        Get the amount of the product's fixed or free price, in cents.
+
+        Pay-what-you-want products have none, so they don't match price filters.
+        """
+        price = product.get_static_price()
+        if price is None:
+            return None
+        if price.amount_type == ProductPriceAmountType.fixed:
+            return price.price_amount
+        if price.amount_type == ProductPriceAmountType.free:
+            return 0
+        return None
+
+    def content_hash(self, product: Any) -> str:
+        """
+        Hash the text embedded for a product.
+
+        Products whose hash didn't change don't need to be embedded again.
+        """
+        text = self.prepare_product_text(product)
+        return hashlib.sha256(text.encode()).hexdigest()[:32]
+
     async def generate_for_product(self, product: Any) -> EmbeddingResult:
         """Generate embedding for product."""
         text = self.prepare_product_text(product)
@@ -0,0 +1,199 @@
+"""In-process vector index for organizations with few products."""
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID
+
+import numpy as np
+
+from polar.agent_knowledge.base import SearchResult, VectorRecord
+from polar.agent_knowledge.vector_store import PgvectorStore
+from polar.kit.cache import LRUCache
+from polar.redis import Redis, create_redis
+
+
+class LocalVectorIndex:
+    """
+    Exact cosine similarity index over a small set of vectors.
+
+    Vectors are kept as a contiguous float32 matrix with normalized rows,
+    so a search is a single matrix-vector product.
+    """
+
+    def __init__(self, records: Sequence[VectorRecord]):
+        """
+        Build the index.
+
+        Args:
+            records: Indexed vectors, with their content and metadata
+        """
+        self.records = list(records)
+
+        matrix = np.asarray(
+            [record.embedding for record in self.records], dtype=np.float32
+        ).reshape(len(self.records), -1)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        self.matrix = np.ascontiguousarray(matrix / norms)
+
+        self.prices = np.array(
+            [_get_price(record.metadata) for record in self.records],
+            dtype=np.float64,
+        )
+        self.categories = np.array(
+            [record.metadata.get("category") for record in self.records],
+            dtype=object,
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def search(
+        self,
+        embedding: list[float],
+        limit: int = 5,
+        filters: dict[str, Any] | None = None,
+    ) -> list[SearchResult]:
+        """
+        Search for the most similar vectors.
+
+        Args:
+            embedding: Query vector
+            limit: Max results
+            filters: Filters (category, min_price, max_price)
+
+        Returns:
+            List of SearchResult ordered by similarity
+        """
+        if not self.records:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        scores = self.matrix @ query
+
+        candidates = np.flatnonzero(self._get_mask(filters or {}))
+        if len(candidates) > limit:
+            top = np.argpartition(-scores[candidates], limit)[:limit]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return [
+            SearchResult(
+                id=self.records[i].id,
+                content=self.records[i].content,
+                metadata=self.records[i].metadata,
+                score=float(scores[i]),
+            )
+            for i in candidates
+        ]
+
+    def _get_mask(self, filters: dict[str, Any]) -> np.ndarray:
+        mask = np.ones(len(self.records), dtype=bool)
+        for key, value in filters.items():
+            if key == "category":
+                mask &= self.categories == value
+            elif key == "min_price":
+                mask &= self.prices >= value
+            elif key == "max_price":
+                mask &= self.prices <= value
+            elif key != "organization_id":
+                mask &= np.array(
+                    [
+                        str(record.metadata.get(key)) == str(value)
+                        for record in self.records
+                    ],
+                    dtype=bool,
+                )
+        return mask
+
+
+def _get_price(metadata: dict[str, Any]) -> float:
+    # Vectors without price never match price filters, like NULL in SQL
+    price = metadata.get("price")
+    return float(price) if price is not None else np.nan
+
+
+_GENERATION_KEY = "agent_knowledge:local_index:generation"
+
+
+@dataclass
+class _CachedIndex:
+    version: Any
+    index: LocalVectorIndex | None
+    """`None` when the organization has too many vectors."""
+
+
+class LocalIndexCache:
+    """
+    LRU of the local vector indexes of small organizations.
+
+    Organizations with more than `max_vectors` vectors are not indexed locally:
+    callers should fall back to pgvector.
+
+    Each organization has a version in Redis, bumped whenever its vectors
+    change, so indexes built by any process are rebuilt on their next use.
+    A global generation is bumped when the whole index is rebuilt.
+    """
+
+    def __init__(
+        self,
+        vector_store: PgvectorStore,
+        redis: Redis | None = None,
+        max_vectors: int = 1000,
+        max_organizations: int = 128,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            vector_store: pgvector store, from which indexes are loaded
+            redis: Redis client, storing the organizations' versions
+            max_vectors: Max vectors of an organization indexed locally
+            max_organizations: Max organizations kept in memory
+        """
+        self.vector_store = vector_store
+        self.redis = redis or create_redis("app")
+        self.max_vectors = max_vectors
+        self._cache = LRUCache[UUID, _CachedIndex](maxsize=max_organizations)
+
+    async def get(self, organization_id: UUID) -> LocalVectorIndex | None:
+        """
+        Get the local index of an organization, loading it if needed.
+
+        Returns:
+            The index, or `None` if the organization is too large
+        """
+        version = await self.redis.mget(
+            _GENERATION_KEY, self._version_key(organization_id)
+        )
+        cached = self._cache.get(organization_id)
+        if cached is not None and cached.version == version:
+            return cached.index
+
+        records = await self.vector_store.get_vectors(
+            {"organization_id": organization_id}, limit=self.max_vectors + 1
+        )
+        index = LocalVectorIndex(records) if len(records) <= self.max_vectors else None
+        self._cache.set(organization_id, _CachedIndex(version=version, index=index))
+        return index
+
+    async def invalidate(self, organization_id: UUID) -> None:
+        """Mark the local indexes of an organization as stale, in every process."""
+        self._cache.pop(organization_id)
+        await self.redis.incr(self._version_key(organization_id))
+
+    async def invalidate_all(self) -> None:
+        """Mark all local indexes as stale, in every process."""
+        self._cache.clear()
+        await self.redis.incr(_GENERATION_KEY)
+
+    def _version_key(self, organization_id: UUID) -> str:
+        return f"agent_knowledge:local_index:{organization_id}:version"
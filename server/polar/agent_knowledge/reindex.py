@@ -0,0 +1,44 @@
+"""Debounced scheduling of incremental product reindexing, per organization."""
+
+import time
+import uuid
+from datetime import timedelta
+
+from polar.redis import Pipeline, Redis
+from polar.worker import enqueue_flush_callback
+
+# Sorted set of organizations to reindex, scored by the time of their last change
+PENDING_KEY = "polar:agent_knowledge:reindex_pending"
+DEBOUNCE = timedelta(seconds=60)
+
+
+def schedule_reindex(organization_id: uuid.UUID) -> None:
+    """
+    Schedule the reindexing of the products of an organization.
+
+    The organization is marked as changed once the current transaction is
+    committed. It's reindexed once it didn't change for `DEBOUNCE`, so a burst
+    of product changes results in a single reindexing.
+    """
+
+    def _mark_changed(pipeline: Pipeline) -> None:
+        pipeline.zadd(PENDING_KEY, {str(organization_id): time.time()})
+
+    enqueue_flush_callback(f"agent_knowledge:reindex:{organization_id}", _mark_changed)
+
+
+async def pop_due_reindexes(
+    redis: Redis, debounce: timedelta = DEBOUNCE
+) -> list[uuid.UUID]:
+    """
+    Pop the organizations which didn't change for `debounce`.
+
+    Organizations changing again in the meantime have a newer score, so they
+    aren't removed, and will be popped once their new debounce elapsed.
+    """
+    cutoff = time.time() - debounce.total_seconds()
+    async with redis.pipeline(transaction=True) as pipeline:
+        pipeline.zrangebyscore(PENDING_KEY, "-inf", cutoff)
+        pipeline.zremrangebyscore(PENDING_KEY, "-inf", cutoff)
+        organization_ids, _ = await pipeline.execute()
+    return [uuid.UUID(organization_id) for organization_id in organization_ids]
@@ -1,19 +1,44 @@
 """Knowledge service for RAG (Retrieval-Augmented Generation)."""
 
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
 from typing import Any
 from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import Select, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from polar.agent_knowledge.base import SearchResult
+from polar.agent_knowledge.base import SearchResult, VectorRecord
 from polar.agent_knowledge.embedding_service import (
     OpenAIEmbeddingService,
     ProductEmbeddingGenerator,
 )
+from polar.agent_knowledge.local_index import LocalIndexCache
 from polar.agent_knowledge.vector_store import ProductVectorStore, PgvectorStore
 from polar.kit.db.postgres import AsyncSessionMaker
-from polar.models import Product
+from polar.models import Organization, Product
+
+
+@dataclass
+class IndexingReport:
+    """Outcome of an incremental indexing run."""
+
+    products: int = 0
+    """Products indexed, whether embedded again or not."""
+    embedded: int = 0
+    """Products embedded, because new or changed."""
+    skipped: int = 0
+    """Products not embedded again, because unchanged: the avoided embeddings."""
+    deleted: int = 0
+    """Stale vectors removed."""
+
+    def __add__(self, other: "IndexingReport") -> "IndexingReport":
+        return IndexingReport(
+            products=self.products + other.products,
+            embedded=self.embedded + other.embedded,
+            skipped=self.skipped + other.skipped,
+            deleted=self.deleted + other.deleted,
+        )
 
 
 class KnowledgeService:
@@ -29,11 +54,14 @@ class KnowledgeService:
     Week 1-3: Basic setup and testing
     """
 
+    INDEXING_BATCH_SIZE = 1000
+
     def __init__(
         self,
         session_maker: AsyncSessionMaker,
         embedding_service: OpenAIEmbeddingService | None = None,
         vector_store: PgvectorStore | None = None,
+        local_index: LocalIndexCache | None = None,
     ):
         """
         Initialize knowledge service.
@@ -42,10 +70,12 @@ class KnowledgeService:
             session_maker: SQLAlchemy async session maker
             embedding_service: OpenAI embedding service
             vector_store: pgvector store
+            local_index: In-process indexes of small organizations
         """
         self.session_maker = session_maker
         self.embedding_service = embedding_service or OpenAIEmbeddingService()
         self.vector_store = vector_store or PgvectorStore(session_maker)
+        self.local_index = local_index or LocalIndexCache(self.vector_store)
         self.product_vector_store = ProductVectorStore(self.vector_store)
         self.product_embedding_generator = ProductEmbeddingGenerator(
             self.embedding_service
@@ -77,38 +107,56 @@ class KnowledgeService:
         # 1. Embed query
         embedding_result = await self.embedding_service.embed(query)
 
-        # 2. Search vector store
-        results = await self.product_vector_store.search_products(
-            query_embedding=embedding_result.embedding,
-            limit=limit,
-            organization_id=organization_id,
-            max_price=max_price,
-            min_price=min_price,
-            category=category,
-        )
+        # 2. Search the local index of small organizations, else vector store
+        local_index = await self.local_index.get(organization_id)
+        if local_index is not None:
+            filters: dict[str, Any] = {}
+            if category:
+                filters["category"] = category
+            if min_price is not None:
+                filters["min_price"] = min_price
+            if max_price is not None:
+                filters["max_price"] = max_price
+            results = local_index.search(
+                embedding_result.embedding, limit=limit, filters=filters
+            )
+        else:
+            results = await self.product_vector_store.search_products(
+                query_embedding=embedding_result.embedding,
+                limit=limit,
+                organization_id=organization_id,
+                max_price=max_price,
+                min_price=min_price,
+                category=category,
+            )
 
-        # 3. Hydrate with full product data
-        products = []
+        # 3. Hydrate with full product data, in one query
+        product_ids = [UUID(result.metadata["product_id"]) for result in results]
         async with self.session_maker() as session:
-            for result in results:
-                product_id = UUID(result.metadata["product_id"])
-                product = await session.get(Product, product_id)
-                if product:
-                    products.append(
-                        {
-                            "id": str(product.id),
-                            "name": product.name,
-                            "description": product.description,
-                            "score": result.score,
-                            # Add more fields as needed
-                        }
-                    )
+            statement = select(Product).where(Product.id.in_(product_ids))
+            products_map = {
+                product.id: product for product in await session.scalars(statement)
+            }
+
+        products = []
+        for product_id, result in zip(product_ids, results):
+            product = products_map.get(product_id)
+            if product:
+                products.append(
+                    {
+                        "id": str(product.id),
+                        "name": product.name,
+                        "description": product.description,
+                        "score": result.score,
+                        # Add more fields as needed
+                    }
+                )
 
         return products
 
     async def index_product(
         self, session: AsyncSession, product: Product
-    ) -> None:
+    ) -> bool:
         """
         Index product for semantic search.
 
@@ -120,23 +168,27 @@ class KnowledgeService:
         Args:
             session: Database session
             product: Product to index
+
+        Returns:
+            Whether the product was embedded, i.e. it was new or changed
         """
+        content_hash = self.product_embedding_generator.content_hash(product)
+        content_hashes = await self.vector_store.get_content_hashes(
+            {
+                "organization_id": str(product.organization_id),
+                "product_id": str(product.id),
+            }
+        )
+        if content_hashes.get(str(product.id)) == content_hash:
+            return False
+
         # 1. Generate embedding
         embedding_result = await self.product_embedding_generator.generate_for_product(
             product
         )
 
         # 2. Prepare metadata
-        product_data = {
-            "product_id": product.id,
-            "organization_id": product.organization_id,
-            "name": product.name,
-            "description": product.description,
-            # TODO: Add category when Product model has it
-            # "category": product.category,
-            # TODO: Add price from ProductPrice relationship
-            # "price": product.default_price_amount,
-        }
+        product_data = self._get_product_data(product, content_hash)
 
         # 3. Upsert to vector store
         await self.product_vector_store.upsert_product(
@@ -144,6 +196,105 @@ class KnowledgeService:
             embedding=embedding_result.embedding,
             product_data=product_data,
         )
+        await self.local_index.invalidate(product.organization_id)
+        return True
+
+    async def reindex_organization(
+        self, session: AsyncSession, organization_id: UUID
+    ) -> IndexingReport:
+        """
+        Incrementally reindex the products of an organization.
+
+        Only products whose embedded text changed since they were indexed,
+        according to their content hash, are embedded again. Vectors of
+        products which were deleted or archived are removed.
+
+        Args:
+            session: Database session
+            organization_id: Organization ID
+
+        Returns:
+            Report of the run, with the number of avoided embeddings
+        """
+        report = IndexingReport()
+        content_hashes = await self.vector_store.get_content_hashes(
+            {"organization_id": str(organization_id)}
+        )
+        stale_ids = set(content_hashes)
+
+        statement = self._get_indexable_products_statement(organization_id)
+        async for products in self._iter_products(session, statement):
+            changed: list[tuple[Product, str]] = []
+            for product in products:
+                product_id = str(product.id)
+                stale_ids.discard(product_id)
+                content_hash = self.product_embedding_generator.content_hash(product)
+                if content_hashes.get(product_id) != content_hash:
+                    changed.append((product, content_hash))
+
+            report.products += len(products)
+            report.skipped += len(products) - len(changed)
+            if not changed:
+                continue
+
+            embedding_results = (
+                await self.product_embedding_generator.generate_for_products(
+                    [product for product, _ in changed]
+                )
+            )
+            await self.vector_store.upsert_many(
+                [
+                    self.product_vector_store.build_record(
+                        product_id=product.id,
+                        embedding=embedding_result.embedding,
+                        product_data=self._get_product_data(product, content_hash),
+                    )
+                    for (product, content_hash), embedding_result in zip(
+                        changed, embedding_results
+                    )
+                ]
+            )
+            report.embedded += len(changed)
+
+        await self.vector_store.delete_many(sorted(stale_ids))
+        report.deleted = len(stale_ids)
+
+        if report.embedded or report.deleted:
+            await self.local_index.invalidate(organization_id)
+        return report
+
+    async def verify_index(self, session: AsyncSession) -> IndexingReport:
+        """
+        Verify the whole product index, for all organizations.
+
+        Cheap alternative to `rebuild_index`: every organization with products
+        or vectors is incrementally reindexed, so only missing or outdated
+        products are embedded, and stale vectors are removed.
+
+        Args:
+            session: Database session
+
+        Returns:
+            Report of the run, summed over all organizations
+        """
+        statement = (
+            select(Product.organization_id)
+            .join(Organization, Organization.id == Product.organization_id)
+            .where(
+                Organization.deleted_at.is_(None),
+                Product.deleted_at.is_(None),
+                Product.is_archived.is_(False),
+            )
+            .distinct()
+        )
+        organization_ids = set(await session.scalars(statement))
+        # Organizations left without products only have stale vectors
+        organization_ids |= await self.vector_store.get_organization_ids()
+
+        report = IndexingReport()
+        for organization_id in sorted(organization_ids):
+            report += await self.reindex_organization(session, organization_id)
+        return report
 
     async def index_products_batch(
         self, session: AsyncSession, organization_id: UUID
@@ -156,6 +307,10 @@ class KnowledgeService:
         - Re-indexing after schema changes
         - Periodic refresh
 
+        Products are embedded and loaded in batches, then atomically swapped
+        with the organization's current embeddings, removing stale ones.
+        Unlike `reindex_organization`, all products are embedded again.
+
         Args:
             session: Database session
             organization_id: Organization ID
@@ -163,40 +318,97 @@ class KnowledgeService:
         Returns:
             Number of products indexed
         """
-        # 1. Fetch all products
-        statement = select(Product).where(
-            Product.organization_id == organization_id,
-            Product.deleted_at.is_(None),
+        statement = self._get_indexable_products_statement(organization_id)
+        count = await self.vector_store.replace(
+            self._iter_product_records(session, statement),
+            filters={"organization_id": str(organization_id)},
         )
-        result = await session.execute(statement)
-        products = list(result.scalars().all())
+        await self.local_index.invalidate(organization_id)
+        return count
 
-        if not products:
-            return 0
+    async def rebuild_index(self, session: AsyncSession) -> int:
+        """
+        Rebuild the whole product index, for all organizations.
 
-        # 2. Generate embeddings (batched)
-        embedding_results = (
-            await self.product_embedding_generator.generate_for_products(products)
-        )
+        The new index is built offline, then swapped with the current one.
+        All products are embedded again: prefer `verify_index`, unless the
+        embedded text or the embedding model changed.
 
-        # 3. Upsert to vector store (batched)
-        for product, embedding_result in zip(products, embedding_results):
-            product_data = {
-                "product_id": product.id,
-                "organization_id": product.organization_id,
-                "name": product.name,
-                "description": product.description,
-            }
+        Args:
+            session: Database session
 
-            await self.product_vector_store.upsert_product(
-                product_id=product.id,
-                embedding=embedding_result.embedding,
-                product_data=product_data,
+        Returns:
+            Number of products indexed
+        """
+        statement = self._get_indexable_products_statement()
+        count = await self.vector_store.rebuild(
+            self._iter_product_records(session, statement)
+        )
+        await self.local_index.invalidate_all()
+        return count
+
+    def _get_indexable_products_statement(
+        self, organization_id: UUID | None = None
+    ) -> Select[tuple[Product]]:
+        """Select the products to index: live products of live organizations."""
+        statement = (
+            select(Product)
+            .join(Organization, Organization.id == Product.organization_id)
+            .where(
+                Organization.deleted_at.is_(None),
+                Product.deleted_at.is_(None),
+                Product.is_archived.is_(False),
             )
+        )
+        if organization_id is not None:
+            statement = statement.where(Product.organization_id == organization_id)
+        return statement
+
+    async def _iter_products(
+        self, session: AsyncSession, statement: Select[tuple[Product]]
+    ) -> AsyncIterator[list[Product]]:
+        """Load products selected by `statement`, in batches."""
+        result = await session.stream_scalars(
+            statement.execution_options(yield_per=self.INDEXING_BATCH_SIZE)
+        )
+        async for products in result.partitions():
+            yield list(products)
+
+    async def _iter_product_records(
+        self, session: AsyncSession, statement: Select[tuple[Product]]
+    ) -> AsyncIterator[list[VectorRecord]]:
+        """Embed products selected by `statement`, in batches."""
+        async for products in self._iter_products(session, statement):
+            embedding_results = (
+                await self.product_embedding_generator.generate_for_products(products)
+            )
+            yield [
+                self.product_vector_store.build_record(
+                    product_id=product.id,
+                    embedding=embedding_result.embedding,
+                    product_data=self._get_product_data(
+                        product,
+                        self.product_embedding_generator.content_hash(product),
+                    ),
+                )
+                for product, embedding_result in zip(products, embedding_results)
+            ]
+
+    def _get_product_data(
+        self, product: Product, content_hash: str | None = None
+    ) -> dict[str, Any]:
+        return {
+            "product_id": product.id,
+            "organization_id": product.organization_id,
+            "name": product.name,
+            "description": product.description,
+            # TODO: Add category when Product model has it
+            # "category": product.category,
+            "price": self.product_embedding_generator.get_price_amount(product),
+            "content_hash": content_hash,
+        }
 
-        return len(products)
-
-    async def delete_product(self, product_id: UUID) -> None:
+    async def delete_product(self, product_id: UUID, organization_id: UUID) -> None:
         """
         Remove product from search index.
 
@@ -204,8 +416,10 @@ class KnowledgeService:
 
         Args:
             product_id: Product ID
+            organization_id: Organization ID of the product
         """
         await self.product_vector_store.delete_product(product_id)
+        await self.local_index.invalidate(organization_id)
 
     async def get_context_for_query(
         self,
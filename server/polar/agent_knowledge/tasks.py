@@ -1,142 +1,157 @@
 """Background tasks for knowledge indexing (Dramatiq)."""
 
+import uuid
+
 import structlog
-from sqlalchemy import select
 
+from polar.agent_knowledge.reindex import pop_due_reindexes
 from polar.agent_knowledge.service import get_knowledge_service
-from polar.kit.db.postgres import AsyncSessionMaker
+from polar.config import settings
+from polar.logging import Logger
 from polar.models import Organization, Product
-from polar.worker import JobContext, PolarWorkerContext, compute_backoff, task
+from polar.worker import (
+    AsyncSessionMaker,
+    CronTrigger,
+    RedisMiddleware,
+    TaskPriority,
+    actor,
+    enqueue_job,
+)
 
-logger = structlog.get_logger()
+log: Logger = structlog.get_logger()
 
 
-@task("agent_knowledge.index_product")
-async def agent_knowledge_index_product(
-    ctx: JobContext, product_id: str, polar_context: PolarWorkerContext
-) -> None:
+@actor(actor_name="agent_knowledge.index_product", priority=TaskPriority.LOW)
+async def agent_knowledge_index_product(product_id: uuid.UUID) -> None:
     """
-    Index a single product for semantic search.
+    Index a single product for semantic search, if it changed.
 
     Triggered when:
-    - Product is created
-    - Product is updated
     - Manual re-indexing is requested
 
+    Product changes are indexed by `agent_knowledge.index_organization_products`,
+    scheduled by `agent_knowledge.reindex.schedule_reindex`.
+
     Args:
-        ctx: Job context
         product_id: Product UUID
-        polar_context: Polar worker context
     """
     async with AsyncSessionMaker() as session:
-        from uuid import UUID
-
         # Get product
-        product = await session.get(Product, UUID(product_id))
+        product = await session.get(Product, product_id)
         if not product:
-            logger.warning(f"Product not found for indexing: {product_id}")
+            log.warning("agent_knowledge.product_not_found", product_id=product_id)
             return
 
-        logger.info(f"Indexing product: {product_id} ({product.name})")
-
         # Get knowledge service
         knowledge_service = get_knowledge_service(AsyncSessionMaker)
 
         # Index product
-        await knowledge_service.index_product(session, product)
+        embedded = await knowledge_service.index_product(session, product)
 
-        logger.info(f"Product indexed successfully: {product_id}")
+        log.info(
+            "agent_knowledge.product_indexed", product_id=product_id, embedded=embedded
+        )
 
 
-@task("agent_knowledge.index_organization_products")
+@actor(
+    actor_name="agent_knowledge.index_organization_products",
+    priority=TaskPriority.LOW,
+)
 async def agent_knowledge_index_organization_products(
-    ctx: JobContext, organization_id: str, polar_context: PolarWorkerContext
+    organization_id: uuid.UUID, force: bool = False
 ) -> None:
     """
-    Batch index all products for an organization.
+    Index the products of an organization.
+
+    Only new and changed products are embedded, unless `force` is set.
 
     Triggered when:
+    - Products of the organization changed
     - Organization onboarding
     - Manual re-indexing requested
-    - Schema changes
+    - Schema changes, with `force`
 
     Args:
-        ctx: Job context
         organization_id: Organization UUID
-        polar_context: Polar worker context
+        force: Embed all products again, and swap them in atomically
     """
     async with AsyncSessionMaker() as session:
-        from uuid import UUID
-
         # Get organization
-        organization = await session.get(Organization, UUID(organization_id))
+        organization = await session.get(Organization, organization_id)
         if not organization:
-            logger.warning(
-                f"Organization not found for indexing: {organization_id}"
+            log.warning(
+                "agent_knowledge.organization_not_found",
+                organization_id=organization_id,
             )
             return
 
-        logger.info(
-            f"Starting batch product indexing for organization: {organization_id} ({organization.name})"
-        )
-
         # Get knowledge service
         knowledge_service = get_knowledge_service(AsyncSessionMaker)
 
-        # Batch index products
-        count = await knowledge_service.index_products_batch(
-            session, UUID(organization_id)
-        )
+        if force:
+            count = await knowledge_service.index_products_batch(
+                session, organization_id
+            )
+            log.info(
+                "agent_knowledge.organization_indexed",
+                organization_id=organization_id,
+                products=count,
+                embedded=count,
+            )
+            return
 
-        logger.info(
-            f"Batch indexing complete: {count} products indexed for {organization_id}"
+        report = await knowledge_service.reindex_organization(session, organization_id)
+        log.info(
+            "agent_knowledge.organization_indexed",
+            organization_id=organization_id,
+            products=report.products,
+            embedded=report.embedded,
+            avoided_embeddings=report.skipped,
+            deleted=report.deleted,
         )
 
 
-@task("agent_knowledge.rebuild_index")
-async def agent_knowledge_rebuild_index(
-    ctx: JobContext, polar_context: PolarWorkerContext
-) -> None:
+@actor(
+    actor_name="agent_knowledge.schedule_reindexes",
+    cron_trigger=(
+        CronTrigger(minute="*") if settings.AGENT_KNOWLEDGE_REINDEX_ENABLED else None
+    ),
+    priority=TaskPriority.LOW,
+)
+async def agent_knowledge_schedule_reindexes() -> None:
+    """Reindex organizations whose products changed, once they settled."""
+    for organization_id in await pop_due_reindexes(RedisMiddleware.get()):
+        enqueue_job("agent_knowledge.index_organization_products", organization_id)
+
+
+@actor(actor_name="agent_knowledge.rebuild_index", priority=TaskPriority.LOW)
+async def agent_knowledge_rebuild_index(force: bool = False) -> None:
     """
-    Rebuild entire product index (all organizations).
+    Verify the entire product index (all organizations).
 
-    Triggered when:
-    - Embedding model changes
-    - Schema migration
-    - Index corruption
+    Only missing or outdated products are embedded, and stale vectors removed.
 
-    WARNING: This is an expensive operation. Use sparingly.
+    With `force`, the index is rebuilt from scratch instead. Use it sparingly,
+    when the embedded text or the embedding model changes: all products are
+    embedded again.
 
     Args:
-        ctx: Job context
-        polar_context: Polar worker context
+        force: Rebuild the index, embedding all products again
     """
     async with AsyncSessionMaker() as session:
-        logger.info("Starting full index rebuild")
-
-        # Get all organizations
-        statement = select(Organization).where(Organization.deleted_at.is_(None))
-        result = await session.execute(statement)
-        organizations = list(result.scalars().all())
-
-        logger.info(f"Rebuilding index for {len(organizations)} organizations")
-
-        # Index each organization's products
-        total_products = 0
         knowledge_service = get_knowledge_service(AsyncSessionMaker)
 
-        for org in organizations:
-            try:
-                count = await knowledge_service.index_products_batch(
-                    session, org.id
-                )
-                total_products += count
-                logger.info(f"Indexed {count} products for {org.name}")
-            except Exception as e:
-                logger.error(
-                    f"Error indexing organization {org.id}: {e}", exc_info=True
-                )
-
-        logger.info(
-            f"Full index rebuild complete: {total_products} products indexed"
+        if force:
+            log.info("agent_knowledge.rebuild_started")
+            count = await knowledge_service.rebuild_index(session)
+            log.info("agent_knowledge.rebuild_complete", products=count, embedded=count)
+            return
+
+        report = await knowledge_service.verify_index(session)
+        log.info(
+            "agent_knowledge.verify_complete",
+            products=report.products,
+            embedded=report.embedded,
+            avoided_embeddings=report.skipped,
+            deleted=report.deleted,
         )
@@ -1,16 +1,88 @@
 """Vector store using PostgreSQL pgvector extension."""
 
+import json
+import struct
+import sys
+import weakref
+from array import array
+from collections.abc import AsyncIterable, Sequence
 from typing import Any
 from uuid import UUID
 
 from sqlalchemy import delete, select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from polar.agent_knowledge.base import SearchResult, VectorStore
+from polar.agent_knowledge.base import SearchResult, VectorRecord, VectorStore
 from polar.kit.db.models import RecordModel
 from polar.kit.db.postgres import AsyncSessionMaker
 
 
+def encode_vector(embedding: Sequence[float]) -> bytes:
+    """
+    Encode a vector in pgvector binary format.
+
+    Big-endian: 16-bit dimensions, 16-bit unused, then float32 values.
+    """
+    values = array("f", embedding)
+    if sys.byteorder == "little":
+        values.byteswap()
+    return struct.pack(">HH", len(values), 0) + values.tobytes()
+
+
+def decode_vector(data: bytes) -> list[float]:
+    """Decode a vector from pgvector binary format."""
+    dimensions, _ = struct.unpack_from(">HH", data)
+    values = array("f")
+    values.frombytes(data[4 : 4 + dimensions * 4])
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values.tolist()
+
+
+# asyncpg connections on which the binary vector codec is registered
+_vector_codec_connections: weakref.WeakSet[Any] = weakref.WeakSet()
+
+
+async def _register_vector_codec(session: AsyncSession) -> Any:
+    """
+    Make the asyncpg connection of the session send and receive vectors
+    in binary form, as lists of floats, and return it.
+    """
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    assert driver_connection is not None
+    if driver_connection not in _vector_codec_connections:
+        await driver_connection.set_type_codec(
+            "vector",
+            schema="public",
+            encoder=encode_vector,
+            decoder=decode_vector,
+            format="binary",
+        )
+        _vector_codec_connections.add(driver_connection)
+    return driver_connection
+
+
+# B-tree indexes of the typed filter columns, by name suffix
+FILTER_INDEXES = {
+    "organization_id_category_idx": "(organization_id, category)",
+    "organization_id_price_idx": "(organization_id, price)",
+}
+
+
+def _get_filter_columns(
+    metadata: dict[str, Any],
+) -> tuple[UUID | None, int | None, str | None]:
+    """Extract the values of the typed filter columns from vector metadata."""
+    organization_id = metadata.get("organization_id")
+    return (
+        UUID(str(organization_id)) if organization_id else None,
+        metadata.get("price"),
+        metadata.get("category"),
+    )
+
+
 class PgvectorStore(VectorStore):
     """
     Vector store using pgvector extension.
@@ -23,14 +95,19 @@ class PgvectorStore(VectorStore):
     Index configuration:
     - ivfflat with lists=100 for <10K vectors
     - ivfflat with lists=1000 for 100K vectors
-    - Set ivfflat.probes=10 for query accuracy
+    - ivfflat.probes=10 / hnsw.ef_search=40 for query accuracy, per query
     """
 
+    SCAN_GROWTH_FACTOR = 4
+    MAX_EF_SEARCH = 1000
+
     def __init__(
         self,
         session_maker: AsyncSessionMaker,
         table_name: str = "product_embeddings",
         dimensions: int = 1536,
+        ef_search: int = 40,
+        probes: int = 10,
     ):
         """
         Initialize pgvector store.
@@ -39,58 +116,88 @@ class PgvectorStore(VectorStore):
             session_maker: SQLAlchemy async session maker
             table_name: Name of embeddings table
             dimensions: Vector dimensions (1536 for OpenAI)
+            ef_search: Default hnsw.ef_search of searches
+            probes: Default ivfflat.probes of searches
         """
         self.session_maker = session_maker
         self.table_name = table_name
         self.dimensions = dimensions
+        self.ef_search = ef_search
+        self.probes = probes
 
     async def search(
         self,
         embedding: list[float],
         limit: int = 5,
         filters: dict[str, Any] | None = None,
+        *,
+        ef_search: int | None = None,
+        probes: int | None = None,
+        exact: bool = False,
     ) -> list[SearchResult]:
         """
         Search for similar vectors using cosine distance.
 
+        Filters on `organization_id`, `category`, `min_price` and `max_price` are
+        pushed down to typed, indexed columns. Other keys filter on metadata.
+
+        Approximate index scans only consider `ef_search` (hnsw) or `probes`
+        (ivfflat) candidates, so filtered searches may find fewer than `limit`
+        matches: in this case, the search is retried with a wider scan, then
+        exhaustively, so `limit` results are returned whenever they exist.
+
         Args:
             embedding: Query vector
             limit: Max results
-            filters: Metadata filters (product_id, category, etc.)
+            filters: Filters (organization_id, category, min_price, etc.)
+            ef_search: hnsw candidate list size, defaults to the store's one
+            probes: ivfflat lists to scan, defaults to the store's one
+            exact: Skip the approximate index, e.g. to measure its recall
 
         Returns:
             List of SearchResult ordered by similarity
         """
+        # TODO: Replace raw SQL with SQLAlchemy model in Week 4-6
+        query = f"""
+            SELECT
+                id,
+                content,
+                metadata,
+                1 - (embedding <=> :embedding::vector) as score
+            FROM {self.table_name}
+            WHERE deleted_at IS NULL
+        """
+        # Add filters
+        filters_clause, params = self._get_filters_clause(filters or {})
+        query += filters_clause
+        query += " ORDER BY embedding <=> :embedding::vector LIMIT :limit"
+        params.update(embedding=embedding, limit=limit)
+
+        ef_search = max(ef_search or self.ef_search, limit)
+        probes = probes or self.probes
         async with self.session_maker() as session:
-            # Build query with cosine distance
-            # TODO: Replace raw SQL with SQLAlchemy model in Week 4-6
-            query = f"""
-                SELECT
-                    id,
-                    content,
-                    metadata,
-                    1 - (embedding <=> :embedding::vector) as score
-                FROM {self.table_name}
-                WHERE deleted_at IS NULL
-            """
-
-            # Add filters
-            if filters:
-                for key, value in filters.items():
-                    # Filter by JSONB metadata
-                    query += f" AND metadata->'{key}' = :filter_{key}"
-
-            query += " ORDER BY embedding <=> :embedding::vector"
-            query += f" LIMIT {limit}"
-
-            # Execute query
-            params = {"embedding": str(embedding)}
-            if filters:
-                for key, value in filters.items():
-                    params[f"filter_{key}"] = str(value)
-
-            result = await session.execute(text(query), params)
-            rows = result.fetchall()
+            await _register_vector_codec(session)
+            while True:
+                if exact:
+                    await session.execute(text("SET LOCAL enable_indexscan = off"))
+                else:
+                    await session.execute(
+                        text(f"SET LOCAL hnsw.ef_search = {ef_search}")
+                    )
+                    await session.execute(
+                        text(f"SET LOCAL ivfflat.probes = {probes}")
+                    )
+
+                result = await session.execute(text(query), params)
+                rows = result.fetchall()
+
+                if exact or len(rows) >= limit or not filters:
+                    break
+
+                # Widen the scan, until it's not worth using the index anymore
+                ef_search *= self.SCAN_GROWTH_FACTOR
+                probes *= self.SCAN_GROWTH_FACTOR
+                exact = ef_search > self.MAX_EF_SEARCH
 
             return [
                 SearchResult(
@@ -123,26 +230,402 @@ class PgvectorStore(VectorStore):
         async with self.session_maker() as session:
             # TODO: Replace raw SQL with SQLAlchemy model in Week 4-6
             query = f"""
-                INSERT INTO {self.table_name} (id, embedding, content, metadata, created_at)
-                VALUES (:id, :embedding::vector, :content, :metadata::jsonb, NOW())
+                INSERT INTO {self.table_name} (
+                    id, embedding, content, metadata,
+                    organization_id, price, category, created_at
+                )
+                VALUES (
+                    :id, :embedding::vector, :content, :metadata::jsonb,
+                    :organization_id, :price, :category, NOW()
+                )
                 ON CONFLICT (id) DO UPDATE SET
                     embedding = EXCLUDED.embedding,
                     content = EXCLUDED.content,
                     metadata = EXCLUDED.metadata,
-                    modified_at = NOW()
+                    organization_id = EXCLUDED.organization_id,
+                    price = EXCLUDED.price,
+                    category = EXCLUDED.category,
+                    modified_at = NOW(),
+                    deleted_at = NULL
             """
 
+            await _register_vector_codec(session)
+            organization_id, price, category = _get_filter_columns(metadata)
             await session.execute(
                 text(query),
                 {
                     "id": id,
-                    "embedding": str(embedding),
+                    "embedding": embedding,
                     "content": content,
-                    "metadata": metadata,
+                    "metadata": json.dumps(metadata, default=str),
+                    "organization_id": organization_id,
+                    "price": price,
+                    "category": category,
                 },
             )
             await session.commit()
 
+    async def upsert_many(self, records: Sequence[VectorRecord]) -> None:
+        """
+        Insert or update many vectors in a single transaction.
+
+        Vectors are sent in binary form with COPY to a staging table,
+        then merged with one INSERT ... ON CONFLICT DO UPDATE.
+
+        Args:
+            records: Vectors to upsert
+        """
+        if not records:
+            return
+
+        async with self.session_maker() as session:
+            await self._create_staging_table(session)
+            await self._copy_records(session, self._staging_table, records)
+            await self._merge_staging_table(session)
+            await session.commit()
+
+    async def replace(
+        self,
+        batches: AsyncIterable[Sequence[VectorRecord]],
+        filters: dict[str, Any],
+    ) -> int:
+        """
+        Atomically replace all vectors matching `filters`.
+
+        Batches are loaded in a staging table first: concurrent searches keep
+        seeing the previous vectors until all of them are swapped in, and vectors
+        matching `filters` absent from the batches are deleted.
+
+        Args:
+            batches: Vectors replacing the current ones, in batches
+            filters: Metadata filters of the replaced vectors (organization_id, etc.)
+
+        Returns:
+            Number of vectors loaded
+        """
+        async with self.session_maker() as session:
+            await self._create_staging_table(session)
+            count = 0
+            async for records in batches:
+                await self._copy_records(session, self._staging_table, records)
+                count += len(records)
+
+            query = f"""
+                DELETE FROM {self.table_name}
+                WHERE id NOT IN (SELECT id FROM {self._staging_table})
+            """
+            filters_clause, params = self._get_filters_clause(filters)
+            await session.execute(text(query + filters_clause), params)
+
+            await self._merge_staging_table(session)
+            await session.commit()
+        return count
+
+    async def rebuild(
+        self,
+        batches: AsyncIterable[Sequence[VectorRecord]],
+        lists: int = 100,
+        method: str = "ivfflat",
+    ) -> int:
+        """
+        Rebuild the whole table offline, then swap it in.
+
+        Vectors are loaded in a new table and indexed there, without impacting
+        searches. The new table then replaces the current one by renaming,
+        which only holds a lock for the duration of the swap.
+
+        Args:
+            batches: All vectors of the new table, in batches
+            lists: Number of lists for ivfflat
+            method: Index method (ivfflat or hnsw)
+
+        Returns:
+            Number of vectors loaded
+        """
+        new_table = f"{self.table_name}_rebuild"
+        old_table = f"{self.table_name}_old"
+
+        async with self.session_maker() as session:
+            await session.execute(text(f"DROP TABLE IF EXISTS {new_table}"))
+            await session.execute(
+                text(
+                    f"""
+                    CREATE TABLE {new_table}
+                    (LIKE {self.table_name} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)
+                    """
+                )
+            )
+            await session.commit()
+
+            count = 0
+            async for records in batches:
+                await self._copy_records(session, new_table, records)
+                await session.commit()
+                count += len(records)
+
+            # Index once loaded, much faster than maintaining indexes while loading.
+            # LIKE only copies NOT NULL and CHECK constraints: recreate the keys,
+            # foreign keys and indexes of the current table under temporary names.
+            constraints, indexes = await self._get_table_schema(session)
+            for name, definition in constraints:
+                await session.execute(
+                    text(
+                        f"ALTER TABLE {new_table} "
+                        f"ADD CONSTRAINT {name}_rebuild {definition}"
+                    )
+                )
+            for name, unique, index_definition in indexes:
+                await session.execute(
+                    text(
+                        f"CREATE {'UNIQUE ' if unique else ''}INDEX {name}_rebuild "
+                        f"ON {new_table} USING {index_definition}"
+                    )
+                )
+            index_query = self._index_query(
+                new_table, f"{new_table}_embedding_idx", lists, method
+            )
+            await session.execute(text(index_query))
+            await session.commit()
+
+            # Swap
+            await session.execute(
+                text(f"LOCK TABLE {self.table_name} IN ACCESS EXCLUSIVE MODE")
+            )
+            await session.execute(
+                text(f"ALTER TABLE {self.table_name} RENAME TO {old_table}")
+            )
+            await session.execute(text(f"DROP TABLE {old_table}"))
+            await session.execute(
+                text(f"ALTER TABLE {new_table} RENAME TO {self.table_name}")
+            )
+            for name, _ in constraints:
+                await session.execute(
+                    text(
+                        f"ALTER TABLE {self.table_name} "
+                        f"RENAME CONSTRAINT {name}_rebuild TO {name}"
+                    )
+                )
+            for name, _, _ in indexes:
+                await session.execute(
+                    text(f"ALTER INDEX {name}_rebuild RENAME TO {name}")
+                )
+            await session.execute(
+                text(
+                    f"ALTER INDEX {new_table}_embedding_idx "
+                    f"RENAME TO {self.table_name}_embedding_idx"
+                )
+            )
+            await session.commit()
+        return count
+
+    async def get_vectors(
+        self, filters: dict[str, Any], limit: int | None = None
+    ) -> list[VectorRecord]:
+        """
+        Load the vectors matching `filters`.
+
+        Args:
+            filters: Filters (organization_id, category, min_price, etc.)
+            limit: Max vectors to load
+
+        Returns:
+            List of VectorRecord, in no particular order
+        """
+        query = f"""
+            SELECT id, embedding, content, metadata
+            FROM {self.table_name}
+            WHERE deleted_at IS NULL
+        """
+        filters_clause, params = self._get_filters_clause(filters)
+        query += filters_clause
+        if limit is not None:
+            query += " LIMIT :limit"
+            params["limit"] = limit
+
+        async with self.session_maker() as session:
+            await _register_vector_codec(session)
+            result = await session.execute(text(query), params)
+            return [
+                VectorRecord(
+                    id=str(row[0]), embedding=row[1], content=row[2], metadata=row[3]
+                )
+                for row in result.fetchall()
+            ]
+
+    async def get_content_hashes(
+        self, filters: dict[str, Any]
+    ) -> dict[str, str | None]:
+        """
+        Load the content hashes of the vectors matching `filters`.
+
+        Args:
+            filters: Filters (organization_id, category, min_price, etc.)
+
+        Returns:
+            Content hash of each vector, by ID
+        """
+        query = f"""
+            SELECT id, metadata->>'content_hash'
+            FROM {self.table_name}
+            WHERE deleted_at IS NULL
+        """
+        filters_clause, params = self._get_filters_clause(filters)
+        async with self.session_maker() as session:
+            result = await session.execute(text(query + filters_clause), params)
+            return {str(row[0]): row[1] for row in result.fetchall()}
+
+    async def get_organization_ids(self) -> set[UUID]:
+        """Load the IDs of the organizations having vectors."""
+        query = f"""
+            SELECT DISTINCT organization_id
+            FROM {self.table_name}
+            WHERE deleted_at IS NULL AND organization_id IS NOT NULL
+        """
+        async with self.session_maker() as session:
+            result = await session.execute(text(query))
+            return {row[0] for row in result.fetchall()}
+
+    async def _get_table_schema(
+        self, session: AsyncSession
+    ) -> tuple[list[tuple[str, str]], list[tuple[str, bool, str]]]:
+        """
+        Get the constraints and indexes of the table.
+
+        Returns:
+            Primary key, unique and foreign key constraints, as name and definition;
+            and the other indexes except vector ones, as name, uniqueness
+            and definition from the index method on
+        """
+        constraints_result = await session.execute(
+            text(
+                """
+                SELECT conname, pg_get_constraintdef(oid)
+                FROM pg_constraint
+                WHERE conrelid = :table_name::regclass
+                AND contype IN ('p', 'u', 'f')
+                """
+            ),
+            {"table_name": self.table_name},
+        )
+        indexes_result = await session.execute(
+            text(
+                """
+                SELECT
+                    index_class.relname,
+                    pg_index.indisunique,
+                    pg_get_indexdef(pg_index.indexrelid)
+                FROM pg_index
+                JOIN pg_class AS index_class ON index_class.oid = pg_index.indexrelid
+                JOIN pg_am ON pg_am.oid = index_class.relam
+                WHERE pg_index.indrelid = :table_name::regclass
+                AND pg_am.amname NOT IN ('ivfflat', 'hnsw')
+                AND NOT EXISTS (
+                    SELECT 1 FROM pg_constraint
+                    WHERE pg_constraint.conrelid = pg_index.indrelid
+                    AND pg_constraint.conindid = pg_index.indexrelid
+                )
+                """
+            ),
+            {"table_name": self.table_name},
+        )
+        constraints = [
+            (name, definition) for name, definition in constraints_result.fetchall()
+        ]
+        indexes: list[tuple[str, bool, str]] = []
+        for name, unique, definition in indexes_result.fetchall():
+            # CREATE [UNIQUE] INDEX name ON schema.table USING method (...) ...
+            _, _, method = definition.partition(" USING ")
+            indexes.append((name, unique, method))
+        return constraints, indexes
+
+    def _get_filters_clause(
+        self, filters: dict[str, Any]
+    ) -> tuple[str, dict[str, Any]]:
+        clause = ""
+        params: dict[str, Any] = {}
+        for key, value in filters.items():
+            if key in {"organization_id", "category"}:
+                clause += f" AND {key} = :{key}"
+                params[key] = UUID(str(value)) if key == "organization_id" else value
+            elif key == "min_price":
+                clause += " AND price >= :min_price"
+                params[key] = value
+            elif key == "max_price":
+                clause += " AND price <= :max_price"
+                params[key] = value
+            else:
+                # Filter by JSONB metadata
+                clause += f" AND metadata->>'{key}' = :filter_{key}"
+                params[f"filter_{key}"] = str(value)
+        return clause, params
+
+    @property
+    def _staging_table(self) -> str:
+        return f"{self.table_name}_staging"
+
+    async def _create_staging_table(self, session: AsyncSession) -> None:
+        await session.execute(
+            text(
+                f"""
+                CREATE TEMPORARY TABLE IF NOT EXISTS {self._staging_table}
+                (LIKE {self.table_name} INCLUDING DEFAULTS)
+                ON COMMIT DROP
+                """
+            )
+        )
+
+    async def _copy_records(
+        self, session: AsyncSession, table_name: str, records: Sequence[VectorRecord]
+    ) -> None:
+        connection = await _register_vector_codec(session)
+        await connection.copy_records_to_table(
+            table_name,
+            records=[
+                (
+                    UUID(record.id),
+                    record.embedding,
+                    record.content,
+                    json.dumps(record.metadata, default=str),
+                    *_get_filter_columns(record.metadata),
+                )
+                for record in records
+            ],
+            columns=[
+                "id",
+                "embedding",
+                "content",
+                "metadata",
+                "organization_id",
+                "price",
+                "category",
+            ],
+        )
+
+    async def _merge_staging_table(self, session: AsyncSession) -> None:
+        await session.execute(
+            text(
+                f"""
+                INSERT INTO {self.table_name} (
+                    id, embedding, content, metadata,
+                    organization_id, price, category, created_at
+                )
+                SELECT
+                    id, embedding, content, metadata,
+                    organization_id, price, category, NOW()
+                FROM {self._staging_table}
+                ON CONFLICT (id) DO UPDATE SET
+                    embedding = EXCLUDED.embedding,
+                    content = EXCLUDED.content,
+                    metadata = EXCLUDED.metadata,
+                    organization_id = EXCLUDED.organization_id,
+                    price = EXCLUDED.price,
+                    category = EXCLUDED.category,
+                    modified_at = NOW(),
+                    deleted_at = NULL
+                """
+            )
+        )
+
     async def delete(self, id: str) -> None:
         """
         Soft delete vector by ID.
@@ -160,6 +643,20 @@ class PgvectorStore(VectorStore):
             await session.execute(text(query), {"id": id})
             await session.commit()
 
+    async def delete_many(self, ids: Sequence[str]) -> None:
+        """Soft delete vectors by ID, in a single statement."""
+        if not ids:
+            return
+
+        async with self.session_maker() as session:
+            query = f"""
+                UPDATE {self.table_name}
+                SET deleted_at = NOW()
+                WHERE id = ANY(:ids)
+            """
+            await session.execute(text(query), {"ids": [UUID(id) for id in ids]})
+            await session.commit()
+
     async def hard_delete(self, id: str) -> None:
         """Hard delete vector (for testing/cleanup)."""
         async with self.session_maker() as session:
@@ -182,38 +679,29 @@ class PgvectorStore(VectorStore):
             await session.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
 
             # Create new index
-            if method == "ivfflat":
-                query = f"""
-                    CREATE INDEX {index_name}
-                    ON {self.table_name}
-                    USING ivfflat (embedding vector_cosine_ops)
-                    WITH (lists = {lists})
-                """
-            elif method == "hnsw":
-                # HNSW (Hierarchical Navigable Small World)
-                # Better accuracy, slower build time
-                query = f"""
-                    CREATE INDEX {index_name}
-                    ON {self.table_name}
-                    USING hnsw (embedding vector_cosine_ops)
-                """
-            else:
-                raise ValueError(f"Unknown index method: {method}")
-
+            query = self._index_query(self.table_name, index_name, lists, method)
             await session.execute(text(query))
             await session.commit()
 
-    async def set_probes(self, probes: int = 10) -> None:
-        """
-        Set ivfflat.probes for query accuracy.
-
-        Higher probes = more accurate but slower.
-        - 1 probe: Fast but less accurate
-        - 10 probes: Good balance (default)
-        - 100 probes: Highest accuracy, slower
-        """
-        async with self.session_maker() as session:
-            await session.execute(text(f"SET ivfflat.probes = {probes}"))
+    def _index_query(
+        self, table_name: str, index_name: str, lists: int, method: str
+    ) -> str:
+        if method == "ivfflat":
+            return f"""
+                CREATE INDEX {index_name}
+                ON {table_name}
+                USING ivfflat (embedding vector_cosine_ops)
+                WITH (lists = {lists})
+            """
+        elif method == "hnsw":
+            # HNSW (Hierarchical Navigable Small World)
+            # Better accuracy, slower build time
+            return f"""
+                CREATE INDEX {index_name}
+                ON {table_name}
+                USING hnsw (embedding vector_cosine_ops)
+            """
+        raise ValueError(f"Unknown index method: {method}")
 
 
 class ProductVectorStore:
@@ -258,38 +746,26 @@ class ProductVectorStore:
         if category:
             filters["category"] = category
 
-        # TODO: Add price filters in Week 4-6
-        # Price requires join with Product table or denormalization in metadata
+        if min_price is not None:
+            filters["min_price"] = min_price
 
-        results = await self.vector_store.search(
+        if max_price is not None:
+            filters["max_price"] = max_price
+
+        return await self.vector_store.search(
             embedding=query_embedding,
             limit=limit,
             filters=filters,
         )
 
-        # Post-filter by price if needed
-        if max_price or min_price:
-            filtered = []
-            for result in results:
-                price = result.metadata.get("price")
-                if price:
-                    if min_price and price < min_price:
-                        continue
-                    if max_price and price > max_price:
-                        continue
-                filtered.append(result)
-            return filtered
-
-        return results
-
-    async def upsert_product(
+    def build_record(
         self,
         product_id: UUID,
         embedding: list[float],
         product_data: dict[str, Any],
-    ) -> None:
+    ) -> VectorRecord:
         """
-        Upsert product embedding.
+        Build the vector record of a product.
 
         Args:
             product_id: Product ID
@@ -302,19 +778,59 @@ class ProductVectorStore:
         # Store metadata
         metadata = {
             "product_id": str(product_id),
-            "organization_id": str(product_data.get("organization_id")),
+            "organization_id": (
+                str(product_data["organization_id"])
+                if product_data.get("organization_id")
+                else None
+            ),
             "name": product_data.get("name"),
             "price": product_data.get("price"),
             "category": product_data.get("category"),
+            "content_hash": product_data.get("content_hash"),
         }
 
-        await self.vector_store.upsert(
+        return VectorRecord(
             id=str(product_id),
             embedding=embedding,
             content=content,
             metadata=metadata,
         )
 
+    async def upsert_product(
+        self,
+        product_id: UUID,
+        embedding: list[float],
+        product_data: dict[str, Any],
+    ) -> None:
+        """
+        Upsert product embedding.
+
+        Args:
+            product_id: Product ID
+            embedding: Product embedding
+            product_data: Product metadata (name, description, price, etc.)
+        """
+        record = self.build_record(product_id, embedding, product_data)
+        await self.vector_store.upsert(
+            id=record.id,
+            embedding=record.embedding,
+            content=record.content,
+            metadata=record.metadata,
+        )
+
+    async def upsert_products(
+        self, products: Sequence[tuple[UUID, list[float], dict[str, Any]]]
+    ) -> None:
+        """
+        Upsert many product embeddings in bulk.
+
+        Args:
+            products: Tuples of product ID, embedding and metadata
+        """
+        await self.vector_store.upsert_many(
+            [self.build_record(*product) for product in products]
+        )
+
     async def delete_product(self, product_id: UUID) -> None:
         """Delete product embedding."""
         await self.vector_store.delete(str(product_id))
@@ -4,7 +4,10 @@ import json
 import logging
 from typing import Any, AsyncIterator
 
+import httpx
+
 from polar.agent_llm.base import LLMClient, LLMMessage, LLMResponse, LLMTool
+from polar.agent_llm.sse import iter_sse_events, raise_for_status
 from polar.config import settings
 
 logger = logging.getLogger(__name__)
@@ -29,6 +32,8 @@ class AnthropicClient(LLMClient):
         self,
         api_key: str | None = None,
         default_model: str = "claude-3-5-sonnet-20241022",
+        base_url: str = "https://api.anthropic.com",
+        http_client: httpx.AsyncClient | None = None,
     ):
         """
         Initialize Anthropic client.
@@ -36,14 +41,15 @@ class AnthropicClient(LLMClient):
         Args:
             api_key: Anthropic API key (defaults to settings.ANTHROPIC_API_KEY)
             default_model: Default model to use
+            base_url: Base URL of the Messages API
+            http_client: HTTP client, pooling connections to the API
         """
         self.api_key = api_key or getattr(settings, "ANTHROPIC_API_KEY", None)
         self.default_model = default_model
-        self.client = None
-
-        # TODO: Initialize Anthropic client
-        # from anthropic import AsyncAnthropic
-        # self.client = AsyncAnthropic(api_key=self.api_key)
+        self.client = http_client or httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
 
     async def chat(
         self,
@@ -70,30 +76,29 @@ class AnthropicClient(LLMClient):
         """
         model = model or self.default_model
 
-        # Convert messages to Anthropic format
-        anthropic_messages = self._convert_messages(messages)
+        # Convert messages to Anthropic format, with the system messages apart
+        system_message, anthropic_messages = self._convert_messages(messages)
 
-        # Extract system message
-        system_message = None
-        if anthropic_messages and anthropic_messages[0]["role"] == "system":
-            system_message = anthropic_messages[0]["content"]
-            anthropic_messages = anthropic_messages[1:]
+        if stream:
+            return self._stream_chat(
+                model,
+                anthropic_messages,
+                system_message,
+                temperature,
+                max_tokens,
+                self._convert_tools(tools) if tools else None,
+            )
 
         # TODO: Make API call (Week 2 implementation)
-        # if stream:
-        #     return self._stream_chat(
-        #         model, anthropic_messages, system_message, temperature, max_tokens, tools
-        #     )
-        # else:
-        #     response = await self.client.messages.create(
-        #         model=model,
-        #         messages=anthropic_messages,
-        #         system=system_message,
-        #         temperature=temperature,
-        #         max_tokens=max_tokens,
-        #         tools=self._convert_tools(tools) if tools else None,
-        #     )
-        #     return self._convert_response(response)
+        # response = await self.client.messages.create(
+        #     model=model,
+        #     messages=anthropic_messages,
+        #     system=system_message,
+        #     temperature=temperature,
+        #     max_tokens=max_tokens,
+        #     tools=self._convert_tools(tools) if tools else None,
+        # )
+        # return self._convert_response(response)
 
         # Placeholder response
         logger.info(f"Claude chat request: model={model}, messages={len(messages)}")
@@ -201,34 +206,75 @@ Respond in JSON format:
         tools: list[dict] | None,
     ) -> AsyncIterator[str]:
         """
-        Stream chat completion.
+        Stream chat completion from the Messages API.
+
+        Text deltas are yielded as soon as their event is received, so the
+        caller's pace propagates back to the API connection.
 
         Yields:
             Text chunks as they arrive
         """
-        # TODO: Implement streaming (Week 2-3)
-        # async with self.client.messages.stream(
-        #     model=model,
-        #     messages=messages,
-        #     system=system,
-        #     temperature=temperature,
-        #     max_tokens=max_tokens,
-        #     tools=tools,
-        # ) as stream:
-        #     async for text in stream.text_stream:
-        #         yield text
-
-        yield "[Streaming placeholder]"
+        if not self.api_key:
+            logger.warning("Anthropic API key not configured, streaming placeholder")
+            yield "[Streaming placeholder]"
+            return
+
+        payload: dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        if system:
+            payload["system"] = system
+        if tools:
+            payload["tools"] = tools
+
+        async with self.client.stream(
+            "POST",
+            "/v1/messages",
+            json=payload,
+            headers={
+                "x-api-key": self.api_key,
+                "anthropic-version": "2023-06-01",
+            },
+        ) as response:
+            await raise_for_status(response)
+            async for event in iter_sse_events(response):
+                if event.event == "content_block_delta":
+                    delta = json.loads(event.data)["delta"]
+                    if delta.get("type") == "text_delta" and delta["text"]:
+                        yield delta["text"]
+                elif event.event == "error":
+                    error = json.loads(event.data)["error"]
+                    raise httpx.HTTPError(
+                        f"Anthropic stream error: {error.get('type')}: "
+                        f"{error.get('message')}"
+                    )
+                elif event.event == "message_stop":
+                    return
+
+    def _convert_messages(
+        self, messages: list[LLMMessage]
+    ) -> tuple[str | None, list[dict]]:
+        """
+        Convert LLMMessage to Anthropic format.
 
-    def _convert_messages(self, messages: list[LLMMessage]) -> list[dict]:
-        """Convert LLMMessage to Anthropic format."""
-        return [
+        The Messages API only accepts user and assistant messages: system
+        messages, wherever they are in the conversation, are merged in
+        the system prompt.
+        """
+        system = "\n\n".join(msg.content for msg in messages if msg.role == "system")
+        converted = [
             {
-                "role": msg.role,
+                "role": msg.provider_role,
                 "content": msg.content,
             }
             for msg in messages
+            if msg.role != "system"
         ]
+        return system or None, converted
 
     def _convert_tools(self, tools: list[LLMTool]) -> list[dict]:
         """Convert LLMTool to Anthropic tool format."""
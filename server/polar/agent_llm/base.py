@@ -9,11 +9,16 @@ from typing import Any, AsyncIterator
 class LLMMessage:
     """Message in LLM conversation."""
 
-    role: str  # system, user, assistant, tool
+    role: str  # system, user, assistant (or agent), tool
     content: str
     name: str | None = None  # For tool responses
     tool_calls: list[dict[str, Any]] | None = None  # For assistant tool calls
 
+    @property
+    def provider_role(self) -> str:
+        """Role sent to providers: messages of the agent are the assistant's."""
+        return "assistant" if self.role == "agent" else self.role
+
 
 @dataclass
 class LLMTool:
@@ -4,7 +4,10 @@ import json
 import logging
 from typing import Any, AsyncIterator
 
+import httpx
+
 from polar.agent_llm.base import LLMClient, LLMMessage, LLMResponse, LLMTool
+from polar.agent_llm.sse import iter_sse_events, raise_for_status
 from polar.config import settings
 
 logger = logging.getLogger(__name__)
@@ -28,10 +31,15 @@ class OpenAIClient(LLMClient):
     - Embeddings for RAG (Week 4-6)
     """
 
+    EMBED_BATCH_SIZE = 2048
+    """Max inputs of an embeddings request."""
+
     def __init__(
         self,
         api_key: str | None = None,
         default_model: str = "gpt-4o",
+        base_url: str = "https://api.openai.com/v1",
+        http_client: httpx.AsyncClient | None = None,
     ):
         """
         Initialize OpenAI client.
@@ -39,14 +47,19 @@ class OpenAIClient(LLMClient):
         Args:
             api_key: OpenAI API key (defaults to settings.OPENAI_API_KEY)
             default_model: Default model to use
+            base_url: Base URL of the API
+            http_client: HTTP client, pooling connections to the API
         """
         self.api_key = api_key or getattr(settings, "OPENAI_API_KEY", None)
         self.default_model = default_model
-        self.client = None
+        self.client = http_client or httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
 
-        # TODO: Initialize OpenAI client
-        # from openai import AsyncOpenAI
-        # self.client = AsyncOpenAI(api_key=self.api_key)
+    async def aclose(self) -> None:
+        """Close the connections of the HTTP client."""
+        await self.client.aclose()
 
     async def chat(
         self,
@@ -76,20 +89,24 @@ class OpenAIClient(LLMClient):
         # Convert messages to OpenAI format
         openai_messages = self._convert_messages(messages)
 
+        if stream:
+            return self._stream_chat(
+                model,
+                openai_messages,
+                temperature,
+                max_tokens,
+                self._convert_tools(tools) if tools else None,
+            )
+
         # TODO: Make API call
-        # if stream:
-        #     return self._stream_chat(
-        #         model, openai_messages, temperature, max_tokens, tools
-        #     )
-        # else:
-        #     response = await self.client.chat.completions.create(
-        #         model=model,
-        #         messages=openai_messages,
-        #         temperature=temperature,
-        #         max_tokens=max_tokens,
-        #         tools=self._convert_tools(tools) if tools else None,
-        #     )
-        #     return self._convert_response(response)
+        # response = await self.client.chat.completions.create(
+        #     model=model,
+        #     messages=openai_messages,
+        #     temperature=temperature,
+        #     max_tokens=max_tokens,
+        #     tools=self._convert_tools(tools) if tools else None,
+        # )
+        # return self._convert_response(response)
 
         # Placeholder
         logger.info(f"OpenAI chat request: model={model}, messages={len(messages)}")
@@ -164,7 +181,9 @@ Respond in JSON format:
             "entities": {},
         }
 
-    async def embed(self, text: str, model: str = "text-embedding-3-small") -> list[float]:
+    async def embed(
+        self, text: str, model: str = "text-embedding-3-small"
+    ) -> list[float]:
         """
         Generate embedding for text.
 
@@ -175,17 +194,8 @@ Respond in JSON format:
         Returns:
             Embedding vector (1536 or 3072 dimensions)
         """
-        # TODO: Make API call
-        # response = await self.client.embeddings.create(
-        #     model=model,
-        #     input=text,
-        # )
-        # return response.data[0].embedding
-
-        # Placeholder
-        logger.info(f"Embedding request: {text[:50]}...")
-        dimensions = 1536 if "small" in model else 3072
-        return [0.0] * dimensions
+        [embedding] = await self.embed_batch([text], model=model)
+        return embedding
 
     async def embed_batch(
         self, texts: list[str], model: str = "text-embedding-3-small"
@@ -193,24 +203,26 @@ Respond in JSON format:
         """
         Generate embeddings for multiple texts (batched).
 
+        Texts are sent in requests of up to `EMBED_BATCH_SIZE` inputs.
+
         Args:
-            texts: Input texts (up to 2048 per batch)
+            texts: Input texts
             model: Embedding model
 
         Returns:
             List of embedding vectors
         """
-        # TODO: Make API call
-        # response = await self.client.embeddings.create(
-        #     model=model,
-        #     input=texts,
-        # )
-        # return [data.embedding for data in response.data]
-
-        # Placeholder
-        logger.info(f"Batch embedding request: {len(texts)} texts")
-        dimensions = 1536 if "small" in model else 3072
-        return [[0.0] * dimensions] * len(texts)
+        embeddings: list[list[float]] = []
+        for i in range(0, len(texts), self.EMBED_BATCH_SIZE):
+            response = await self.client.post(
+                "/embeddings",
+                json={"model": model, "input": texts[i : i + self.EMBED_BATCH_SIZE]},
+                headers={"Authorization": f"Bearer {self.api_key}"},
+            )
+            response.raise_for_status()
+            data = sorted(response.json()["data"], key=lambda d: d["index"])
+            embeddings.extend(d["embedding"] for d in data)
+        return embeddings
 
     async def _stream_chat(
         self,
@@ -220,27 +232,52 @@ Respond in JSON format:
         max_tokens: int,
         tools: list[dict] | None,
     ) -> AsyncIterator[str]:
-        """Stream chat completion."""
-        # TODO: Implement streaming
-        # stream = await self.client.chat.completions.create(
-        #     model=model,
-        #     messages=messages,
-        #     temperature=temperature,
-        #     max_tokens=max_tokens,
-        #     tools=tools,
-        #     stream=True,
-        # )
-        # async for chunk in stream:
-        #     if chunk.choices[0].delta.content:
-        #         yield chunk.choices[0].delta.content
+        """
+        Stream chat completion from the Chat Completions API.
 
-        yield "[Streaming placeholder]"
+        Yields:
+            Text chunks as they arrive
+        """
+        if not self.api_key:
+            logger.warning("OpenAI API key not configured, streaming placeholder")
+            yield "[Streaming placeholder]"
+            return
+
+        payload: dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        if tools:
+            payload["tools"] = tools
+
+        async with self.client.stream(
+            "POST",
+            "/chat/completions",
+            json=payload,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+        ) as response:
+            await raise_for_status(response)
+            async for event in iter_sse_events(response):
+                if event.data == "[DONE]":
+                    return
+                chunk = json.loads(event.data)
+                if "error" in chunk:
+                    raise httpx.HTTPError(
+                        f"OpenAI stream error: {chunk['error'].get('message')}"
+                    )
+                for choice in chunk.get("choices", []):
+                    content = choice.get("delta", {}).get("content")
+                    if content:
+                        yield content
 
     def _convert_messages(self, messages: list[LLMMessage]) -> list[dict]:
         """Convert LLMMessage to OpenAI format."""
         return [
             {
-                "role": msg.role,
+                "role": msg.provider_role,
                 "content": msg.content,
             }
             for msg in messages
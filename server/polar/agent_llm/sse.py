@@ -0,0 +1,55 @@
+"""Server-Sent Events parsing for streaming LLM APIs."""
+
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+
+import httpx
+
+
+@dataclass
+class SSEEvent:
+    """Event received from a Server-Sent Events stream."""
+
+    event: str
+    data: str
+
+
+async def iter_sse_events(response: httpx.Response) -> AsyncIterator[SSEEvent]:
+    """
+    Parse the Server-Sent Events of a streamed response, as they arrive.
+
+    Args:
+        response: Streamed HTTP response
+
+    Yields:
+        Events, with their multi-line data joined
+    """
+    event = "message"
+    data: list[str] = []
+    async for line in response.aiter_lines():
+        if not line:
+            # Blank line: dispatch the pending event
+            if data:
+                yield SSEEvent(event=event, data="\n".join(data))
+            event = "message"
+            data = []
+        elif line.startswith(":"):
+            # Comment, used as keep-alive
+            continue
+        else:
+            name, _, value = line.partition(":")
+            value = value.removeprefix(" ")
+            if name == "event":
+                event = value
+            elif name == "data":
+                data.append(value)
+
+    if data:
+        yield SSEEvent(event=event, data="\n".join(data))
+
+
+async def raise_for_status(response: httpx.Response) -> None:
+    """Raise for error responses of a stream, with their body loaded."""
+    if response.is_error:
+        await response.aread()
+        response.raise_for_status()
@@ -1,10 +1,11 @@
 """Agent Tools module - Tool registry and execution."""
 
 from polar.agent_tools.base import BaseTool, ToolResult
-from polar.agent_tools.registry import ToolRegistry, tool_registry
+from polar.agent_tools.registry import ToolCall, ToolRegistry, tool_registry
 
 __all__ = [
     "BaseTool",
+    "ToolCall",
     "ToolResult",
     "ToolRegistry",
     "tool_registry",
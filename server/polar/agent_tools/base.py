@@ -33,6 +33,15 @@ class BaseTool(ABC):
     description: str
     parameters_schema: dict
 
+    timeout: float = 10.0
+    """Max seconds an execution may take, before it's reported as failed."""
+
+    idempotent: bool = False
+    """Whether successful results may be reused for the same parameters."""
+
+    read_only: bool = False
+    """Whether the tool only reads, so it may run in a session of its own."""
+
     @abstractmethod
     async def execute(
         self, session: AsyncSession, parameters: dict[str, Any]
@@ -2,8 +2,9 @@
 
 import time
 from typing import Any
+from uuid import UUID
 
-from sqlalchemy import select
+from sqlalchemy import Text, cast, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from polar.agent_tools.base import BaseTool, ToolResult
@@ -15,7 +16,8 @@ class ProductLookupTool(BaseTool):
     Tool for searching product catalog.
 
     In Week 4-6, this will use RAG (semantic search).
-    For now, uses basic SQL search.
+    For now, uses basic SQL search: substring matches on the name and
+    description, served by trigram indexes, within the organization's products.
     """
 
     name = "product_lookup"
@@ -23,6 +25,7 @@ class ProductLookupTool(BaseTool):
     parameters_schema = {
         "type": "object",
         "properties": {
+            "organization_id": {"type": "string", "format": "uuid"},
             "query": {"type": "string", "description": "Search query"},
             "category": {"type": "string", "description": "Filter by category"},
             "max_price": {"type": "integer", "description": "Max price in cents"},
@@ -33,8 +36,10 @@ class ProductLookupTool(BaseTool):
                 "default": 5,
             },
         },
-        "required": ["query"],
+        "required": ["organization_id", "query"],
     }
+    idempotent = True
+    read_only = True
 
     async def execute(
         self, session: AsyncSession, parameters: dict[str, Any]
@@ -42,13 +47,24 @@ class ProductLookupTool(BaseTool):
         """Execute product search."""
         start_time = time.time()
 
-        query = parameters.get("query", "")
+        organization_id = UUID(parameters["organization_id"])
+        query = parameters.get("query") or ""
         limit = parameters.get("limit", 5)
 
         # Basic SQL search (will be replaced with RAG in Week 4)
         statement = select(Product).where(
-            Product.name.ilike(f"%{query}%") | Product.description.ilike(f"%{query}%")
+            Product.organization_id == organization_id,
+            Product.is_archived.is_(False),
+            Product.deleted_at.is_(None),
         )
+        if query:
+            # `name` is case-insensitive text: cast it, to match its trigram index
+            name = cast(Product.name, Text)
+            statement = statement.where(
+                name.ilike(f"%{query}%") | Product.description.ilike(f"%{query}%")
+            ).order_by(func.similarity(name, query).desc(), Product.created_at)
+        else:
+            statement = statement.order_by(Product.created_at.desc())
 
         # Apply filters
         if "category" in parameters:
@@ -1,10 +1,35 @@
 """Tool registry - manages available tools for agents."""
 
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
 from typing import Any
 
-from sqlalchemy.ext.asyncio import AsyncSession
+import logfire
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
 from polar.agent_tools.base import BaseTool, ToolResult
+from polar.kit.cache import LRUCache
+from polar.kit.db.postgres import create_async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+tool_latency_histogram = logfire.metric_histogram(
+    "polar.agent.tool_latency",
+    unit="ms",
+    description="Duration of agent tool executions, by tool and outcome.",
+)
+
+
+@dataclass
+class ToolCall:
+    """Invocation of a tool by name."""
+
+    tool_name: str
+    parameters: dict[str, Any]
 
 
 class ToolRegistry:
@@ -12,11 +37,21 @@ class ToolRegistry:
     Registry of available tools for agents.
 
     Tools are registered by name and can be invoked dynamically.
+
+    Each execution is bounded by the tool's `timeout`, and successful results
+    of idempotent tools are cached for `cache_ttl` seconds.
     """
 
-    def __init__(self):
-        """Initialize tool registry."""
+    def __init__(self, cache_size: int = 1_000, cache_ttl: float = 60.0):
+        """
+        Initialize tool registry.
+
+        Args:
+            cache_size: Max cached results of idempotent tools
+            cache_ttl: Seconds a cached result is reused
+        """
         self.tools: dict[str, BaseTool] = {}
+        self._cache = LRUCache[str, ToolResult](cache_size, ttl=cache_ttl)
 
     def register(self, tool: BaseTool) -> None:
         """Register a tool."""
@@ -67,8 +102,112 @@ class ToolRegistry:
                 error="Invalid parameters",
             )
 
+        cache_key: str | None = None
+        if tool.idempotent:
+            cache_key = self._get_cache_key(tool_name, parameters)
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+
         # Execute tool
-        return await tool.execute(session, parameters)
+        result = await self._execute(tool, session, parameters)
+
+        if cache_key is not None and result.success:
+            self._cache.set(cache_key, result)
+
+        return result
+
+    async def invoke_many(
+        self, session: AsyncSession, calls: Sequence[ToolCall]
+    ) -> list[ToolResult]:
+        """
+        Invoke independent tools concurrently.
+
+        A session can't run concurrent queries: read-only tools each run in a
+        session of their own, which is never committed, while the others run
+        one after the other in the caller's session, so their writes are
+        committed or rolled back with it.
+
+        Args:
+            session: Database session
+            calls: Tool invocations
+
+        Returns:
+            ToolResult of each call, in the same order
+        """
+        read_only_calls: list[int] = []
+        calls_in_session: list[int] = []
+        for index, call in enumerate(calls):
+            tool = self.get(call.tool_name)
+            if tool is not None and tool.read_only:
+                read_only_calls.append(index)
+            else:
+                calls_in_session.append(index)
+
+        bind = session.bind
+        if isinstance(bind, AsyncConnection):
+            bind = bind.engine
+        if bind is None or not read_only_calls or len(calls) == 1:
+            return [
+                await self.invoke(session, call.tool_name, call.parameters)
+                for call in calls
+            ]
+
+        sessionmaker = create_async_sessionmaker(bind)
+        results: list[ToolResult | None] = [None] * len(calls)
+
+        async def _invoke_read_only(index: int) -> None:
+            call = calls[index]
+            async with sessionmaker() as tool_session:
+                results[index] = await self.invoke(
+                    tool_session, call.tool_name, call.parameters
+                )
+
+        async def _invoke_in_session() -> None:
+            for index in calls_in_session:
+                call = calls[index]
+                results[index] = await self.invoke(
+                    session, call.tool_name, call.parameters
+                )
+
+        await asyncio.gather(
+            _invoke_in_session(),
+            *(_invoke_read_only(index) for index in read_only_calls),
+        )
+        return [result for result in results if result is not None]
+
+    async def _execute(
+        self, tool: BaseTool, session: AsyncSession, parameters: dict[str, Any]
+    ) -> ToolResult:
+        """Execute a tool, within its timeout, and record its latency."""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with asyncio.timeout(tool.timeout):
+                result = await tool.execute(session, parameters)
+            outcome = "success" if result.success else "error"
+        except TimeoutError:
+            outcome = "timeout"
+            result = ToolResult(
+                success=False,
+                data={},
+                error=f"Tool '{tool.name}' timed out after {tool.timeout}s",
+            )
+        except Exception as e:
+            logger.error(f"Tool '{tool.name}' failed: {e}", exc_info=True)
+            result = ToolResult(success=False, data={}, error=str(e))
+        finally:
+            duration = (time.perf_counter() - start) * 1000
+            tool_latency_histogram.record(
+                duration, attributes={"tool": tool.name, "outcome": outcome}
+            )
+
+        if not result.execution_time_ms:
+            result.execution_time_ms = int(duration)
+        return result
+
+    def _get_cache_key(self, tool_name: str, parameters: dict[str, Any]) -> str:
+        return f"{tool_name}:{json.dumps(parameters, sort_keys=True, default=str)}"
 
 
 # Global tool registry instance
@@ -7,13 +7,19 @@ from fastapi import FastAPI
 from fastapi.routing import APIRoute
 
 from polar import worker  # noqa
+from polar.agent.websocket import close_manager
+from polar.agent_core.orchestrator import agent_orchestrator
+from polar.agent_knowledge.embedding_service import close_openai_client
 from polar.api import router
 from polar.auth.middlewares import AuthSubjectMiddleware
 from polar.backoffice import app as backoffice_app
 from polar.checkout import ip_geolocation
 from polar.config import settings
+from polar.email.react import email_renderer
+from polar.eventstream.multiplexer import close_multiplexer
 from polar.exception_handlers import add_exception_handlers
 from polar.health.endpoints import router as health_router
+from polar.invoice.renderer import invoice_renderer
 from polar.kit.cors import CORSConfig, CORSMatcherMiddleware, Scope
 from polar.kit.db.postgres import (
     AsyncEngine,
@@ -23,6 +29,7 @@ from polar.kit.db.postgres import (
     create_async_sessionmaker,
     create_sync_sessionmaker,
 )
+from polar.kit.db.replica import ReadReplicaPool
 from polar.logfire import (
     configure_logfire,
     instrument_fastapi,
@@ -41,9 +48,10 @@ from polar.oauth2.endpoints.well_known import router as well_known_router
 from polar.oauth2.exception_handlers import OAuth2Error, oauth2_error_exception_handler
 from polar.openapi import OPENAPI_PARAMETERS, APITag, set_openapi_generator
 from polar.postgres import (
+    READ_AFTER_WRITE_HEADER,
     AsyncSessionMiddleware,
     create_async_engine,
-    create_async_read_engine,
+    create_read_replica_pool,
     create_sync_engine,
 )
 from polar.posthog import configure_posthog
@@ -71,6 +79,7 @@ def configure_cors(app: FastAPI) -> None:
             allow_credentials=True,  # Cookies are allowed, but only there!
             allow_methods=["*"],
             allow_headers=["*"],
+            expose_headers=[READ_AFTER_WRITE_HEADER],
         )
         configs.append(polar_frontend_config)
 
@@ -80,7 +89,10 @@ def configure_cors(app: FastAPI) -> None:
         allow_origins=["*"],
         allow_credentials=False,  # No cookies allowed
         allow_methods=["*"],
-        allow_headers=["Authorization"],  # Allow Authorization header to pass tokens
+        # Allow Authorization header to pass tokens, and the read-after-write token
+        # so clients without cookies can echo it back on their next read
+        allow_headers=["Authorization", READ_AFTER_WRITE_HEADER],
+        expose_headers=[READ_AFTER_WRITE_HEADER],
     )
     configs.append(api_config)
 
@@ -95,8 +107,7 @@ def generate_unique_openapi_id(route: APIRoute) -> str:
 class State(TypedDict):
     async_engine: AsyncEngine
     async_sessionmaker: AsyncSessionMaker
-    async_read_engine: AsyncEngine
-    async_read_sessionmaker: AsyncSessionMaker
+    read_replica_pool: ReadReplicaPool
     sync_engine: Engine
     sync_sessionmaker: SyncSessionMaker
 
@@ -108,16 +119,17 @@ class State(TypedDict):
 async def lifespan(app: FastAPI) -> AsyncIterator[State]:
     log.info("Starting Polar API")
 
-    async_engine = async_read_engine = create_async_engine("app")
-    async_sessionmaker = async_read_sessionmaker = create_async_sessionmaker(
-        async_engine
-    )
+    async_engine = create_async_engine("app")
+    async_sessionmaker = create_async_sessionmaker(async_engine)
     instrument_engines = [async_engine.sync_engine]
+    agent_orchestrator.session_maker = async_sessionmaker
 
-    if settings.is_read_replica_configured():
-        async_read_engine = create_async_read_engine("app")
-        async_read_sessionmaker = create_async_sessionmaker(async_read_engine)
-        instrument_engines.append(async_read_engine.sync_engine)
+    read_replica_pool = create_read_replica_pool(
+        "app",
+        async_sessionmaker,  # type: ignore[arg-type]
+    )
+    for replica in read_replica_pool.replicas:
+        instrument_engines.append(replica.engine.sync_engine)
 
     sync_engine = create_sync_engine("app")
     sync_sessionmaker = create_sync_sessionmaker(sync_engine)
@@ -125,6 +137,7 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
     instrument_sqlalchemy(instrument_engines)
 
     redis = create_redis("app")
+    read_replica_pool.start()
 
     try:
         ip_geolocation_client = ip_geolocation.get_client()
@@ -140,18 +153,21 @@ async def lifespan(app: FastAPI) -> AsyncIterator[State]:
     yield {
         "async_engine": async_engine,
         "async_sessionmaker": async_sessionmaker,
-        "async_read_engine": async_read_engine,
-        "async_read_sessionmaker": async_read_sessionmaker,
+        "read_replica_pool": read_replica_pool,
         "sync_engine": sync_engine,
         "sync_sessionmaker": sync_sessionmaker,
         "redis": redis,
         "ip_geolocation_client": ip_geolocation_client,
     }
 
+    await close_manager()
+    await close_multiplexer()
+    await close_openai_client()
+    invoice_renderer.shutdown()
+    await email_renderer.close()
     await redis.close(True)
+    await read_replica_pool.close()
     await async_engine.dispose()
-    if async_read_engine is not async_engine:
-        await async_read_engine.dispose()
     sync_engine.dispose()
     if ip_geolocation_client is not None:
         ip_geolocation_client.close()
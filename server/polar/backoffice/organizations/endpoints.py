@@ -1,7 +1,7 @@
 import builtins
 import contextlib
 import uuid
-from collections.abc import Generator
+from collections.abc import Generator, Mapping
 from datetime import UTC, datetime
 from typing import Annotated, Any, Literal, override
 
@@ -1279,14 +1279,15 @@ async def create_plain_thread(
 
 
 class FileDownloadLinkColumn(datatable.DatatableColumn[File]):
-    """A column that displays a download link for a file."""
+    """A column that displays a download link for a file, from URLs by file ID."""
 
-    def __init__(self, label: str = "Download"):
+    def __init__(self, urls: Mapping[uuid.UUID, str], label: str = "Download"):
         super().__init__(label)
+        self.urls = urls
 
     def render(self, request: Request, item: File) -> Generator[None]:
         """Render a download link for the file."""
-        url, _ = file_service.generate_download_url(item)
+        url = self.urls[item.id]
         with tag.a(
             href=url, classes="btn btn-sm", target="_blank", rel="noopener noreferrer"
         ):
@@ -1801,13 +1802,19 @@ async def get(
                     service=FileServiceTypes.downloadable,
                     sorting=sorting,
                 )
+                download_urls = {
+                    file.id: url
+                    for file, (url, _) in zip(
+                        files, file_service.generate_download_urls(files), strict=True
+                    )
+                }
 
                 with datatable.Datatable[File, FileSortProperty](
                     datatable.DatatableAttrColumn("name", "Name"),
                     datatable.DatatableDateTimeColumn("created_at", "Created At"),
                     datatable.DatatableAttrColumn("mime_type", "MIME Type"),
                     FileSizeColumn("size", "Size"),
-                    FileDownloadLinkColumn(),
+                    FileDownloadLinkColumn(download_urls),
                     empty_message="No downloadable files found",
                 ).render(request, files, sorting=sorting):
                     pass
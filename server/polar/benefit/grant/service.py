@@ -7,6 +7,7 @@ import structlog
 from sqlalchemy import select
 from sqlalchemy.orm import joinedload
 
+from polar.customer.cache import customer_state_cache
 from polar.customer.repository import CustomerRepository
 from polar.event.service import event as event_service
 from polar.event.system import SystemEvent, build_system_event
@@ -588,6 +589,7 @@ class BenefitGrantService(ResourceServiceReader[BenefitGrant]):
         assert loaded is not None
         loaded.previous_properties = previous_grant_properties
         await webhook_service.send(session, benefit.organization, event_type, loaded)
+        customer_state_cache.invalidate(grant.customer_id)
         enqueue_job(
             "customer.webhook",
             WebhookEventType.customer_state_changed,
@@ -1,8 +1,21 @@
 from collections.abc import AsyncGenerator, Sequence
 from datetime import datetime
+from typing import Any, NamedTuple
 from uuid import UUID
 
-from sqlalchemy import Select, func, update
+from sqlalchemy import (
+    Float,
+    Select,
+    and_,
+    cast,
+    func,
+    insert,
+    literal,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by, array_agg
 from sqlalchemy.orm.strategy_options import contains_eager
 
 from polar.config import settings
@@ -12,10 +25,32 @@ from polar.kit.repository import (
     RepositorySoftDeletionIDMixin,
     RepositorySoftDeletionMixin,
 )
-from polar.models import BillingEntry
+from polar.models import BillingEntry, Event, Meter
+from polar.models.event import EventSource
 from polar.models.product_price import ProductPrice, ProductPriceMeteredUnit
 
 
+class PendingMeteredGroup(NamedTuple):
+    meter: Meter
+    product_price_id: UUID | None = None
+    """Price of the entries to aggregate, or `None` for all the meter's prices."""
+    created_after: datetime | None = None
+    """If set, only the entries created after this time are aggregated."""
+
+
+class PendingMeteredAggregate(NamedTuple):
+    units: float
+    """Units consumed, aggregated with the meter's aggregation."""
+    credit_units: list[Any]
+    """Units of the meter credit events, in ingestion order."""
+    entry_ids: list[UUID]
+    """IDs of the pending billing entries."""
+    product_price_ids: list[UUID]
+    """Distinct prices of the pending billing entries."""
+    last_created_at: datetime | None
+    """Creation time of the last pending billing entry."""
+
+
 class BillingEntryRepository(
     RepositorySoftDeletionIDMixin[BillingEntry, UUID],
     RepositorySoftDeletionMixin[BillingEntry],
@@ -23,6 +58,11 @@ class BillingEntryRepository(
 ):
     model = BillingEntry
 
+    async def insert_batch(self, entries: Sequence[dict[str, Any]]) -> None:
+        if not entries:
+            return
+        await self.session.execute(insert(BillingEntry), entries)
+
     async def update_order_item_id(
         self, billing_entries: Sequence[UUID], order_item_id: UUID
     ) -> None:
@@ -96,34 +136,111 @@ class BillingEntryRepository(
         finally:
             await results.close()
 
-    async def get_pending_ids_by_subscription_and_price(
-        self, subscription_id: UUID, product_price_id: UUID
-    ) -> Sequence[UUID]:
-        statement = (
-            self.get_pending_by_subscription_statement(subscription_id)
-            .with_only_columns(BillingEntry.id)
-            .where(BillingEntry.product_price_id == product_price_id)
-        )
-        results = await self.session.execute(statement)
-        return results.scalars().unique().all()
-
-    async def get_pending_ids_by_subscription_and_meter(
-        self, subscription_id: UUID, meter_id: UUID
-    ) -> Sequence[UUID]:
+    async def get_pending_metered_aggregates(
+        self, subscription_id: UUID, groups: Sequence[PendingMeteredGroup]
+    ) -> list[PendingMeteredAggregate]:
         """
-        Get all pending billing entry IDs for a subscription and meter across all prices.
+        Aggregate pending metered billing entries of a subscription, in one query.
+
+        Each group is a meter and a price: the entries of this price are
+        aggregated. If the price is `None`, the entries of all the prices of the
+        meter are aggregated instead. If `created_after` is set, only the
+        entries created since are aggregated.
+
+        Pending entries are read once, then each group is aggregated with the
+        aggregation of its meter.
+
+        Returns:
+            The aggregate of each group, in the same order
         """
-        statement = (
+        if not groups:
+            return []
+
+        pending = (
             self.get_pending_by_subscription_statement(subscription_id)
             .join(
                 ProductPriceMeteredUnit,
                 BillingEntry.product_price_id == ProductPriceMeteredUnit.id,
             )
-            .with_only_columns(BillingEntry.id)
-            .where(ProductPriceMeteredUnit.meter_id == meter_id)
+            .with_only_columns(
+                BillingEntry.id,
+                BillingEntry.event_id,
+                BillingEntry.product_price_id,
+                BillingEntry.created_at,
+                ProductPriceMeteredUnit.meter_id,
+            )
+            .order_by(None)
+            .cte("pending")
         )
-        results = await self.session.execute(statement)
-        return results.scalars().unique().all()
+
+        selects = []
+        for index, (meter, product_price_id, created_after) in enumerate(groups):
+            group_clause = (
+                pending.c.product_price_id == product_price_id
+                if product_price_id is not None
+                else pending.c.meter_id == meter.id
+            )
+            if created_after is not None:
+                group_clause = and_(group_clause, pending.c.created_at > created_after)
+            units = meter.aggregation.get_sql_column(Event).filter(
+                Event.source == EventSource.user
+            )
+            credit_units = func.jsonb_agg(
+                aggregate_order_by(Event.user_metadata["units"], Event.ingested_at),
+                type_=JSONB,
+            ).filter(Event.is_meter_credit.is_(True))
+            entry_ids = (
+                select(
+                    array_agg(
+                        aggregate_order_by(
+                            pending.c.id, pending.c.created_at, pending.c.id
+                        )
+                    )
+                )
+                .where(group_clause)
+                .scalar_subquery()
+            )
+            product_price_ids = (
+                select(array_agg(pending.c.product_price_id.distinct()))
+                .where(group_clause)
+                .scalar_subquery()
+            )
+            last_created_at = (
+                select(func.max(pending.c.created_at))
+                .where(group_clause)
+                .scalar_subquery()
+            )
+            selects.append(
+                select(
+                    literal(index).label("index"),
+                    cast(func.coalesce(units, 0), Float).label("units"),
+                    credit_units.label("credit_units"),
+                    entry_ids.label("entry_ids"),
+                    product_price_ids.label("product_price_ids"),
+                    last_created_at.label("last_created_at"),
+                ).where(Event.id.in_(select(pending.c.event_id).where(group_clause)))
+            )
+
+        # Aggregates without GROUP BY: exactly one row per group
+        result = await self.session.execute(union_all(*selects))
+        aggregates = {
+            index: PendingMeteredAggregate(
+                units or 0.0,
+                credit_units or [],
+                entry_ids or [],
+                product_price_ids or [],
+                last_created_at,
+            )
+            for (
+                index,
+                units,
+                credit_units,
+                entry_ids,
+                product_price_ids,
+                last_created_at,
+            ) in result.tuples()
+        }
+        return [aggregates[index] for index in range(len(groups))]
 
     def get_pending_by_subscription_statement(
         self, subscription_id: UUID, *, options: Options = ()
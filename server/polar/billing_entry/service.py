@@ -1,7 +1,10 @@
 import dataclasses
+import functools
 import uuid
-from collections.abc import Sequence
-from datetime import datetime
+from collections import defaultdict
+from collections.abc import Container, Sequence
+from datetime import UTC, datetime
+from decimal import Decimal
 from typing import cast
 
 import structlog
@@ -9,13 +12,11 @@ from babel.dates import format_date
 from sqlalchemy.util.typing import Literal
 from typing_extensions import AsyncGenerator
 
-from polar.event.repository import EventRepository
 from polar.integrations.stripe.service import stripe as stripe_service
+from polar.integrations.stripe.service import stripe_executor
 from polar.kit.math import non_negative_running_sum
-from polar.meter.service import meter as meter_service
-from polar.models import BillingEntry, Event, OrderItem, Subscription
+from polar.models import BillingEntry, OrderItem, Subscription, SubscriptionMeter
 from polar.models.billing_entry import BillingEntryDirection, BillingEntryType
-from polar.models.event import EventSource
 from polar.postgres import AsyncSession
 from polar.product.guard import (
     MeteredPrice,
@@ -25,10 +26,20 @@ from polar.product.guard import (
 from polar.product.repository import ProductPriceRepository, ProductRepository
 from polar.worker._enqueue import enqueue_job
 
-from .repository import BillingEntryRepository
+from .repository import (
+    BillingEntryRepository,
+    PendingMeteredAggregate,
+    PendingMeteredGroup,
+)
 
 log = structlog.get_logger(__name__)
 
+# `computed_until` of subscription meters without pending entries: every entry
+# created since is added to their totals
+_NO_ENTRIES = datetime(1970, 1, 1, tzinfo=UTC)
+
+_STRIPE_INVOICE_ITEM_NAMESPACE = uuid.UUID("5d8e1f3a-7c4b-4e2a-9f6d-1b3c5a7e9d20")
+
 
 @dataclasses.dataclass
 class StaticLineItem:
@@ -61,33 +72,39 @@ class BillingEntryService:
         stripe_invoice_id: str | None = None,
         stripe_customer_id: str | None = None,
     ) -> Sequence[OrderItem]:
-        items: list[OrderItem] = []
+        # Compute every line item first, so Stripe calls don't interleave with
+        # database queries
+        pending: list[
+            tuple[uuid.UUID, StaticLineItem | MeteredLineItem, Sequence[uuid.UUID]]
+        ] = []
         async for line_item, entries in self.compute_pending_subscription_line_items(
             session, subscription
         ):
             order_item_id = uuid.uuid4()
-
-            # For legacy subscriptions managed by Stripe, we create invoice items on Stripe
-            if stripe_invoice_id and stripe_customer_id:
-                assert isinstance(line_item, MeteredLineItem)
-                price = line_item.price
-                await stripe_service.create_invoice_item(
-                    customer=stripe_customer_id,
-                    invoice=stripe_invoice_id,
-                    amount=line_item.amount,
-                    currency=line_item.currency,
-                    description=line_item.label,
-                    metadata={
-                        "order_item_id": str(order_item_id),
-                        "product_price_id": str(price.id),
-                        "meter_id": str(price.meter_id),
-                        "units": str(line_item.consumed_units),
-                        "credited_units": str(line_item.credited_units),
-                        "unit_amount": str(price.unit_amount),
-                        "cap_amount": str(price.cap_amount),
-                    },
+            if stripe_invoice_id is not None:
+                # Stable across retries of the invoice webhook, like the
+                # idempotency key of its Stripe invoice item
+                order_item_id = uuid.uuid5(
+                    _STRIPE_INVOICE_ITEM_NAMESPACE,
+                    f"{stripe_invoice_id}:{line_item.price.id}",
+                )
+            pending.append((order_item_id, line_item, entries))
+
+        # For legacy subscriptions managed by Stripe, we create invoice items on Stripe
+        if stripe_invoice_id and stripe_customer_id:
+            await stripe_executor.gather(
+                functools.partial(
+                    self._create_stripe_invoice_item,
+                    order_item_id,
+                    line_item,
+                    stripe_invoice_id=stripe_invoice_id,
+                    stripe_customer_id=stripe_customer_id,
                 )
+                for order_item_id, line_item, _ in pending
+            )
 
+        items: list[OrderItem] = []
+        for order_item_id, line_item, entries in pending:
             order_item = OrderItem(
                 id=order_item_id,
                 label=line_item.label,
@@ -100,7 +117,9 @@ class BillingEntryService:
 
             # Do it asynchronously to avoid issues with DB flush, since we're
             # generating OrderItem without attached to an Order yet.
-            enqueue_job("billing_entry.set_order_item", entries, order_item.id)
+            enqueue_job(
+                "billing_entry.set_order_item", entries, order_item.id, subscription.id
+            )
 
         return items
 
@@ -118,77 +137,235 @@ class BillingEntryService:
             )
             yield static_line_item, [entry.id]
 
-        # 👋 Reading the code below, you might wonder:
-        # "Why is this so complex?"
-        # "Why are there so many queries?"
-        # Well, if you look at the previous implementation, it was much more readable
-        # but it involved to load lot of BillingEntry in memory, which was causing
-        # performance issues and even OOM on large subscriptions.
+        async for (
+            metered_line_item,
+            aggregate,
+        ) in self._compute_pending_metered_line_items(session, subscription):
+            yield metered_line_item, aggregate.entry_ids
+
+    async def update_subscription_meters(
+        self,
+        session: AsyncSession,
+        subscription: Subscription,
+        *,
+        reconcile: bool = False,
+    ) -> None:
+        """
+        Update the totals of the subscription meters from their pending entries.
+
+        Meters with a summable aggregation (count, sum), whose entries are all
+        on their current price, are updated incrementally: only the entries
+        created since their `computed_until` are aggregated, and added to their
+        totals. Other meters are recomputed from all their pending entries, as
+        every meter is when `reconcile` is set, e.g. after a billing cycle.
+
+        The billing entries of a meter are created by one job at a time, holding
+        a lock on the meter until they're committed: once an entry is visible, no
+        entry created before it can be committed later.
+        """
+        repository = BillingEntryRepository.from_session(session)
+        active_prices = self._get_active_metered_prices(subscription)
+
+        incremental: list[tuple[SubscriptionMeter, MeteredPrice]] = []
+        recomputed: set[uuid.UUID] = set()
+        for subscription_meter in subscription.meters:
+            price = active_prices.get(subscription_meter.meter_id)
+            if (
+                reconcile
+                or price is None
+                or subscription_meter.computed_until is None
+                or not price.meter.aggregation.is_summable()
+            ):
+                recomputed.add(subscription_meter.meter_id)
+            else:
+                incremental.append((subscription_meter, price))
+
+        aggregates = await repository.get_pending_metered_aggregates(
+            subscription.id,
+            [
+                PendingMeteredGroup(
+                    price.meter, created_after=subscription_meter.computed_until
+                )
+                for subscription_meter, price in incremental
+            ],
+        )
+        for (subscription_meter, price), aggregate in zip(
+            incremental, aggregates, strict=True
+        ):
+            if not aggregate.entry_ids:
+                continue
+            # Entries of another price are billed separately, with their own
+            # amount: they can't be added to the totals of the current one.
+            if aggregate.product_price_ids != [price.id]:
+                recomputed.add(subscription_meter.meter_id)
+                continue
+
+            consumed_units = float(subscription_meter.consumed_units) + aggregate.units
+            credited_units = non_negative_running_sum(
+                iter(aggregate.credit_units), subscription_meter.credited_units
+            )
+            amount, _ = price.get_amount_and_label(consumed_units - credited_units)
+            subscription_meter.consumed_units = Decimal(consumed_units)
+            subscription_meter.credited_units = credited_units
+            subscription_meter.amount = amount
+            subscription_meter.computed_until = aggregate.last_created_at
+
+        if not recomputed:
+            return
+
+        meter_line_items: defaultdict[
+            uuid.UUID, list[tuple[MeteredLineItem, PendingMeteredAggregate]]
+        ] = defaultdict(list)
+        async for line_item, aggregate in self._compute_pending_metered_line_items(
+            session, subscription, meter_ids=recomputed
+        ):
+            meter_line_items[line_item.price.meter_id].append((line_item, aggregate))
+
+        for subscription_meter in subscription.meters:
+            if subscription_meter.meter_id not in recomputed:
+                continue
+
+            subscription_meter.reset()
+            line_items = meter_line_items[subscription_meter.meter_id]
+            for line_item, _ in line_items:
+                subscription_meter.consumed_units += Decimal(line_item.consumed_units)
+                subscription_meter.credited_units += line_item.credited_units
+                subscription_meter.amount += line_item.amount
+
+            # Update it incrementally from now on, if it's billed at one price
+            price = active_prices.get(subscription_meter.meter_id)
+            if price is None or not price.meter.aggregation.is_summable():
+                continue
+            if not line_items:
+                subscription_meter.computed_until = _NO_ENTRIES
+            elif len(line_items) == 1 and line_items[0][0].price.id == price.id:
+                subscription_meter.computed_until = line_items[0][1].last_created_at
+
+    async def _compute_pending_metered_line_items(
+        self,
+        session: AsyncSession,
+        subscription: Subscription,
+        *,
+        meter_ids: Container[uuid.UUID] | None = None,
+    ) -> AsyncGenerator[tuple[MeteredLineItem, PendingMeteredAggregate]]:
+        repository = BillingEntryRepository.from_session(session)
+
+        # Pending metered entries can be numerous: they're aggregated in the
+        # database, with a constant number of queries whatever the number of
+        # prices and meters. Loading them in memory caused OOM on large
+        # subscriptions.
         product_price_repository = ProductPriceRepository.from_session(session)
 
-        # Track which meters we've already processed to avoid duplicates
-        # For non-summable aggregations (max, min, avg, unique), we process each meter only once
-        # (even if there are billing entries with multiple prices) because these aggregations
-        # must be computed across ALL events, not per-price
-        processed_meters: set[uuid.UUID] = set()
+        # Group entries by price, to bill each price separately.
+        # For non-summable aggregations (max, min, avg, unique), group by meter
+        # instead (even if there are billing entries with multiple prices),
+        # because these aggregations must be computed across ALL events, not
+        # per-price. For example:
+        # - MAX(3 servers on priceA, 2 servers on priceB) = 3 servers (not 3+2=5)
+        # - We bill this at the currently active price from subscription
+        pending_tuples = [
+            pending_tuple
+            async for pending_tuple in (
+                repository.get_pending_metered_by_subscription_tuples(subscription.id)
+            )
+            if meter_ids is None or pending_tuple[1] in meter_ids
+        ]
+        if not pending_tuples:
+            return
+
+        prices = {
+            price.id: cast(MeteredPrice, price)
+            for price in await product_price_repository.get_all_by_ids(
+                {product_price_id for product_price_id, *_ in pending_tuples}
+            )
+        }
 
-        async for (
+        active_prices = self._get_active_metered_prices(subscription)
+        groups: list[tuple[MeteredPrice, uuid.UUID | None, datetime, datetime]] = []
+        processed_meters: set[uuid.UUID] = set()
+        for (
             product_price_id,
             meter_id,
             start_timestamp,
             end_timestamp,
-        ) in repository.get_pending_metered_by_subscription_tuples(subscription.id):
-            metered_price = cast(
-                MeteredPrice, await product_price_repository.get_by_id(product_price_id)
-            )
-
-            # Check if this meter uses a non-summable aggregation
-            # Non-summable aggregations (max, min, avg, unique) must be computed across
-            # ALL events in the period, not per-price. For example:
-            # - MAX(3 servers on priceA, 2 servers on priceB) = 3 servers (not 3+2=5)
-            # - We bill this at the currently active price from subscription
-            if not metered_price.meter.aggregation.is_summable():
-                if meter_id in processed_meters:
-                    continue
-                processed_meters.add(meter_id)
-
-                # Find the currently active price for this meter from the subscription
-                # This is the source of truth - even if all billing entries used priceA,
-                # if the customer changed to priceB, we bill at priceB
-                active_price = None
-                for spp in subscription.subscription_product_prices:
-                    if (
-                        is_metered_price(spp.product_price)
-                        and spp.product_price.meter_id == meter_id
-                    ):
-                        active_price = spp.product_price
-                        break
-
-                if active_price is None:
-                    log.info(
-                        f"No active price found for meter {meter_id} in subscription {subscription.id}"
-                    )
-                    continue
-
-                metered_line_item = await self._get_metered_line_item_by_meter(
-                    session, active_price, subscription, start_timestamp, end_timestamp
-                )
-                pending_entries_ids = (
-                    await repository.get_pending_ids_by_subscription_and_meter(
-                        subscription.id, meter_id
-                    )
-                )
-            else:
-                metered_line_item = await self._get_metered_line_item(
-                    session, metered_price, subscription, start_timestamp, end_timestamp
+        ) in pending_tuples:
+            metered_price = prices[product_price_id]
+            if metered_price.meter.aggregation.is_summable():
+                groups.append(
+                    (metered_price, product_price_id, start_timestamp, end_timestamp)
                 )
-                pending_entries_ids = (
-                    await repository.get_pending_ids_by_subscription_and_price(
-                        subscription.id, product_price_id
-                    )
+                continue
+
+            if meter_id in processed_meters:
+                continue
+            processed_meters.add(meter_id)
+
+            # Find the currently active price for this meter from the subscription
+            # This is the source of truth - even if all billing entries used priceA,
+            # if the customer changed to priceB, we bill at priceB
+            active_price = active_prices.get(meter_id)
+            if active_price is None:
+                log.info(
+                    f"No active price found for meter {meter_id} in subscription {subscription.id}"
                 )
+                continue
 
-            yield metered_line_item, pending_entries_ids
+            groups.append((active_price, None, start_timestamp, end_timestamp))
+
+        aggregates = await repository.get_pending_metered_aggregates(
+            subscription.id,
+            [
+                PendingMeteredGroup(price.meter, product_price_id)
+                for price, product_price_id, *_ in groups
+            ],
+        )
+        for (price, _, start_timestamp, end_timestamp), aggregate in zip(
+            groups, aggregates, strict=True
+        ):
+            yield (
+                self._get_metered_line_item(
+                    price, start_timestamp, end_timestamp, aggregate
+                ),
+                aggregate,
+            )
+
+    def _get_active_metered_prices(
+        self, subscription: Subscription
+    ) -> dict[uuid.UUID, MeteredPrice]:
+        """Current metered prices of the subscription, by meter ID."""
+        active_prices: dict[uuid.UUID, MeteredPrice] = {}
+        for spp in subscription.subscription_product_prices:
+            if is_metered_price(spp.product_price):
+                active_prices.setdefault(spp.product_price.meter_id, spp.product_price)
+        return active_prices
+
+    async def _create_stripe_invoice_item(
+        self,
+        order_item_id: uuid.UUID,
+        line_item: StaticLineItem | MeteredLineItem,
+        *,
+        stripe_invoice_id: str,
+        stripe_customer_id: str,
+    ) -> None:
+        assert isinstance(line_item, MeteredLineItem)
+        price = line_item.price
+        await stripe_service.create_invoice_item(
+            customer=stripe_customer_id,
+            invoice=stripe_invoice_id,
+            amount=line_item.amount,
+            currency=line_item.currency,
+            description=line_item.label,
+            metadata={
+                "order_item_id": str(order_item_id),
+                "product_price_id": str(price.id),
+                "meter_id": str(price.meter_id),
+                "units": str(line_item.consumed_units),
+                "credited_units": str(line_item.credited_units),
+                "unit_amount": str(price.unit_amount),
+                "cap_amount": str(price.cap_amount),
+            },
+            idempotency_key=f"invoice_item:{stripe_invoice_id}:{price.id}",
+        )
 
     async def _get_static_price_line_item(
         self, session: AsyncSession, price: StaticPrice, entry: BillingEntry
@@ -219,86 +396,24 @@ class BillingEntryService:
             proration=entry.type == BillingEntryType.proration,
         )
 
-    async def _get_metered_line_item(
+    def _get_metered_line_item(
         self,
-        session: AsyncSession,
         price: MeteredPrice,
-        subscription: Subscription,
         start_timestamp: datetime,
         end_timestamp: datetime,
+        aggregate: PendingMeteredAggregate,
     ) -> MeteredLineItem:
         """
-        Compute a metered line item for a specific price.
-        Used for summable aggregations (sum, count) where we can group by price.
-        """
-        event_repository = EventRepository.from_session(session)
-        events_statement = event_repository.get_by_pending_entries_statement(
-            subscription.id, price.id
-        )
-        meter = price.meter
-        units = await meter_service.get_quantity(
-            session,
-            meter,
-            events_statement.with_only_columns(Event.id).where(
-                Event.source == EventSource.user
-            ),
-        )
-        credit_events_statement = events_statement.where(
-            Event.is_meter_credit.is_(True)
-        )
-        credit_events = await event_repository.get_all(credit_events_statement)
-        credited_units = non_negative_running_sum(
-            event.user_metadata["units"] for event in credit_events
-        )
-        amount, amount_label = price.get_amount_and_label(units - credited_units)
-        label = f"{meter.name} — {amount_label}"
-
-        return MeteredLineItem(
-            price=price,
-            start_timestamp=start_timestamp,
-            end_timestamp=end_timestamp,
-            consumed_units=units,
-            credited_units=credited_units,
-            amount=amount,
-            currency=price.price_currency,
-            label=label,
-        )
+        Compute a metered line item from the aggregate of its pending entries.
 
-    async def _get_metered_line_item_by_meter(
-        self,
-        session: AsyncSession,
-        price: MeteredPrice,
-        subscription: Subscription,
-        start_timestamp: datetime,
-        end_timestamp: datetime,
-    ) -> MeteredLineItem:
-        """
-        Compute a metered line item grouped by meter.
-        Used for non-summable aggregations (max, min, avg, unique) where we must
-        compute across ALL events for the meter, regardless of which price was active.
-        Uses the provided price for billing (should be the most recent/current price).
+        The aggregate is either the one of the price, for summable aggregations
+        (sum, count), or the one of the meter across all prices, for
+        non-summable aggregations (max, min, avg, unique). In the latter case,
+        the provided price is used for billing (should be the current price).
         """
-        event_repository = EventRepository.from_session(session)
         meter = price.meter
-
-        # Get events across ALL prices for this meter
-        events_statement = event_repository.get_by_pending_entries_for_meter_statement(
-            subscription.id, meter.id
-        )
-        units = await meter_service.get_quantity(
-            session,
-            meter,
-            events_statement.with_only_columns(Event.id).where(
-                Event.source == EventSource.user
-            ),
-        )
-        credit_events_statement = events_statement.where(
-            Event.is_meter_credit.is_(True)
-        )
-        credit_events = await event_repository.get_all(credit_events_statement)
-        credited_units = non_negative_running_sum(
-            event.user_metadata["units"] for event in credit_events
-        )
+        units = aggregate.units
+        credited_units = non_negative_running_sum(iter(aggregate.credit_units))
         amount, amount_label = price.get_amount_and_label(units - credited_units)
         label = f"{meter.name} — {amount_label}"
 
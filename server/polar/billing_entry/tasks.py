@@ -1,5 +1,6 @@
 import uuid
 
+from polar.subscription.meters import schedule_update_meters
 from polar.worker import AsyncSessionMaker, TaskPriority, actor
 
 from .repository import BillingEntryRepository
@@ -7,8 +8,14 @@ from .repository import BillingEntryRepository
 
 @actor(actor_name="billing_entry.set_order_item", priority=TaskPriority.LOW)
 async def set_order_item(
-    billing_entries: list[uuid.UUID], order_item_id: uuid.UUID
+    billing_entries: list[uuid.UUID],
+    order_item_id: uuid.UUID,
+    subscription_id: uuid.UUID | None = None,
 ) -> None:
     async with AsyncSessionMaker() as session:
         repository = BillingEntryRepository.from_session(session)
         await repository.update_order_item_id(billing_entries, order_item_id)
+
+    # The entries aren't pending anymore: recompute the meters without them
+    if subscription_id is not None:
+        schedule_update_meters(subscription_id, reconcile=True)
@@ -131,11 +131,22 @@ class Settings(BaseSettings):
     POSTGRES_READ_HOST: str | None = None
     POSTGRES_READ_PORT: int | None = None
     POSTGRES_READ_DATABASE: str | None = None
+    # Additional replica hosts, sharing the credentials of POSTGRES_READ_*
+    POSTGRES_READ_EXTRA_HOSTS: list[str] = []
+    DATABASE_READ_REPLICA_MAX_LAG: timedelta = timedelta(seconds=5)
+    DATABASE_READ_REPLICA_LAG_CHECK_INTERVAL: timedelta = timedelta(seconds=2)
+    # Window during which reads are routed to the primary after a write
+    DATABASE_READ_AFTER_WRITE_TTL: timedelta = timedelta(seconds=10)
+    DATABASE_READ_AFTER_WRITE_COOKIE_KEY: str = "polar_read_after_write"
 
     # Redis
     REDIS_HOST: str = "127.0.0.1"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
+    # Number of pub/sub connections per process serving SSE eventstreams
+    EVENTSTREAM_PUBSUB_SHARDS: int = 1
+    # Interval at which local rate limit counters are synced to Redis
+    RATE_LIMIT_SYNC_INTERVAL: timedelta = timedelta(milliseconds=250)
 
     # Emails
     EMAIL_RENDERER_BINARY_PATH: Annotated[
@@ -146,9 +157,15 @@ class Settings(BaseSettings):
         / "bin"
         / f"react-email-pkg{file_extension}"
     )
+    # Number of long-lived renderer processes, and max emails rendered at once
+    EMAIL_RENDERER_PROCESSES: int = 2
+    EMAIL_RENDERER_MAX_CONCURRENCY: int = 32
     EMAIL_SENDER: EmailSender = EmailSender.logger
     RESEND_API_KEY: str = ""
     RESEND_API_BASE_URL: str = "https://api.resend.com"
+    # Max emails per batch request, and max requests in flight per process
+    RESEND_BATCH_SIZE: int = 100
+    RESEND_MAX_CONCURRENCY: int = 4
     EMAIL_FROM_NAME: str = "Polar"
     EMAIL_FROM_DOMAIN: str = "notifications.polar.sh"
     EMAIL_FROM_LOCAL: str = "mail"
@@ -180,6 +197,9 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "o4-mini-2025-04-16"
 
+    # Agent knowledge
+    AGENT_KNOWLEDGE_REINDEX_ENABLED: bool = False
+
     # Stripe
     STRIPE_SECRET_KEY: str = ""
     STRIPE_PUBLISHABLE_KEY: str = ""
@@ -187,6 +207,10 @@ class Settings(BaseSettings):
     STRIPE_WEBHOOK_SECRET: str = ""
     STRIPE_CONNECT_WEBHOOK_SECRET: str = ""
     STRIPE_STATEMENT_DESCRIPTOR: str = "POLAR"
+    # Max requests in flight, and requests per second, of bulk Stripe requests.
+    # Stripe allows 100 requests per second in live mode, 25 in test mode.
+    STRIPE_MAX_CONCURRENCY: int = 8
+    STRIPE_RATE_LIMIT: float = 25.0
 
     # Open Collective
     OPEN_COLLECTIVE_PERSONAL_TOKEN: str | None = None
@@ -252,6 +276,9 @@ class Settings(BaseSettings):
     # Application behaviours
     API_PAGINATION_MAX_LIMIT: int = 100
 
+    # Due subscriptions cycled per job, in bulk
+    SUBSCRIPTION_CYCLE_CHUNK_SIZE: int = 100
+
     ACCOUNT_PAYOUT_DELAY: timedelta = timedelta(seconds=1)
     ACCOUNT_PAYOUT_MINIMUM_BALANCE: int = 1000
 
@@ -370,7 +397,7 @@ class Settings(BaseSettings):
         )
 
     def get_postgres_read_dsn(
-        self, driver: Literal["asyncpg", "psycopg2"]
+        self, driver: Literal["asyncpg", "psycopg2"], host: str | None = None
     ) -> str | None:
         if not self.is_read_replica_configured():
             return None
@@ -380,12 +407,18 @@ class Settings(BaseSettings):
                 scheme=f"postgresql+{driver}",
                 username=self.POSTGRES_READ_USER,
                 password=self.POSTGRES_READ_PWD,
-                host=self.POSTGRES_READ_HOST,
+                host=host or self.POSTGRES_READ_HOST,
                 port=self.POSTGRES_READ_PORT,
                 path=self.POSTGRES_READ_DATABASE,
             )
         )
 
+    def get_postgres_read_hosts(self) -> list[str]:
+        if not self.is_read_replica_configured():
+            return []
+        assert self.POSTGRES_READ_HOST is not None
+        return [self.POSTGRES_READ_HOST, *self.POSTGRES_READ_EXTRA_HOSTS]
+
     def is_environment(self, environments: set[Environment]) -> bool:
         return self.ENV in environments
 
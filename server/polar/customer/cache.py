@@ -0,0 +1,139 @@
+import uuid
+from datetime import timedelta
+from typing import TYPE_CHECKING, NamedTuple
+
+from polar.kit.cache import LRUCache
+from polar.redis import Pipeline, Redis
+from polar.worker import enqueue_flush_callback
+
+if TYPE_CHECKING:
+    from .schemas.state import CustomerState
+
+# 👋 Whenever you change the state schema,
+# please also update the cache key with a version number.
+CACHE_KEY_PREFIX = "polar:customer_state:v4"
+CACHE_TTL = timedelta(hours=1)
+# Must outlive the cached state, so a state can't match versions recreated
+# after the previous ones expired.
+VERSIONS_TTL = timedelta(days=1)
+LOCAL_CACHE_MAXSIZE = 1024
+
+
+class CustomerStateVersions(NamedTuple):
+    """
+    Opaque tokens identifying the current version of a customer state.
+
+    `all` changes whenever anything in the state changes; `meters` changes
+    when only the customer meters changed, allowing to refresh them without
+    recomputing the whole state.
+    """
+
+    all: str
+    meters: str
+
+
+class CachedCustomerState(NamedTuple):
+    raw_state: str
+    meters_stale: bool
+
+
+def _state_key(customer_id: uuid.UUID) -> str:
+    return f"{CACHE_KEY_PREFIX}:{customer_id}"
+
+
+def _versions_key(customer_id: uuid.UUID) -> str:
+    return f"{CACHE_KEY_PREFIX}:{customer_id}:versions"
+
+
+class CustomerStateCache:
+    """
+    Two-tier cache of customer states: an in-process LRU in front of Redis.
+
+    Entries are tagged with the versions they were computed at. Invalidating a
+    state bumps its versions in Redis once the current transaction is committed,
+    so every process detects stale entries on its next read, at the cost of a
+    single small round trip.
+    """
+
+    def __init__(self, local_maxsize: int = LOCAL_CACHE_MAXSIZE) -> None:
+        self._local = LRUCache[
+            uuid.UUID, tuple[CustomerStateVersions, "CustomerState"]
+        ](local_maxsize)
+
+    def invalidate(self, customer_id: uuid.UUID, *, meters_only: bool = False) -> None:
+        field = "meters" if meters_only else "all"
+
+        def _bump_version(pipeline: Pipeline) -> None:
+            key = _versions_key(customer_id)
+            pipeline.hset(key, field, uuid.uuid4().hex)
+            pipeline.expire(key, VERSIONS_TTL)
+
+        enqueue_flush_callback(f"customer_state:{customer_id}:{field}", _bump_version)
+
+    async def get_versions(
+        self, redis: Redis, customer_id: uuid.UUID
+    ) -> CustomerStateVersions:
+        key = _versions_key(customer_id)
+        token = uuid.uuid4().hex
+        async with redis.pipeline(transaction=False) as pipeline:
+            pipeline.hsetnx(key, "all", token)
+            pipeline.hsetnx(key, "meters", token)
+            pipeline.hmget(key, "all", "meters")
+            pipeline.expire(key, VERSIONS_TTL)
+            _, _, (all_version, meters_version), _ = await pipeline.execute()
+        return CustomerStateVersions(all_version, meters_version)
+
+    def get_local(
+        self, customer_id: uuid.UUID, versions: CustomerStateVersions
+    ) -> "CustomerState | None":
+        entry = self._local.get(customer_id)
+        if entry is None:
+            return None
+        local_versions, state = entry
+        if local_versions != versions:
+            self._local.pop(customer_id)
+            return None
+        return state
+
+    async def get(
+        self, redis: Redis, customer_id: uuid.UUID, versions: CustomerStateVersions
+    ) -> CachedCustomerState | None:
+        all_version, meters_version, raw_state = await redis.hmget(
+            _state_key(customer_id), "all", "meters", "state"
+        )
+        if raw_state is None or all_version != versions.all:
+            return None
+
+        return CachedCustomerState(raw_state, meters_version != versions.meters)
+
+    def set_local(
+        self,
+        customer_id: uuid.UUID,
+        versions: CustomerStateVersions,
+        state: "CustomerState",
+    ) -> None:
+        self._local.set(customer_id, (versions, state))
+
+    async def set(
+        self,
+        redis: Redis,
+        customer_id: uuid.UUID,
+        versions: CustomerStateVersions,
+        state: "CustomerState",
+    ) -> None:
+        self.set_local(customer_id, versions, state)
+        key = _state_key(customer_id)
+        async with redis.pipeline(transaction=False) as pipeline:
+            pipeline.hset(
+                key,
+                mapping={
+                    "all": versions.all,
+                    "meters": versions.meters,
+                    "state": state.model_dump_json(),
+                },
+            )
+            pipeline.expire(key, CACHE_TTL)
+            await pipeline.execute()
+
+
+customer_state_cache = CustomerStateCache()
@@ -20,6 +20,8 @@ from polar.models import Customer, UserOrganization
 from polar.models.webhook_endpoint import WebhookEventType
 from polar.worker import enqueue_job
 
+from .cache import customer_state_cache
+
 
 def _get_changed_value(
     inspection: InstanceState[Customer], attr_name: str
@@ -86,6 +88,7 @@ class CustomerRepository(
         inspection = orm_inspect(object)
 
         customer = await super().update(object, update_dict=update_dict, flush=flush)
+        customer_state_cache.invalidate(customer.id)
         enqueue_job("customer.webhook", WebhookEventType.customer_updated, customer.id)
 
         # Only create an event if the customer is not being deleted
@@ -131,6 +134,7 @@ class CustomerRepository(
             customer.user_metadata = user_metadata
             customer.external_id = None
 
+        customer_state_cache.invalidate(customer.id)
         enqueue_job("customer.webhook", WebhookEventType.customer_deleted, customer.id)
         enqueue_job("customer.event", customer.id, SystemEvent.customer_deleted)
 
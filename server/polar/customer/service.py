@@ -4,7 +4,6 @@ from typing import Any
 
 from sqlalchemy import UnaryExpression, asc, desc, func, or_
 from sqlalchemy.orm import joinedload
-from sqlalchemy_utils.types.range import timedelta
 
 from polar.auth.models import AuthSubject
 from polar.benefit.grant.repository import BenefitGrantRepository
@@ -22,9 +21,10 @@ from polar.subscription.repository import SubscriptionRepository
 from polar.webhook.service import webhook as webhook_service
 from polar.worker import enqueue_job
 
+from .cache import customer_state_cache
 from .repository import CustomerRepository
 from .schemas.customer import CustomerCreate, CustomerUpdate, CustomerUpdateExternalID
-from .schemas.state import CustomerState
+from .schemas.state import CustomerState, CustomerStateMeter
 from .sorting import CustomerSortProperty
 
 
@@ -239,14 +239,33 @@ class CustomerService:
         customer: Customer,
         cache: bool = True,
     ) -> CustomerState:
-        # 👋 Whenever you change the state schema,
-        # please also update the cache key with a version number.
-        cache_key = f"polar:customer_state:v3:{customer.id}"
+        versions = await customer_state_cache.get_versions(redis, customer.id)
 
         if cache:
-            raw_state = await redis.get(cache_key)
-            if raw_state is not None:
-                return CustomerState.model_validate_json(raw_state)
+            state = customer_state_cache.get_local(customer.id, versions)
+            if state is not None:
+                return state
+
+            cached = await customer_state_cache.get(redis, customer.id, versions)
+            if cached is not None:
+                state = CustomerState.model_validate_json(cached.raw_state)
+                if not cached.meters_stale:
+                    customer_state_cache.set_local(customer.id, versions, state)
+                    return state
+
+                # Only meters changed: refresh them on top of the cached state
+                customer_meter_repository = CustomerMeterRepository.from_session(
+                    session
+                )
+                active_meters = await customer_meter_repository.get_all_by_customer(
+                    customer.id
+                )
+                state.active_meters = [
+                    CustomerStateMeter.model_validate(customer_meter)
+                    for customer_meter in active_meters
+                ]
+                await customer_state_cache.set(redis, customer.id, versions, state)
+                return state
 
         # If not cached, fetch from the database
         subscription_repository = SubscriptionRepository.from_session(session)
@@ -267,12 +286,7 @@ class CustomerService:
         )
 
         state = CustomerState.model_validate(customer)
-
-        await redis.set(
-            cache_key,
-            state.model_dump_json(),
-            ex=int(timedelta(hours=1).total_seconds()),
-        )
+        await customer_state_cache.set(redis, customer.id, versions, state)
 
         return state
 
@@ -285,7 +299,7 @@ class CustomerService:
     ) -> None:
         data: CustomerState | Customer
         if event_type == WebhookEventType.customer_state_changed:
-            data = await self.get_state(session, redis, customer, cache=False)
+            data = await self.get_state(session, redis, customer)
             await webhook_service.send(
                 session,
                 customer.organization,
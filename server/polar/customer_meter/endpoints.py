@@ -8,7 +8,7 @@ from polar.meter.schemas import MeterID
 from polar.models import CustomerMeter
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import AsyncReadSession, get_db_read_session
 from polar.routing import APIRouter
 
 from . import auth, sorting
@@ -51,7 +51,7 @@ async def list(
     meter_id: MultipleQueryFilter[MeterID] | None = Query(
         None, title="MeterID Filter", description="Filter by meter ID."
     ),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> ListResource[CustomerMeterSchema]:
     """List customer meters."""
     results, count = await customer_meter_service.list(
@@ -81,7 +81,7 @@ async def list(
 async def get(
     id: CustomerMeterID,
     auth_subject: auth.CustomerMeterRead,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> CustomerMeter:
     """Get a customer meter by ID."""
     customer_meter = await customer_meter_service.get(session, auth_subject, id)
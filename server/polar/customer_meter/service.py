@@ -7,6 +7,7 @@ from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.strategy_options import contains_eager
 
 from polar.auth.models import AuthSubject, Organization, User
+from polar.customer.cache import customer_state_cache
 from polar.customer.repository import CustomerRepository
 from polar.event.repository import EventRepository
 from polar.kit.math import non_negative_running_sum
@@ -18,7 +19,7 @@ from polar.meter.service import meter as meter_service
 from polar.models import Customer, CustomerMeter, Event, Meter
 from polar.models.event import EventSource
 from polar.models.webhook_endpoint import WebhookEventType
-from polar.postgres import AsyncSession
+from polar.postgres import AsyncReadSession, AsyncSession
 from polar.worker import enqueue_job
 
 from .repository import CustomerMeterRepository
@@ -28,7 +29,7 @@ from .sorting import CustomerMeterSortProperty
 class CustomerMeterService:
     async def list(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[User | Organization],
         *,
         organization_id: Sequence[uuid.UUID] | None = None,
@@ -70,7 +71,7 @@ class CustomerMeterService:
 
     async def get(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[User | Organization],
         id: uuid.UUID,
     ) -> CustomerMeter | None:
@@ -100,6 +101,7 @@ class CustomerMeterService:
             updated = updated or meter_updated
 
         if updated:
+            customer_state_cache.invalidate(customer.id, meters_only=True)
             enqueue_job(
                 "customer.webhook", WebhookEventType.customer_state_changed, customer.id
             )
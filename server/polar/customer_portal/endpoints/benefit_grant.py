@@ -4,7 +4,7 @@ from fastapi import Depends, Path, Query
 from pydantic import UUID4
 
 from polar.exceptions import NotPermitted, ResourceNotFound
-from polar.kit.db.postgres import AsyncSession
+from polar.kit.db.postgres import AsyncReadSession, AsyncSession
 from polar.kit.pagination import ListResource, PaginationParamsQuery
 from polar.kit.schemas import MultipleQueryFilter
 from polar.kit.sorting import Sorting, SortingGetter
@@ -12,7 +12,7 @@ from polar.models import BenefitGrant
 from polar.models.benefit import BenefitType
 from polar.openapi import APITag
 from polar.order.schemas import OrderID
-from polar.postgres import get_db_session
+from polar.postgres import get_db_read_session, get_db_session
 from polar.routing import APIRouter
 from polar.subscription.schemas import SubscriptionID
 
@@ -68,7 +68,7 @@ async def list(
     subscription_id: MultipleQueryFilter[SubscriptionID] | None = Query(
         None, title="SubscriptionID Filter", description="Filter by subscription ID."
     ),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> ListResource[CustomerBenefitGrant]:
     """List benefits grants of the authenticated customer."""
     results, count = await customer_benefit_grant_service.list(
@@ -99,7 +99,7 @@ async def list(
 async def get(
     id: BenefitGrantID,
     auth_subject: auth.CustomerPortalRead,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> BenefitGrant:
     """Get a benefit grant by ID for the authenticated customer."""
     benefit_grant = await customer_benefit_grant_service.get_by_id(
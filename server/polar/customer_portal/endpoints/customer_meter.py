@@ -7,7 +7,7 @@ from polar.kit.schemas import MultipleQueryFilter
 from polar.meter.schemas import MeterID
 from polar.models import CustomerMeter
 from polar.openapi import APITag
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import AsyncReadSession, get_db_read_session
 from polar.routing import APIRouter
 
 from .. import auth
@@ -40,7 +40,7 @@ async def list(
         None, title="MeterID Filter", description="Filter by meter ID."
     ),
     query: str | None = Query(None, description="Filter by meter name."),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> ListResource[CustomerMeterSchema]:
     """List meters of the authenticated customer."""
     results, count = await customer_meter_service.list(
@@ -68,7 +68,7 @@ async def list(
 async def get(
     id: CustomerMeterID,
     auth_subject: auth.CustomerPortalRead,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> CustomerMeter:
     """Get a meter by ID for the authenticated customer."""
     customer_meter = await customer_meter_service.get(session, auth_subject, id)
@@ -23,9 +23,10 @@ from polar.license_key.schemas import (
     ValidatedLicenseKey,
 )
 from polar.license_key.service import license_key as license_key_service
-from polar.models import LicenseKey, LicenseKeyActivation
+from polar.models import LicenseKeyActivation
 from polar.openapi import APITag
 from polar.postgres import get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from .. import auth
@@ -100,7 +101,8 @@ async def get(
 async def validate(
     validate: LicenseKeyValidate,
     session: AsyncSession = Depends(get_db_session),
-) -> LicenseKey:
+    redis: Redis = Depends(get_redis),
+) -> ValidatedLicenseKey:
     """
      Validate a license key.
 
@@ -109,14 +111,7 @@ async def validate(
     > If you plan to validate a license key on a server, use the `/v1/license-keys/validate`
     > endpoint instead.
     """
-    license_key = await license_key_service.get_or_raise_by_key(
-        session,
-        organization_id=validate.organization_id,
-        key=validate.key,
-    )
-    return await license_key_service.validate(
-        session, license_key=license_key, validate=validate
-    )
+    return await license_key_service.validate_by_key(session, redis, validate=validate)
 
 
 @router.post(
@@ -4,14 +4,14 @@ import structlog
 from fastapi import Depends, Query
 
 from polar.exceptions import ResourceNotFound
-from polar.kit.db.postgres import AsyncSession
+from polar.kit.db.postgres import AsyncReadSession, AsyncSession
 from polar.kit.pagination import ListResource, PaginationParamsQuery
 from polar.kit.schemas import MultipleQueryFilter
 from polar.kit.sorting import Sorting, SortingGetter
 from polar.locker import Locker, get_locker
 from polar.models import Subscription
 from polar.openapi import APITag
-from polar.postgres import get_db_session
+from polar.postgres import get_db_read_session, get_db_session
 from polar.product.schemas import ProductID
 from polar.routing import APIRouter
 from polar.subscription.schemas import SubscriptionChargePreview, SubscriptionID
@@ -57,7 +57,7 @@ async def list(
     query: str | None = Query(
         None, description="Search by product or organization name."
     ),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> ListResource[CustomerSubscription]:
     """List subscriptions of the authenticated customer."""
     results, count = await customer_subscription_service.list(
@@ -86,7 +86,7 @@ async def list(
 async def get(
     id: SubscriptionID,
     auth_subject: auth.CustomerPortalRead,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> Subscription:
     """Get a subscription for the authenticated customer."""
     subscription = await customer_subscription_service.get_by_id(
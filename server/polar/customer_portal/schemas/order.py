@@ -4,7 +4,13 @@ from pydantic import UUID4, AliasChoices, AliasPath, Field, model_validator
 from pydantic.json_schema import SkipJsonSchema
 
 from polar.enums import PaymentProcessor
+from polar.kit.repository import Loader, LoaderSpec
 from polar.kit.schemas import Schema
+from polar.models.order import Order as OrderModel
+from polar.models.order_item import OrderItem as OrderItemModel
+from polar.models.product import Product as ProductModel
+from polar.models.product_price import ProductPrice as ProductPriceModel
+from polar.models.subscription import Subscription as SubscriptionModel
 from polar.order.schemas import OrderBase, OrderItemSchema, OrderUpdateBase
 from polar.product.schemas import (
     BenefitPublicList,
@@ -58,6 +64,37 @@ class CustomerOrder(OrderBase):
     )
 
 
+# How to load orders serialized with the `CustomerOrder` schema, e.g. in lists
+CUSTOMER_ORDER_LOADER = LoaderSpec(
+    Loader(OrderModel.customer),
+    Loader(
+        OrderModel.product,
+        children=(
+            Loader(ProductModel.prices, "selectin"),
+            Loader(ProductModel.product_benefits, "selectin"),
+            Loader(ProductModel.product_medias, "selectin"),
+            Loader(ProductModel.organization),
+        ),
+        raise_others=True,
+    ),
+    Loader(
+        OrderModel.subscription,
+        children=(Loader(SubscriptionModel.subscription_product_prices, "selectin"),),
+        raise_others=True,
+    ),
+    Loader(
+        OrderModel.items,
+        "selectin",
+        children=(
+            Loader(
+                OrderItemModel.product_price,
+                children=(Loader(ProductPriceModel.product, raise_others=True),),
+            ),
+        ),
+    ),
+)
+
+
 class CustomerOrderInvoice(Schema):
     """Order's invoice data."""
 
@@ -5,9 +5,13 @@ from pydantic import UUID4, AliasChoices, AliasPath, Field, computed_field
 from pydantic.json_schema import SkipJsonSchema
 
 from polar.enums import SubscriptionProrationBehavior
+from polar.kit.repository import Loader, LoaderSpec
 from polar.kit.schemas import IDSchema, Schema, SetSchemaReference, TimestampedSchema
 from polar.meter.schemas import NAME_DESCRIPTION as METER_NAME_DESCRIPTION
+from polar.models.product import Product as ProductModel
 from polar.models.subscription import CustomerCancellationReason
+from polar.models.subscription import Subscription as SubscriptionModel
+from polar.models.subscription_meter import SubscriptionMeter as SubscriptionMeterModel
 from polar.product.schemas import (
     BenefitPublicList,
     ProductBase,
@@ -74,6 +78,28 @@ class CustomerSubscription(SubscriptionBase):
         return self.stripe_subscription_id is None
 
 
+# How to load subscriptions serialized with the `CustomerSubscription` schema
+CUSTOMER_SUBSCRIPTION_LOADER = LoaderSpec(
+    Loader(SubscriptionModel.customer),
+    Loader(
+        SubscriptionModel.product,
+        children=(
+            Loader(ProductModel.prices, "selectin"),
+            Loader(ProductModel.product_benefits, "selectin"),
+            Loader(ProductModel.product_medias, "selectin"),
+            Loader(ProductModel.organization),
+        ),
+        raise_others=True,
+    ),
+    Loader(SubscriptionModel.subscription_product_prices, "selectin"),
+    Loader(
+        SubscriptionModel.meters,
+        "selectin",
+        children=(Loader(SubscriptionMeterModel.meter),),
+    ),
+)
+
+
 class CustomerSubscriptionUpdateProduct(Schema):
     product_id: UUID4 = Field(description="Update subscription to another product.")
 
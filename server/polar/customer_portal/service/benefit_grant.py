@@ -9,7 +9,7 @@ from sqlalchemy.orm import contains_eager, joinedload
 from polar.auth.models import AuthSubject
 from polar.customer.repository import CustomerRepository
 from polar.exceptions import NotPermitted, PolarRequestValidationError
-from polar.kit.db.postgres import AsyncSession
+from polar.kit.db.postgres import AsyncReadSession, AsyncSession
 from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
@@ -40,7 +40,7 @@ class CustomerBenefitGrantSortProperty(StrEnum):
 class CustomerBenefitGrantService(ResourceServiceReader[BenefitGrant]):
     async def list(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[Customer],
         *,
         type: Sequence[BenefitType] | None = None,
@@ -106,7 +106,7 @@ class CustomerBenefitGrantService(ResourceServiceReader[BenefitGrant]):
 
     async def get_by_id(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[Customer],
         id: uuid.UUID,
     ) -> BenefitGrant | None:
@@ -5,7 +5,7 @@ from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.strategy_options import contains_eager
 
 from polar.auth.models import AuthSubject
-from polar.kit.db.postgres import AsyncSession
+from polar.kit.db.postgres import AsyncReadSession
 from polar.kit.pagination import PaginationParams
 from polar.kit.sorting import Sorting
 from polar.models import Customer, CustomerMeter, Meter
@@ -17,7 +17,7 @@ from ..sorting.customer_meter import CustomerCustomerMeterSortProperty
 class CustomerMeterService:
     async def list(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[Customer],
         *,
         meter_id: Sequence[uuid.UUID] | None = None,
@@ -50,7 +50,7 @@ class CustomerMeterService:
 
     async def get(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[Customer],
         id: uuid.UUID,
     ) -> CustomerMeter | None:
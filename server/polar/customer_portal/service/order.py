@@ -4,7 +4,6 @@ from enum import StrEnum
 from typing import Any
 
 from sqlalchemy import UnaryExpression, asc, desc
-from sqlalchemy.orm import contains_eager
 
 from polar.auth.models import AuthSubject
 from polar.enums import PaymentProcessor
@@ -20,6 +19,7 @@ from polar.order.service import order as order_service
 
 from ..repository.order import CustomerOrderRepository
 from ..schemas.order import (
+    CUSTOMER_ORDER_LOADER,
     CustomerOrderInvoice,
     CustomerOrderPaymentConfirmation,
     CustomerOrderUpdate,
@@ -77,11 +77,7 @@ class CustomerOrderService:
         statement = (
             repository.get_readable_statement(auth_subject)
             .join(Order.product, isouter=True)
-            .options(
-                *repository.get_eager_options(
-                    product_load=contains_eager(Order.product)
-                )
-            )
+            .options(*CUSTOMER_ORDER_LOADER.get_options(contains=(Order.product,)))
         )
 
         if product_id is not None:
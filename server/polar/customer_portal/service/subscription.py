@@ -4,11 +4,11 @@ from enum import StrEnum
 from typing import Any
 
 from sqlalchemy import Select, UnaryExpression, asc, desc, select
-from sqlalchemy.orm import contains_eager, joinedload, selectinload
+from sqlalchemy.orm import joinedload, selectinload
 
 from polar.auth.models import AuthSubject
 from polar.exceptions import PolarError
-from polar.kit.db.postgres import AsyncSession
+from polar.kit.db.postgres import AsyncReadSession, AsyncSession
 from polar.kit.pagination import PaginationParams, paginate
 from polar.kit.services import ResourceServiceReader
 from polar.kit.sorting import Sorting
@@ -23,6 +23,7 @@ from polar.models.subscription import CustomerCancellationReason
 from polar.subscription.service import subscription as subscription_service
 
 from ..schemas.subscription import (
+    CUSTOMER_SUBSCRIPTION_LOADER,
     CustomerSubscriptionUpdate,
     CustomerSubscriptionUpdateProduct,
     CustomerSubscriptionUpdateSeats,
@@ -48,7 +49,7 @@ class CustomerSubscriptionSortProperty(StrEnum):
 class CustomerSubscriptionService(ResourceServiceReader[Subscription]):
     async def list(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[Customer],
         *,
         product_id: Sequence[uuid.UUID] | None = None,
@@ -67,12 +68,9 @@ class CustomerSubscriptionService(ResourceServiceReader[Subscription]):
             statement.join(Product, onclause=Subscription.product_id == Product.id)
             .join(Organization, onclause=Product.organization_id == Organization.id)
             .options(
-                joinedload(Subscription.customer),
-                contains_eager(Subscription.product).options(
-                    selectinload(Product.product_medias),
-                    contains_eager(Product.organization),
-                ),
-                selectinload(Subscription.meters).joinedload(SubscriptionMeter.meter),
+                *CUSTOMER_SUBSCRIPTION_LOADER.get_options(
+                    contains=(Subscription.product, Product.organization)
+                )
             )
         )
 
@@ -107,7 +105,7 @@ class CustomerSubscriptionService(ResourceServiceReader[Subscription]):
 
     async def get_by_id(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[Customer],
         id: uuid.UUID,
     ) -> Subscription | None:
@@ -10,7 +10,7 @@ from polar.models import CustomerSeat, Organization
 log: Logger = structlog.get_logger()
 
 
-def send_seat_invitation_email(
+async def send_seat_invitation_email(
     customer_email: str,
     seat: CustomerSeat,
     organization: Organization,
@@ -33,7 +33,7 @@ def send_seat_invitation_email(
         f"?token={seat.invitation_token}"
     )
 
-    html_content = render_email_template(
+    html_content = await render_email_template(
         SeatInvitationEmail(
             props=SeatInvitationProps.model_validate(
                 {
@@ -1,26 +1,203 @@
-import subprocess
+import asyncio
+import contextlib
+import itertools
+import json
+import struct
 from typing import TYPE_CHECKING
 
+import structlog
+
 from polar.config import settings
+from polar.exceptions import PolarError
+from polar.kit.cache import LRUCache
+from polar.logging import Logger
 
 if TYPE_CHECKING:
     from .schemas import Email
 
+log: Logger = structlog.get_logger()
+
+_HEADER = struct.Struct(">I")
+
+
+class EmailRenderingError(PolarError):
+    def __init__(self, message: str) -> None:
+        super().__init__(f"Error in react-email process: {message}")
+
+
+class _RendererProcess:
+    """
+    A long-lived react-email process, rendering emails requested on its stdin.
+
+    Messages are JSON, prefixed by their length. Several emails can be in
+    flight at once: responses are matched to their request by ID.
+    """
+
+    def __init__(self, process: asyncio.subprocess.Process) -> None:
+        self.process = process
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future[str]] = {}
+        self._closing = False
+        self._reader = asyncio.create_task(self._read())
 
-def render_email_template(email: "Email") -> str:
-    process = subprocess.Popen(
-        [
+    @classmethod
+    async def start(cls) -> "_RendererProcess":
+        process = await asyncio.create_subprocess_exec(
             settings.EMAIL_RENDERER_BINARY_PATH,
-            email.template,
-            email.props.model_dump_json(),
-        ],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
-    stdout, stderr = process.communicate()
-    if process.returncode != 0:
-        raise Exception(f"Error in react-email process: {stderr.decode('utf-8')}")
-    return stdout.decode("utf-8")
-
-
-__all__ = ["render_email_template"]
+            "--serve",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        log.info("email.renderer.started", pid=process.pid)
+        return cls(process)
+
+    @property
+    def alive(self) -> bool:
+        return not self._reader.done()
+
+    async def render(self, template: str, props_json: str) -> str:
+        assert self.process.stdin is not None
+        id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[id] = future
+        # Props are already serialized: embed them rather than decoding them
+        body = (
+            f'{{"id":{id},"template":{json.dumps(template)},"props":{props_json}}}'
+        ).encode()
+        try:
+            try:
+                self.process.stdin.write(_HEADER.pack(len(body)) + body)
+                await self.process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError) as e:
+                raise EmailRenderingError("renderer process exited") from e
+            return await future
+        finally:
+            self._pending.pop(id, None)
+
+    async def close(self) -> None:
+        assert self.process.stdin is not None
+        self._closing = True
+        self.process.stdin.close()
+        await self.process.wait()
+        await self._reader
+
+    def kill(self) -> None:
+        with contextlib.suppress(ProcessLookupError):
+            self.process.kill()
+
+    async def _read(self) -> None:
+        assert self.process.stdout is not None
+        try:
+            while True:
+                (length,) = _HEADER.unpack(
+                    await self.process.stdout.readexactly(_HEADER.size)
+                )
+                response = json.loads(await self.process.stdout.readexactly(length))
+                future = self._pending.get(response["id"])
+                if future is None or future.done():
+                    continue
+                if "error" in response:
+                    future.set_exception(EmailRenderingError(response["error"]))
+                else:
+                    future.set_result(response["html"])
+        except asyncio.IncompleteReadError:
+            if not self._closing:
+                log.warning("email.renderer.exited", pid=self.process.pid)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(EmailRenderingError("renderer process exited"))
+
+
+class EmailRenderer:
+    """
+    Pool of warm react-email processes, rendering emails without blocking.
+
+    Processes are started on first use and kept alive, saving the startup of
+    the Node.js runtime on every email. Processes exiting are replaced on
+    next use.
+
+    Rendered emails are cached by template and props, so sending the same
+    email to many recipients renders it once.
+    """
+
+    def __init__(
+        self,
+        processes: int = 2,
+        max_concurrency: int = 32,
+        cache_size: int = 256,
+        cache_ttl: float = 600.0,
+    ) -> None:
+        """
+        Args:
+            processes: Number of renderer processes
+            max_concurrency: Max emails being rendered at once, in all processes
+            cache_size: Max rendered emails kept in cache
+            cache_ttl: Seconds a rendered email is reused
+        """
+        self.processes = processes
+        self.max_concurrency = max_concurrency
+        self._cache = LRUCache[tuple[str, str], str](cache_size, ttl=cache_ttl)
+        self._next_process = itertools.count()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pool: list[_RendererProcess | None] = []
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+
+    async def render(self, email: "Email") -> str:
+        props_json = email.props.model_dump_json()
+        key = (email.template, props_json)
+        if (html := self._cache.get(key)) is not None:
+            return html
+
+        self._bind_loop()
+        async with self._semaphore:
+            process = await self._get_process()
+            html = await process.render(email.template, props_json)
+
+        self._cache.set(key, html)
+        return html
+
+    async def close(self) -> None:
+        """Stop the renderer processes, once their renders are done."""
+        pool, self._pool = self._pool, [None] * self.processes
+        await asyncio.gather(*(p.close() for p in pool if p is not None and p.alive))
+
+    def _bind_loop(self) -> None:
+        # Processes' pipes are bound to the loop they were started in
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        for process in self._pool:
+            if process is not None:
+                process.kill()
+        self._loop = loop
+        self._pool = [None] * self.processes
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._lock = asyncio.Lock()
+
+    async def _get_process(self) -> _RendererProcess:
+        index = next(self._next_process) % self.processes
+        process = self._pool[index]
+        if process is not None and process.alive:
+            return process
+
+        async with self._lock:
+            process = self._pool[index]
+            if process is None or not process.alive:
+                process = await _RendererProcess.start()
+                self._pool[index] = process
+            return process
+
+
+email_renderer = EmailRenderer(
+    processes=settings.EMAIL_RENDERER_PROCESSES,
+    max_concurrency=settings.EMAIL_RENDERER_MAX_CONCURRENCY,
+)
+
+
+async def render_email_template(email: "Email") -> str:
+    return await email_renderer.render(email)
+
+
+__all__ = ["EmailRenderingError", "email_renderer", "render_email_template"]
@@ -1,6 +1,9 @@
+import asyncio
+import contextlib
+import time
 from abc import ABC, abstractmethod
-from collections.abc import Iterable
-from typing import Any, TypedDict
+from collections.abc import Iterable, Sequence
+from typing import Any, NotRequired, TypedDict
 
 import httpx
 import structlog
@@ -41,6 +44,20 @@ class Attachment(TypedDict):
     filename: str
 
 
+class EmailMessage(TypedDict):
+    """Arguments of `EmailSender.send`, to send emails in batches."""
+
+    to_email_addr: str
+    subject: str
+    html_content: str
+    from_name: NotRequired[str]
+    from_email_addr: NotRequired[str]
+    email_headers: NotRequired[dict[str, str] | None]
+    reply_to_name: NotRequired[str | None]
+    reply_to_email_addr: NotRequired[str | None]
+    attachments: NotRequired[list[Attachment] | None]
+
+
 class EmailSender(ABC):
     @abstractmethod
     async def send(
@@ -58,6 +75,22 @@ class EmailSender(ABC):
     ) -> None:
         pass
 
+    async def send_batch(
+        self, emails: Sequence[EmailMessage], *, idempotency_key: str | None = None
+    ) -> None:
+        """
+        Send several emails.
+
+        By default, they're sent one by one.
+
+        Args:
+            emails: Emails to send
+            idempotency_key: Unique key of the batch, so retrying it doesn't
+            send the emails again, if supported
+        """
+        for email in emails:
+            await self.send(**email)
+
 
 class LoggingEmailSender(EmailSender):
     async def send(
@@ -83,11 +116,50 @@ class LoggingEmailSender(EmailSender):
 
 
 class ResendEmailSender(EmailSender):
-    def __init__(self) -> None:
+    """
+    Send emails through the Resend API.
+
+    A single pooled client is kept per process. Requests are bounded by
+    `max_concurrency`, and rate limited requests are retried once the rate
+    limit resets: meanwhile, the other requests of the process wait as well.
+    """
+
+    def __init__(
+        self,
+        *,
+        base_url: str = settings.RESEND_API_BASE_URL,
+        api_key: str = settings.RESEND_API_KEY,
+        batch_size: int = settings.RESEND_BATCH_SIZE,
+        max_concurrency: int = settings.RESEND_MAX_CONCURRENCY,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        """
+        Args:
+            base_url: Base URL of the Resend API
+            api_key: Resend API key
+            batch_size: Max emails per batch request, 100 at most
+            max_concurrency: Max requests in flight
+            max_retries: Max retries of a rate limited request
+            retry_backoff: Base delay of the exponential backoff, in seconds,
+            when the rate limit reset isn't returned
+            transport: Custom HTTP transport, mostly for testing
+        """
         self.client = httpx.AsyncClient(
-            base_url=settings.RESEND_API_BASE_URL,
-            headers={"Authorization": f"Bearer {settings.RESEND_API_KEY}"},
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            transport=transport,
         )
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limited_until = 0.0
 
     async def send(
         self,
@@ -101,33 +173,23 @@ class ResendEmailSender(EmailSender):
         reply_to_name: str | None = DEFAULT_REPLY_TO_NAME,
         reply_to_email_addr: str | None = DEFAULT_REPLY_TO_EMAIL_ADDRESS,
         attachments: Iterable[Attachment] | None = None,
+        idempotency_key: str | None = None,
     ) -> None:
         to_email_addr_ascii = to_ascii_email(to_email_addr)
-        payload: dict[str, Any] = {
-            "from": f"{from_name} <{to_ascii_email(from_email_addr)}>",
-            "to": [to_email_addr_ascii],
-            "subject": subject,
-            "html": html_content,
-            "headers": email_headers or {},
-            "attachments": [
-                {
-                    "path": attachment["remote_url"],
-                    "filename": attachment["filename"],
-                }
-                for attachment in attachments
-            ]
-            if attachments
-            else [],
-        }
-        if reply_to_name and reply_to_email_addr:
-            payload["reply_to"] = (
-                f"{reply_to_name} <{to_ascii_email(reply_to_email_addr)}>"
-            )
+        payload = self._get_payload(
+            to_email_addr=to_email_addr,
+            subject=subject,
+            html_content=html_content,
+            from_name=from_name,
+            from_email_addr=from_email_addr,
+            email_headers=email_headers,
+            reply_to_name=reply_to_name,
+            reply_to_email_addr=reply_to_email_addr,
+            attachments=list(attachments) if attachments else None,
+        )
 
         try:
-            response = await self.client.post("/emails", json=payload)
-            response.raise_for_status()
-            email = response.json()
+            email = await self._post("/emails", payload, idempotency_key)
         except httpx.HTTPError as e:
             log.warning(
                 "resend.send_error",
@@ -144,6 +206,127 @@ class ResendEmailSender(EmailSender):
             email_id=email["id"],
         )
 
+    async def send_batch(
+        self, emails: Sequence[EmailMessage], *, idempotency_key: str | None = None
+    ) -> None:
+        """
+        Send several emails, `batch_size` emails per request.
+
+        The batch endpoint doesn't support attachments: emails having some are
+        sent one by one, with their own idempotency key derived from the batch one.
+        """
+        batchable = [email for email in emails if not email.get("attachments")]
+        with_attachments = [email for email in emails if email.get("attachments")]
+        chunks = [
+            batchable[i : i + self.batch_size]
+            for i in range(0, len(batchable), self.batch_size)
+        ]
+
+        await asyncio.gather(
+            *(
+                self._send_chunk(
+                    chunk,
+                    f"{idempotency_key}/{index}" if idempotency_key else None,
+                )
+                for index, chunk in enumerate(chunks)
+            ),
+            *(
+                self.send(
+                    **email,
+                    idempotency_key=(
+                        f"{idempotency_key}/attachments/{index}"
+                        if idempotency_key
+                        else None
+                    ),
+                )
+                for index, email in enumerate(with_attachments)
+            ),
+        )
+
+    async def _send_chunk(
+        self, emails: list[EmailMessage], idempotency_key: str | None
+    ) -> None:
+        payload = [self._get_payload(**email) for email in emails]
+        try:
+            response = await self._post("/emails/batch", payload, idempotency_key)
+        except httpx.HTTPError as e:
+            log.warning("resend.send_batch_error", emails=len(emails), error=e)
+            raise SendEmailError(str(e)) from e
+
+        log.info(
+            "resend.send_batch",
+            emails=len(emails),
+            email_ids=[email["id"] for email in response["data"]],
+        )
+
+    async def _post(
+        self, path: str, payload: Any, idempotency_key: str | None = None
+    ) -> Any:
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else {}
+        async with self._semaphore:
+            retries = 0
+            while True:
+                await self._wait_rate_limit()
+                response = await self.client.post(path, json=payload, headers=headers)
+                if response.status_code != 429 or retries >= self.max_retries:
+                    break
+                delay = self._get_retry_delay(response, retries)
+                self._rate_limited_until = max(
+                    self._rate_limited_until, time.monotonic() + delay
+                )
+                log.info("resend.rate_limited", path=path, retry_in=delay)
+                retries += 1
+
+        response.raise_for_status()
+        return response.json()
+
+    async def _wait_rate_limit(self) -> None:
+        delay = self._rate_limited_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _get_retry_delay(self, response: httpx.Response, retries: int) -> float:
+        retry_after = response.headers.get("retry-after")
+        if retry_after is not None:
+            with contextlib.suppress(ValueError):
+                return float(retry_after)
+        return self.retry_backoff * 2**retries
+
+    def _get_payload(
+        self,
+        *,
+        to_email_addr: str,
+        subject: str,
+        html_content: str,
+        from_name: str = DEFAULT_FROM_NAME,
+        from_email_addr: str = DEFAULT_FROM_EMAIL_ADDRESS,
+        email_headers: dict[str, str] | None = None,
+        reply_to_name: str | None = DEFAULT_REPLY_TO_NAME,
+        reply_to_email_addr: str | None = DEFAULT_REPLY_TO_EMAIL_ADDRESS,
+        attachments: list[Attachment] | None = None,
+    ) -> dict[str, Any]:
+        payload: dict[str, Any] = {
+            "from": f"{from_name} <{to_ascii_email(from_email_addr)}>",
+            "to": [to_ascii_email(to_email_addr)],
+            "subject": subject,
+            "html": html_content,
+            "headers": email_headers or {},
+        }
+        # Not supported by the batch endpoint, even empty
+        if attachments:
+            payload["attachments"] = [
+                {
+                    "path": attachment["remote_url"],
+                    "filename": attachment["filename"],
+                }
+                for attachment in attachments
+            ]
+        if reply_to_name and reply_to_email_addr:
+            payload["reply_to"] = (
+                f"{reply_to_name} <{to_ascii_email(reply_to_email_addr)}>"
+            )
+        return payload
+
 
 class EmailFromReply(TypedDict):
     from_name: str
@@ -177,6 +360,16 @@ def enqueue_email(
     )
 
 
+def enqueue_emails(emails: Sequence[EmailMessage]) -> None:
+    """
+    Send several emails in a single job, batched if the sender supports it.
+
+    Prefer it to `enqueue_email` when sending emails in bulk.
+    """
+    if emails:
+        enqueue_job("email.send_batch", emails=list(emails))
+
+
 email_sender: EmailSender
 if settings.EMAIL_SENDER == EmailSenderType.resend:
     email_sender = ResendEmailSender()
@@ -1,6 +1,8 @@
+from dramatiq.middleware import CurrentMessage
+
 from polar.worker import TaskPriority, actor
 
-from .sender import Attachment, email_sender
+from .sender import Attachment, EmailMessage, email_sender
 
 
 @actor(actor_name="email.send", priority=TaskPriority.HIGH)
@@ -26,3 +28,12 @@ async def email_send(
         reply_to_email_addr=reply_to_email_addr,
         attachments=attachments,
     )
+
+
+@actor(actor_name="email.send_batch", priority=TaskPriority.HIGH)
+async def email_send_batch(emails: list[EmailMessage]) -> None:
+    # Stable across retries, so emails already sent aren't sent again
+    message = CurrentMessage.get_current_message()
+    await email_sender.send_batch(
+        emails, idempotency_key=message.message_id if message else None
+    )
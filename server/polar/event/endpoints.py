@@ -15,7 +15,12 @@ from polar.models import Event
 from polar.models.event import EventSource
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
-from polar.postgres import AsyncSession, get_db_session
+from polar.postgres import (
+    AsyncReadSession,
+    AsyncSession,
+    get_db_read_session,
+    get_db_session,
+)
 from polar.routing import APIRouter
 
 from . import auth, sorting
@@ -96,7 +101,7 @@ async def list(
         description="Metadata field paths to aggregate from descendants into ancestors (e.g., '_cost.amount', 'duration_ns'). Use dot notation for nested fields.",
         include_in_schema=False,
     ),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> ListResource[EventSchema]:
     """List events."""
 
@@ -197,7 +202,7 @@ async def get_hierarchy_stats_endpoint(
         default=["cost.amount"],
         description="Metadata field paths to aggregate (e.g., 'cost.amount', 'duration_ns'). Use dot notation for nested fields.",
     ),
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> Sequence[RootEventStatistics]:
     """
     Get aggregate statistics grouped by root event name.
@@ -251,7 +256,7 @@ async def list_names(
     auth_subject: auth.EventRead,
     pagination: PaginationParamsQuery,
     sorting: sorting.EventNamesSorting,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
     organization_id: MultipleQueryFilter[OrganizationID] | None = Query(
         None, title="OrganizationID Filter", description="Filter by organization ID."
     ),
@@ -294,7 +299,7 @@ async def list_names(
 async def get(
     id: EventID,
     auth_subject: auth.EventRead,
-    session: AsyncSession = Depends(get_db_session),
+    session: AsyncReadSession = Depends(get_db_read_session),
 ) -> Event:
     """Get an event by ID."""
     event = await event_service.get(session, auth_subject, id)
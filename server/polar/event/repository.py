@@ -28,14 +28,12 @@ from polar.kit.repository import RepositoryBase, RepositoryIDMixin
 from polar.kit.repository.base import Options
 from polar.kit.utils import generate_uuid
 from polar.models import (
-    BillingEntry,
     Customer,
     Event,
     Meter,
     UserOrganization,
 )
 from polar.models.event import EventClosure, EventSource
-from polar.models.product_price import ProductPriceMeteredUnit
 
 from .system import SystemEvent
 
@@ -196,43 +194,6 @@ class EventRepository(RepositoryBase[Event], RepositoryIDMixin[Event, UUID]):
             self.get_meter_clause(meter),
         )
 
-    def get_by_pending_entries_statement(
-        self, subscription: UUID, price: UUID
-    ) -> Select[tuple[Event]]:
-        return (
-            self.get_base_statement()
-            .join(BillingEntry, Event.id == BillingEntry.event_id)
-            .where(
-                BillingEntry.subscription_id == subscription,
-                BillingEntry.order_item_id.is_(None),
-                BillingEntry.product_price_id == price,
-            )
-            .order_by(Event.ingested_at.asc())
-        )
-
-    def get_by_pending_entries_for_meter_statement(
-        self, subscription: UUID, meter: UUID
-    ) -> Select[tuple[Event]]:
-        """
-        Get events for pending billing entries grouped by meter.
-        Used for non-summable aggregations where we need to compute across all events
-        in the period, regardless of which price was active when the event occurred.
-        """
-        return (
-            self.get_base_statement()
-            .join(BillingEntry, Event.id == BillingEntry.event_id)
-            .join(
-                ProductPriceMeteredUnit,
-                BillingEntry.product_price_id == ProductPriceMeteredUnit.id,
-            )
-            .where(
-                BillingEntry.subscription_id == subscription,
-                BillingEntry.order_item_id.is_(None),
-                ProductPriceMeteredUnit.meter_id == meter,
-            )
-            .order_by(Event.ingested_at.asc())
-        )
-
     def get_eager_options(self) -> Options:
         return (joinedload(Event.customer),)
 
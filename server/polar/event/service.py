@@ -37,7 +37,7 @@ from polar.models import (
     UserOrganization,
 )
 from polar.models.event import EventSource
-from polar.postgres import AsyncSession
+from polar.postgres import AsyncReadSession, AsyncSession
 from polar.worker import enqueue_events
 
 from .repository import EventRepository
@@ -64,7 +64,7 @@ class EventIngestValidationError(EventError):
 class EventService:
     async def _build_filtered_statement(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[User | Organization],
         repository: EventRepository,
         *,
@@ -167,7 +167,7 @@ class EventService:
 
     async def list(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[User | Organization],
         *,
         filter: Filter | None = None,
@@ -223,7 +223,7 @@ class EventService:
 
     async def get(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[User | Organization],
         id: uuid.UUID,
     ) -> Event | None:
@@ -237,7 +237,7 @@ class EventService:
 
     async def get_hierarchy_stats(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[User | Organization],
         *,
         filter: Filter | None = None,
@@ -282,7 +282,7 @@ class EventService:
 
     async def list_names(
         self,
-        session: AsyncSession,
+        session: AsyncReadSession,
         auth_subject: AuthSubject[User | Organization],
         *,
         organization_id: Sequence[uuid.UUID] | None = None,
@@ -428,6 +428,21 @@ class EventService:
         )
         return event
 
+    async def create_events(
+        self, session: AsyncSession, events: Sequence[dict[str, Any]]
+    ) -> Sequence[uuid.UUID]:
+        """
+        Create several events at once, e.g. the system events of a bulk operation.
+
+        Unlike `create_event`, events are inserted as rows with a single
+        statement, and their closures populated in batch.
+        """
+        repository = EventRepository.from_session(session)
+        event_ids, _ = await repository.insert_batch(events)
+        await self.populate_event_closures_batch(session, event_ids)
+        enqueue_events(*event_ids)
+        return event_ids
+
     async def populate_event_closures_batch(
         self, session: AsyncSession, event_ids: Sequence[uuid.UUID]
     ) -> None:
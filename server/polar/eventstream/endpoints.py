@@ -1,12 +1,9 @@
-import asyncio
 from collections.abc import AsyncGenerator
 from typing import Any
 
 import structlog
 from fastapi import Depends, Request
-from redis.exceptions import ConnectionError
 from sse_starlette.sse import EventSourceResponse
-from uvicorn import Server
 
 from polar.auth.dependencies import WebUserRead
 from polar.exceptions import ResourceNotFound
@@ -16,6 +13,7 @@ from polar.postgres import AsyncSession, get_db_session
 from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
+from .multiplexer import SubscriptionClosed, get_multiplexer
 from .service import Receivers
 
 router = APIRouter(prefix="/stream", tags=["stream"], include_in_schema=False)
@@ -23,59 +21,26 @@ router = APIRouter(prefix="/stream", tags=["stream"], include_in_schema=False)
 log = structlog.get_logger()
 
 
-def _uvicorn_should_exit() -> bool:
-    """
-    Hacky way to check if Uvicorn server is shutting down, by retrieving
-    it from the running asyncio tasks.
-
-    We do this because the exit signal handler monkey-patch made by sse_starlette
-    doesn't work when running Uvicorn from the CLI,
-    preventing a graceful shutdown when a SSE connection is open.
-    """
-    try:
-        for task in asyncio.all_tasks():
-            coroutine = task.get_coro()
-            if coroutine is not None:
-                frame = coroutine.cr_frame  # type: ignore
-                if frame is not None:
-                    args = frame.f_locals
-                    if self := args.get("self"):
-                        if isinstance(self, Server):
-                            return self.should_exit
-    except RuntimeError:
-        pass
-    return False
-
-
 async def subscribe(
     redis: Redis,
     channels: list[str],
     request: Request,
 ) -> AsyncGenerator[Any, Any]:
-    async with redis.pubsub() as pubsub:
-        await pubsub.subscribe(*channels)
-
-        while not _uvicorn_should_exit():
+    multiplexer = await get_multiplexer(redis)
+    async with multiplexer.subscribe(channels) as subscription:
+        while not multiplexer.should_exit:
             if await request.is_disconnected():
-                await pubsub.close()
                 break
 
             try:
-                message = await pubsub.get_message(
-                    ignore_subscribe_messages=True,
-                    # Waits for up to 10s for a new message
-                    timeout=10.0,
-                )
+                # Waits for up to 10s for a new message
+                data = await subscription.get(timeout=10.0)
+            except SubscriptionClosed:
+                break
 
-                if message is not None:
-                    log.info("redis.pubsub", message=message["data"])
-                    yield message["data"]
-            except asyncio.CancelledError as e:
-                await pubsub.close()
-                raise e
-            except ConnectionError as e:
-                await pubsub.close()
-                raise e
+            if data is not None:
+                log.info("redis.pubsub", message=data)
+                yield data
 
 
 @router.get("/user")
@@ -0,0 +1,312 @@
+import asyncio
+import contextlib
+import zlib
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
+
+import structlog
+from uvicorn import Server
+
+from polar.config import settings
+from polar.logging import Logger
+from polar.redis import Redis
+
+log: Logger = structlog.get_logger()
+
+_SHUTDOWN = object()
+
+_uvicorn_server: Server | None = None
+
+
+def _uvicorn_should_exit() -> bool:
+    """
+    Hacky way to check if Uvicorn server is shutting down, by retrieving
+    it from the running asyncio tasks.
+
+    We do this because the exit signal handler monkey-patch made by sse_starlette
+    doesn't work when running Uvicorn from the CLI,
+    preventing a graceful shutdown when a SSE connection is open.
+
+    The server is looked up once, then cached.
+    """
+    global _uvicorn_server
+    if _uvicorn_server is not None:
+        return _uvicorn_server.should_exit
+
+    try:
+        for task in asyncio.all_tasks():
+            coroutine = task.get_coro()
+            if coroutine is not None:
+                frame = coroutine.cr_frame  # type: ignore
+                if frame is not None:
+                    args = frame.f_locals
+                    if self := args.get("self"):
+                        if isinstance(self, Server):
+                            _uvicorn_server = self
+                            return self.should_exit
+    except RuntimeError:
+        pass
+    return False
+
+
+class SubscriptionClosed(Exception):
+    """The multiplexer is shutting down."""
+
+
+class Subscription:
+    """
+    A client subscription to a set of channels.
+
+    Messages are buffered in a bounded queue: when the client is too slow to
+    consume them, the oldest ones are dropped.
+    """
+
+    def __init__(self, channels: Iterable[str], maxsize: int) -> None:
+        self.channels = frozenset(channels)
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, data: Any) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(data)
+
+    def close(self) -> None:
+        self.put(_SHUTDOWN)
+
+    async def get(self, timeout: float | None = None) -> Any | None:
+        """
+        Wait for the next message.
+
+        Returns `None` on timeout. Raises `SubscriptionClosed` when the
+        multiplexer is shutting down.
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                data = await self._queue.get()
+        except TimeoutError:
+            return None
+        if data is _SHUTDOWN:
+            raise SubscriptionClosed()
+        return data
+
+
+class _Shard:
+    RECONNECT_MIN_DELAY = 0.5
+    RECONNECT_MAX_DELAY = 30.0
+
+    def __init__(self, redis: Redis, index: int) -> None:
+        self.index = index
+        self.redis = redis
+        self.pubsub = redis.pubsub(ignore_subscribe_messages=True)
+        self.subscriptions: dict[str, set[Subscription]] = {}
+        self.lock = asyncio.Lock()
+        self._reader: asyncio.Task[None] | None = None
+        self._subscribed = asyncio.Event()
+        self._delay = self.RECONNECT_MIN_DELAY
+
+    async def add(self, subscription: Subscription, channels: Iterable[str]) -> None:
+        async with self.lock:
+            new_channels: list[str] = []
+            for channel in channels:
+                subscribers = self.subscriptions.setdefault(channel, set())
+                if not subscribers:
+                    new_channels.append(channel)
+                subscribers.add(subscription)
+
+            if new_channels:
+                await self.pubsub.subscribe(*new_channels)
+
+            # Wake the reader up if it's idle or backing off
+            self._subscribed.set()
+
+            if self._reader is None:
+                self._reader = asyncio.create_task(self._read())
+
+    async def remove(self, subscription: Subscription, channels: Iterable[str]) -> None:
+        async with self.lock:
+            unused_channels: list[str] = []
+            for channel in channels:
+                subscribers = self.subscriptions.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscriptions[channel]
+                    unused_channels.append(channel)
+
+            if unused_channels:
+                await self.pubsub.unsubscribe(*unused_channels)
+
+    async def _read(self) -> None:
+        self._delay = self.RECONNECT_MIN_DELAY
+        reconnect = False
+        while True:
+            if not self.subscriptions:
+                # Without any channel, the pub/sub connection is unset and
+                # reading from it fails: idle until the next subscription
+                self._subscribed.clear()
+                await self._subscribed.wait()
+            try:
+                if reconnect:
+                    await self._reconnect()
+                    reconnect = False
+                message = await self.pubsub.get_message(timeout=1.0)
+            except Exception as e:
+                # Keep the reader alive whatever the error: without it, every
+                # client of the shard would silently stop receiving messages
+                log.warning(
+                    "eventstream.pubsub_error",
+                    shard=self.index,
+                    error=str(e),
+                    retry_in=self._delay,
+                )
+                await self._backoff()
+                reconnect = True
+                continue
+            self._delay = self.RECONNECT_MIN_DELAY
+
+            if message is None or message["type"] != "message":
+                continue
+
+            for subscription in self.subscriptions.get(message["channel"], ()):
+                subscription.put(message["data"])
+
+    async def _backoff(self) -> None:
+        """
+        Wait before reconnecting, exponentially longer after each failure.
+
+        A new subscription cuts the wait short and resets the delay, so it
+        doesn't wait for a reconnection scheduled while the shard was unused.
+        """
+        self._subscribed.clear()
+        try:
+            async with asyncio.timeout(self._delay):
+                await self._subscribed.wait()
+        except TimeoutError:
+            self._delay = min(self._delay * 2, self.RECONNECT_MAX_DELAY)
+        else:
+            self._delay = self.RECONNECT_MIN_DELAY
+
+    async def _reconnect(self) -> None:
+        """Replace the pub/sub connection and subscribe its channels again."""
+        async with self.lock:
+            with contextlib.suppress(Exception):
+                await self.pubsub.aclose()
+            self.pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            if self.subscriptions:
+                await self.pubsub.subscribe(*self.subscriptions)
+
+    def close(self) -> None:
+        for subscribers in self.subscriptions.values():
+            for subscription in subscribers:
+                subscription.close()
+
+    async def aclose(self) -> None:
+        if self._reader is not None:
+            self._reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader
+            self._reader = None
+        await self.pubsub.aclose()
+
+
+class EventStreamMultiplexer:
+    """
+    Fan-out Redis pub/sub messages to many SSE clients of the same process.
+
+    Channels are spread over a fixed number of shards, each one holding a single
+    pub/sub connection subscribed to the union of its clients' channels.
+    Each channel is subscribed once, when its first client joins, and
+    unsubscribed when its last client leaves.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        shards: int = 1,
+        queue_maxsize: int = 100,
+        shutdown_check_interval: float = 1.0,
+    ) -> None:
+        self.redis = redis
+        self.queue_maxsize = queue_maxsize
+        self.shutdown_check_interval = shutdown_check_interval
+        self._shards = [_Shard(redis, index) for index in range(shards)]
+        self._shutdown_watcher: asyncio.Task[None] | None = None
+        self.should_exit = False
+
+    def _get_shard(self, channel: str) -> _Shard:
+        return self._shards[zlib.crc32(channel.encode()) % len(self._shards)]
+
+    def _group_by_shard(self, channels: Iterable[str]) -> dict[_Shard, list[str]]:
+        shards: dict[_Shard, list[str]] = {}
+        for channel in channels:
+            shards.setdefault(self._get_shard(channel), []).append(channel)
+        return shards
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channels: Iterable[str]) -> AsyncIterator[Subscription]:
+        if self._shutdown_watcher is None:
+            self._shutdown_watcher = asyncio.create_task(self._watch_shutdown())
+
+        subscription = Subscription(channels, self.queue_maxsize)
+        shards = self._group_by_shard(subscription.channels)
+        try:
+            for shard, shard_channels in shards.items():
+                await shard.add(subscription, shard_channels)
+            yield subscription
+        finally:
+            for shard, shard_channels in shards.items():
+                await asyncio.shield(shard.remove(subscription, shard_channels))
+
+    async def _watch_shutdown(self) -> None:
+        while not _uvicorn_should_exit():
+            await asyncio.sleep(self.shutdown_check_interval)
+        self.close()
+
+    def close(self) -> None:
+        """Signal every connected client to stop."""
+        self.should_exit = True
+        for shard in self._shards:
+            shard.close()
+
+    async def aclose(self) -> None:
+        self.close()
+        if self._shutdown_watcher is not None:
+            self._shutdown_watcher.cancel()
+            self._shutdown_watcher = None
+        for shard in self._shards:
+            await shard.aclose()
+
+
+_multiplexer: EventStreamMultiplexer | None = None
+
+
+async def get_multiplexer(redis: Redis) -> EventStreamMultiplexer:
+    global _multiplexer
+    if _multiplexer is not None and _multiplexer.redis is not redis:
+        await close_multiplexer()
+    if _multiplexer is None:
+        _multiplexer = EventStreamMultiplexer(
+            redis, shards=settings.EVENTSTREAM_PUBSUB_SHARDS
+        )
+    return _multiplexer
+
+
+async def close_multiplexer() -> None:
+    """Disconnect the clients and pub/sub connections of the multiplexer."""
+    global _multiplexer
+    if _multiplexer is not None:
+        multiplexer, _multiplexer = _multiplexer, None
+        await multiplexer.aclose()
+
+
+__all__ = [
+    "EventStreamMultiplexer",
+    "Subscription",
+    "SubscriptionClosed",
+    "close_multiplexer",
+    "get_multiplexer",
+]
@@ -7,11 +7,11 @@ from pydantic import BaseModel
 from polar.kit.utils import generate_uuid
 from polar.logging import Logger
 from polar.postgres import AsyncSession
-from polar.redis import Redis
+from polar.redis import Pipeline, Redis
 from polar.user_organization.service import (
     user_organization as user_organization_service,
 )
-from polar.worker import enqueue_job
+from polar.worker import enqueue_flush_callback
 
 log: Logger = structlog.get_logger()
 
@@ -51,13 +51,31 @@ class Event(BaseModel):
 
 
 async def send_event(redis: Redis, event_json: str, channels: list[str]) -> None:
-    for channel in channels:
-        await redis.publish(channel, event_json)
+    async with redis.pipeline(transaction=False) as pipeline:
+        for channel in channels:
+            pipeline.publish(channel, event_json)
+        await pipeline.execute()
     log.debug(
         "Published event to eventstream", event_json=event_json, channels=channels
     )
 
 
+def _enqueue_publish(event_id: UUID, messages: list[tuple[str, str]]) -> None:
+    """
+    Publish messages once the current unit of work is committed.
+
+    Publications are added to the Redis pipeline run when the job queue manager
+    is flushed, so they are sent in the same round trip as other post-commit
+    Redis commands, without going through a worker job.
+    """
+
+    def _publish(pipeline: Pipeline) -> None:
+        for channel, event_json in messages:
+            pipeline.publish(channel, event_json)
+
+    enqueue_flush_callback(f"eventstream:{event_id}", _publish)
+
+
 async def publish(
     key: str,
     payload: dict[str, Any],
@@ -73,13 +91,14 @@ async def publish(
         customer_id=customer_id,
     )
     channels = receivers.get_channels()
+    event_id = generate_uuid()
     event = Event(
-        id=generate_uuid(),
+        id=event_id,
         key=key,
         payload=payload,
     ).model_dump_json()
 
-    enqueue_job("eventstream.publish", event, channels)
+    _enqueue_publish(event_id, [(channel, event) for channel in channels])
 
 
 async def publish_members(
@@ -89,13 +108,14 @@ async def publish_members(
         session, org_id=organization_id
     )
 
+    messages: list[tuple[str, str]] = []
     for m in members:
         receivers = Receivers(user_id=m.user_id)
-        channels = receivers.get_channels()
         event = Event(
             id=generate_uuid(),
             key=key,
             payload=payload,
         ).model_dump_json()
+        messages.extend((channel, event) for channel in receivers.get_channels())
 
-        enqueue_job("eventstream.publish", event, channels)
+    _enqueue_publish(generate_uuid(), messages)
@@ -3,6 +3,8 @@ from polar.worker import RedisMiddleware, TaskPriority, actor
 from .service import send_event
 
 
+# Events are now published inline, on commit. Kept to process messages
+# enqueued before the switch.
 @actor(actor_name="eventstream.publish", priority=TaskPriority.HIGH)
 async def eventstream_publish(event: str, channels: list[str]) -> None:
     await send_event(RedisMiddleware.get(), event, channels)
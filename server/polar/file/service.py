@@ -1,6 +1,8 @@
+import builtins
 import uuid
 from collections.abc import Sequence
 from datetime import datetime
+from typing import cast
 
 import structlog
 
@@ -8,7 +10,7 @@ from polar.auth.models import AuthSubject
 from polar.integrations.aws.s3 import S3FileError
 from polar.kit.pagination import PaginationParams
 from polar.models import Organization, ProductMedia, User
-from polar.models.file import File, ProductMediaFile
+from polar.models.file import File, FileServiceTypes, ProductMediaFile
 from polar.postgres import AsyncReadSession, AsyncSession, sql
 
 from .repository import FileRepository
@@ -94,7 +96,7 @@ class FileService:
         create_schema: FileCreate,
     ) -> FileUpload:
         s3_service = S3_SERVICES[create_schema.service]
-        upload = s3_service.create_multipart_upload(
+        upload = await s3_service.create_multipart_upload(
             create_schema, namespace=create_schema.service.value
         )
 
@@ -124,7 +126,7 @@ class FileService:
         completed_schema: FileUploadCompleted,
     ) -> File:
         s3_service = S3_SERVICES[file.service]
-        s3file = s3_service.complete_multipart_upload(completed_schema)
+        s3file = await s3_service.complete_multipart_upload(completed_schema)
 
         file.is_uploaded = True
 
@@ -153,6 +155,27 @@ class FileService:
             mime_type=file.mime_type,
         )
 
+    def generate_download_urls(
+        self, files: Sequence[File]
+    ) -> builtins.list[tuple[str, datetime]]:
+        """
+        Generate presigned download URLs for several files, in a single pass
+        per storage service.
+        """
+        urls: list[tuple[str, datetime] | None] = [None] * len(files)
+        files_by_service: dict[FileServiceTypes, list[tuple[int, File]]] = {}
+        for i, file in enumerate(files):
+            files_by_service.setdefault(file.service, []).append((i, file))
+
+        for service, service_files in files_by_service.items():
+            presigned = S3_SERVICES[service].generate_presigned_download_urls(
+                [(file.path, file.name, file.mime_type) for _, file in service_files]
+            )
+            for (i, _), url in zip(service_files, presigned, strict=True):
+                urls[i] = url
+
+        return cast(list[tuple[str, datetime]], urls)
+
     def generate_downloadable_schema(self, file: File) -> FileDownload:
         url, expires_at = self.generate_download_url(file)
         return FileDownload.from_presigned(file, url=url, expires_at=expires_at)
@@ -167,7 +190,7 @@ class FileService:
         await session.execute(statement)
 
         s3_service = S3_SERVICES[file.service]
-        deleted = s3_service.delete_file(file.path)
+        deleted = await s3_service.delete_file(file.path)
         log.info("file.delete", file_id=file.id, s3_deleted=deleted)
         return True
 
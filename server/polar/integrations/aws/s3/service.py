@@ -1,4 +1,8 @@
+import asyncio
 import base64
+import functools
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import TYPE_CHECKING, Any, cast
 
@@ -6,6 +10,7 @@ import botocore
 import structlog
 from botocore.client import ClientError
 
+from polar.kit.cache import LRUCache
 from polar.kit.utils import generate_uuid, utc_now
 
 from .client import client, get_client
@@ -27,19 +32,47 @@ if TYPE_CHECKING:
 
 log = structlog.get_logger()
 
+# boto3 clients are blocking but thread-safe: calls to S3 are offloaded to a
+# bounded pool, shared by all the services, so a slow S3 can neither block the
+# event loop nor starve the default executor.
+EXECUTOR_MAX_WORKERS = 16
+_executor = ThreadPoolExecutor(EXECUTOR_MAX_WORKERS, thread_name_prefix="s3")
+
+PRESIGN_CACHE_MAXSIZE = 4096
+PUBLIC_URL_CACHE_MAXSIZE = 4096
+
 
 class S3Service:
+    """
+    Access to an S3 bucket.
+
+    Calls to S3 are awaitable; presigning is local, so it's synchronous.
+    Presigned download URLs are reused for `presign_cache_ttl` seconds: they're
+    valid for at least `presign_ttl - presign_cache_ttl` seconds when handed out.
+    Set `presign_cache_ttl` to 0 to always sign them again.
+    """
+
     def __init__(
         self,
         bucket: str,
         presign_ttl: int = 600,
         client: "S3Client" = client,
+        presign_cache_ttl: int = 60,
     ):
         self.bucket = bucket
         self.presign_ttl = presign_ttl
+        self.presign_cache_ttl = presign_cache_ttl
         self.client = client
+        self._presign_cache = LRUCache[tuple[str, str, str, int], tuple[str, datetime]](
+            PRESIGN_CACHE_MAXSIZE
+        )
+        self._public_url_cache = LRUCache[str, str](PUBLIC_URL_CACHE_MAXSIZE)
 
-    def upload(
+    async def _run[T](self, fn: Callable[..., T], **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, functools.partial(fn, **kwargs))
+
+    async def upload(
         self,
         data: bytes,
         path: str,
@@ -64,10 +97,10 @@ class S3Service:
         if checksum_sha256_base64:
             request["ChecksumSHA256"] = checksum_sha256_base64
 
-        response = self.client.put_object(**request)
+        await self._run(self.client.put_object, **request)
         return path
 
-    def create_multipart_upload(
+    async def create_multipart_upload(
         self, data: S3FileCreate, namespace: str = ""
     ) -> S3FileUpload:
         if not data.organization_id:
@@ -98,7 +131,8 @@ class S3Service:
             file.checksum_sha256_base64 = sha256_base64
             file.checksum_sha256_hex = base64.b64decode(sha256_base64).hex()
 
-        multipart_upload = self.client.create_multipart_upload(
+        multipart_upload = await self._run(
+            self.client.create_multipart_upload,
             Bucket=self.bucket,
             Key=file.path,
             ContentType=file.mime_type,
@@ -169,9 +203,12 @@ class S3Service:
             )
         return ret
 
-    def get_object_or_raise(self, path: str, s3_version_id: str = "") -> dict[str, Any]:
+    async def get_object_or_raise(
+        self, path: str, s3_version_id: str = ""
+    ) -> dict[str, Any]:
         try:
-            obj = self.client.get_object(
+            obj = await self._run(
+                self.client.get_object,
                 Bucket=self.bucket,
                 Key=path,
                 VersionId=s3_version_id,
@@ -182,26 +219,34 @@ class S3Service:
 
         return cast(dict[str, Any], obj)
 
-    def get_head_or_raise(self, path: str, s3_version_id: str = "") -> dict[str, Any]:
+    async def get_head_or_raise(
+        self, path: str, s3_version_id: str = ""
+    ) -> dict[str, Any]:
         try:
-            head = self.client.head_object(
-                Bucket=self.bucket, Key=path, VersionId=s3_version_id
+            head = await self._run(
+                self.client.head_object,
+                Bucket=self.bucket,
+                Key=path,
+                VersionId=s3_version_id,
             )
         except ClientError:
             raise S3FileError("No metadata from S3")
 
         return cast(dict[str, Any], head)
 
-    def complete_multipart_upload(self, data: S3FileUploadCompleted) -> S3File:
+    async def complete_multipart_upload(self, data: S3FileUploadCompleted) -> S3File:
         boto_arguments = data.get_boto3_arguments()
-        response = self.client.complete_multipart_upload(
-            Bucket=self.bucket, Key=data.path, **boto_arguments
+        response = await self._run(
+            self.client.complete_multipart_upload,
+            Bucket=self.bucket,
+            Key=data.path,
+            **boto_arguments,
         )
         if not response:
             raise S3FileError("No response from S3")
 
         version_id = response.get("VersionId", "")
-        head = self.get_head_or_raise(data.path, s3_version_id=version_id)
+        head = await self.get_head_or_raise(data.path, s3_version_id=version_id)
         file = S3File.from_head(data.path, head)
         return file
 
@@ -212,33 +257,82 @@ class S3Service:
         filename: str,
         mime_type: str,
     ) -> tuple[str, datetime]:
-        expires_in = self.presign_ttl
+        [presigned] = self.generate_presigned_download_urls(
+            [(path, filename, mime_type)]
+        )
+        return presigned
+
+    def generate_presigned_download_urls(
+        self, objects: Sequence[tuple[str, str, str]]
+    ) -> list[tuple[str, datetime]]:
+        """
+        Generate presigned download URLs for several objects in a single pass.
+
+        URLs are cached by object and expiry bucket, so listing the same files
+        again within `presign_cache_ttl` doesn't sign them again.
+
+        Args:
+            objects: The `(path, filename, mime_type)` of each object.
+
+        Returns:
+            The presigned URL and its expiration date of each object,
+            in the same order.
+        """
         presign_from = utc_now()
-        signed_download_url = self.client.generate_presigned_url(
-            "get_object",
-            Params=dict(
-                Bucket=self.bucket,
-                Key=path,
-                ResponseContentDisposition=get_downloadable_content_disposition(
-                    filename
-                ),
-                ResponseContentType=mime_type,
-            ),
-            ExpiresIn=expires_in,
+        expiry_bucket = (
+            int(presign_from.timestamp()) // self.presign_cache_ttl
+            if self.presign_cache_ttl > 0
+            else None
         )
 
-        presign_expires_at = presign_from + timedelta(seconds=expires_in)
-        return (signed_download_url, presign_expires_at)
+        presigned_urls: list[tuple[str, datetime]] = []
+        for path, filename, mime_type in objects:
+            if expiry_bucket is not None:
+                cache_key = (path, filename, mime_type, expiry_bucket)
+                presigned = self._presign_cache.get(cache_key)
+                if presigned is not None:
+                    presigned_urls.append(presigned)
+                    continue
+
+            signed_download_url = self.client.generate_presigned_url(
+                "get_object",
+                Params=dict(
+                    Bucket=self.bucket,
+                    Key=path,
+                    ResponseContentDisposition=get_downloadable_content_disposition(
+                        filename
+                    ),
+                    ResponseContentType=mime_type,
+                ),
+                ExpiresIn=self.presign_ttl,
+            )
+            presign_expires_at = presign_from + timedelta(seconds=self.presign_ttl)
+            presigned = (signed_download_url, presign_expires_at)
+
+            if expiry_bucket is not None:
+                self._presign_cache.set(cache_key, presigned)
+            presigned_urls.append(presigned)
+
+        return presigned_urls
 
     def get_public_url(self, path: str) -> str:
-        # This is apparently the *only* way to get a public URL with boto3,
-        # apart from building a URL manually 🙄
-        # Ref: https://stackoverflow.com/a/48197923
-        unsigned_client = get_client(signature_version=botocore.UNSIGNED)
-        return unsigned_client.generate_presigned_url(
-            "get_object", ExpiresIn=0, Params=dict(Bucket=self.bucket, Key=path)
-        )
+        public_url = self._public_url_cache.get(path)
+        if public_url is None:
+            # This is apparently the *only* way to get a public URL with boto3,
+            # apart from building a URL manually 🙄
+            # Ref: https://stackoverflow.com/a/48197923
+            public_url = self._unsigned_client.generate_presigned_url(
+                "get_object", ExpiresIn=0, Params=dict(Bucket=self.bucket, Key=path)
+            )
+            self._public_url_cache.set(path, public_url)
+        return public_url
 
-    def delete_file(self, path: str) -> bool:
-        deleted = self.client.delete_object(Bucket=self.bucket, Key=path)
+    async def delete_file(self, path: str) -> bool:
+        deleted = await self._run(
+            self.client.delete_object, Bucket=self.bucket, Key=path
+        )
         return deleted.get("DeleteMarker", False)
+
+    @functools.cached_property
+    def _unsigned_client(self) -> "S3Client":
+        return get_client(signature_version=botocore.UNSIGNED)
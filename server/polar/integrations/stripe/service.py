@@ -1,5 +1,14 @@
+import asyncio
+import time
 import uuid
-from collections.abc import AsyncGenerator, AsyncIterator, Sequence
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Sequence,
+)
 from typing import TYPE_CHECKING, Literal, Unpack, cast, overload
 
 import stripe as stripe_lib
@@ -65,6 +74,113 @@ class MissingPaymentMethod(StripeError):
         super().__init__(message, 400)
 
 
+class AdaptiveRateLimiter:
+    """
+    Pace requests under a rate adapting to the rate limits actually hit.
+
+    The rate is halved each time a request is rate limited, down to `min_rate`,
+    and grows back by about `increase` requests per second, every second, while
+    requests succeed, up to `max_rate`.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        *,
+        min_rate: float = 1.0,
+        max_rate: float | None = None,
+        increase: float = 1.0,
+    ) -> None:
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.increase = increase
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_rate_limited(self, retry_after: float) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._next_slot = max(self._next_slot, time.monotonic() + retry_after)
+
+
+class StripeRequestExecutor:
+    """
+    Run Stripe requests concurrently, within the rate limits of the account.
+
+    Requests are bounded by `max_concurrency` and paced by an adaptive rate
+    limiter, shared by the requests of the process. Rate limited requests are
+    retried with an exponential backoff: they should be sent with an
+    idempotency key.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_concurrency: int = settings.STRIPE_MAX_CONCURRENCY,
+        rate: float = settings.STRIPE_RATE_LIMIT,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+    ) -> None:
+        """
+        Args:
+            max_concurrency: Max requests in flight
+            rate: Max requests per second
+            max_retries: Max retries of a rate limited request
+            retry_backoff: Base delay of the exponential backoff, in seconds
+        """
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.limiter = AdaptiveRateLimiter(rate)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run[T](self, request: Callable[[], Awaitable[T]]) -> T:
+        self._bind_loop()
+        async with self._semaphore:
+            retries = 0
+            while True:
+                await self.limiter.acquire()
+                try:
+                    result = await request()
+                except stripe_lib.RateLimitError as e:
+                    if retries >= self.max_retries:
+                        raise
+                    delay = self.retry_backoff * 2**retries
+                    self.limiter.on_rate_limited(delay)
+                    log.info(
+                        "stripe.rate_limited",
+                        request_id=e.request_id,
+                        retry_in=delay,
+                        rate=self.limiter.rate,
+                    )
+                    retries += 1
+                else:
+                    self.limiter.on_success()
+                    return result
+
+    async def gather[T](
+        self, requests: Iterable[Callable[[], Awaitable[T]]]
+    ) -> list[T]:
+        return await asyncio.gather(*(self.run(request) for request in requests))
+
+    def _bind_loop(self) -> None:
+        # Semaphores are bound to the loop they're first waited in
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+
 class StripeService:
     async def retrieve_intent(self, id: str) -> stripe_lib.PaymentIntent:
         return await stripe_lib.PaymentIntent.retrieve_async(id)
@@ -907,16 +1023,21 @@ class StripeService:
         description: str,
         tax_behavior: Literal["exclusive", "inclusive"] = "exclusive",
         metadata: dict[str, str] | None = None,
+        idempotency_key: str | None = None,
     ) -> stripe_lib.InvoiceItem:
-        return await stripe_lib.InvoiceItem.create_async(
-            customer=customer,
-            invoice=invoice,
-            amount=amount,
-            currency=currency,
-            description=description,
-            tax_behavior=tax_behavior,
-            metadata=metadata or {},
-        )
+        params: stripe_lib.InvoiceItem.CreateParams = {
+            "customer": customer,
+            "invoice": invoice,
+            "amount": amount,
+            "currency": currency,
+            "description": description,
+            "tax_behavior": tax_behavior,
+            "metadata": metadata or {},
+        }
+        if idempotency_key is not None:
+            params["idempotency_key"] = idempotency_key
+
+        return await stripe_lib.InvoiceItem.create_async(**params)
 
     async def create_tax_calculation(
         self,
@@ -1046,3 +1167,4 @@ class StripeService:
 
 
 stripe = StripeService()
+stripe_executor = StripeRequestExecutor()
@@ -0,0 +1,135 @@
+"""
+Rendering of invoice PDFs in a pool of worker processes.
+
+Laying out a PDF is CPU-bound: rendering it in the process handling the jobs
+would block its event loop for the whole render.
+"""
+
+import asyncio
+import datetime
+import math
+import os
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+from polar.kit.address import Address, CountryAlpha2
+from polar.kit.tax import TaxabilityReason
+
+from .generator import Invoice, InvoiceGenerator, InvoiceItem
+
+_WARMUP_INVOICE = Invoice(
+    number="WARMUP",
+    date=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC),
+    seller_name="Seller",
+    seller_address=Address(country=CountryAlpha2("US")),
+    customer_name="Customer",
+    customer_address=Address(country=CountryAlpha2("FR")),
+    subtotal_amount=100_00,
+    discount_amount=0,
+    taxability_reason=TaxabilityReason.standard_rated,
+    tax_amount=20_00,
+    tax_rate=None,
+    currency="eur",
+    items=[InvoiceItem(description="Item", quantity=1, unit_amount=100, amount=100)],
+    notes="**Notes**",
+)
+
+
+def _initialize_process() -> None:
+    """
+    Prepare a worker process, so the first invoice it renders isn't slower.
+
+    A throwaway render loads everything an invoice needs once for the lifetime
+    of the process: the fonts and their table parsers, the locale data used to
+    format amounts and dates, and the countries database.
+    """
+    render_invoices([_WARMUP_INVOICE], "Invoice")
+
+
+def render_invoices(invoices: Sequence[Invoice], heading_title: str) -> list[bytes]:
+    """Render invoices to PDF, in the current process."""
+    rendered: list[bytes] = []
+    for invoice in invoices:
+        generator = InvoiceGenerator(invoice, heading_title=heading_title)
+        generator.generate()
+        rendered.append(bytes(generator.output()))
+    return rendered
+
+
+class InvoiceRenderer:
+    """
+    Render invoice PDFs in a pool of worker processes, off the event loop.
+
+    The pool is started on first use, and its processes are kept alive to
+    render the following invoices.
+    """
+
+    def __init__(self, max_workers: int | None = None, max_chunk_size: int = 16):
+        """
+        Args:
+            max_workers: Number of worker processes, defaults to the CPU count
+            max_chunk_size: Max invoices sent at once to a worker, in batches
+        """
+        self.max_workers = max_workers or os.process_cpu_count() or 1
+        self.max_chunk_size = max_chunk_size
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def render(
+        self, invoice: Invoice, *, heading_title: str = "Invoice"
+    ) -> bytes:
+        """Render an invoice to PDF."""
+        [rendered] = await self._submit([invoice], heading_title)
+        return rendered
+
+    async def render_many(
+        self, invoices: Sequence[Invoice], *, heading_title: str = "Invoice"
+    ) -> list[bytes]:
+        """
+        Render a batch of invoices to PDF, spread over the worker processes.
+
+        Invoices are sent to the workers in chunks, to amortize the cost of
+        the round-trips with the pool.
+
+        Returns:
+            The PDF of each invoice, in the same order
+        """
+        if not invoices:
+            return []
+
+        chunk_size = min(
+            self.max_chunk_size,
+            math.ceil(len(invoices) / self.max_workers),
+        )
+        chunks = await asyncio.gather(
+            *(
+                self._submit(invoices[i : i + chunk_size], heading_title)
+                for i in range(0, len(invoices), chunk_size)
+            )
+        )
+        return [rendered for chunk in chunks for rendered in chunk]
+
+    def shutdown(self) -> None:
+        """Stop the worker processes. The pool is started again on next use."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def _submit(
+        self, invoices: Sequence[Invoice], heading_title: str
+    ) -> list[bytes]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_executor(), render_invoices, list(invoices), heading_title
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                self.max_workers, initializer=_initialize_process
+            )
+        return self._executor
+
+
+invoice_renderer = InvoiceRenderer()
+
+__all__ = ["InvoiceRenderer", "invoice_renderer", "render_invoices"]
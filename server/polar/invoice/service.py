@@ -12,10 +12,10 @@ from polar.transaction.repository import TransactionRepository
 
 from .generator import (
     Invoice,
-    InvoiceGenerator,
     InvoiceHeadingItem,
     InvoiceItem,
 )
+from .renderer import invoice_renderer
 
 
 class InvoiceError(PolarError): ...
@@ -33,14 +33,10 @@ class MissingAccountBillingDetails(InvoiceError):
 class InvoiceService:
     async def create_order_invoice(self, order: Order) -> str:
         invoice = Invoice.from_order(order)
-        generator = InvoiceGenerator(invoice)
-        generator.generate()
-        invoice_bytes = generator.output()
+        invoice_bytes = await invoice_renderer.render(invoice)
 
         s3 = S3Service(settings.S3_CUSTOMER_INVOICES_BUCKET_NAME)
-        return s3.upload(
-            bytes(invoice_bytes), order.invoice_filename, "application/pdf"
-        )
+        return await s3.upload(invoice_bytes, order.invoice_filename, "application/pdf")
 
     async def get_order_invoice_url(self, order: Order) -> tuple[str, datetime]:
         invoice_path = order.invoice_path
@@ -136,12 +132,12 @@ class InvoiceService:
             ],
         )
 
-        generator = InvoiceGenerator(invoice, heading_title="Reverse Invoice")
-        generator.generate()
-        invoice_bytes = generator.output()
+        invoice_bytes = await invoice_renderer.render(
+            invoice, heading_title="Reverse Invoice"
+        )
         s3 = S3Service(settings.S3_PAYOUT_INVOICES_BUCKET_NAME)
-        return s3.upload(
-            bytes(invoice_bytes),
+        return await s3.upload(
+            invoice_bytes,
             f"{account.id}/Payout-{payout.invoice_number}.pdf",
             "application/pdf",
         )
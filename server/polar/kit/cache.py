@@ -0,0 +1,53 @@
+import time
+from collections import OrderedDict
+
+
+class LRUCache[K, V]:
+    """
+    Bounded in-process least-recently-used cache, with an optional TTL.
+
+    Not shared across processes: it's meant as a front tier in front of Redis or
+    the database, so callers are responsible for validating entries they get
+    from it if the underlying data can change.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return None
+
+        if self.ttl is not None and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        entry = self._data.pop(key, None)
+        return entry[1] if entry is not None else None
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+__all__ = ["LRUCache"]
@@ -0,0 +1,185 @@
+import asyncio
+import itertools
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Literal, TypeAlias
+
+import logfire
+import structlog
+from sqlalchemy import event, text
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+
+from polar.logging import Logger
+
+from .postgres import AsyncEngine, AsyncReadSession, AsyncReadSessionMaker
+
+log: Logger = structlog.get_logger()
+
+ReadRoutingReason: TypeAlias = Literal[
+    "replica", "read_after_write", "replica_lag", "no_replica"
+]
+
+_REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+read_routing_counter = logfire.metric_counter(
+    "polar.db.read_routing",
+    unit="1",
+    description="Read-only sessions opened, by target and routing reason.",
+)
+replica_lag_histogram = logfire.metric_histogram(
+    "polar.db.replica_lag",
+    unit="s",
+    description="Replication lag measured on read replicas.",
+)
+
+
+_HAS_WRITES_KEY = "polar_has_writes"
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flush_writes(session: Session, flush_context: UOWTransaction) -> None:
+    session.info[_HAS_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement_writes(orm_execute_state: ORMExecuteState) -> None:
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        orm_execute_state.session.info[_HAS_WRITES_KEY] = True
+
+
+def has_writes(session: AsyncReadSession) -> bool:
+    """
+    Whether the session flushed or executed any write statement.
+
+    Used to route the next reads of the same client to the primary,
+    so it reads its own writes despite replication lag.
+    """
+    return session.info.get(_HAS_WRITES_KEY, False)
+
+
+@dataclass
+class ReadReplica:
+    name: str
+    engine: AsyncEngine
+    sessionmaker: AsyncReadSessionMaker
+    lag: float | None = None
+    checked_at: float | None = None
+
+    def is_healthy(self, max_lag: float, max_staleness: float) -> bool:
+        if self.lag is None or self.checked_at is None:
+            return False
+        if time.monotonic() - self.checked_at > max_staleness:
+            return False
+        return self.lag <= max_lag
+
+
+class ReadReplicaPool:
+    """
+    Route read-only sessions to a pool of read replicas.
+
+    Replication lag is measured in the background every `check_interval` seconds.
+    Replicas lagging more than `max_lag` seconds, or whose last check failed or
+    is too old, are skipped. When no replica is usable, the primary is returned.
+    """
+
+    def __init__(
+        self,
+        primary: AsyncReadSessionMaker,
+        replicas: Sequence[ReadReplica],
+        *,
+        max_lag: float,
+        check_interval: float,
+        check_timeout: float = 1.0,
+    ) -> None:
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.check_timeout = check_timeout
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        self._task: asyncio.Task[None] | None = None
+
+    def get_sessionmaker(
+        self, *, read_after_write: bool = False
+    ) -> tuple[AsyncReadSessionMaker, ReadRoutingReason]:
+        reason: ReadRoutingReason
+        if read_after_write:
+            reason = "read_after_write"
+        elif self._cycle is None:
+            reason = "no_replica"
+        else:
+            # Staleness bound: a replica we couldn't check for a few intervals
+            # is considered unhealthy, even if it was fine before.
+            max_staleness = self.check_interval * 3
+            for _ in range(len(self.replicas)):
+                replica = next(self._cycle)
+                if replica.is_healthy(self.max_lag, max_staleness):
+                    read_routing_counter.add(
+                        1, {"target": replica.name, "reason": "replica"}
+                    )
+                    return replica.sessionmaker, "replica"
+            reason = "replica_lag"
+
+        read_routing_counter.add(1, {"target": "primary", "reason": reason})
+        return self.primary, reason
+
+    async def check_lag(self) -> None:
+        await asyncio.gather(*(self._check_replica(r) for r in self.replicas))
+
+    async def _check_replica(self, replica: ReadReplica) -> None:
+        try:
+            async with asyncio.timeout(self.check_timeout):
+                async with replica.engine.connect() as connection:
+                    result = await connection.execute(_REPLICA_LAG_QUERY)
+                    lag = float(result.scalar_one())
+        except Exception as e:
+            log.warning(
+                "polar.db.replica_lag_check_failed", replica=replica.name, error=str(e)
+            )
+            replica.lag = None
+            return
+
+        replica.lag = lag
+        replica.checked_at = time.monotonic()
+        replica_lag_histogram.record(lag, {"replica": replica.name})
+        if lag > self.max_lag:
+            log.info("polar.db.replica_lagging", replica=replica.name, lag=lag)
+
+    async def _run(self) -> None:
+        while True:
+            await self.check_lag()
+            await asyncio.sleep(self.check_interval)
+
+    def start(self) -> None:
+        if self.replicas and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+__all__ = ["ReadReplica", "ReadReplicaPool", "ReadRoutingReason", "has_writes"]
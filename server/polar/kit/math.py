@@ -3,7 +3,7 @@ from collections.abc import Iterator
 from decimal import Decimal
 
 
-def non_negative_running_sum(values: Iterator[int]) -> int:
+def non_negative_running_sum(values: Iterator[int], initial: int = 0) -> int:
     """
     Calculate the non-negative running sum of a sequence.
     The sum never goes below zero - if adding a value would make it negative,
@@ -11,11 +11,12 @@ def non_negative_running_sum(values: Iterator[int]) -> int:
 
     Args:
         values: An iterable of integers
+        initial: The running sum to continue from
 
     Returns:
         The non-negative running sum
     """
-    current_sum = 0
+    current_sum = initial
 
     for value in values:
         current_sum = max(0, current_sum + value)
@@ -0,0 +1,192 @@
+import asyncio
+import contextlib
+import math
+import time
+from collections.abc import Collection
+from dataclasses import dataclass
+
+import structlog
+from ratelimit import Rule
+from ratelimit.backends import BaseBackend
+from ratelimit.backends.redis import RedisBackend
+
+from polar.logging import Logger
+from polar.redis import Redis
+
+log: Logger = structlog.get_logger()
+
+# Add pending hits to the global counters, and return their value and TTL.
+# KEYS: counter keys
+# ARGV: pending hits of each key, then window length of each key in milliseconds
+_SYNC_SCRIPT = """
+local result = {}
+local n = #KEYS
+for i = 1, n do
+    local count = redis.call('INCRBY', KEYS[i], ARGV[i])
+    local ttl = redis.call('PTTL', KEYS[i])
+    if ttl < 0 then
+        ttl = tonumber(ARGV[n + i])
+        redis.call('PEXPIRE', KEYS[i], ttl)
+    end
+    result[2 * i - 1] = count
+    result[2 * i] = ttl
+end
+return result
+"""
+
+
+@dataclass(slots=True)
+class _Counter:
+    limit: int
+    window: int
+    expires_at: float
+    count: int = 0
+    """Last known global count of the window."""
+    pending: int = 0
+    """Local hits not yet synced to Redis."""
+
+    def refresh(self, now: float) -> None:
+        if now >= self.expires_at:
+            self.count = 0
+            self.expires_at = now + self.window
+
+    def is_exceeded(self) -> bool:
+        return self.count + self.pending >= self.limit
+
+
+class HybridBackend(BaseBackend):
+    """
+    Rate limit backend counting hits in process memory, reconciled with Redis.
+
+    Requests are admitted or rejected from local fixed-window counters,
+    without any Redis round trip. Every `sync_interval` seconds, local hits
+    are added to global counters in Redis by a single Lua script, whose result
+    updates the local view with the hits of every other process.
+
+    Limits are thus approximate: they may be exceeded by what other processes
+    admitted since the last sync. Rules of `strict_zones` are delegated to the
+    plain Redis backend, so they are enforced exactly.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        strict_zones: Collection[str] = (),
+        sync_interval: float = 0.25,
+        key_prefix: str = "ratelimit:hybrid",
+    ) -> None:
+        self._redis = redis
+        self._strict_backend = RedisBackend(redis)
+        self._sync_script = redis.register_script(_SYNC_SCRIPT)
+        self.strict_zones = frozenset(strict_zones)
+        self.sync_interval = sync_interval
+        self.key_prefix = key_prefix
+        self._counters: dict[str, _Counter] = {}
+        self._blocked_until: dict[str, float] = {}
+        self._users: set[str] = set()
+        self._sync_task: asyncio.Task[None] | None = None
+
+    async def retry_after(self, path: str, user: str, rule: Rule) -> int:
+        if rule.zone in self.strict_zones:
+            return await self._strict_backend.retry_after(path, user, rule)
+
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._run_sync())
+
+        now = time.monotonic()
+        self._users.add(user)
+
+        blocked_until = self._blocked_until.get(user)
+        if blocked_until is not None:
+            if blocked_until > now:
+                return math.ceil(blocked_until - now)
+            del self._blocked_until[user]
+
+        counters: list[_Counter] = []
+        retry_after = 0
+        for key, (limit, window) in rule.ruleset(path, user).items():
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = _Counter(limit=limit, window=window, expires_at=now + window)
+                self._counters[key] = counter
+            counter.refresh(now)
+            if counter.is_exceeded():
+                retry_after = max(retry_after, math.ceil(counter.expires_at - now))
+            counters.append(counter)
+
+        if retry_after > 0:
+            if rule.block_time:
+                self._blocked_until[user] = now + rule.block_time
+                await self._strict_backend.set_block_time(user, rule.block_time)
+                return rule.block_time
+            return retry_after
+
+        for counter in counters:
+            counter.pending += 1
+        return 0
+
+    async def sync(self) -> None:
+        """Reconcile local counters and blocks with Redis, in one round trip."""
+        now = time.monotonic()
+        keys: list[str] = []
+        synced: list[tuple[_Counter, int]] = []
+        for key, counter in list(self._counters.items()):
+            counter.refresh(now)
+            # Forget idle counters: their window is over and nothing is pending
+            if counter.pending == 0 and counter.count == 0:
+                del self._counters[key]
+                continue
+            keys.append(f"{self.key_prefix}:{key}")
+            synced.append((counter, counter.pending))
+
+        users = list(self._users)
+        self._users.clear()
+
+        if not keys and not users:
+            return
+
+        async with self._redis.pipeline(transaction=False) as pipeline:
+            if keys:
+                # Queued on the pipeline, executed with the TTL reads below
+                await self._sync_script(
+                    keys=keys,
+                    args=[
+                        *(pending for _, pending in synced),
+                        *(counter.window * 1000 for counter, _ in synced),
+                    ],
+                    client=pipeline,
+                )
+            for user in users:
+                pipeline.ttl(f"blocking:{user}")
+            results = await pipeline.execute()
+
+        now = time.monotonic()
+        if keys:
+            values = results.pop(0)
+            for i, (counter, pending) in enumerate(synced):
+                counter.pending -= pending
+                counter.count = int(values[2 * i])
+                counter.expires_at = now + int(values[2 * i + 1]) / 1000
+
+        for user, block_ttl in zip(users, results):
+            if block_ttl > 0:
+                self._blocked_until[user] = now + block_ttl
+
+    async def aclose(self) -> None:
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._sync_task
+            self._sync_task = None
+
+    async def _run_sync(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                log.warning("rate_limit.sync_failed", error=str(e))
+
+
+__all__ = ["HybridBackend"]
@@ -7,13 +7,16 @@ from .base import (
     RepositorySortingMixin,
     SortingClause,
 )
+from .loaders import Loader, LoaderSpec
 
 __all__ = [
+    "Loader",
+    "LoaderSpec",
     "Options",
     "RepositoryBase",
     "RepositoryIDMixin",
-    "RepositorySoftDeletionMixin",
     "RepositorySoftDeletionIDMixin",
+    "RepositorySoftDeletionMixin",
     "RepositorySortingMixin",
     "SortingClause",
 ]
@@ -0,0 +1,103 @@
+import dataclasses
+from collections.abc import Collection, Sequence
+from typing import TYPE_CHECKING, Any, Literal
+
+from sqlalchemy.orm import (
+    MapperProperty,
+    QueryableAttribute,
+    contains_eager,
+    joinedload,
+    raiseload,
+    selectinload,
+)
+
+from .base import Options
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm.strategy_options import _AbstractLoad
+
+
+@dataclasses.dataclass(frozen=True)
+class Loader:
+    """
+    How to eager load a relationship, and the relationships below it.
+
+    `joined` suits many-to-one relationships, as it doesn't multiply rows.
+    `selectin` suits collections, loaded with a single extra query per page.
+
+    With `raise_others`, the other relationships of the loaded model raise
+    instead of emitting SQL, including the ones eager loaded by default on the
+    model.
+    """
+
+    attribute: QueryableAttribute[Any]
+    strategy: Literal["joined", "selectin"] = "joined"
+    children: Sequence["Loader"] = ()
+    raise_others: bool = False
+
+    def get_options(
+        self,
+        parent: "_AbstractLoad | None" = None,
+        *,
+        contains: Collection[MapperProperty[Any]] = (),
+    ) -> list["_AbstractLoad"]:
+        load: _AbstractLoad
+        if self.attribute.property in contains:
+            load = (
+                parent.contains_eager(self.attribute)
+                if parent is not None
+                else contains_eager(self.attribute)
+            )
+        elif self.strategy == "selectin":
+            load = (
+                parent.selectinload(self.attribute)
+                if parent is not None
+                else selectinload(self.attribute)
+            )
+        else:
+            load = (
+                parent.joinedload(self.attribute)
+                if parent is not None
+                else joinedload(self.attribute)
+            )
+
+        options = [load]
+        for child in self.children:
+            options.extend(child.get_options(load, contains=contains))
+        if self.raise_others:
+            options.append(load.raiseload("*", sql_only=True))
+        return options
+
+
+class LoaderSpec:
+    """
+    Eager loading profile of a model, for the response schema it's declared with.
+
+    It lists the relationships the schema reads and how to load them; the
+    other relationships raise instead of emitting SQL. A schema change that
+    would silently trigger lazy loads, or a model default eager loading data
+    the schema doesn't need, then fails loudly instead of adding queries.
+    """
+
+    def __init__(self, *loaders: Loader, raise_others: bool = True) -> None:
+        self.loaders = loaders
+        self.raise_others = raise_others
+
+    def get_options(
+        self, *, contains: Collection[QueryableAttribute[Any]] = ()
+    ) -> Options:
+        """
+        Get the loader options to apply to a statement.
+
+        Args:
+            contains: Relationships the statement already joins, e.g. to filter
+            or sort on them, at any depth of the spec. They're populated from
+            those joins instead of being loaded separately.
+        """
+        contains_properties = {attribute.property for attribute in contains}
+        options: list[_AbstractLoad] = []
+        for loader in self.loaders:
+            options.extend(loader.get_options(contains=contains_properties))
+        if self.raise_others:
+            options.append(raiseload("*", sql_only=True))
+        return options
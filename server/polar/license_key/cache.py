@@ -0,0 +1,128 @@
+import uuid
+from datetime import timedelta
+from typing import Any, Self
+
+from polar.kit.cache import LRUCache
+from polar.kit.schemas import Schema
+from polar.models import LicenseKey
+from polar.redis import Pipeline, Redis
+from polar.worker import enqueue_flush_callback
+
+from .schemas import LicenseKeyActivationBase, ValidatedLicenseKey
+
+# 👋 Whenever you change the cached schema,
+# please also update the cache key with a version number.
+CACHE_KEY_PREFIX = "polar:license_key_state:v1"
+# Bounds the staleness of data not owned by the license key, like its customer
+CACHE_TTL = timedelta(minutes=10)
+# Must outlive the cached state, so a state can't match a version recreated
+# after the previous one expired.
+VERSION_TTL = timedelta(days=1)
+LOCAL_CACHE_MAXSIZE = 4096
+
+
+class LicenseKeyStateActivation(LicenseKeyActivationBase):
+    conditions: dict[str, Any]
+
+
+class LicenseKeyState(Schema):
+    """Everything needed to validate a license key without the database."""
+
+    license_key: ValidatedLicenseKey
+    activations: list[LicenseKeyStateActivation]
+
+    @classmethod
+    def from_license_key(cls, license_key: LicenseKey) -> Self:
+        return cls(
+            license_key=ValidatedLicenseKey.model_validate(license_key),
+            activations=[
+                LicenseKeyStateActivation.model_validate(activation)
+                for activation in license_key.activations
+            ],
+        )
+
+
+def _state_key(organization_id: uuid.UUID, key: str) -> str:
+    return f"{CACHE_KEY_PREFIX}:{organization_id}:{key}"
+
+
+def _version_key(organization_id: uuid.UUID, key: str) -> str:
+    return f"{CACHE_KEY_PREFIX}:{organization_id}:{key}:version"
+
+
+class LicenseKeyStateCache:
+    """
+    Two-tier cache of license keys validity state: an in-process LRU in front
+    of Redis, looked up by organization and key, as validations are.
+
+    Entries are tagged with the version they were computed at. Invalidating a
+    state bumps its version in Redis once the current transaction is committed,
+    so every process detects stale entries on its next read, at the cost of a
+    single small round trip.
+    """
+
+    def __init__(self, local_maxsize: int = LOCAL_CACHE_MAXSIZE) -> None:
+        self._local = LRUCache[tuple[uuid.UUID, str], tuple[str, LicenseKeyState]](
+            local_maxsize
+        )
+
+    def invalidate(self, organization_id: uuid.UUID, key: str) -> None:
+        def _bump_version(pipeline: Pipeline) -> None:
+            version_key = _version_key(organization_id, key)
+            pipeline.set(version_key, uuid.uuid4().hex, ex=VERSION_TTL)
+
+        enqueue_flush_callback(
+            f"license_key_state:{organization_id}:{key}", _bump_version
+        )
+
+    async def get_version(
+        self, redis: Redis, organization_id: uuid.UUID, key: str
+    ) -> str:
+        version_key = _version_key(organization_id, key)
+        async with redis.pipeline(transaction=False) as pipeline:
+            pipeline.set(version_key, uuid.uuid4().hex, nx=True)
+            pipeline.get(version_key)
+            pipeline.expire(version_key, VERSION_TTL)
+            _, version, _ = await pipeline.execute()
+        return version
+
+    async def get(
+        self, redis: Redis, organization_id: uuid.UUID, key: str, version: str
+    ) -> LicenseKeyState | None:
+        entry = self._local.get((organization_id, key))
+        if entry is not None:
+            local_version, state = entry
+            if local_version == version:
+                return state
+            self._local.pop((organization_id, key))
+
+        cached_version, raw_state = await redis.hmget(
+            _state_key(organization_id, key), "version", "state"
+        )
+        if raw_state is None or cached_version != version:
+            return None
+
+        state = LicenseKeyState.model_validate_json(raw_state)
+        self._local.set((organization_id, key), (version, state))
+        return state
+
+    async def set(
+        self,
+        redis: Redis,
+        organization_id: uuid.UUID,
+        key: str,
+        version: str,
+        state: LicenseKeyState,
+    ) -> None:
+        self._local.set((organization_id, key), (version, state))
+        state_key = _state_key(organization_id, key)
+        async with redis.pipeline(transaction=False) as pipeline:
+            pipeline.hset(
+                state_key,
+                mapping={"version": version, "state": state.model_dump_json()},
+            )
+            pipeline.expire(state_key, CACHE_TTL)
+            await pipeline.execute()
+
+
+license_key_state_cache = LicenseKeyStateCache()
@@ -10,6 +10,7 @@ from polar.models import LicenseKey, LicenseKeyActivation
 from polar.openapi import APITag
 from polar.organization.schemas import OrganizationID
 from polar.postgres import get_db_read_session, get_db_session
+from polar.redis import Redis, get_redis
 from polar.routing import APIRouter
 
 from . import auth
@@ -154,7 +155,8 @@ async def validate(
     auth_subject: auth.LicenseKeysWrite,
     validate: LicenseKeyValidate,
     session: AsyncSession = Depends(get_db_session),
-) -> LicenseKey:
+    redis: Redis = Depends(get_redis),
+) -> ValidatedLicenseKey:
     """Validate a license key."""
     repository = LicenseKeyRepository.from_session(session)
     license_key = await repository.get_readable_by_key(
@@ -168,7 +170,7 @@ async def validate(
         raise ResourceNotFound()
 
     return await license_key_service.validate(
-        session, license_key=license_key, validate=validate
+        session, redis, license_key=license_key, validate=validate
     )
 
 
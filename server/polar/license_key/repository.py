@@ -1,6 +1,17 @@
+from collections.abc import Sequence
 from uuid import UUID
 
-from sqlalchemy import Select, select
+from sqlalchemy import (
+    TIMESTAMP,
+    Integer,
+    Select,
+    Uuid,
+    column,
+    func,
+    select,
+    update,
+    values,
+)
 from sqlalchemy.orm import joinedload
 
 from polar.auth.models import AuthSubject, User, is_organization, is_user
@@ -12,6 +23,8 @@ from polar.kit.repository import (
 )
 from polar.models import LicenseKey, Organization, UserOrganization
 
+from .validations import PendingValidations
+
 
 class LicenseKeyRepository(
     RepositorySoftDeletionIDMixin[LicenseKey, UUID],
@@ -75,6 +88,65 @@ class LicenseKeyRepository(
         )
         return await self.get_one_or_none(statement)
 
+    async def increment_usage(self, id: UUID, increment: int) -> int | None:
+        """
+        Atomically increment the usage of a key, unless it would exceed its limit.
+
+        Returns:
+            The new usage, or `None` if the limit would be exceeded.
+        """
+        statement = (
+            update(LicenseKey)
+            .where(
+                LicenseKey.id == id,
+                LicenseKey.usage + increment <= LicenseKey.limit_usage,
+            )
+            .values(usage=LicenseKey.usage + increment)
+            .returning(LicenseKey.usage)
+        )
+        result = await self.session.execute(statement)
+        return result.scalar_one_or_none()
+
+    async def get_usage(self, id: UUID) -> int:
+        statement = select(LicenseKey.usage).where(LicenseKey.id == id)
+        result = await self.session.execute(statement)
+        return result.scalar_one()
+
+    async def apply_pending_validations(
+        self, pending: Sequence[PendingValidations]
+    ) -> Sequence[tuple[UUID, str]]:
+        """
+        Apply buffered validation counters, in a single statement.
+
+        Returns:
+            The organization ID and key of the updated license keys.
+        """
+        if not pending:
+            return []
+
+        pending_values = values(
+            column("id", Uuid),
+            column("validations", Integer),
+            column("usage", Integer),
+            column("last_validated_at", TIMESTAMP(timezone=True)),
+            name="pending",
+        ).data([tuple(p) for p in pending])
+        statement = (
+            update(LicenseKey)
+            .where(LicenseKey.id == pending_values.c.id)
+            .values(
+                validations=LicenseKey.validations + pending_values.c.validations,
+                usage=LicenseKey.usage + pending_values.c.usage,
+                last_validated_at=func.greatest(
+                    LicenseKey.last_validated_at, pending_values.c.last_validated_at
+                ),
+            )
+            .returning(LicenseKey.organization_id, LicenseKey.key)
+            .execution_options(synchronize_session=False)
+        )
+        result = await self.session.execute(statement)
+        return [(organization_id, key) for organization_id, key in result.all()]
+
     def get_eager_options(self) -> Options:
         return (
             joinedload(LicenseKey.customer),
@@ -21,8 +21,11 @@ from polar.models import (
     Organization,
     User,
 )
+from polar.models.license_key import LicenseKeyStatus
 from polar.postgres import AsyncReadSession, AsyncSession
+from polar.redis import Redis
 
+from .cache import LicenseKeyState, LicenseKeyStateActivation, license_key_state_cache
 from .repository import LicenseKeyRepository
 from .schemas import (
     LicenseKeyActivate,
@@ -30,7 +33,9 @@ from .schemas import (
     LicenseKeyDeactivate,
     LicenseKeyUpdate,
     LicenseKeyValidate,
+    ValidatedLicenseKey,
 )
+from .validations import record_validation
 
 log = structlog.get_logger()
 
@@ -141,41 +146,83 @@ class LicenseKeyService:
 
         session.add(license_key)
         await session.flush()
+        license_key_state_cache.invalidate(license_key.organization_id, license_key.key)
         return license_key
 
     async def validate(
         self,
         session: AsyncSession,
+        redis: Redis,
         *,
         license_key: LicenseKey,
         validate: LicenseKeyValidate,
-    ) -> LicenseKey:
+    ) -> ValidatedLicenseKey:
+        return await self._validate(
+            session, redis, LicenseKeyState.from_license_key(license_key), validate
+        )
+
+    async def validate_by_key(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        *,
+        validate: LicenseKeyValidate,
+    ) -> ValidatedLicenseKey:
+        """
+        Validate a license key by its key, reading its state through the cache.
+
+        Validations are hot, so their counters are buffered and flushed to the
+        database in batches. Only usage increments of limited keys are written
+        right away, so concurrent validations can't exceed the limit.
+        """
+        organization_id, key = validate.organization_id, validate.key
+        version = await license_key_state_cache.get_version(redis, organization_id, key)
+        state = await license_key_state_cache.get(redis, organization_id, key, version)
+        if state is None:
+            license_key = await self.get_or_raise_by_key(
+                session, organization_id=organization_id, key=key
+            )
+            state = LicenseKeyState.from_license_key(license_key)
+            await license_key_state_cache.set(
+                redis, organization_id, key, version, state
+            )
+
+        return await self._validate(session, redis, state, validate)
+
+    async def _validate(
+        self,
+        session: AsyncSession,
+        redis: Redis,
+        state: LicenseKeyState,
+        validate: LicenseKeyValidate,
+    ) -> ValidatedLicenseKey:
+        license_key = state.license_key
         bound_logger = log.bind(
             license_key_id=license_key.id,
             organization_id=license_key.organization_id,
             customer_id=license_key.customer_id,
             benefit_id=license_key.benefit_id,
         )
-        if not license_key.is_active():
+        if license_key.status != LicenseKeyStatus.granted:
             bound_logger.info("license_key.validate.invalid_status")
             raise ResourceNotFound("License key is no longer active.")
 
-        if license_key.expires_at:
-            if utc_now() >= license_key.expires_at:
-                bound_logger.info("license_key.validate.invalid_ttl")
-                raise ResourceNotFound("License key has expired.")
+        if license_key.expires_at and utc_now() >= license_key.expires_at:
+            bound_logger.info("license_key.validate.invalid_ttl")
+            raise ResourceNotFound("License key has expired.")
 
+        activation: LicenseKeyStateActivation | None = None
         if validate.activation_id:
-            activation = await self.get_activation_or_raise(
-                session,
-                license_key=license_key,
-                activation_id=validate.activation_id,
+            activation = next(
+                (a for a in state.activations if a.id == validate.activation_id),
+                None,
             )
+            if activation is None:
+                raise ResourceNotFound()
             if activation.conditions and validate.conditions != activation.conditions:
                 # Skip logging UGC conditions
                 bound_logger.info("license_key.validate.invalid_conditions")
                 raise ResourceNotFound("License key does not match required conditions")
-            license_key.activation = activation
 
         if validate.benefit_id and validate.benefit_id != license_key.benefit_id:
             bound_logger.info("license_key.validate.invalid_benefit")
@@ -188,20 +235,41 @@ class LicenseKeyService:
             )
             raise ResourceNotFound("License key does not match given user.")
 
-        if validate.increment_usage and license_key.limit_usage:
-            remaining = license_key.limit_usage - license_key.usage
-            if validate.increment_usage > remaining:
+        increment_usage = validate.increment_usage or 0
+        usage: int | None = None
+        if increment_usage and license_key.limit_usage:
+            # Strongly consistent path, so concurrent increments can't exceed it
+            repository = LicenseKeyRepository.from_session(session)
+            usage = await repository.increment_usage(license_key.id, increment_usage)
+            if usage is None:
+                remaining = license_key.limit_usage - await repository.get_usage(
+                    license_key.id
+                )
                 bound_logger.info(
                     "license_key.validate.insufficient_usage",
                     usage_remaining=remaining,
-                    usage_requested=validate.increment_usage,
+                    usage_requested=increment_usage,
                 )
                 raise BadRequest(f"License key only has {remaining} more usages.")
+            license_key_state_cache.invalidate(
+                license_key.organization_id, license_key.key
+            )
+            increment_usage = 0
 
-        license_key.mark_validated(increment_usage=validate.increment_usage)
-        session.add(license_key)
+        pending = await record_validation(
+            redis, license_key.id, increment_usage=increment_usage
+        )
+        if usage is None:
+            usage = license_key.usage + pending.usage
         bound_logger.info("license_key.validate")
-        return license_key
+        return license_key.model_copy(
+            update={
+                "usage": usage,
+                "validations": license_key.validations + pending.validations,
+                "last_validated_at": pending.last_validated_at,
+                "activation": activation,
+            }
+        )
 
     async def get_activation_count(
         self,
@@ -263,6 +331,7 @@ class LicenseKeyService:
         session.add(instance)
         await session.flush()
         assert instance.id
+        license_key_state_cache.invalidate(license_key.organization_id, license_key.key)
         log.info(
             "license_key.activate",
             license_key_id=license_key.id,
@@ -288,6 +357,7 @@ class LicenseKeyService:
         session.add(activation)
         await session.flush()
         assert activation.deleted_at is not None
+        license_key_state_cache.invalidate(license_key.organization_id, license_key.key)
         log.info(
             "license_key.deactivate",
             license_key_id=license_key.id,
@@ -364,6 +434,7 @@ class LicenseKeyService:
         session.add(key)
         await session.flush()
         assert key.id is not None
+        license_key_state_cache.invalidate(key.organization_id, key.key)
         log.info(
             "license_key.grant.update",
             license_key_id=key.id,
@@ -409,6 +480,7 @@ class LicenseKeyService:
         key.mark_revoked()
         session.add(key)
         await session.flush()
+        license_key_state_cache.invalidate(key.organization_id, key.key)
         log.info(
             "license_key.revoke",
             license_key_id=key.id,
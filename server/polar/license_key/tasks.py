@@ -0,0 +1,47 @@
+import itertools
+
+import structlog
+
+from polar.logging import Logger
+from polar.worker import (
+    AsyncSessionMaker,
+    CronTrigger,
+    RedisMiddleware,
+    TaskPriority,
+    actor,
+)
+
+from .cache import license_key_state_cache
+from .repository import LicenseKeyRepository
+from .validations import pop_pending_validations, restore_pending_validations
+
+log: Logger = structlog.get_logger()
+
+FLUSH_BATCH_SIZE = 1000
+
+
+@actor(
+    actor_name="license_key.flush_validations",
+    cron_trigger=CronTrigger(second="*/10"),
+    priority=TaskPriority.LOW,
+)
+async def license_key_flush_validations() -> None:
+    """Flush the buffered validation counters of license keys to the database."""
+    redis = RedisMiddleware.get()
+    pending = await pop_pending_validations(redis)
+    if not pending:
+        return
+
+    try:
+        async with AsyncSessionMaker() as session:
+            repository = LicenseKeyRepository.from_session(session)
+            for batch in itertools.batched(pending, FLUSH_BATCH_SIZE):
+                updated = await repository.apply_pending_validations(batch)
+                # Cached counters are now outdated
+                for organization_id, key in updated:
+                    license_key_state_cache.invalidate(organization_id, key)
+    except Exception:
+        await restore_pending_validations(redis, pending)
+        raise
+
+    log.info("license_key.flush_validations", license_keys=len(pending))
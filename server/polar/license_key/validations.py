@@ -0,0 +1,79 @@
+"""Write-behind buffer of license keys validation counters."""
+
+import time
+import uuid
+from datetime import UTC, datetime
+from typing import NamedTuple
+
+from polar.redis import Redis
+
+# Hashes of pending counters, by license key ID
+VALIDATIONS_KEY = "polar:license_key:pending_validations"
+USAGE_KEY = "polar:license_key:pending_usage"
+LAST_VALIDATED_AT_KEY = "polar:license_key:pending_last_validated_at"
+
+
+class PendingValidations(NamedTuple):
+    license_key_id: uuid.UUID
+    validations: int
+    usage: int
+    last_validated_at: datetime
+
+
+async def record_validation(
+    redis: Redis, license_key_id: uuid.UUID, *, increment_usage: int = 0
+) -> PendingValidations:
+    """
+    Buffer a validation of a license key, until it's flushed to the database.
+
+    Usage increments are only buffered for keys without usage limit: limited
+    ones are incremented in the database right away, so concurrent validations
+    can't exceed the limit.
+
+    Returns:
+        The pending counters of the license key, including this validation.
+    """
+    field = str(license_key_id)
+    now = time.time()
+    async with redis.pipeline(transaction=True) as pipeline:
+        pipeline.hincrby(VALIDATIONS_KEY, field, 1)
+        pipeline.hincrby(USAGE_KEY, field, increment_usage)
+        pipeline.hset(LAST_VALIDATED_AT_KEY, field, now)
+        validations, usage, _ = await pipeline.execute()
+
+    return PendingValidations(
+        license_key_id, validations, usage, datetime.fromtimestamp(now, tz=UTC)
+    )
+
+
+async def pop_pending_validations(redis: Redis) -> list[PendingValidations]:
+    """Pop the pending counters of all the license keys validated since last time."""
+    async with redis.pipeline(transaction=True) as pipeline:
+        for key in (VALIDATIONS_KEY, USAGE_KEY, LAST_VALIDATED_AT_KEY):
+            pipeline.hgetall(key)
+            pipeline.delete(key)
+        validations, _, usage, _, last_validated_at, _ = await pipeline.execute()
+
+    return [
+        PendingValidations(
+            uuid.UUID(id),
+            int(count),
+            int(usage.get(id, 0)),
+            datetime.fromtimestamp(float(last_validated_at[id]), tz=UTC),
+        )
+        for id, count in validations.items()
+    ]
+
+
+async def restore_pending_validations(
+    redis: Redis, pending: list[PendingValidations]
+) -> None:
+    """Put back popped counters that couldn't be flushed, to retry later."""
+    async with redis.pipeline(transaction=True) as pipeline:
+        for license_key_id, validations, usage, last_validated_at in pending:
+            field = str(license_key_id)
+            pipeline.hincrby(VALIDATIONS_KEY, field, validations)
+            pipeline.hincrby(USAGE_KEY, field, usage)
+            # Keep the latest timestamp if the key was validated in the meantime
+            pipeline.hsetnx(LAST_VALIDATED_AT_KEY, field, last_validated_at.timestamp())
+        await pipeline.execute()
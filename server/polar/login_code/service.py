@@ -64,7 +64,7 @@ class LoginCodeService:
 
         email = login_code.email
         subject = "Sign in to Polar"
-        body = render_email_template(
+        body = await render_email_template(
             LoginCodeEmail(
                 props=LoginCodeProps(
                     email=email,
@@ -3,13 +3,28 @@ from uuid import UUID
 from sqlalchemy import Select, select
 
 from polar.auth.models import AuthSubject, Organization, User, is_organization, is_user
-from polar.kit.repository import RepositoryBase, RepositoryIDMixin
+from polar.kit.repository import Options, RepositoryBase, RepositoryIDMixin
 from polar.models import Meter, UserOrganization
 
 
 class MeterRepository(RepositoryBase[Meter], RepositoryIDMixin[Meter, UUID]):
     model = Meter
 
+    async def get_by_id_for_update(
+        self, id: UUID, *, options: Options = ()
+    ) -> Meter | None:
+        """
+        Get and lock the meter with the given ID until the end of the transaction,
+        waiting for other transactions holding it.
+        """
+        statement = (
+            self.get_base_statement()
+            .where(Meter.id == id)
+            .options(*options)
+            .with_for_update(of=Meter)
+        )
+        return await self.get_one_or_none(statement)
+
     async def get_readable_by_id(
         self, id: UUID, auth_subject: AuthSubject[User | Organization]
     ) -> Meter | None:
@@ -40,6 +40,7 @@ from polar.models import (
 )
 from polar.organization.resolver import get_payload_organization
 from polar.postgres import AsyncReadSession, AsyncSession
+from polar.subscription.meters import schedule_update_meters
 from polar.subscription.repository import (
     CustomerSubscriptionProductPrice,
     SubscriptionProductPriceRepository,
@@ -454,7 +455,7 @@ class MeterService:
         session.add(meter)
 
         for subscription_id in updated_subscriptions:
-            enqueue_job("subscription.update_meters", subscription_id)
+            schedule_update_meters(subscription_id)
 
         return entries
 
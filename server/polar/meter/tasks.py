@@ -34,7 +34,9 @@ async def meter_enqueue_billing() -> None:
 async def meter_billing_entries(meter_id: uuid.UUID) -> None:
     async with AsyncSessionMaker() as session:
         repository = MeterRepository.from_session(session)
-        meter = await repository.get_by_id(
+        # One billing run per meter at a time: its entries are committed in the
+        # order they're created, which incremental meters updates rely on
+        meter = await repository.get_by_id_for_update(
             meter_id, options=(joinedload(Meter.last_billed_event),)
         )
         if meter is None:
@@ -5,13 +5,16 @@ from uuid import UUID
 
 from sqlalchemy import (
     Boolean,
+    Column,
     ColumnElement,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     Uuid,
     case,
+    cast,
     or_,
     select,
 )
@@ -48,6 +51,21 @@ class ProductBillingType(StrEnum):
 
 class Product(TrialConfigurationMixin, MetadataMixin, RecordModel):
     __tablename__ = "products"
+    __table_args__ = (
+        # Trigram indexes, for substring searches of the agent product lookup
+        Index(
+            "ix_products_name_trgm",
+            cast(Column("name"), Text).label("name_text"),
+            postgresql_using="gin",
+            postgresql_ops={"name_text": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_products_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+    )
 
     name: Mapped[str] = mapped_column(CITEXT(), nullable=False)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
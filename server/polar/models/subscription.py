@@ -391,7 +391,12 @@ class Subscription(CustomFieldDataMixin, MetadataMixin, RecordModel):
         for price_meter in price_meters:
             try:
                 # Check if the meter already exists in the subscription
-                next(sm for sm in subscription_meters if sm.meter == price_meter)
+                subscription_meter = next(
+                    sm for sm in subscription_meters if sm.meter == price_meter
+                )
+                # Its price may have changed: entries of the period can't be
+                # added to its totals anymore, they need to be recomputed
+                subscription_meter.computed_until = None
             except StopIteration:
                 # If it doesn't, create a new SubscriptionMeter
                 subscription_meters.append(SubscriptionMeter(meter=price_meter))
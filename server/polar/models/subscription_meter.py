@@ -1,8 +1,9 @@
+from datetime import datetime
 from decimal import Decimal
 from typing import TYPE_CHECKING
 from uuid import UUID
 
-from sqlalchemy import ForeignKey, Numeric, UniqueConstraint, Uuid
+from sqlalchemy import TIMESTAMP, ForeignKey, Numeric, UniqueConstraint, Uuid
 from sqlalchemy.orm import Mapped, declared_attr, mapped_column, relationship
 from sqlalchemy.sql.sqltypes import Integer
 
@@ -20,6 +21,15 @@ class SubscriptionMeter(RecordModel):
     consumed_units: Mapped[Decimal] = mapped_column(Numeric, nullable=False, default=0)
     credited_units: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     amount: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    computed_until: Mapped[datetime | None] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True, default=None
+    )
+    """
+    Creation time of the last billing entry included in the totals.
+
+    Entries created later are added incrementally. `None` if the totals need to
+    be recomputed from all the pending entries.
+    """
 
     subscription_id: Mapped[UUID] = mapped_column(
         Uuid, ForeignKey("subscriptions.id", ondelete="cascade"), nullable=False
@@ -45,3 +55,4 @@ class SubscriptionMeter(RecordModel):
         self.consumed_units = Decimal(0)
         self.credited_units = 0
         self.amount = 0
+        self.computed_until = None
@@ -26,10 +26,10 @@ class NotificationPayloadBase(BaseModel):
     def template_name(cls) -> str:
         pass
 
-    def render(self) -> tuple[str, str]:
+    async def render(self) -> tuple[str, str]:
         from polar.email.schemas import EmailAdapter
 
-        return self.subject(), render_email_template(
+        return self.subject(), await render_email_template(
             EmailAdapter.validate_python(
                 {
                     "template": self.template_name(),
@@ -18,12 +18,18 @@ from polar.discount.schemas import DiscountMinimal
 from polar.exceptions import ResourceNotFound
 from polar.kit.address import Address, AddressInput
 from polar.kit.metadata import MetadataOutputMixin
+from polar.kit.repository import Loader, LoaderSpec
 from polar.kit.schemas import IDSchema, MergeJSONSchema, Schema, TimestampedSchema
+from polar.models.order import Order as OrderModel
 from polar.models.order import (
     OrderBillingReason,
     OrderBillingReasonInternal,
     OrderStatus,
 )
+from polar.models.order_item import OrderItem as OrderItemModel
+from polar.models.product import Product as ProductModel
+from polar.models.product_price import ProductPrice as ProductPriceModel
+from polar.models.subscription import Subscription as SubscriptionModel
 from polar.product.schemas import ProductBase, ProductPrice
 from polar.subscription.schemas import SubscriptionBase
 
@@ -240,6 +246,36 @@ class Order(CustomFieldDataOutputMixin, MetadataOutputMixin, OrderBase):
     )
 
 
+# How to load orders serialized with the `Order` schema, e.g. in lists
+ORDER_LOADER = LoaderSpec(
+    Loader(OrderModel.customer),
+    Loader(
+        OrderModel.product,
+        children=(Loader(ProductModel.prices, "selectin"),),
+        raise_others=True,
+    ),
+    Loader(OrderModel.discount, raise_others=True),
+    Loader(
+        OrderModel.subscription,
+        children=(
+            Loader(SubscriptionModel.customer),
+            Loader(SubscriptionModel.subscription_product_prices, "selectin"),
+        ),
+        raise_others=True,
+    ),
+    Loader(
+        OrderModel.items,
+        "selectin",
+        children=(
+            Loader(
+                OrderItemModel.product_price,
+                children=(Loader(ProductPriceModel.product, raise_others=True),),
+            ),
+        ),
+    ),
+)
+
+
 class OrderUpdateBase(Schema):
     billing_name: str | None = Field(
         description=(
@@ -107,7 +107,7 @@ from polar.webhook.service import webhook as webhook_service
 from polar.worker import enqueue_job
 
 from .repository import OrderRepository
-from .schemas import OrderInvoice, OrderUpdate
+from .schemas import ORDER_LOADER, OrderInvoice, OrderUpdate
 from .sorting import OrderSortProperty
 
 log: Logger = structlog.get_logger()
@@ -367,10 +367,8 @@ class OrderService:
             statement.join(Order.discount, isouter=True)
             .join(Order.product, isouter=True)
             .options(
-                *repository.get_eager_options(
-                    customer_load=contains_eager(Order.customer),
-                    product_load=contains_eager(Order.product),
-                    discount_load=contains_eager(Order.discount),
+                *ORDER_LOADER.get_options(
+                    contains=(Order.customer, Order.product, Order.discount)
                 )
             )
         )
@@ -1646,7 +1644,7 @@ class OrderService:
                 {"remote_url": invoice.url, "filename": order.invoice_filename}
             ]
 
-        body = render_email_template(email)
+        body = await render_email_template(email)
         enqueue_email(
             **organization.email_from_reply,
             to_email_addr=customer.email,
@@ -99,7 +99,7 @@ async def organization_under_review(organization_id: uuid.UUID) -> None:
                 enqueue_email(
                     to_email_addr=admin_user.email,
                     subject="Your organization is under review",
-                    html_content=render_email_template(email),
+                    html_content=await render_email_template(email),
                 )
 
 
@@ -132,5 +132,5 @@ async def organization_reviewed(
                 enqueue_email(
                     to_email_addr=admin_user.email,
                     subject="Your organization review is complete",
-                    html_content=render_email_template(email),
+                    html_content=await render_email_template(email),
                 )
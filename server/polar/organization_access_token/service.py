@@ -176,7 +176,7 @@ class OrganizationAccessTokenService:
         )
         for organization_member in organization_members:
             email = organization_member.user.email
-            body = render_email_template(
+            body = await render_email_template(
                 OrganizationAccessTokenLeakedEmail(
                     props=OrganizationAccessTokenLeakedProps(
                         email=email,
@@ -109,7 +109,7 @@ class PersonalAccessTokenService(ResourceServiceReader[PersonalAccessToken]):
 
         email = personal_access_token.user.email
 
-        body = render_email_template(
+        body = await render_email_template(
             PersonalAccessTokenLeakedEmail(
                 props=PersonalAccessTokenLeakedProps(
                     email=email,
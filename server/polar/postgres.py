@@ -1,8 +1,11 @@
+import time
 from collections.abc import AsyncGenerator
 from typing import Literal, TypeAlias
 
 from fastapi import Request
-from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from polar.config import settings
 from polar.kit.db.postgres import (
@@ -12,10 +15,12 @@ from polar.kit.db.postgres import (
     AsyncSession,
     AsyncSessionMaker,
     Engine,
+    create_async_sessionmaker,
     sql,
 )
 from polar.kit.db.postgres import create_async_engine as _create_async_engine
 from polar.kit.db.postgres import create_sync_engine as _create_sync_engine
+from polar.kit.db.replica import ReadReplica, ReadReplicaPool, has_writes
 
 ProcessName: TypeAlias = Literal["app", "worker", "scheduler", "script"]
 
@@ -31,9 +36,11 @@ def create_async_engine(process_name: ProcessName) -> AsyncEngine:
     )
 
 
-def create_async_read_engine(process_name: ProcessName) -> AsyncEngine:
+def create_async_read_engine(
+    process_name: ProcessName, host: str | None = None
+) -> AsyncEngine:
     return _create_async_engine(
-        dsn=str(settings.get_postgres_read_dsn("asyncpg")),
+        dsn=str(settings.get_postgres_read_dsn("asyncpg", host)),
         application_name=f"{settings.ENV.value}.{process_name}",
         debug=settings.SQLALCHEMY_DEBUG,
         pool_size=settings.DATABASE_POOL_SIZE,
@@ -42,6 +49,29 @@ def create_async_read_engine(process_name: ProcessName) -> AsyncEngine:
     )
 
 
+def create_read_replica_pool(
+    process_name: ProcessName, primary: AsyncReadSessionMaker
+) -> ReadReplicaPool:
+    replicas: list[ReadReplica] = []
+    for host in settings.get_postgres_read_hosts():
+        engine = create_async_read_engine(process_name, host)
+        replicas.append(
+            ReadReplica(
+                name=host,
+                engine=engine,
+                sessionmaker=create_async_sessionmaker(engine),  # type: ignore[arg-type]
+            )
+        )
+    return ReadReplicaPool(
+        primary,
+        replicas,
+        max_lag=settings.DATABASE_READ_REPLICA_MAX_LAG.total_seconds(),
+        check_interval=(
+            settings.DATABASE_READ_REPLICA_LAG_CHECK_INTERVAL.total_seconds()
+        ),
+    )
+
+
 def create_sync_engine(process_name: ProcessName) -> Engine:
     return _create_sync_engine(
         dsn=str(settings.get_postgres_dsn("psycopg2")),
@@ -53,7 +83,18 @@ def create_sync_engine(process_name: ProcessName) -> Engine:
     )
 
 
+READ_AFTER_WRITE_HEADER = "Polar-Read-After-Write"
+
+
 class AsyncSessionMiddleware:
+    """
+    Open the read-write session of the request.
+
+    When the request writes to the database, the response carries a
+    read-after-write token, as a cookie and a header, telling until when
+    the client's reads should be served by the primary.
+    """
+
     def __init__(self, app: ASGIApp) -> None:
         self.app = app
 
@@ -64,7 +105,48 @@ class AsyncSessionMiddleware:
         sessionmaker: AsyncSessionMaker = scope["state"]["async_sessionmaker"]
         async with sessionmaker() as session:
             scope["state"]["async_session"] = session
-            await self.app(scope, receive, send)
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and has_writes(session):
+                    _set_read_after_write_token(message)
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def _set_read_after_write_token(message: Message) -> None:
+    ttl = settings.DATABASE_READ_AFTER_WRITE_TTL
+    value = str(int(time.time() + ttl.total_seconds()))
+
+    cookie_response = Response()
+    cookie_response.set_cookie(
+        settings.DATABASE_READ_AFTER_WRITE_COOKIE_KEY,
+        value=value,
+        max_age=int(ttl.total_seconds()),
+        path="/",
+        domain=settings.USER_SESSION_COOKIE_DOMAIN,
+        secure=not settings.is_development(),
+        httponly=True,
+        samesite="lax",
+    )
+
+    message.setdefault("headers", [])
+    headers = MutableHeaders(scope=message)
+    headers[READ_AFTER_WRITE_HEADER] = value
+    for cookie in cookie_response.headers.getlist("set-cookie"):
+        headers.append("set-cookie", cookie)
+
+
+def _is_read_after_write(request: Request) -> bool:
+    token = request.headers.get(READ_AFTER_WRITE_HEADER) or request.cookies.get(
+        settings.DATABASE_READ_AFTER_WRITE_COOKIE_KEY
+    )
+    if token is None:
+        return False
+    try:
+        return float(token) > time.time()
+    except ValueError:
+        return False
 
 
 async def get_db_sessionmaker(request: Request) -> AsyncSessionMaker:
@@ -90,7 +172,16 @@ async def get_db_session(request: Request) -> AsyncGenerator[AsyncSession]:
 
 
 async def get_db_read_session(request: Request) -> AsyncGenerator[AsyncReadSession]:
-    sessionmaker: AsyncReadSessionMaker = request.state.async_read_sessionmaker
+    """
+    Open a read-only session, served by a read replica when possible.
+
+    Falls back to the primary when the replicas are lagging, or when the client
+    recently wrote data and should read its own writes.
+    """
+    read_replica_pool: ReadReplicaPool = request.state.read_replica_pool
+    sessionmaker, _ = read_replica_pool.get_sessionmaker(
+        read_after_write=_is_read_after_write(request)
+    )
     async with sessionmaker() as session:
         yield session
 
@@ -102,6 +193,7 @@ __all__ = [
     "sql",
     "create_async_engine",
     "create_async_read_engine",
+    "create_read_replica_pool",
     "create_sync_engine",
     "get_db_session",
     "get_db_read_session",
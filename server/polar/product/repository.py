@@ -1,3 +1,4 @@
+from collections.abc import Iterable, Sequence
 from uuid import UUID
 
 from sqlalchemy import Select, case, func, select
@@ -173,6 +174,14 @@ class ProductPriceRepository(
         )
         return await self.get_one_or_none(statement)
 
+    async def get_all_by_ids(
+        self, ids: Iterable[UUID], *, options: Options = ()
+    ) -> Sequence[ProductPrice]:
+        statement = (
+            self.get_base_statement().where(ProductPrice.id.in_(ids)).options(*options)
+        )
+        return await self.get_all(statement)
+
     async def get_by_stripe_price_id(
         self, stripe_price_id: str, *, options: Options = ()
     ) -> ProductPrice | None:
@@ -7,9 +7,11 @@ import stripe
 from sqlalchemy import select
 from sqlalchemy.orm import contains_eager, selectinload
 
+from polar.agent_knowledge.reindex import schedule_reindex
 from polar.auth.models import AuthSubject, is_user
 from polar.benefit.service import benefit as benefit_service
 from polar.checkout_link.repository import CheckoutLinkRepository
+from polar.config import settings
 from polar.custom_field.service import custom_field as custom_field_service
 from polar.enums import SubscriptionRecurringInterval
 from polar.exceptions import (
@@ -669,6 +671,8 @@ class ProductService:
         product: Product,
     ) -> None:
         await self._send_webhook(session, product, WebhookEventType.product_created)
+        if settings.AGENT_KNOWLEDGE_REINDEX_ENABLED:
+            schedule_reindex(product.organization_id)
         if is_user(auth_subject):
             user = auth_subject.subject
             await loops_service.user_created_product(user)
@@ -677,6 +681,8 @@ class ProductService:
         self, session: AsyncSession, product: Product
     ) -> None:
         await self._send_webhook(session, product, WebhookEventType.product_updated)
+        if settings.AGENT_KNOWLEDGE_REINDEX_ENABLED:
+            schedule_reindex(product.organization_id)
 
     async def _send_webhook(
         self,
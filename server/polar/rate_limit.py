@@ -3,12 +3,12 @@ from collections.abc import Sequence
 from ratelimit import RateLimitMiddleware, Rule
 from ratelimit.auths import EmptyInformation
 from ratelimit.auths.ip import client_ip
-from ratelimit.backends.redis import RedisBackend
 from ratelimit.types import ASGIApp, Scope
 
 from polar.auth.models import AuthSubject, Subject, is_anonymous
 from polar.config import Environment, settings
 from polar.enums import RateLimitGroup
+from polar.kit.rate_limit import HybridBackend
 from polar.redis import create_redis
 
 
@@ -38,6 +38,10 @@ _BASE_RULES: dict[str, Sequence[Rule]] = {
     ],
 }
 
+# Zones counted exactly in Redis on every request, since they guard
+# against brute-force attacks. Other zones are counted in process memory.
+_STRICT_ZONES = {"login-code", "customer-session-login", "customer-license-key"}
+
 _SANDBOX_RULES: dict[str, Sequence[Rule]] = {
     **_BASE_RULES,
     "^/v1": [
@@ -65,9 +69,12 @@ def get_middleware(app: ASGIApp) -> RateLimitMiddleware:
             rules = _SANDBOX_RULES
         case _:
             rules = {}
-    return RateLimitMiddleware(
-        app, _authenticate, RedisBackend(create_redis("rate-limit")), rules
+    backend = HybridBackend(
+        create_redis("rate-limit"),
+        strict_zones=_STRICT_ZONES,
+        sync_interval=settings.RATE_LIMIT_SYNC_INTERVAL.total_seconds(),
     )
+    return RateLimitMiddleware(app, _authenticate, backend, rules)
 
 
 __all__ = ["get_middleware"]
@@ -12,8 +12,12 @@ from polar.config import settings
 # Redis is generic at type checking, but not at runtime...
 if TYPE_CHECKING:
     Redis = _async_redis.Redis[str]
+    BinaryRedis = _async_redis.Redis[bytes]
+    Pipeline = _async_redis.client.Pipeline[str]
 else:
     Redis = _async_redis.Redis
+    BinaryRedis = _async_redis.Redis
+    Pipeline = _async_redis.client.Pipeline
 
 
 REDIS_RETRY_ON_ERRROR: list[type[RedisError]] = [ConnectionError, TimeoutError]
@@ -32,14 +36,28 @@ def create_redis(process_name: ProcessName) -> Redis:
     )
 
 
+def create_binary_redis(process_name: ProcessName) -> BinaryRedis:
+    """Create a client returning raw bytes, for values that are not text."""
+    return _async_redis.Redis.from_url(
+        settings.redis_url,
+        decode_responses=False,
+        retry_on_error=REDIS_RETRY_ON_ERRROR,
+        retry=REDIS_RETRY,
+        client_name=f"{settings.ENV.value}.{process_name}",
+    )
+
+
 async def get_redis(request: Request) -> Redis:
     return request.state.redis
 
 
 __all__ = [
     "Redis",
+    "BinaryRedis",
+    "Pipeline",
     "REDIS_RETRY_ON_ERRROR",
     "REDIS_RETRY",
     "create_redis",
+    "create_binary_redis",
     "get_redis",
 ]
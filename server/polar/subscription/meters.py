@@ -0,0 +1,57 @@
+"""Debounced scheduling of subscription meters updates, per subscription."""
+
+import time
+import uuid
+from datetime import timedelta
+
+from polar.redis import Pipeline, Redis
+from polar.worker import enqueue_flush_callback
+
+# Sorted sets of subscriptions to update, scored by the time of their first change
+PENDING_KEY = "polar:subscription:update_meters_pending"
+RECONCILE_KEY = "polar:subscription:reconcile_meters_pending"
+DEBOUNCE = timedelta(seconds=30)
+
+
+def schedule_update_meters(
+    subscription_id: uuid.UUID, *, reconcile: bool = False
+) -> None:
+    """
+    Schedule the update of the meters of a subscription.
+
+    The subscription is marked as changed once the current transaction is
+    committed. It's updated `DEBOUNCE` after its first change, so billing runs
+    in the meantime result in a single update, while a continuous flow of
+    events still updates it regularly.
+
+    With `reconcile`, its meters are recomputed from all the pending entries
+    instead of incrementally, e.g. once they're billed.
+    """
+    key = RECONCILE_KEY if reconcile else PENDING_KEY
+
+    def _mark_changed(pipeline: Pipeline) -> None:
+        pipeline.zadd(key, {str(subscription_id): time.time()}, nx=True)
+
+    enqueue_flush_callback(f"{key}:{subscription_id}", _mark_changed)
+
+
+async def pop_due_update_meters(
+    redis: Redis, debounce: timedelta = DEBOUNCE
+) -> list[tuple[uuid.UUID, bool]]:
+    """
+    Pop the subscriptions which first changed at least `debounce` ago.
+
+    Returns:
+        The subscription IDs, and whether their meters should be reconciled
+    """
+    cutoff = time.time() - debounce.total_seconds()
+    async with redis.pipeline(transaction=True) as pipeline:
+        for key in (RECONCILE_KEY, PENDING_KEY):
+            pipeline.zrangebyscore(key, "-inf", cutoff)
+            pipeline.zremrangebyscore(key, "-inf", cutoff)
+        reconcile_ids, _, update_ids, _ = await pipeline.execute()
+
+    # Reconciling the meters also includes the latest entries
+    return [(uuid.UUID(id), True) for id in reconcile_ids] + [
+        (uuid.UUID(id), False) for id in update_ids if id not in reconcile_ids
+    ]
@@ -103,6 +103,25 @@ class SubscriptionRepository(
         )
         return await self.get_one_or_none(statement)
 
+    async def get_all_by_ids_for_update(
+        self, ids: Sequence[UUID], *, options: Options = ()
+    ) -> Sequence[Subscription]:
+        """
+        Get and lock the subscriptions with the given IDs until the end of the
+        transaction, waiting for other transactions holding them.
+
+        They're locked in a consistent order, so transactions locking
+        overlapping sets don't deadlock.
+        """
+        statement = (
+            self.get_base_statement()
+            .where(Subscription.id.in_(ids))
+            .options(*options)
+            .order_by(Subscription.id)
+            .with_for_update(of=Subscription)
+        )
+        return await self.get_all(statement)
+
     async def get_by_checkout_id(
         self, checkout_id: UUID, *, options: Options = ()
     ) -> Subscription | None:
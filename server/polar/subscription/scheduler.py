@@ -1,5 +1,8 @@
 import datetime
+import itertools
 import uuid
+from collections.abc import Callable
+from typing import Any
 
 import dramatiq
 import structlog
@@ -9,6 +12,7 @@ from apscheduler.triggers.date import DateTrigger
 from sqlalchemy import Select, select, update
 from sqlalchemy.orm import Session
 
+from polar.config import settings
 from polar.kit.utils import utc_now
 from polar.logging import Logger
 from polar.models import Subscription
@@ -20,6 +24,11 @@ def enqueue_subscription_cycle(subscription_id: uuid.UUID) -> None:
     actor.send(subscription_id=subscription_id)
 
 
+def enqueue_subscriptions_cycle(subscription_ids: list[uuid.UUID]) -> None:
+    actor = dramatiq.get_broker().get_actor("subscription.cycle_many")
+    actor.send(subscription_ids=subscription_ids)
+
+
 class SubscriptionJobStore(BaseJobStore):
     """
     A custom job store for APScheduler that uses our subscription data to trigger
@@ -50,7 +59,10 @@ class SubscriptionJobStore(BaseJobStore):
             )
             .order_by(Subscription.current_period_end.asc())
         )
-        jobs = self._list_jobs_from_statement(statement)
+        # Due subscriptions are cycled in bulk, by chunks
+        jobs = self._list_jobs_from_statement(
+            statement, chunk_size=settings.SUBSCRIPTION_CYCLE_CHUNK_SIZE
+        )
         self.log.debug("Due jobs", count=len(jobs))
         return jobs
 
@@ -88,10 +100,10 @@ class SubscriptionJobStore(BaseJobStore):
         return jobs
 
     def remove_job(self, job_id: str) -> None:
-        subscription_id = job_id.split(":")[-1]
+        subscription_ids = job_id.split(":")[-1].split(",")
         statement = (
             update(Subscription)
-            .where(Subscription.id == subscription_id)
+            .where(Subscription.id.in_(subscription_ids))
             .values(scheduler_locked_at=utc_now())
         )
         with self.engine.begin() as connection:
@@ -107,7 +119,7 @@ class SubscriptionJobStore(BaseJobStore):
         raise RuntimeError("This job store does not support managing jobs directly.")
 
     def _list_jobs_from_statement(
-        self, statement: Select[tuple[Subscription]]
+        self, statement: Select[tuple[Subscription]], *, chunk_size: int = 1
     ) -> list[Job]:
         jobs: list[Job] = []
         with Session(self.engine) as session:
@@ -116,17 +128,27 @@ class SubscriptionJobStore(BaseJobStore):
                     Subscription.id, Subscription.current_period_end
                 ).execution_options(stream_results=True, max_row_buffer=250)
             )
-            for result in results.yield_per(250):
-                subscription_id, current_period_end = result._tuple()
+            for chunk in itertools.batched(results.yield_per(250), chunk_size):
+                subscription_ids = [subscription_id for subscription_id, _ in chunk]
+                current_period_end = max(
+                    period_end for _, period_end in chunk if period_end is not None
+                )
                 trigger = DateTrigger(current_period_end, datetime.UTC)
+                func: Callable[..., None]
+                args: tuple[Any, ...]
+                if chunk_size == 1:
+                    func, args = enqueue_subscription_cycle, (subscription_ids[0],)
+                else:
+                    func, args = enqueue_subscriptions_cycle, (subscription_ids,)
                 job_kwargs = {
                     **(self._scheduler._job_defaults if self._scheduler else {}),
                     "trigger": trigger,
                     "executor": self.executor,
-                    "func": enqueue_subscription_cycle,
-                    "args": (subscription_id,),
+                    "func": func,
+                    "args": args,
                     "kwargs": {},
-                    "id": f"subscriptions:cycle:{subscription_id}",
+                    "id": "subscriptions:cycle:"
+                    + ",".join(str(id) for id in subscription_ids),
                     "name": None,
                     "next_run_time": trigger.run_date,
                     "misfire_grace_time": None,
@@ -1,3 +1,4 @@
+import builtins
 import contextlib
 import uuid
 from collections.abc import AsyncGenerator, Sequence
@@ -13,11 +14,11 @@ from sqlalchemy.orm import contains_eager, selectinload
 
 from polar.auth.models import AuthSubject
 from polar.billing_entry.repository import BillingEntryRepository
-from polar.billing_entry.service import MeteredLineItem
 from polar.billing_entry.service import billing_entry as billing_entry_service
 from polar.checkout.eventstream import CheckoutEvent, publish_checkout_event
 from polar.checkout.guard import has_product_checkout
 from polar.config import settings
+from polar.customer.cache import customer_state_cache
 from polar.customer.repository import CustomerRepository
 from polar.customer_meter.service import customer_meter as customer_meter_service
 from polar.customer_seat.service import seat_service
@@ -45,7 +46,7 @@ from polar.kit.metadata import MetadataQuery, apply_metadata_clause
 from polar.kit.pagination import PaginationParams
 from polar.kit.sorting import Sorting
 from polar.kit.tax import calculate_tax
-from polar.kit.utils import utc_now
+from polar.kit.utils import generate_uuid, utc_now
 from polar.locker import Locker
 from polar.logging import Logger
 from polar.models import (
@@ -67,6 +68,7 @@ from polar.models import (
     User,
 )
 from polar.models.billing_entry import BillingEntryDirection, BillingEntryType
+from polar.models.event import EventSource
 from polar.models.order import OrderBillingReasonInternal
 from polar.models.product_price import ProductPriceSeatUnit
 from polar.models.subscription import CustomerCancellationReason, SubscriptionStatus
@@ -978,6 +980,161 @@ class SubscriptionService:
 
         return subscription
 
+    async def cycle_many(
+        self, session: AsyncSession, subscriptions: Sequence[Subscription]
+    ) -> builtins.list[uuid.UUID]:
+        """
+        Cycle several due subscriptions at once, e.g. on renewal peaks.
+
+        Renewals are applied in bulk: their system events and billing entries
+        are inserted with a statement per table, the `subscription.updated`
+        webhooks are sent per organization, and the customer state ones once
+        per customer.
+
+        Subscriptions due to be revoked, and those failing to renew, are left
+        untouched, so they can be cycled one by one with `cycle`.
+
+        Returns:
+            The IDs of the subscriptions which were not cycled.
+        """
+        skipped: list[uuid.UUID] = []
+        renewed: list[tuple[Subscription, SubscriptionStatus]] = []
+        events: list[dict[str, Any]] = []
+        entries: list[dict[str, Any]] = []
+        for subscription in subscriptions:
+            if not subscription.active or subscription.cancel_at_period_end:
+                skipped.append(subscription.id)
+                continue
+
+            previous_status = subscription.status
+            try:
+                event, subscription_entries = self._renew(subscription)
+            except Exception:
+                log.exception(
+                    "subscription.cycle_many.error", subscription_id=subscription.id
+                )
+                skipped.append(subscription.id)
+                continue
+
+            renewed.append((subscription, previous_status))
+            events.append(event)
+            entries.extend(subscription_entries)
+
+        if not renewed:
+            return skipped
+
+        await event_service.create_events(session, events)
+        billing_entry_repository = BillingEntryRepository.from_session(session)
+        await billing_entry_repository.insert_batch(entries)
+        await session.flush()
+
+        by_organization: dict[Organization, list[Subscription]] = {}
+        customer_ids: set[uuid.UUID] = set()
+        for subscription, previous_status in renewed:
+            enqueue_job(
+                "order.create_subscription_order",
+                subscription.id,
+                OrderBillingReasonInternal.subscription_cycle_after_trial
+                if previous_status == SubscriptionStatus.trialing
+                else OrderBillingReasonInternal.subscription_cycle,
+            )
+            by_organization.setdefault(subscription.organization, []).append(
+                subscription
+            )
+            customer_ids.add(subscription.customer_id)
+
+        for organization, organization_subscriptions in by_organization.items():
+            await webhook_service.send_many(
+                session,
+                organization,
+                WebhookEventType.subscription_updated,
+                organization_subscriptions,
+            )
+
+        for customer_id in customer_ids:
+            customer_state_cache.invalidate(customer_id)
+            enqueue_job(
+                "customer.webhook",
+                WebhookEventType.customer_state_changed,
+                customer_id,
+            )
+
+        return skipped
+
+    def _renew(
+        self, subscription: Subscription
+    ) -> tuple[dict[str, Any], builtins.list[dict[str, Any]]]:
+        """
+        Move a subscription to its next period, like `cycle` does.
+
+        Nothing is changed if it fails: the subscription is only updated once
+        its new period is computed.
+
+        Returns:
+            The row of its `subscription_cycled` system event, and those of the
+            billing entries of its new period.
+        """
+        previous_status = subscription.status
+        current_period_start = subscription.current_period_end
+        assert current_period_start is not None
+        current_period_end = subscription.recurring_interval.get_next_period(
+            current_period_start, subscription.recurring_interval_count
+        )
+
+        discount = subscription.discount
+        if discount is not None:
+            assert subscription.started_at is not None
+            if discount.is_repetition_expired(
+                subscription.started_at,
+                current_period_start,
+                previous_status == SubscriptionStatus.trialing,
+            ):
+                discount = None
+
+        event_id = generate_uuid()
+        event: dict[str, Any] = {
+            "id": event_id,
+            "root_id": event_id,
+            "name": SystemEvent.subscription_cycled,
+            "source": EventSource.system,
+            "customer_id": subscription.customer_id,
+            "organization_id": subscription.organization.id,
+            "user_metadata": {"subscription_id": str(subscription.id)},
+        }
+        entries: list[dict[str, Any]] = []
+        for subscription_product_price in subscription.subscription_product_prices:
+            product_price = subscription_product_price.product_price
+            if is_static_price(product_price):
+                entries.append(
+                    {
+                        "start_timestamp": current_period_start,
+                        "end_timestamp": current_period_end,
+                        "type": BillingEntryType.cycle,
+                        "direction": BillingEntryDirection.debit,
+                        "amount": subscription_product_price.amount,
+                        "currency": subscription.currency,
+                        "customer_id": subscription.customer_id,
+                        "product_price_id": product_price.id,
+                        "discount_id": discount.id if discount else None,
+                        "discount_amount": discount.get_discount_amount(
+                            subscription_product_price.amount
+                        )
+                        if discount
+                        else 0,
+                        "subscription_id": subscription.id,
+                        "event_id": event_id,
+                    }
+                )
+
+        subscription.current_period_start = current_period_start
+        subscription.current_period_end = current_period_end
+        subscription.discount = discount
+        if previous_status == SubscriptionStatus.trialing:
+            subscription.status = SubscriptionStatus.active
+        subscription.scheduler_locked_at = None
+
+        return event, entries
+
     async def reset_meters(
         self, session: AsyncSession, subscription: Subscription
     ) -> None:
@@ -1028,6 +1185,7 @@ class SubscriptionService:
         if subscription.active:
             await self._on_subscription_activated(session, subscription, False)
 
+        customer_state_cache.invalidate(subscription.customer_id)
         enqueue_job(
             "customer.webhook",
             WebhookEventType.customer_state_changed,
@@ -2091,27 +2249,22 @@ class SubscriptionService:
             subscription.canceled_at = canceled_at
 
     async def update_meters(
-        self, session: AsyncSession, subscription: Subscription
+        self,
+        session: AsyncSession,
+        subscription: Subscription,
+        *,
+        reconcile: bool = False,
     ) -> Subscription:
-        # First reset all meters, since we're computing from every entry
-        for subscription_meter in subscription.meters:
-            subscription_meter.reset()
+        """
+        Update the subscription meters from the pending billing entries.
 
-        async for (
-            line_item,
-            _,
-        ) in billing_entry_service.compute_pending_subscription_line_items(
-            session, subscription
-        ):
-            if not isinstance(line_item, MeteredLineItem):
-                continue
-            subscription_meter_line = subscription.get_meter(line_item.price.meter)
-            if subscription_meter_line is not None:
-                subscription_meter_line.consumed_units += Decimal(
-                    line_item.consumed_units
-                )
-                subscription_meter_line.credited_units += line_item.credited_units
-                subscription_meter_line.amount += line_item.amount
+        They're updated incrementally from the entries created since their last
+        update, unless `reconcile` is set: they're then recomputed from all the
+        pending entries.
+        """
+        await billing_entry_service.update_subscription_meters(
+            session, subscription, reconcile=reconcile
+        )
 
         session.add(subscription)
         await self._after_subscription_updated(
@@ -2246,6 +2399,7 @@ class SubscriptionService:
                 session, subscription, past_due=became_past_due
             )
 
+        customer_state_cache.invalidate(subscription.customer_id)
         enqueue_job(
             "customer.webhook",
             WebhookEventType.customer_state_changed,
@@ -2627,7 +2781,7 @@ class SubscriptionService:
             }
         )
 
-        body = render_email_template(email)
+        body = await render_email_template(email)
 
         subject = subject_template.format(product=product)
 
@@ -19,12 +19,15 @@ from polar.product.repository import ProductRepository
 from polar.subscription.repository import SubscriptionRepository
 from polar.worker import (
     AsyncSessionMaker,
+    CronTrigger,
+    JobQueueManager,
     RedisMiddleware,
     TaskPriority,
     actor,
     enqueue_job,
 )
 
+from .meters import pop_due_update_meters
 from .service import SubscriptionNotReadyForMigration
 from .service import subscription as subscription_service
 
@@ -89,6 +92,50 @@ async def subscription_cycle(subscription_id: uuid.UUID, force: bool = False) ->
             await subscription_service.cycle(session, subscription)
 
 
+@actor(actor_name="subscription.cycle_many", priority=TaskPriority.LOW)
+async def subscription_cycle_many(subscription_ids: list[uuid.UUID]) -> None:
+    try:
+        async with AsyncSessionMaker() as session:
+            repository = SubscriptionRepository.from_session(session)
+            # Wait for subscriptions being updated, e.g. cycled, by another job,
+            # then check again whether they're due
+            subscriptions = await repository.get_all_by_ids_for_update(
+                subscription_ids, options=repository.get_eager_options()
+            )
+
+            now = utc_now()
+            due: list[Subscription] = []
+            for subscription in subscriptions:
+                if (
+                    subscription.current_period_end
+                    and subscription.current_period_end > now
+                ):
+                    log.info(
+                        "Subscription has already been cycled",
+                        subscription_id=subscription.id,
+                    )
+                    await repository.update(
+                        subscription, update_dict={"scheduler_locked_at": None}
+                    )
+                else:
+                    due.append(subscription)
+
+            not_cycled = await subscription_service.cycle_many(session, due)
+    except Exception:
+        log.exception(
+            "subscription.cycle_many.failed", subscriptions=len(subscription_ids)
+        )
+        # Discard the jobs of the rolled back transaction: the subscriptions are
+        # cycled one by one instead
+        JobQueueManager.get().reset()
+        not_cycled = subscription_ids
+
+    # Isolate the subscriptions which weren't cycled in bulk in their own job,
+    # with their own retries
+    for subscription_id in not_cycled:
+        enqueue_job("subscription.cycle", subscription_id)
+
+
 @actor(
     actor_name="subscription.subscription.update_product_benefits_grants",
     priority=TaskPriority.MEDIUM,
@@ -106,7 +153,9 @@ async def subscription_update_product_benefits_grants(
 
 
 @actor(actor_name="subscription.update_meters", priority=TaskPriority.LOW)
-async def subscription_update_meters(subscription_id: uuid.UUID) -> None:
+async def subscription_update_meters(
+    subscription_id: uuid.UUID, reconcile: bool = False
+) -> None:
     async with AsyncSessionMaker() as session:
         repository = SubscriptionRepository.from_session(session)
         subscription = await repository.get_by_id(
@@ -117,7 +166,22 @@ async def subscription_update_meters(subscription_id: uuid.UUID) -> None:
         )
         if subscription is None:
             raise SubscriptionDoesNotExist(subscription_id)
-        await subscription_service.update_meters(session, subscription)
+        await subscription_service.update_meters(
+            session, subscription, reconcile=reconcile
+        )
+
+
+@actor(
+    actor_name="subscription.schedule_meters_updates",
+    cron_trigger=CronTrigger(second="*/15"),
+    priority=TaskPriority.LOW,
+)
+async def subscription_schedule_meters_updates() -> None:
+    """Update the meters of subscriptions with new billing entries, debounced."""
+    for subscription_id, reconcile in await pop_due_update_meters(
+        RedisMiddleware.get()
+    ):
+        enqueue_job("subscription.update_meters", subscription_id, reconcile=reconcile)
 
 
 @actor(actor_name="subscription.cancel_customer", priority=TaskPriority.HIGH)
@@ -1,3 +1,4 @@
+from polar.agent_knowledge import tasks as agent_knowledge
 from polar.auth import tasks as auth
 from polar.benefit import tasks as benefit
 from polar.billing_entry import tasks as billing_entry
@@ -11,6 +12,7 @@ from polar.event import tasks as event
 from polar.eventstream import tasks as eventstream
 from polar.integrations.loops import tasks as loops
 from polar.integrations.stripe import tasks as stripe
+from polar.license_key import tasks as license_key
 from polar.meter import tasks as meter
 from polar.notifications import tasks as notifications
 from polar.order import tasks as order
@@ -25,6 +27,7 @@ from polar.user import tasks as user
 from polar.webhook import tasks as webhook
 
 __all__ = [
+    "agent_knowledge",
     "auth",
     "benefit",
     "billing_entry",
@@ -36,6 +39,7 @@ __all__ = [
     "email_update",
     "event",
     "eventstream",
+    "license_key",
     "loops",
     "meter",
     "stripe",
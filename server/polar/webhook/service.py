@@ -15,7 +15,7 @@ from polar.config import settings
 from polar.customer.schemas.state import CustomerState
 from polar.email.react import render_email_template
 from polar.email.schemas import EmailAdapter
-from polar.email.sender import enqueue_email
+from polar.email.sender import EmailMessage, enqueue_emails
 from polar.exceptions import PolarError, ResourceNotFound
 from polar.integrations.loops.service import loops as loops_service
 from polar.kit.crypto import generate_token
@@ -325,6 +325,7 @@ class WebhookService:
                 organization = user_organizations[0].organization
                 dashboard_url = f"{settings.FRONTEND_BASE_URL}/dashboard/{organization.slug}/settings/webhooks"
 
+                emails: list[EmailMessage] = []
                 for user_org in user_organizations:
                     user = user_org.user
                     email = EmailAdapter.validate_python(
@@ -339,13 +340,18 @@ class WebhookService:
                         }
                     )
 
-                    body = render_email_template(email)
+                    body = await render_email_template(email)
 
-                    enqueue_email(
-                        to_email_addr=user.email,
-                        subject=f"Webhook endpoint disabled for {organization.name}",
-                        html_content=body,
+                    emails.append(
+                        {
+                            "to_email_addr": user.email,
+                            "subject": (
+                                f"Webhook endpoint disabled for {organization.name}"
+                            ),
+                            "html_content": body,
+                        }
                     )
+                enqueue_emails(emails)
 
     async def get_event_by_id(
         self, session: AsyncSession, id: UUID
@@ -689,6 +695,55 @@ class WebhookService:
 
         return events
 
+    async def send_many(
+        self,
+        session: AsyncSession,
+        target: Organization,
+        event: WebhookEventType,
+        data: Sequence[object],
+    ) -> list[WebhookEvent]:
+        """
+        Send the same event for several objects of a target, e.g. after a bulk
+        update.
+
+        The target endpoints are fetched once, and the webhook events flushed
+        at once.
+        """
+        endpoints = await self._get_event_target_endpoints(
+            session, event=event, target=target
+        )
+        if not endpoints:
+            return []
+
+        now = utc_now()
+        events: list[WebhookEvent] = []
+        for item in data:
+            payload = WebhookPayloadTypeAdapter.validate_python(
+                {"type": event, "timestamp": now, "data": item}
+            )
+            for endpoint in endpoints:
+                try:
+                    payload_data = payload.get_payload(endpoint.format, target)
+                except UnsupportedTarget as e:
+                    log.error(e.message)
+                    continue
+                except SkipEvent:
+                    continue
+                webhook_event = WebhookEvent(
+                    created_at=payload.timestamp,
+                    webhook_endpoint=endpoint,
+                    type=event,
+                    payload=payload_data,
+                )
+                session.add(webhook_event)
+                events.append(webhook_event)
+
+        await session.flush()
+        for webhook_event in events:
+            enqueue_job("webhook_event.send", webhook_event_id=webhook_event.id)
+
+        return events
+
     async def archive_events(
         self,
         session: AsyncSession,
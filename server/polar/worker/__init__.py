@@ -17,9 +17,15 @@ from polar.config import settings
 from polar.logfire import instrument_httpx
 
 from ._encoder import JSONEncoder
-from ._enqueue import JobQueueManager, enqueue_events, enqueue_job
+from ._enqueue import (
+    JobQueueManager,
+    enqueue_events,
+    enqueue_flush_callback,
+    enqueue_job,
+)
 from ._health import HealthMiddleware
 from ._redis import RedisMiddleware
+from ._renderers import RenderersMiddleware
 from ._sqlalchemy import AsyncSessionMaker, SQLAlchemyMiddleware
 
 
@@ -165,6 +171,7 @@ broker.add_middleware(middleware.CurrentMessage())
 broker.add_middleware(MaxRetriesMiddleware())
 broker.add_middleware(SQLAlchemyMiddleware())
 broker.add_middleware(RedisMiddleware())
+broker.add_middleware(RenderersMiddleware())
 broker.add_middleware(scheduler_middleware)
 broker.add_middleware(LogfireMiddleware())
 broker.add_middleware(LogContextMiddleware())
@@ -235,6 +242,7 @@ __all__ = [
     "scheduler_middleware",
     "enqueue_job",
     "enqueue_events",
+    "enqueue_flush_callback",
     "get_retries",
     "can_retry",
     "TaskPriority",
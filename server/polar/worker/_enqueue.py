@@ -3,14 +3,14 @@ import contextvars
 import itertools
 import uuid
 from collections import defaultdict
-from collections.abc import AsyncIterator, Iterable, Mapping
+from collections.abc import AsyncIterator, Callable, Iterable, Mapping
 from typing import Any, Self, TypeAlias
 
 import dramatiq
 import structlog
 
 from polar.logging import Logger
-from polar.redis import Redis
+from polar.redis import Pipeline, Redis
 
 log: Logger = structlog.get_logger()
 
@@ -27,6 +27,11 @@ JSONSerializable: TypeAlias = (
 )
 
 
+FlushCallback: TypeAlias = Callable[[Pipeline], None]
+"""
+Callback adding Redis commands to the pipeline executed on flush.
+"""
+
 _job_queue_manager: contextvars.ContextVar["JobQueueManager | None"] = (
     contextvars.ContextVar("polar.job_queue_manager")
 )
@@ -35,13 +40,14 @@ FLUSH_BATCH_SIZE = 50
 
 
 class JobQueueManager:
-    __slots__ = ("_enqueued_jobs", "_ingested_events")
+    __slots__ = ("_enqueued_jobs", "_ingested_events", "_flush_callbacks")
 
     def __init__(self) -> None:
         self._enqueued_jobs: list[
             tuple[str, tuple[JSONSerializable, ...], dict[str, JSONSerializable]]
         ] = []
         self._ingested_events: list[uuid.UUID] = []
+        self._flush_callbacks: dict[str, FlushCallback] = {}
 
     def enqueue_job(
         self, actor: str, *args: JSONSerializable, **kwargs: JSONSerializable
@@ -52,14 +58,32 @@ class JobQueueManager:
     def enqueue_events(self, *event_ids: uuid.UUID) -> None:
         self._ingested_events.extend(event_ids)
 
+    def enqueue_flush_callback(self, key: str, callback: FlushCallback) -> None:
+        """
+        Register a callback adding Redis commands to the pipeline run on flush.
+
+        The pipeline is executed in a single round trip when the manager is
+        flushed, i.e. after the database transaction is committed, and after
+        the enqueued jobs are pushed to the queues. Failures are logged and
+        don't prevent the jobs from being enqueued.
+
+        Callbacks registered with the same key are only executed once.
+        """
+        self._flush_callbacks[key] = callback
+
     async def flush(self, broker: dramatiq.Broker, redis: Redis) -> None:
         if len(self._ingested_events) > 0:
             self.enqueue_job("event.ingested", self._ingested_events)
 
-        if not self._enqueued_jobs:
-            self.reset()
-            return
+        if self._enqueued_jobs:
+            await self._flush_jobs(broker, redis)
+
+        if self._flush_callbacks:
+            await self._flush_callbacks_pipeline(redis)
+
+        self.reset()
 
+    async def _flush_jobs(self, broker: dramatiq.Broker, redis: Redis) -> None:
         queue_messages = defaultdict[str, list[tuple[str, Any]]](list)
         all_messages: list[tuple[str, Any]] = []
 
@@ -87,7 +111,25 @@ class JobQueueManager:
                 "polar.worker.job_flushed", actor=actor_name, message=encoded_message
             )
 
-        self.reset()
+    async def _flush_callbacks_pipeline(self, redis: Redis) -> None:
+        # Side effects of an already committed transaction: a failing callback
+        # must neither prevent the others from running nor fail the request
+        async with redis.pipeline(transaction=False) as pipeline:
+            for key, callback in self._flush_callbacks.items():
+                try:
+                    callback(pipeline)
+                except Exception as e:
+                    log.exception(
+                        "polar.worker.flush_callback_error", key=key, error=str(e)
+                    )
+            try:
+                await pipeline.execute()
+            except Exception as e:
+                log.exception(
+                    "polar.worker.flush_pipeline_error",
+                    keys=list(self._flush_callbacks),
+                    error=str(e),
+                )
 
     async def _batch_hset_messages(
         self,
@@ -115,6 +157,7 @@ class JobQueueManager:
     def reset(self) -> None:
         self._enqueued_jobs = []
         self._ingested_events = []
+        self._flush_callbacks = {}
 
     @classmethod
     def set(cls) -> "Self":
@@ -158,3 +201,9 @@ def enqueue_events(*event_ids: uuid.UUID) -> None:
     """Enqueue events to be ingested."""
     job_queue_manager = JobQueueManager.get()
     job_queue_manager.enqueue_events(*event_ids)
+
+
+def enqueue_flush_callback(key: str, callback: FlushCallback) -> None:
+    """Run Redis commands once the current unit of work is committed."""
+    job_queue_manager = JobQueueManager.get()
+    job_queue_manager.enqueue_flush_callback(key, callback)
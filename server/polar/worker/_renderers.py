@@ -0,0 +1,31 @@
+import dramatiq
+import structlog
+from dramatiq.asyncio import get_event_loop_thread
+
+from polar.logging import Logger
+
+log: Logger = structlog.get_logger()
+
+
+class RenderersMiddleware(dramatiq.Middleware):
+    """
+    Middleware stopping the processes of the renderers on shutdown.
+
+    They're started on first use, and kept alive between jobs.
+    """
+
+    def after_worker_shutdown(
+        self, broker: dramatiq.Broker, worker: dramatiq.Worker
+    ) -> None:
+        # Imported here: the renderers depend on the models, which enqueue jobs
+        from polar.email.react import email_renderer
+        from polar.invoice.renderer import invoice_renderer
+
+        invoice_renderer.shutdown()
+        log.info("Stopped invoice renderer")
+
+        # Email renderer processes are bound to the loop they were started in
+        event_loop_thread = get_event_loop_thread()
+        assert event_loop_thread is not None
+        event_loop_thread.run_coroutine(email_renderer.close())
+        log.info("Stopped email renderer")
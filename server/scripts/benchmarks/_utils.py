@@ -0,0 +1,51 @@
+import asyncio
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from functools import wraps
+from typing import Any
+
+import typer
+
+
+def typer_async(f):  # type: ignore
+    @wraps(f)
+    def wrapper(*args, **kwargs):  # type: ignore
+        return asyncio.run(f(*args, **kwargs))
+
+    return wrapper
+
+
+def report(
+    name: str, durations: list[float], *, unit: str = "op", throughput: bool = True
+) -> None:
+    """
+    Print latency percentiles of a list of durations.
+
+    When `throughput` is set, durations are assumed to be sequential,
+    and the resulting rate is printed as well.
+    """
+    total = sum(durations)
+    quantiles = statistics.quantiles(durations, n=100) if len(durations) > 1 else []
+    p50 = quantiles[49] if quantiles else total
+    p99 = quantiles[98] if quantiles else total
+    rate = f"{len(durations) / total:>12.1f} {unit}/s" if throughput else ""
+    typer.echo(
+        f"{name:<40} {rate}  n={len(durations)}"
+        f"  p50={p50 * 1000:.3f}ms  p99={p99 * 1000:.3f}ms"
+    )
+
+
+async def measure(
+    fn: Callable[[], Awaitable[Any]], iterations: int, *, warmup: int = 0
+) -> list[float]:
+    """Run `fn` sequentially and return the duration of each call."""
+    for _ in range(warmup):
+        await fn()
+
+    durations: list[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await fn()
+        durations.append(time.perf_counter() - start)
+    return durations
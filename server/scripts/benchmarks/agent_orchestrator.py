@@ -0,0 +1,138 @@
+"""
+End-to-end latency benchmark of `AgentOrchestrator.process_message`.
+
+The database, LLM, intent classifier and knowledge base are replaced by stubs
+sleeping for a configurable latency, so the benchmark measures how the
+orchestrator overlaps its layers, without any external service.
+
+    uv run python -m scripts.benchmarks.agent_orchestrator --turns 50
+"""
+
+import asyncio
+import statistics
+import uuid
+from datetime import UTC, datetime
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import typer
+
+from polar.agent.enums import Intent
+from polar.agent.schemas import IntentResult
+from polar.agent_core.orchestrator import AgentOrchestrator, TurnContext
+from polar.agent_llm.base import LLMResponse
+from polar.agent_tools.base import ToolResult
+
+from ._utils import measure, report, typer_async
+
+cli = typer.Typer()
+
+
+def _stub(latency_ms: float, result: Any) -> Any:
+    async def _fn(*args: Any, **kwargs: Any) -> Any:
+        await asyncio.sleep(latency_ms / 1000)
+        return result
+
+    return _fn
+
+
+@cli.command()
+@typer_async
+async def run(
+    turns: int = typer.Option(50, help="Number of processed messages."),
+    history_ms: float = typer.Option(5, help="Latency of the history query."),
+    classifier_ms: float = typer.Option(150, help="Latency of intent classification."),
+    knowledge_ms: float = typer.Option(120, help="Latency of the RAG lookup."),
+    tool_ms: float = typer.Option(20, help="Latency of the tool invocation."),
+    llm_ms: float = typer.Option(600, help="Latency of response generation."),
+) -> None:
+    orchestrator = AgentOrchestrator()
+    agent = MagicMock(personality={}, rules={}, config={})
+    conversation = MagicMock(
+        id=uuid.uuid4(),
+        organization_id=uuid.uuid4(),
+        customer_id=uuid.uuid4(),
+        agent=agent,
+        stage="discovery",
+        context={"cart": {}},
+        hesitation_signals=0,
+    )
+    user_message = MagicMock(
+        id=uuid.uuid4(), role="user", content="Running shoes under $150?"
+    )
+    history = [
+        MagicMock(
+            id=uuid.uuid4(),
+            role="user",
+            content="Hello",
+            intent="greeting",
+            created_at=datetime.now(UTC),
+        )
+    ]
+    session = MagicMock()
+
+    intent_result = IntentResult(
+        intent=Intent.PRODUCT_QUERY,
+        confidence=0.9,
+        entities={"product_type": "shoes"},
+        reasoning="Benchmark",
+    )
+    timings: list[dict[str, int]] = []
+    original_span = TurnContext.span
+
+    def _record_span(self: TurnContext, layer: str) -> Any:
+        if not timings or timings[-1] is not self.timings:
+            timings.append(self.timings)
+        return original_span(self, layer)
+
+    with (
+        patch.multiple(
+            "polar.agent.service.message_service",
+            get_conversation_messages=_stub(history_ms, history),
+            create_agent_message=_stub(history_ms, MagicMock()),
+        ),
+        patch.object(
+            orchestrator.intent_classifier,
+            "classify",
+            _stub(classifier_ms, intent_result),
+        ),
+        patch.object(
+            orchestrator,
+            "_retrieve_knowledge",
+            _stub(knowledge_ms, {"rag_context": "Shoes"}),
+        ),
+        patch.object(
+            orchestrator.tool_registry,
+            "invoke",
+            _stub(tool_ms, ToolResult(success=True, data={}, execution_time_ms=0)),
+        ),
+        patch.object(
+            orchestrator.llm_client,
+            "chat",
+            _stub(
+                llm_ms,
+                LLMResponse(
+                    content="Here you go", role="assistant", finish_reason="stop"
+                ),
+            ),
+        ),
+        patch.object(TurnContext, "span", _record_span),
+    ):
+
+        async def _turn() -> None:
+            await orchestrator.process_message(session, conversation, user_message)
+
+        durations = await measure(_turn, turns, warmup=1)
+
+    sequential_ms = 2 * history_ms + classifier_ms + knowledge_ms + tool_ms + llm_ms
+    typer.echo(f"Agent turn, sum of stubbed latencies: {sequential_ms:.0f}ms")
+    report("process_message", durations, unit="turns")
+    for layer in timings[-1]:
+        values = [
+            turn_timings[layer] for turn_timings in timings if layer in turn_timings
+        ]
+        typer.echo(f"  {layer:<38} median={statistics.median(values):.0f}ms")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,163 @@
+"""
+Load test of the agent chat WebSocket fan-out, across two server processes.
+
+Spawns two servers sharing the Redis backplane, then opens many WebSocket
+clients, alternately on each server, spread over a number of conversations.
+Each broadcast is triggered on one server and must reach every client of the
+conversation, whatever its server. Requires a running Redis.
+
+Thousands of sockets need a higher open files limit, e.g. `ulimit -n 65536`.
+
+    uv run python -m scripts.benchmarks.agent_websocket run --clients 5000
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+import time
+import uuid
+
+import typer
+import uvicorn
+from starlette.applications import Starlette
+from starlette.routing import WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from websockets.asyncio.client import ClientConnection, connect
+
+from polar.agent.websocket import ConnectionManager
+from polar.redis import create_redis
+
+from ._utils import report, typer_async
+
+cli = typer.Typer()
+
+
+def _create_app(manager: ConnectionManager) -> Starlette:
+    async def _endpoint(websocket: WebSocket) -> None:
+        conversation_id: uuid.UUID = websocket.path_params["conversation_id"]
+        await manager.connect(websocket, conversation_id)
+        try:
+            while True:
+                if await websocket.receive_text() == "broadcast":
+                    await manager.broadcast({"sent_at": time.time()}, conversation_id)
+        except WebSocketDisconnect:
+            manager.disconnect(websocket, conversation_id)
+
+    return Starlette(routes=[WebSocketRoute("/ws/{conversation_id:uuid}", _endpoint)])
+
+
+@cli.command()
+@typer_async
+async def serve(port: int = typer.Option(8765, help="Port to listen on.")) -> None:
+    manager = ConnectionManager(create_redis("script"))
+    config = uvicorn.Config(
+        _create_app(manager), host="127.0.0.1", port=port, log_level="warning"
+    )
+    try:
+        await uvicorn.Server(config).serve()
+    finally:
+        await manager.aclose()
+
+
+async def _wait_for_server(port: int, timeout: float = 30.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+        else:
+            writer.close()
+            await writer.wait_closed()
+            return
+
+
+@cli.command()
+@typer_async
+async def run(
+    clients: int = typer.Option(5_000, help="Number of WebSocket clients."),
+    conversations: int = typer.Option(500, help="Number of conversations."),
+    messages: int = typer.Option(20, help="Broadcasts per conversation."),
+    port: int = typer.Option(8765, help="Port of the first server."),
+    concurrency: int = typer.Option(200, help="Max concurrent connection attempts."),
+    timeout: float = typer.Option(30.0, help="Max seconds to wait for deliveries."),
+) -> None:
+    ports = [port, port + 1]
+    servers = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "scripts.benchmarks.agent_websocket",
+                "serve",
+                "--port",
+                str(server_port),
+            ]
+        )
+        for server_port in ports
+    ]
+
+    try:
+        await asyncio.gather(*(_wait_for_server(p) for p in ports))
+
+        conversation_ids = [uuid.uuid4() for _ in range(conversations)]
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _connect(index: int) -> ClientConnection:
+            conversation_id = conversation_ids[index % conversations]
+            uri = f"ws://127.0.0.1:{ports[index % 2]}/ws/{conversation_id}"
+            async with semaphore:
+                return await connect(uri, max_queue=None)
+
+        start = time.perf_counter()
+        connections = await asyncio.gather(*(_connect(i) for i in range(clients)))
+        typer.echo(f"{clients} clients connected in {time.perf_counter() - start:.2f}s")
+
+        expected = clients * messages
+        latencies: list[float] = []
+        delivered = asyncio.Event()
+
+        async def _receive(connection: ClientConnection) -> None:
+            async for data in connection:
+                latencies.append(time.time() - json.loads(data)["sent_at"])
+                if len(latencies) == expected:
+                    delivered.set()
+
+        receivers = [asyncio.create_task(_receive(c)) for c in connections]
+        # Let the subscribers of both servers subscribe to their channels
+        await asyncio.sleep(1.0)
+
+        # Trigger broadcasts from the first client of each conversation, so half
+        # of the conversations broadcast from each server
+        start = time.perf_counter()
+        for _ in range(messages):
+            await asyncio.gather(
+                *(connections[i].send("broadcast") for i in range(conversations))
+            )
+        try:
+            await asyncio.wait_for(delivered.wait(), timeout)
+        except TimeoutError:
+            pass
+        elapsed = time.perf_counter() - start
+
+        report("broadcast delivery", latencies, unit="msg", throughput=False)
+        typer.echo(
+            f"Delivered {len(latencies)}/{expected} messages in {elapsed:.2f}s"
+            f" ({len(latencies) / elapsed:.1f} msg/s)"
+        )
+
+        for receiver in receivers:
+            receiver.cancel()
+        await asyncio.gather(*(c.close() for c in connections))
+    finally:
+        for server in servers:
+            server.terminate()
+        for server in servers:
+            server.wait()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,203 @@
+"""
+Benchmark of pending subscription line items computation, for a subscription
+with many metered prices and billing entries.
+
+Seeds a throwaway organization, metered product, subscription, events and
+billing entries in a transaction that is rolled back at the end, then measures
+`BillingEntryService.compute_pending_subscription_line_items` and the number
+of queries it runs.
+
+    uv run python -m scripts.benchmarks.billing_line_items --entries 1000000
+"""
+
+import time
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import typer
+from sqlalchemy import event, text
+from sqlalchemy.orm import selectinload
+
+from polar.billing_entry.service import billing_entry as billing_entry_service
+from polar.enums import SubscriptionRecurringInterval
+from polar.kit.db.postgres import create_async_sessionmaker
+from polar.kit.utils import generate_uuid
+from polar.meter.aggregation import (
+    AggregationFunction,
+    CountAggregation,
+    PropertyAggregation,
+)
+from polar.meter.filter import Filter, FilterConjunction
+from polar.models import (
+    Customer,
+    Meter,
+    Organization,
+    Product,
+    ProductPriceMeteredUnit,
+    Subscription,
+    SubscriptionProductPrice,
+)
+from polar.models.subscription import SubscriptionStatus
+from polar.postgres import create_async_engine
+
+from ._utils import report, typer_async
+
+cli = typer.Typer()
+
+# Events and their billing entries, one per generated row, spread over prices
+_SEED_STATEMENT = text(
+    """
+    WITH events AS (
+        INSERT INTO events (
+            id, ingested_at, timestamp, name, source,
+            customer_id, organization_id, user_metadata
+        )
+        SELECT
+            gen_random_uuid(), :start + g * interval '1 millisecond',
+            :start + g * interval '1 millisecond', 'benchmark', 'user',
+            :customer_id, :organization_id,
+            jsonb_build_object('index', g, 'tokens', g % 1000)
+        FROM generate_series(0, :entries - 1) AS g
+        RETURNING id, timestamp, (user_metadata ->> 'index')::int AS index
+    )
+    INSERT INTO billing_entry (
+        id, created_at, start_timestamp, end_timestamp, type, direction,
+        customer_id, product_price_id, subscription_id, event_id
+    )
+    SELECT
+        gen_random_uuid(), events.timestamp, events.timestamp, events.timestamp,
+        'metered', 'debit', :customer_id,
+        (CAST(:price_ids AS uuid[]))[1 + events.index % :prices],
+        :subscription_id, events.id
+    FROM events
+    """
+)
+
+
+@cli.command()
+@typer_async
+async def run(
+    prices: int = typer.Option(20, help="Number of metered prices."),
+    entries: int = typer.Option(1_000_000, help="Number of pending billing entries."),
+    iterations: int = typer.Option(5, help="Number of computations."),
+) -> None:
+    engine = create_async_engine("script")
+    sessionmaker = create_async_sessionmaker(engine)
+
+    queries = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count_query(*args: object) -> None:
+        nonlocal queries
+        queries += 1
+
+    async with sessionmaker() as session:
+        slug = f"benchmark-{generate_uuid().hex[:8]}"
+        organization = Organization(
+            name=slug, slug=slug, customer_invoice_prefix=slug.upper()
+        )
+        customer = Customer(
+            email=f"{slug}@example.com", name="Benchmark", organization=organization
+        )
+        product = Product(
+            name="Benchmark",
+            organization=organization,
+            recurring_interval=SubscriptionRecurringInterval.month,
+            recurring_interval_count=1,
+            all_prices=[],
+            prices=[],
+            product_benefits=[],
+            product_medias=[],
+            attached_custom_fields=[],
+        )
+        session.add_all([organization, customer, product])
+        for i in range(prices):
+            # Alternate summable and non-summable aggregations
+            aggregation = (
+                CountAggregation()
+                if i % 2 == 0
+                else PropertyAggregation(
+                    func=AggregationFunction.max, property="tokens"
+                )
+            )
+            meter = Meter(
+                name=f"Meter {i}",
+                organization=organization,
+                filter=Filter(conjunction=FilterConjunction.and_, clauses=[]),
+                aggregation=aggregation,
+            )
+            session.add(
+                ProductPriceMeteredUnit(
+                    price_currency="usd",
+                    unit_amount=Decimal(1),
+                    meter=meter,
+                    product=product,
+                )
+            )
+        await session.flush()
+
+        now = datetime.now(UTC)
+        subscription = Subscription(
+            recurring_interval=SubscriptionRecurringInterval.month,
+            recurring_interval_count=1,
+            status=SubscriptionStatus.active,
+            current_period_start=now - timedelta(days=30),
+            current_period_end=now,
+            started_at=now - timedelta(days=30),
+            customer=customer,
+            product=product,
+            subscription_product_prices=[
+                SubscriptionProductPrice.from_price(price)
+                for price in product.all_prices
+            ],
+            user_metadata={},
+        )
+        session.add(subscription)
+        await session.flush()
+
+        typer.echo(f"Seeding {entries} billing entries over {prices} prices")
+        await session.execute(
+            _SEED_STATEMENT,
+            {
+                "start": now - timedelta(days=30),
+                "customer_id": customer.id,
+                "organization_id": organization.id,
+                "subscription_id": subscription.id,
+                "price_ids": [price.id for price in product.all_prices],
+                "prices": prices,
+                "entries": entries,
+            },
+        )
+        await session.execute(text("ANALYZE events, billing_entry"))
+        session.expunge_all()
+
+        subscription = await session.get_one(
+            Subscription,
+            subscription.id,
+            options=(selectinload(Subscription.subscription_product_prices),),
+        )
+
+        durations: list[float] = []
+        for _ in range(iterations):
+            queries = 0
+            start = time.perf_counter()
+            line_items = [
+                item
+                async for item in (
+                    billing_entry_service.compute_pending_subscription_line_items(
+                        session, subscription
+                    )
+                )
+            ]
+            durations.append(time.perf_counter() - start)
+
+        typer.echo(f"{len(line_items)} line items, {queries} queries per computation")
+        report("compute pending line items", durations, unit="computations")
+
+        await session.rollback()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    cli()
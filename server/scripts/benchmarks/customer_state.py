@@ -0,0 +1,110 @@
+"""
+Load test of customer state reads, for a customer with many meters.
+
+Seeds a throwaway organization, customer and meters in a transaction that is
+rolled back at the end, then measures `CustomerService.get_state` through each
+cache tier.
+
+    uv run python -m scripts.benchmarks.customer_state --meters 100
+"""
+
+import dramatiq
+import typer
+from sqlalchemy.orm import joinedload
+
+from polar.customer.cache import customer_state_cache
+from polar.customer.service import customer as customer_service
+from polar.kit.db.postgres import create_async_sessionmaker
+from polar.kit.utils import generate_uuid
+from polar.meter.aggregation import CountAggregation
+from polar.meter.filter import Filter, FilterConjunction
+from polar.models import Customer, CustomerMeter, Meter, Organization
+from polar.postgres import create_async_engine
+from polar.redis import create_redis
+from polar.worker import JobQueueManager
+
+from ._utils import measure, report, typer_async
+
+cli = typer.Typer()
+
+
+@cli.command()
+@typer_async
+async def run(
+    meters: int = typer.Option(100, help="Number of meters of the customer."),
+    iterations: int = typer.Option(1000, help="Number of reads per scenario."),
+) -> None:
+    engine = create_async_engine("script")
+    sessionmaker = create_async_sessionmaker(engine)
+    redis = create_redis("script")
+    broker = dramatiq.get_broker()
+
+    async with sessionmaker() as session:
+        slug = f"benchmark-{generate_uuid().hex[:8]}"
+        organization = Organization(
+            name=slug, slug=slug, customer_invoice_prefix=slug.upper()
+        )
+        customer = Customer(
+            email=f"{slug}@example.com", name="Benchmark", organization=organization
+        )
+        session.add_all([organization, customer])
+        for i in range(meters):
+            meter = Meter(
+                name=f"Meter {i}",
+                organization=organization,
+                filter=Filter(conjunction=FilterConjunction.and_, clauses=[]),
+                aggregation=CountAggregation(),
+            )
+            session.add_all(
+                [
+                    meter,
+                    CustomerMeter(
+                        customer=customer,
+                        meter=meter,
+                        consumed_units=i,
+                        credited_units=meters,
+                        balance=meters - i,
+                    ),
+                ]
+            )
+        await session.flush()
+        session.expunge_all()
+
+        customer = await session.get_one(
+            Customer, customer.id, options=(joinedload(Customer.organization),)
+        )
+
+        async def _uncached() -> None:
+            await customer_service.get_state(session, redis, customer, cache=False)
+
+        async def _redis_tier() -> None:
+            customer_state_cache._local.clear()
+            await customer_service.get_state(session, redis, customer)
+
+        async def _local_tier() -> None:
+            await customer_service.get_state(session, redis, customer)
+
+        async def _meters_changed() -> None:
+            JobQueueManager.set()
+            customer_state_cache.invalidate(customer.id, meters_only=True)
+            await JobQueueManager.get().flush(broker, redis)
+            JobQueueManager.close()
+            await customer_service.get_state(session, redis, customer)
+
+        typer.echo(f"Customer state reads, {meters} meters, {iterations} iterations")
+        for name, fn in [
+            ("uncached (database)", _uncached),
+            ("redis tier", _redis_tier),
+            ("local LRU tier", _local_tier),
+            ("meters invalidated", _meters_changed),
+        ]:
+            report(name, await measure(fn, iterations, warmup=10), unit="reads")
+
+        await session.rollback()
+
+    await redis.close(True)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    cli()
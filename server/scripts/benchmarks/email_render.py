@@ -0,0 +1,87 @@
+"""
+Benchmark of email rendering.
+
+Compares starting the react-email binary for every email, as
+`render_email_template` used to, with the `EmailRenderer` pool of warm
+processes, for distinct emails and for the same email sent to many
+recipients. Requires the built binary, see `uv run task emails`.
+
+    uv run python -m scripts.benchmarks.email_render --emails 500
+"""
+
+import asyncio
+import subprocess
+import time
+
+import typer
+
+from polar.config import settings
+from polar.email.react import EmailRenderer
+from polar.email.schemas import Email, LoginCodeEmail, LoginCodeProps
+
+from ._utils import typer_async
+
+cli = typer.Typer()
+
+
+def _email(i: int) -> Email:
+    return LoginCodeEmail(
+        props=LoginCodeProps(
+            email=f"user-{i}@example.com", code=f"{i:06d}", code_lifetime_minutes=30
+        )
+    )
+
+
+def _render_subprocess(email: Email) -> str:
+    process = subprocess.Popen(
+        [
+            settings.EMAIL_RENDERER_BINARY_PATH,
+            email.template,
+            email.props.model_dump_json(),
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    stdout, _ = process.communicate()
+    return stdout.decode("utf-8")
+
+
+def _echo(name: str, emails: int, elapsed: float) -> None:
+    typer.echo(f"{name:<40} {emails / elapsed:>12.1f} emails/s  {elapsed:.3f}s")
+
+
+@cli.command()
+@typer_async
+async def run(
+    emails: int = typer.Option(500, help="Number of emails to render."),
+    processes: int = typer.Option(2, help="Renderer processes in the pool."),
+    concurrency: int = typer.Option(32, help="Max emails rendered at once."),
+) -> None:
+    distinct = [_email(i) for i in range(emails)]
+
+    start = time.perf_counter()
+    for email in distinct:
+        _render_subprocess(email)
+    _echo("subprocess per email", emails, time.perf_counter() - start)
+
+    renderer = EmailRenderer(
+        processes=processes, max_concurrency=concurrency, cache_size=emails
+    )
+    try:
+        # Start the processes before measuring
+        await asyncio.gather(*(renderer.render(_email(-i)) for i in range(processes)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(renderer.render(email) for email in distinct))
+        _echo("pool, distinct emails", emails, time.perf_counter() - start)
+
+        same = [_email(0)] * emails
+        start = time.perf_counter()
+        await asyncio.gather(*(renderer.render(email) for email in same))
+        _echo("pool, same email (cached)", emails, time.perf_counter() - start)
+    finally:
+        await renderer.close()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,132 @@
+"""
+Benchmark of sending emails through `ResendEmailSender`.
+
+Runs a local stub of the Resend API, rate limited like the real one, and
+compares sending emails one request each with sending them in batches.
+
+    uv run python -m scripts.benchmarks.email_send --emails 2000 --rate-limit 10
+"""
+
+import asyncio
+import json
+import time
+
+import typer
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from polar.email.sender import EmailMessage, ResendEmailSender
+
+from ._utils import typer_async
+
+cli = typer.Typer()
+
+
+def _create_stub(rate_limit: float, latency: float) -> Starlette:
+    """Resend API stub, allowing `rate_limit` requests per second."""
+    window_start = time.monotonic()
+    window_requests = 0
+
+    def _rate_limited() -> JSONResponse | None:
+        nonlocal window_start, window_requests
+        now = time.monotonic()
+        if now - window_start >= 1.0:
+            window_start, window_requests = now, 0
+        window_requests += 1
+        if window_requests > rate_limit:
+            retry_after = 1.0 - (now - window_start)
+            return JSONResponse(
+                {"name": "rate_limit_exceeded"},
+                status_code=429,
+                headers={"retry-after": f"{retry_after:.3f}"},
+            )
+        return None
+
+    async def _send(request: Request) -> JSONResponse:
+        if (response := _rate_limited()) is not None:
+            return response
+        await request.body()
+        await asyncio.sleep(latency)
+        return JSONResponse({"id": "email"})
+
+    async def _send_batch(request: Request) -> JSONResponse:
+        if (response := _rate_limited()) is not None:
+            return response
+        emails = json.loads(await request.body())
+        await asyncio.sleep(latency)
+        return JSONResponse({"data": [{"id": "email"} for _ in emails]})
+
+    return Starlette(
+        routes=[
+            Route("/emails", _send, methods=["POST"]),
+            Route("/emails/batch", _send_batch, methods=["POST"]),
+        ]
+    )
+
+
+def _echo(name: str, emails: int, elapsed: float) -> None:
+    typer.echo(f"{name:<40} {emails / elapsed:>12.1f} emails/s  {elapsed:.3f}s")
+
+
+@cli.command()
+@typer_async
+async def run(
+    emails: int = typer.Option(2_000, help="Number of emails to send."),
+    batch_size: int = typer.Option(100, help="Emails per batch request."),
+    concurrency: int = typer.Option(4, help="Max requests in flight."),
+    rate_limit: float = typer.Option(10.0, help="Stub requests per second."),
+    latency: float = typer.Option(0.05, help="Stub latency, in seconds."),
+    port: int = typer.Option(8766, help="Port of the stub server."),
+) -> None:
+    server = uvicorn.Server(
+        uvicorn.Config(
+            _create_stub(rate_limit, latency),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+        )
+    )
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    messages: list[EmailMessage] = [
+        {
+            "to_email_addr": f"user-{i}@example.com",
+            "subject": "Your receipt",
+            "html_content": "<p>Thank you for your purchase!</p>" * 50,
+        }
+        for i in range(emails)
+    ]
+
+    def _sender() -> ResendEmailSender:
+        return ResendEmailSender(
+            base_url=f"http://127.0.0.1:{port}",
+            api_key="KEY",
+            batch_size=batch_size,
+            max_concurrency=concurrency,
+            max_retries=100,
+        )
+
+    try:
+        sender = _sender()
+        start = time.perf_counter()
+        await asyncio.gather(*(sender.send(**message) for message in messages))
+        _echo("one request per email", emails, time.perf_counter() - start)
+
+        sender = _sender()
+        # Let the rate limit window reset
+        await asyncio.sleep(1.0)
+        start = time.perf_counter()
+        await sender.send_batch(messages)
+        _echo(f"batches of {batch_size}", emails, time.perf_counter() - start)
+    finally:
+        server.should_exit = True
+        await server_task
+
+
+if __name__ == "__main__":
+    cli()
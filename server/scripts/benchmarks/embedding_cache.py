@@ -0,0 +1,93 @@
+"""
+Benchmark of the embedding cache of `OpenAIEmbeddingService`.
+
+Compares the legacy layout, one JSON-encoded vector per key read and written
+one round trip at a time, with the packed float32 layout read with MGET and
+written with pipelined SET, through each cache tier. Requires a running Redis.
+
+    uv run python -m scripts.benchmarks.embedding_cache --vectors 10000
+"""
+
+import json
+import random
+import time
+
+import typer
+
+from polar.agent_knowledge.embedding_service import OpenAIEmbeddingService
+from polar.redis import create_binary_redis
+
+from ._utils import typer_async
+
+cli = typer.Typer()
+
+
+def _echo(name: str, vectors: int, elapsed: float) -> None:
+    typer.echo(f"{name:<40} {vectors / elapsed:>12.1f} vectors/s  {elapsed:.3f}s")
+
+
+@cli.command()
+@typer_async
+async def run(
+    vectors: int = typer.Option(10_000, help="Number of cached vectors."),
+    dimensions: int = typer.Option(1536, help="Dimensions of each vector."),
+) -> None:
+    redis = create_binary_redis("script")
+    service = OpenAIEmbeddingService(
+        dimensions=dimensions, local_cache_size=vectors, redis=redis
+    )
+    embeddings = {
+        service._cache_key(f"benchmark-{i}"): [
+            random.uniform(-1, 1) for _ in range(dimensions)
+        ]
+        for i in range(vectors)
+    }
+    keys = list(embeddings.keys())
+    legacy_keys = [f"{key}:json" for key in keys]
+
+    typer.echo(f"Embedding cache, {vectors} vectors of {dimensions} dimensions")
+
+    start = time.perf_counter()
+    for key, embedding in zip(legacy_keys, embeddings.values()):
+        await redis.set(key, json.dumps(embedding), ex=service.cache_ttl)
+    _echo("legacy JSON write", vectors, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for key in legacy_keys:
+        value = await redis.get(key)
+        assert value is not None
+        json.loads(value)
+    _echo("legacy JSON read", vectors, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await service._set_cached(embeddings)
+    _echo("float32 pipelined write", vectors, time.perf_counter() - start)
+
+    service._local_cache.clear()
+    start = time.perf_counter()
+    await service._get_cached(keys)
+    _echo("float32 MGET read (redis tier)", vectors, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await service._get_cached(keys)
+    _echo("float32 read (local LRU tier)", vectors, time.perf_counter() - start)
+
+    sample = keys[: min(100, vectors)]
+    legacy_memory = sum(
+        [await redis.memory_usage(f"{key}:json") or 0 for key in sample]
+    ) / len(sample)
+    memory = sum([await redis.memory_usage(key) or 0 for key in sample]) / len(sample)
+    typer.echo(
+        f"Redis memory: legacy {legacy_memory * vectors / 1e6:.1f} MB, "
+        f"float32 {memory * vectors / 1e6:.1f} MB"
+    )
+    local_memory = sum(len(service._local_cache.get(key) or b"") for key in keys)
+    typer.echo(f"Local LRU tier payload: {local_memory / 1e6:.1f} MB")
+
+    await redis.delete(*legacy_keys)
+    await redis.delete(*keys)
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,87 @@
+"""
+Load test of the SSE eventstream fan-out with many simulated clients.
+
+Each simulated client subscribes to its own user channel and to one of the
+organization channels, like a dashboard stream does. Requires a running Redis.
+
+    uv run python -m scripts.benchmarks.eventstream --clients 10000
+"""
+
+import asyncio
+import json
+import time
+
+import typer
+
+from polar.eventstream.multiplexer import EventStreamMultiplexer, SubscriptionClosed
+from polar.redis import create_redis
+
+from ._utils import report, typer_async
+
+cli = typer.Typer()
+
+
+@cli.command()
+@typer_async
+async def run(
+    clients: int = typer.Option(10_000, help="Number of simulated SSE clients."),
+    organizations: int = typer.Option(100, help="Number of organization channels."),
+    messages: int = typer.Option(1_000, help="Number of published messages."),
+    shards: int = typer.Option(1, help="Number of pub/sub connections."),
+) -> None:
+    redis = create_redis("script")
+    publisher = create_redis("script")
+    multiplexer = EventStreamMultiplexer(redis, shards=shards, queue_maxsize=1_000)
+
+    connected_clients_before = (await publisher.info("clients"))["connected_clients"]
+
+    latencies: list[float] = []
+    ready = asyncio.Barrier(clients + 1)
+
+    async def _client(index: int) -> None:
+        channels = [f"user:{index}", f"org:{index % organizations}"]
+        async with multiplexer.subscribe(channels) as subscription:
+            await ready.wait()
+            while True:
+                try:
+                    data = await subscription.get()
+                except SubscriptionClosed:
+                    return
+                latencies.append(time.perf_counter() - json.loads(data)["sent_at"])
+
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(_client(i)) for i in range(clients)]
+    await ready.wait()
+    typer.echo(f"{clients} clients subscribed in {time.perf_counter() - start:.2f}s")
+
+    connected_clients = (await publisher.info("clients"))["connected_clients"]
+    typer.echo(
+        "Redis connections opened by the clients: "
+        f"{connected_clients - connected_clients_before - 1}"
+    )
+
+    start = time.perf_counter()
+    for i in range(messages):
+        channel = f"org:{i % organizations}" if i % 2 == 0 else f"user:{i % clients}"
+        await publisher.publish(
+            channel, json.dumps({"sent_at": time.perf_counter(), "index": i})
+        )
+
+    expected = (messages // 2) * (clients // organizations) + messages // 2
+    while len(latencies) < expected and time.perf_counter() - start < 30:
+        await asyncio.sleep(0.1)
+    elapsed = time.perf_counter() - start
+
+    typer.echo(f"Delivered {len(latencies)}/{expected} messages in {elapsed:.2f}s")
+    report("delivery latency", latencies, throughput=False)
+    typer.echo(f"Delivery throughput: {len(latencies) / elapsed:.1f} msg/s")
+
+    multiplexer.close()
+    await asyncio.gather(*tasks)
+    await multiplexer.aclose()
+    await redis.aclose()
+    await publisher.aclose()
+
+
+if __name__ == "__main__":
+    cli()
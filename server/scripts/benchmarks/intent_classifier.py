@@ -0,0 +1,119 @@
+"""
+Throughput of rule-based intent classification, on a synthetic corpus.
+
+Compares matching the rules one `re.search` at a time with the single-pass
+multi-pattern matcher, then measures the full `IntentClassifier.classify`.
+
+    uv run python -m scripts.benchmarks.intent_classifier --messages 100000
+"""
+
+import random
+import re
+import time
+
+import typer
+
+from polar.agent_conversation.intent_classifier import IntentClassifier
+
+from ._utils import report, typer_async
+
+cli = typer.Typer()
+
+_TEMPLATES = [
+    "hi, {filler}",
+    "{filler} looking for {color} {product} in size {size}",
+    "do you have {product} under ${price}?",
+    "can you do {price} dollars for the {product}?",
+    "how long does shipping take to {place}?",
+    "i'll take the {color} {product}, add to cart",
+    "{filler} my card was declined",
+    "i want to return the {product} i got {filler}",
+    "hmm not sure about the {product}",
+    "can i speak to someone about my {product}",
+    "thanks, that's all",
+    "{filler} {product} {filler}",
+    "what about the {color} one with {feature}",
+]
+_FILLERS = [
+    "well",
+    "so",
+    "honestly",
+    "last week",
+    "for my brother",
+    "as usual",
+    "by the way",
+]
+_PRODUCTS = ["trail shoes", "rain jacket", "backpack", "wool socks", "headlamp"]
+_COLORS = ["blue", "red", "black", "olive", "white"]
+_SIZES = ["s", "m", "l", "xl", "42"]
+_PLACES = ["lisbon", "berlin", "toronto", "sydney"]
+_FEATURES = ["a hood", "zippers", "extra padding", "reflective stripes"]
+
+
+def _generate_corpus(size: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        rng.choice(_TEMPLATES).format(
+            filler=rng.choice(_FILLERS),
+            product=rng.choice(_PRODUCTS),
+            color=rng.choice(_COLORS),
+            size=rng.choice(_SIZES),
+            price=rng.randint(10, 300),
+            place=rng.choice(_PLACES),
+            feature=rng.choice(_FEATURES),
+        )
+        for _ in range(size)
+    ]
+
+
+@cli.command()
+@typer_async
+async def run(
+    messages: int = typer.Option(100_000, help="Number of messages of the corpus."),
+    seed: int = typer.Option(0, help="Seed of the corpus generator."),
+) -> None:
+    corpus = _generate_corpus(messages, seed)
+    classifier = IntentClassifier()
+    patterns = [
+        pattern for patterns in classifier.PATTERNS.values() for pattern in patterns
+    ]
+
+    def _sequential(message: str) -> int | None:
+        for index, pattern in enumerate(patterns):
+            if re.search(pattern, message, re.IGNORECASE):
+                return index
+        return None
+
+    durations: list[float] = []
+    sequential_results: list[int | None] = []
+    for message in corpus:
+        start = time.perf_counter()
+        sequential_results.append(_sequential(message))
+        durations.append(time.perf_counter() - start)
+    report("rules, sequential re.search", durations, unit="msg")
+
+    durations = []
+    matcher_results: list[int | None] = []
+    for message in corpus:
+        start = time.perf_counter()
+        matcher_results.append(classifier._rules.first(message))
+        durations.append(time.perf_counter() - start)
+    report("rules, multi-pattern matcher", durations, unit="msg")
+
+    mismatches = sum(
+        expected != result
+        for expected, result in zip(sequential_results, matcher_results)
+    )
+    if mismatches:
+        typer.echo(f"WARNING: {mismatches} messages matched different rules")
+
+    durations = []
+    for message in corpus:
+        start = time.perf_counter()
+        await classifier.classify(message)
+        durations.append(time.perf_counter() - start)
+    report("classify, with entities", durations, unit="msg")
+
+
+if __name__ == "__main__":
+    cli()
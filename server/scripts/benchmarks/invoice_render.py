@@ -0,0 +1,134 @@
+"""
+Benchmark of invoice PDF rendering.
+
+Compares rendering in the event loop's process, as the invoice jobs used to,
+with the `InvoiceRenderer` process pool, one invoice at a time and in batches.
+Reports the rate per core, and the longest stall of the event loop meanwhile.
+
+    uv run python -m scripts.benchmarks.invoice_render --invoices 1000
+"""
+
+import asyncio
+import datetime
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import typer
+
+from polar.invoice.generator import Invoice, InvoiceItem
+from polar.invoice.renderer import InvoiceRenderer, render_invoices
+from polar.kit.address import Address, CountryAlpha2
+from polar.kit.tax import TaxabilityReason
+
+from ._utils import typer_async
+
+cli = typer.Typer()
+
+
+def _invoice(i: int) -> Invoice:
+    return Invoice(
+        number=f"BENCHMARK-{i:06d}",
+        date=datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC),
+        seller_name="Polar Software Inc",
+        seller_address=Address(
+            line1="123 Polar St",
+            city="San Francisco",
+            state="CA",
+            postal_code="94107",
+            country=CountryAlpha2("US"),
+        ),
+        customer_name=f"Customer {i}",
+        customer_address=Address(
+            line1="1 Rue de Rivoli", city="Paris", country=CountryAlpha2("FR")
+        ),
+        subtotal_amount=100_00,
+        discount_amount=10_00,
+        taxability_reason=TaxabilityReason.standard_rated,
+        tax_amount=18_00,
+        tax_rate={
+            "rate_type": "percentage",
+            "display_name": "VAT",
+            "basis_points": 2000,
+            "country": "FR",
+            "amount": None,
+            "amount_currency": None,
+            "state": None,
+        },
+        currency="eur",
+        items=[
+            InvoiceItem(
+                description="SaaS Subscription",
+                quantity=1,
+                unit_amount=50_00,
+                amount=50_00,
+            ),
+            InvoiceItem(
+                description="Metered Usage",
+                quantity=50,
+                unit_amount=1_00,
+                amount=50_00,
+            ),
+        ],
+    )
+
+
+async def _run(
+    name: str, cores: int, invoices: int, fn: Callable[[], Awaitable[Any]]
+) -> None:
+    max_stall = 0.0
+    stop = asyncio.Event()
+
+    async def _monitor() -> None:
+        nonlocal max_stall
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_stall = max(max_stall, time.perf_counter() - start - 0.001)
+
+    monitor = asyncio.create_task(_monitor())
+    start = time.perf_counter()
+    await fn()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+
+    rate = invoices / elapsed
+    typer.echo(
+        f"{name:<30} {rate:>10.1f} invoices/s  {rate / cores:>8.1f} /s/core"
+        f"  loop stall max={max_stall * 1000:.1f}ms"
+    )
+
+
+@cli.command()
+@typer_async
+async def run(
+    invoices: int = typer.Option(1_000, help="Number of invoices to render."),
+    workers: int | None = typer.Option(None, help="Processes, defaults to CPUs."),
+) -> None:
+    batch = [_invoice(i) for i in range(invoices)]
+    renderer = InvoiceRenderer(max_workers=workers)
+    cores = renderer.max_workers
+
+    async def _inline() -> None:
+        render_invoices(batch, "Invoice")
+
+    async def _pool_single() -> None:
+        await asyncio.gather(*(renderer.render(invoice) for invoice in batch))
+
+    async def _pool_batch() -> None:
+        await renderer.render_many(batch)
+
+    # Start the worker processes before measuring
+    await renderer.render_many([_invoice(0)] * cores)
+
+    try:
+        await _run("in event loop process", 1, invoices, _inline)
+        await _run("pool, one at a time", cores, invoices, _pool_single)
+        await _run("pool, batch", cores, invoices, _pool_batch)
+    finally:
+        renderer.shutdown()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,158 @@
+"""
+Load test of license key validations, as shipped software does on every launch.
+
+Seeds a throwaway organization, customer and license keys in a transaction that
+is rolled back at the end, then measures validations through each cache tier,
+sequentially and under concurrency. The target is 5k validations per second
+per instance.
+
+    uv run python -m scripts.benchmarks.license_key_validate --concurrency 64
+"""
+
+import asyncio
+import time
+
+import typer
+
+from polar.kit.db.postgres import create_async_sessionmaker
+from polar.kit.utils import generate_uuid
+from polar.license_key.cache import license_key_state_cache
+from polar.license_key.schemas import LicenseKeyValidate
+from polar.license_key.service import license_key as license_key_service
+from polar.license_key.validations import (
+    LAST_VALIDATED_AT_KEY,
+    USAGE_KEY,
+    VALIDATIONS_KEY,
+)
+from polar.models import Benefit, Customer, LicenseKey, Organization
+from polar.models.benefit import BenefitType
+from polar.postgres import create_async_engine
+from polar.redis import create_redis
+from polar.worker import JobQueueManager
+
+from ._utils import measure, report, typer_async
+
+cli = typer.Typer()
+
+
+@cli.command()
+@typer_async
+async def run(
+    iterations: int = typer.Option(2000, help="Number of validations per scenario."),
+    concurrency: int = typer.Option(64, help="Concurrent validations."),
+) -> None:
+    engine = create_async_engine("script")
+    sessionmaker = create_async_sessionmaker(engine)
+    redis = create_redis("script")
+    JobQueueManager.set()
+
+    async with sessionmaker() as session:
+        slug = f"benchmark-{generate_uuid().hex[:8]}"
+        organization = Organization(
+            name=slug, slug=slug, customer_invoice_prefix=slug.upper()
+        )
+        customer = Customer(
+            email=f"{slug}@example.com", name="Benchmark", organization=organization
+        )
+        benefit = Benefit(
+            type=BenefitType.license_keys,
+            description="Benchmark",
+            is_tax_applicable=False,
+            organization=organization,
+            selectable=True,
+            deletable=True,
+            properties={
+                "prefix": None,
+                "expires": None,
+                "activations": None,
+                "limit_usage": None,
+            },
+        )
+        license_key, limited_license_key = (
+            LicenseKey(
+                organization=organization,
+                customer=customer,
+                benefit=benefit,
+                key=f"{slug}-{generate_uuid()}".upper(),
+                limit_usage=limit_usage,
+            )
+            for limit_usage in (None, 10 * iterations)
+        )
+        session.add_all(
+            [organization, customer, benefit, license_key, limited_license_key]
+        )
+        await session.flush()
+        session.expunge_all()
+
+        validate = LicenseKeyValidate(
+            key=license_key.key, organization_id=organization.id, conditions={}
+        )
+        limited_validate = LicenseKeyValidate(
+            key=limited_license_key.key,
+            organization_id=organization.id,
+            increment_usage=1,
+            conditions={},
+        )
+
+        async def _database() -> None:
+            lk = await license_key_service.get_or_raise_by_key(
+                session, organization_id=organization.id, key=license_key.key
+            )
+            await license_key_service.validate(
+                session, redis, license_key=lk, validate=validate
+            )
+
+        async def _redis_tier() -> None:
+            license_key_state_cache._local.clear()
+            await license_key_service.validate_by_key(session, redis, validate=validate)
+
+        async def _local_tier() -> None:
+            await license_key_service.validate_by_key(session, redis, validate=validate)
+
+        async def _limited_increment() -> None:
+            await license_key_service.validate_by_key(
+                session, redis, validate=limited_validate
+            )
+            JobQueueManager.get().reset()
+
+        typer.echo(f"License key validations, {iterations} iterations")
+        for name, fn in [
+            ("database", _database),
+            ("redis tier", _redis_tier),
+            ("local LRU tier", _local_tier),
+            ("limited key, increment_usage", _limited_increment),
+        ]:
+            report(name, await measure(fn, iterations, warmup=10), unit="validations")
+
+        # Cached validations don't need the session, so they can run concurrently
+        async def _worker(count: int) -> None:
+            for _ in range(count):
+                await license_key_service.validate_by_key(
+                    session, redis, validate=validate
+                )
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(_worker(iterations // concurrency) for _ in range(concurrency))
+        )
+        elapsed = time.perf_counter() - start
+        total = iterations // concurrency * concurrency
+        typer.echo(
+            f"{f'{concurrency} concurrent, cached':<40} "
+            f"{total / elapsed:>12.1f} validations/s  target=5000.0 validations/s"
+        )
+
+        # Leave no buffered counters of the rolled back keys behind
+        for pending_key in (VALIDATIONS_KEY, USAGE_KEY, LAST_VALIDATED_AT_KEY):
+            await redis.hdel(
+                pending_key, str(license_key.id), str(limited_license_key.id)
+            )
+        await session.rollback()
+
+    JobQueueManager.close()
+    await redis.close(True)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,205 @@
+"""
+Query count and latency of the top list endpoints, by page size.
+
+Seeds a throwaway organization, customer, products, subscriptions and orders in
+a transaction that is rolled back at the end. It then lists and serializes them
+like the orders, customer portal orders and customer portal subscriptions
+endpoints do. The number of queries per page shouldn't grow with the page size.
+
+    uv run python -m scripts.benchmarks.list_queries --items 200
+"""
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+import typer
+from sqlalchemy import event
+
+from polar.auth.models import AuthSubject
+from polar.auth.scope import Scope
+from polar.customer_portal.schemas.order import CustomerOrder
+from polar.customer_portal.schemas.subscription import CustomerSubscription
+from polar.customer_portal.service.order import customer_order as customer_order_service
+from polar.customer_portal.service.subscription import (
+    customer_subscription as customer_subscription_service,
+)
+from polar.enums import SubscriptionRecurringInterval
+from polar.kit.db.postgres import create_async_sessionmaker
+from polar.kit.pagination import PaginationParams
+from polar.kit.utils import generate_uuid, utc_now
+from polar.models import (
+    Customer,
+    Order,
+    OrderItem,
+    Organization,
+    Product,
+    ProductPriceFixed,
+    Subscription,
+    SubscriptionProductPrice,
+)
+from polar.models.order import OrderBillingReasonInternal, OrderStatus
+from polar.models.subscription import SubscriptionStatus
+from polar.order.schemas import Order as OrderSchema
+from polar.order.service import order as order_service
+from polar.postgres import create_async_engine
+
+from ._utils import measure, report, typer_async
+
+cli = typer.Typer()
+
+
+@cli.command()
+@typer_async
+async def run(
+    items: int = typer.Option(200, help="Number of subscriptions and orders."),
+    products: int = typer.Option(20, help="Number of products."),
+    iterations: int = typer.Option(50, help="Number of page loads per scenario."),
+) -> None:
+    engine = create_async_engine("script")
+    sessionmaker = create_async_sessionmaker(engine)
+
+    statements: list[str] = []
+
+    def _before_cursor_execute(
+        conn: Any, cursor: Any, statement: str, *args: Any
+    ) -> None:
+        statements.append(statement)
+
+    async with sessionmaker() as session:
+        slug = f"benchmark-{generate_uuid().hex[:8]}"
+        organization = Organization(
+            name=slug, slug=slug, customer_invoice_prefix=slug.upper()
+        )
+        customer = Customer(
+            email=f"{slug}@example.com", name="Benchmark", organization=organization
+        )
+        session.add_all([organization, customer])
+
+        prices: list[ProductPriceFixed] = []
+        for i in range(products):
+            product = Product(
+                name=f"Benchmark {i}",
+                organization=organization,
+                recurring_interval=SubscriptionRecurringInterval.month,
+                recurring_interval_count=1,
+                all_prices=[],
+                prices=[],
+                product_benefits=[],
+                product_medias=[],
+                attached_custom_fields=[],
+            )
+            price = ProductPriceFixed(
+                price_currency="usd", price_amount=1000, product=product
+            )
+            session.add_all([product, price])
+            prices.append(price)
+
+        now = utc_now()
+        for i in range(items):
+            price = prices[i % products]
+            subscription = Subscription(
+                recurring_interval=SubscriptionRecurringInterval.month,
+                recurring_interval_count=1,
+                status=SubscriptionStatus.active,
+                cancel_at_period_end=False,
+                current_period_start=now,
+                current_period_end=now,
+                started_at=now,
+                customer=customer,
+                product=price.product,
+                subscription_product_prices=[
+                    SubscriptionProductPrice.from_price(price)
+                ],
+                user_metadata={},
+            )
+            order = Order(
+                status=OrderStatus.paid,
+                subtotal_amount=1000,
+                tax_amount=0,
+                discount_amount=0,
+                refunded_amount=0,
+                refunded_tax_amount=0,
+                applied_balance_amount=0,
+                items=[
+                    OrderItem(
+                        label=price.product.name,
+                        amount=1000,
+                        tax_amount=0,
+                        proration=False,
+                        product_price=price,
+                    )
+                ],
+                currency="usd",
+                billing_reason=OrderBillingReasonInternal.subscription_create,
+                invoice_number=f"{slug.upper()}-{i:04d}",
+                customer=customer,
+                product=price.product,
+                subscription=subscription,
+                custom_field_data={},
+                user_metadata={},
+            )
+            session.add_all([subscription, order])
+
+        await session.flush()
+        session.expunge_all()
+
+        organization_subject = AuthSubject(organization, {Scope.web_read}, None)
+        customer_subject = AuthSubject(customer, {Scope.customer_portal_read}, None)
+
+        def _scenarios(
+            pagination: PaginationParams,
+        ) -> list[tuple[str, Callable[[], Awaitable[None]]]]:
+            async def _orders() -> None:
+                results, _ = await order_service.list(
+                    session, organization_subject, pagination=pagination
+                )
+                for result in results:
+                    OrderSchema.model_validate(result)
+
+            async def _customer_orders() -> None:
+                results, _ = await customer_order_service.list(
+                    session, customer_subject, pagination=pagination
+                )
+                for result in results:
+                    CustomerOrder.model_validate(result)
+
+            async def _customer_subscriptions() -> None:
+                results, _ = await customer_subscription_service.list(
+                    session, customer_subject, pagination=pagination
+                )
+                for result in results:
+                    CustomerSubscription.model_validate(result)
+
+            return [
+                ("orders", _orders),
+                ("customer portal orders", _customer_orders),
+                ("customer portal subscriptions", _customer_subscriptions),
+            ]
+
+        sync_engine = engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+
+        for limit in (10, 100):
+            typer.echo(f"Page size {limit}, {iterations} iterations")
+            for name, fn in _scenarios(PaginationParams(limit=limit, page=1)):
+
+                async def _cold_page(fn: Callable[[], Awaitable[None]] = fn) -> None:
+                    # Don't let the identity map spare queries across iterations
+                    session.expunge_all()
+                    await fn()
+
+                statements.clear()
+                await _cold_page()
+                typer.echo(f"{name:<40} {len(statements):>12} queries/page")
+                report(
+                    name, await measure(_cold_page, iterations, warmup=2), unit="pages"
+                )
+
+        event.remove(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        await session.rollback()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,84 @@
+"""
+Benchmark of the rate limit middleware overhead per request.
+
+Sends requests through `RateLimitMiddleware` wrapping a no-op ASGI app, with
+the plain Redis backend and with the hybrid one, both for a zone counted in
+process memory and for a strict zone. Requires a running Redis.
+
+    uv run python -m scripts.benchmarks.rate_limit --requests 10000
+"""
+
+from typing import Any
+
+import typer
+from ratelimit import RateLimitMiddleware, Rule
+from ratelimit.backends import BaseBackend
+from ratelimit.backends.redis import RedisBackend
+
+from polar.kit.rate_limit import HybridBackend
+from polar.redis import create_redis
+
+from ._utils import measure, report, typer_async
+
+cli = typer.Typer()
+
+
+async def _app(scope: Any, receive: Any, send: Any) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _receive() -> Any:
+    return {"type": "http.request"}
+
+
+async def _send(message: Any) -> None:
+    pass
+
+
+@cli.command()
+@typer_async
+async def run(
+    requests: int = typer.Option(10_000, help="Number of requests per scenario."),
+    users: int = typer.Option(100, help="Number of distinct rate limit keys."),
+) -> None:
+    redis = create_redis("script")
+    rules = {
+        "^/v1/login-code": [Rule(minute=1_000_000, zone="login-code")],
+        "^/v1": [Rule(minute=1_000_000, zone="api")],
+    }
+
+    counter = 0
+
+    async def _authenticate(scope: Any) -> tuple[str, str]:
+        return f"benchmark-{counter % users}", "default"
+
+    hybrid_backend = HybridBackend(redis, strict_zones={"login-code"})
+    backends: list[tuple[str, BaseBackend]] = [
+        ("redis", RedisBackend(redis)),
+        ("hybrid", hybrid_backend),
+    ]
+
+    typer.echo(f"Rate limit middleware, {requests} requests, {users} keys")
+    for backend_name, backend in backends:
+        middleware = RateLimitMiddleware(_app, _authenticate, backend, rules)
+        for path in ["/v1/products/", "/v1/login-code/request"]:
+            scope = {"type": "http", "path": path, "headers": [], "state": {}}
+
+            async def _request() -> None:
+                nonlocal counter
+                counter += 1
+                await middleware(scope, _receive, _send)
+
+            report(
+                f"{backend_name} {path}",
+                await measure(_request, requests, warmup=100),
+                unit="req",
+            )
+
+    await hybrid_backend.aclose()
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,106 @@
+"""
+Benchmark of the S3 service: presigning, public URLs and concurrent uploads.
+
+Runs against the S3 endpoint of the settings, e.g. the local MinIO of the
+development environment. Objects uploaded for the benchmark are deleted at the
+end. It compares signing each download URL on every listing with the cached
+batch presign, building public URLs with a new client each time with the cached
+ones, and blocking uploads one by one with concurrent uploads offloaded to the
+bounded pool.
+
+    uv run python -m scripts.benchmarks.s3_presign --files 200
+"""
+
+import asyncio
+import time
+
+import botocore
+import typer
+
+from polar.config import settings
+from polar.integrations.aws.s3 import S3Service
+from polar.integrations.aws.s3.client import get_client
+from polar.kit.utils import generate_uuid
+
+from ._utils import measure, report, typer_async
+
+cli = typer.Typer()
+
+
+@cli.command()
+@typer_async
+async def run(
+    files: int = typer.Option(200, help="Number of files per listing."),
+    iterations: int = typer.Option(50, help="Number of listings per scenario."),
+    uploads: int = typer.Option(64, help="Number of uploads per scenario."),
+    upload_size: int = typer.Option(64 * 1024, help="Size of each upload, in bytes."),
+) -> None:
+    bucket = settings.S3_FILES_BUCKET_NAME
+    uncached = S3Service(
+        bucket, presign_ttl=settings.S3_FILES_PRESIGN_TTL, presign_cache_ttl=0
+    )
+    cached = S3Service(bucket, presign_ttl=settings.S3_FILES_PRESIGN_TTL)
+    prefix = f"benchmark-{generate_uuid().hex[:8]}"
+    objects = [
+        (f"{prefix}/{i}/file.pdf", f"file-{i}.pdf", "application/pdf")
+        for i in range(files)
+    ]
+
+    async def _one_by_one() -> None:
+        for path, filename, mime_type in objects:
+            uncached.generate_presigned_download_url(
+                path=path, filename=filename, mime_type=mime_type
+            )
+
+    async def _batch_cold() -> None:
+        cached._presign_cache.clear()
+        cached.generate_presigned_download_urls(objects)
+
+    async def _batch_warm() -> None:
+        cached.generate_presigned_download_urls(objects)
+
+    async def _public_new_client() -> None:
+        for path, _, _ in objects:
+            get_client(signature_version=botocore.UNSIGNED).generate_presigned_url(
+                "get_object", ExpiresIn=0, Params=dict(Bucket=bucket, Key=path)
+            )
+
+    async def _public_cached() -> None:
+        for path, _, _ in objects:
+            cached.get_public_url(path)
+
+    typer.echo(f"Listings of {files} files, {iterations} iterations")
+    for name, fn in [
+        ("presign one by one, uncached", _one_by_one),
+        ("batch presign, cold cache", _batch_cold),
+        ("batch presign, warm cache", _batch_warm),
+        ("public URLs, new client each", _public_new_client),
+        ("public URLs, cached", _public_cached),
+    ]:
+        report(name, await measure(fn, iterations, warmup=1), unit="listings")
+
+    data = b"\0" * upload_size
+    paths = [f"{prefix}/uploads/{i}" for i in range(uploads)]
+
+    typer.echo(f"{uploads} uploads of {upload_size} bytes")
+    start = time.perf_counter()
+    for path in paths:
+        # What awaiting the service did before: block the event loop
+        cached.client.put_object(
+            Bucket=bucket, Key=path, Body=data, ContentType="application/octet-stream"
+        )
+    elapsed = time.perf_counter() - start
+    typer.echo(f"{'blocking, one by one':<40} {uploads / elapsed:>12.1f} uploads/s")
+
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(cached.upload(data, path, "application/octet-stream") for path in paths)
+    )
+    elapsed = time.perf_counter() - start
+    typer.echo(f"{'offloaded, concurrent':<40} {uploads / elapsed:>12.1f} uploads/s")
+
+    await asyncio.gather(*(cached.delete_file(path) for path in paths))
+
+
+if __name__ == "__main__":
+    cli()
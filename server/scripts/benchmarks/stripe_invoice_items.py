@@ -0,0 +1,122 @@
+"""
+Benchmark of creating Stripe invoice items through `StripeRequestExecutor`.
+
+Runs a local stub of the Stripe API, rate limited like the real one, and
+compares creating the invoice items of an invoice one after the other with
+creating them concurrently. Pass `--api-base` to target stripe-mock instead.
+
+    uv run python -m scripts.benchmarks.stripe_invoice_items --items 200
+"""
+
+import asyncio
+import time
+
+import stripe as stripe_lib
+import typer
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from polar.integrations.stripe.service import StripeRequestExecutor, StripeService
+
+from ._utils import typer_async
+
+cli = typer.Typer()
+
+
+def _create_stub(rate_limit: float, latency: float) -> Starlette:
+    """Stripe invoice items API stub, allowing `rate_limit` requests per second."""
+    window_start = time.monotonic()
+    window_requests = 0
+
+    async def _create_invoice_item(request: Request) -> JSONResponse:
+        nonlocal window_start, window_requests
+        now = time.monotonic()
+        if now - window_start >= 1.0:
+            window_start, window_requests = now, 0
+        window_requests += 1
+        if window_requests > rate_limit:
+            return JSONResponse(
+                {"error": {"type": "invalid_request_error", "code": "rate_limit"}},
+                status_code=429,
+            )
+        await request.body()
+        await asyncio.sleep(latency)
+        return JSONResponse({"id": "ii_benchmark", "object": "invoiceitem"})
+
+    return Starlette(
+        routes=[Route("/v1/invoiceitems", _create_invoice_item, methods=["POST"])]
+    )
+
+
+def _echo(name: str, items: int, elapsed: float) -> None:
+    typer.echo(f"{name:<40} {items / elapsed:>12.1f} items/s  {elapsed:.3f}s")
+
+
+@cli.command()
+@typer_async
+async def run(
+    items: int = typer.Option(200, help="Number of invoice items to create."),
+    concurrency: int = typer.Option(8, help="Max requests in flight."),
+    rate: float = typer.Option(25.0, help="Max requests per second."),
+    rate_limit: float = typer.Option(25.0, help="Stub requests per second."),
+    latency: float = typer.Option(0.2, help="Stub latency, in seconds."),
+    port: int = typer.Option(8767, help="Port of the stub server."),
+    api_base: str | None = typer.Option(None, help="Stripe API to target instead."),
+) -> None:
+    server: uvicorn.Server | None = None
+    server_task: asyncio.Task[None] | None = None
+    if api_base is None:
+        server = uvicorn.Server(
+            uvicorn.Config(
+                _create_stub(rate_limit, latency),
+                host="127.0.0.1",
+                port=port,
+                log_level="warning",
+            )
+        )
+        server_task = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.05)
+        api_base = f"http://127.0.0.1:{port}"
+
+    stripe_lib.api_base = api_base
+    stripe_lib.api_key = "sk_test_benchmark"
+    stripe_service = StripeService()
+
+    async def _create(i: int, run: str) -> stripe_lib.InvoiceItem:
+        return await stripe_service.create_invoice_item(
+            customer="cus_benchmark",
+            invoice="in_benchmark",
+            amount=1000,
+            currency="usd",
+            description=f"Item {i}",
+            idempotency_key=f"benchmark:{run}:{i}",
+        )
+
+    try:
+        start = time.perf_counter()
+        for i in range(items):
+            await _create(i, f"sequential-{start}")
+        _echo("sequential", items, time.perf_counter() - start)
+
+        executor = StripeRequestExecutor(
+            max_concurrency=concurrency, rate=rate, max_retries=100
+        )
+        # Let the rate limit window reset
+        await asyncio.sleep(1.0)
+        start = time.perf_counter()
+        await executor.gather(
+            lambda i=i: _create(i, f"executor-{start}") for i in range(items)
+        )
+        _echo(f"executor, {concurrency} in flight", items, time.perf_counter() - start)
+    finally:
+        if server is not None and server_task is not None:
+            server.should_exit = True
+            await server_task
+
+
+if __name__ == "__main__":
+    cli()
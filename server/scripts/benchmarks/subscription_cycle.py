@@ -0,0 +1,152 @@
+"""
+Benchmark of cycling due subscriptions, as on renewal peaks.
+
+Seeds a throwaway organization, fixed price product and due subscriptions in a
+transaction that is rolled back at the end. It then compares cycling them one
+by one, like the `subscription.cycle` job does, with cycling them in chunks,
+like the `subscription.cycle_many` job does.
+
+    uv run python -m scripts.benchmarks.subscription_cycle --subscriptions 5000
+"""
+
+import itertools
+import time
+from datetime import UTC, datetime, timedelta
+
+import typer
+
+from polar.enums import SubscriptionRecurringInterval
+from polar.kit.db.postgres import create_async_sessionmaker
+from polar.kit.utils import generate_uuid
+from polar.models import (
+    Customer,
+    Organization,
+    Product,
+    ProductPriceFixed,
+    Subscription,
+    SubscriptionProductPrice,
+)
+from polar.models.subscription import SubscriptionStatus
+from polar.postgres import AsyncSession, create_async_engine
+from polar.subscription.repository import SubscriptionRepository
+from polar.subscription.service import subscription as subscription_service
+from polar.worker import JobQueueManager
+
+from ._utils import typer_async
+
+cli = typer.Typer()
+
+
+def _echo(name: str, subscriptions: int, elapsed: float) -> None:
+    typer.echo(f"{name:<40} {subscriptions / elapsed:>12.1f} cycles/s  {elapsed:.3f}s")
+
+
+async def _seed(
+    session: AsyncSession, subscriptions: int, customers: int
+) -> list[list[Subscription]]:
+    """Seed two identical sets of due subscriptions, one per scenario."""
+    slug = f"benchmark-{generate_uuid().hex[:8]}"
+    organization = Organization(
+        name=slug, slug=slug, customer_invoice_prefix=slug.upper()
+    )
+    product = Product(
+        name="Benchmark",
+        organization=organization,
+        recurring_interval=SubscriptionRecurringInterval.month,
+        recurring_interval_count=1,
+        all_prices=[],
+        prices=[],
+        product_benefits=[],
+        product_medias=[],
+        attached_custom_fields=[],
+    )
+    price = ProductPriceFixed(price_currency="usd", price_amount=1000, product=product)
+    session.add_all([organization, product, price])
+
+    now = datetime.now(UTC)
+    sets: list[list[Subscription]] = []
+    for _ in range(2):
+        customer_pool = [
+            Customer(
+                email=f"{slug}-{generate_uuid().hex[:8]}@example.com",
+                name="Benchmark",
+                organization=organization,
+            )
+            for _ in range(customers)
+        ]
+        session.add_all(customer_pool)
+        subscription_set = [
+            Subscription(
+                recurring_interval=SubscriptionRecurringInterval.month,
+                recurring_interval_count=1,
+                status=SubscriptionStatus.active,
+                cancel_at_period_end=False,
+                current_period_start=now - timedelta(days=31),
+                current_period_end=now - timedelta(minutes=1),
+                started_at=now - timedelta(days=31),
+                customer=customer_pool[i % customers],
+                product=product,
+                subscription_product_prices=[
+                    SubscriptionProductPrice.from_price(price)
+                ],
+                user_metadata={},
+            )
+            for i in range(subscriptions)
+        ]
+        session.add_all(subscription_set)
+        sets.append(subscription_set)
+
+    await session.flush()
+    session.expunge_all()
+    return sets
+
+
+@cli.command()
+@typer_async
+async def run(
+    subscriptions: int = typer.Option(5_000, help="Due subscriptions per scenario."),
+    customers: int = typer.Option(2_000, help="Customers per scenario."),
+    chunk_size: int = typer.Option(100, help="Subscriptions per bulk cycle."),
+) -> None:
+    engine = create_async_engine("script")
+    sessionmaker = create_async_sessionmaker(engine)
+    JobQueueManager.set()
+
+    async with sessionmaker() as session:
+        typer.echo(f"Seeding {subscriptions} due subscriptions per scenario")
+        one_by_one, bulk = await _seed(session, subscriptions, customers)
+        repository = SubscriptionRepository.from_session(session)
+
+        start = time.perf_counter()
+        for seeded in one_by_one:
+            subscription = await repository.get_by_id(
+                seeded.id, options=repository.get_eager_options()
+            )
+            assert subscription is not None
+            await subscription_service.cycle(session, subscription)
+        await session.flush()
+        _echo("one by one", subscriptions, time.perf_counter() - start)
+        JobQueueManager.get().reset()
+
+        start = time.perf_counter()
+        for chunk in itertools.batched(bulk, chunk_size):
+            chunk_subscriptions = await repository.get_all_by_ids_for_update(
+                [seeded.id for seeded in chunk],
+                options=repository.get_eager_options(),
+            )
+            not_cycled = await subscription_service.cycle_many(
+                session, chunk_subscriptions
+            )
+            assert not_cycled == []
+        await session.flush()
+        _echo(f"chunks of {chunk_size}", subscriptions, time.perf_counter() - start)
+        JobQueueManager.get().reset()
+
+        await session.rollback()
+
+    JobQueueManager.close()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    cli()
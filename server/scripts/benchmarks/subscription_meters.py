@@ -0,0 +1,199 @@
+"""
+Benchmark of subscription meters updates, as the period's events grow.
+
+Seeds a throwaway organization, metered product and subscription in a
+transaction that is rolled back at the end. For each size of the period, it
+adds billing entries, then measures recomputing the subscription meters from
+all the pending entries, and updating them incrementally after a billing run.
+
+    uv run python -m scripts.benchmarks.subscription_meters --sizes 10000,1000000
+"""
+
+import time
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import typer
+from sqlalchemy import text
+from sqlalchemy.orm import selectinload
+
+from polar.billing_entry.service import billing_entry as billing_entry_service
+from polar.enums import SubscriptionRecurringInterval
+from polar.kit.db.postgres import create_async_sessionmaker
+from polar.kit.utils import generate_uuid
+from polar.meter.aggregation import AggregationFunction, PropertyAggregation
+from polar.meter.filter import Filter, FilterConjunction
+from polar.models import (
+    Customer,
+    Meter,
+    Organization,
+    Product,
+    ProductPriceMeteredUnit,
+    Subscription,
+    SubscriptionMeter,
+    SubscriptionProductPrice,
+)
+from polar.models.subscription import SubscriptionStatus
+from polar.postgres import create_async_engine
+
+from ._utils import measure, report, typer_async
+
+cli = typer.Typer()
+
+# Events and their billing entries, created in order
+_SEED_STATEMENT = text(
+    """
+    WITH events AS (
+        INSERT INTO events (
+            id, ingested_at, timestamp, name, source,
+            customer_id, organization_id, user_metadata
+        )
+        SELECT
+            gen_random_uuid(), :start + g * interval '1 millisecond',
+            :start + g * interval '1 millisecond', 'benchmark', 'user',
+            :customer_id, :organization_id, jsonb_build_object('tokens', g % 1000)
+        FROM generate_series(:offset, :offset + :count - 1) AS g
+        RETURNING id, timestamp
+    )
+    INSERT INTO billing_entry (
+        id, created_at, start_timestamp, end_timestamp, type, direction,
+        customer_id, product_price_id, subscription_id, event_id
+    )
+    SELECT
+        gen_random_uuid(), events.timestamp, events.timestamp, events.timestamp,
+        'metered', 'debit', :customer_id, :product_price_id, :subscription_id,
+        events.id
+    FROM events
+    """
+)
+
+
+@cli.command()
+@typer_async
+async def run(
+    sizes: str = typer.Option(
+        "10000,100000,1000000", help="Comma-separated numbers of period entries."
+    ),
+    batch: int = typer.Option(100, help="Entries created by a billing run."),
+    iterations: int = typer.Option(20, help="Number of updates per scenario."),
+) -> None:
+    engine = create_async_engine("script")
+    sessionmaker = create_async_sessionmaker(engine)
+
+    async with sessionmaker() as session:
+        slug = f"benchmark-{generate_uuid().hex[:8]}"
+        organization = Organization(
+            name=slug, slug=slug, customer_invoice_prefix=slug.upper()
+        )
+        customer = Customer(
+            email=f"{slug}@example.com", name="Benchmark", organization=organization
+        )
+        meter = Meter(
+            name="Tokens",
+            organization=organization,
+            filter=Filter(conjunction=FilterConjunction.and_, clauses=[]),
+            aggregation=PropertyAggregation(
+                func=AggregationFunction.sum, property="tokens"
+            ),
+        )
+        product = Product(
+            name="Benchmark",
+            organization=organization,
+            recurring_interval=SubscriptionRecurringInterval.month,
+            recurring_interval_count=1,
+            all_prices=[],
+            prices=[],
+            product_benefits=[],
+            product_medias=[],
+            attached_custom_fields=[],
+        )
+        price = ProductPriceMeteredUnit(
+            price_currency="usd", unit_amount=Decimal(1), meter=meter, product=product
+        )
+        session.add_all([organization, customer, meter, product, price])
+        await session.flush()
+
+        now = datetime.now(UTC)
+        subscription = Subscription(
+            recurring_interval=SubscriptionRecurringInterval.month,
+            recurring_interval_count=1,
+            status=SubscriptionStatus.active,
+            cancel_at_period_end=False,
+            current_period_start=now - timedelta(days=30),
+            current_period_end=now,
+            started_at=now - timedelta(days=30),
+            customer=customer,
+            product=product,
+            subscription_product_prices=[SubscriptionProductPrice.from_price(price)],
+            user_metadata={},
+        )
+        session.add(subscription)
+        await session.flush()
+        session.expunge_all()
+
+        subscription = await session.get_one(
+            Subscription,
+            subscription.id,
+            options=(
+                selectinload(Subscription.meters).joinedload(SubscriptionMeter.meter),
+                selectinload(Subscription.subscription_product_prices),
+            ),
+        )
+
+        offset = 0
+
+        async def _seed(count: int) -> None:
+            nonlocal offset
+            await session.execute(
+                _SEED_STATEMENT,
+                {
+                    "start": now - timedelta(days=30),
+                    "offset": offset,
+                    "count": count,
+                    "customer_id": customer.id,
+                    "organization_id": organization.id,
+                    "product_price_id": price.id,
+                    "subscription_id": subscription.id,
+                },
+            )
+            offset += count
+
+        async def _recompute() -> None:
+            await billing_entry_service.update_subscription_meters(
+                session, subscription, reconcile=True
+            )
+
+        async def _incremental() -> list[float]:
+            durations: list[float] = []
+            for _ in range(iterations):
+                await _seed(batch)
+                start = time.perf_counter()
+                await billing_entry_service.update_subscription_meters(
+                    session, subscription
+                )
+                durations.append(time.perf_counter() - start)
+            return durations
+
+        for size in sorted(int(size) for size in sizes.split(",")):
+            typer.echo(f"Seeding the period up to {size} billing entries")
+            await _seed(size - offset)
+            await session.execute(text("ANALYZE events, billing_entry"))
+
+            report(
+                f"{size} entries, full recompute",
+                await measure(_recompute, iterations, warmup=1),
+                unit="updates",
+            )
+            report(
+                f"{size} entries, incremental, {batch} new",
+                await _incremental(),
+                unit="updates",
+            )
+
+        await session.rollback()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,130 @@
+"""
+Recall and latency harness of filtered product vector searches in pgvector.
+
+Loads random vectors spread over organizations, prices and categories in a
+throwaway embeddings table with an HNSW index, then compares approximate
+searches with exhaustive ones, for several filters and `ef_search` values.
+Requires a running PostgreSQL with the pgvector extension.
+
+    uv run python -m scripts.benchmarks.vector_search --vectors 100000
+"""
+
+import random
+import time
+from typing import Any
+
+import typer
+from sqlalchemy import text
+
+from polar.agent_knowledge.base import VectorRecord
+from polar.agent_knowledge.vector_store import PgvectorStore
+from polar.kit.db.postgres import create_async_sessionmaker
+from polar.kit.utils import generate_uuid
+from polar.postgres import create_async_engine
+
+from ._utils import report, typer_async
+from .vector_upsert import create_embeddings_table
+
+cli = typer.Typer()
+
+CATEGORIES = ["apparel", "books", "electronics", "home", "software"]
+
+
+@cli.command()
+@typer_async
+async def run(
+    vectors: int = typer.Option(100_000, help="Number of indexed vectors."),
+    dimensions: int = typer.Option(256, help="Dimensions of each vector."),
+    organizations: int = typer.Option(100, help="Number of organizations."),
+    queries: int = typer.Option(100, help="Number of queries per scenario."),
+    limit: int = typer.Option(10, help="Number of results per query."),
+) -> None:
+    engine = create_async_engine("script")
+    sessionmaker = create_async_sessionmaker(engine)
+    table_name = f"benchmark_embeddings_{generate_uuid().hex[:8]}"
+    store = PgvectorStore(sessionmaker, table_name=table_name, dimensions=dimensions)
+    organization_ids = [generate_uuid() for _ in range(organizations)]
+
+    def _vector() -> list[float]:
+        return [random.uniform(-1, 1) for _ in range(dimensions)]
+
+    async with sessionmaker() as session:
+        await create_embeddings_table(session, table_name, dimensions)
+
+    try:
+        for start in range(0, vectors, 1000):
+            await store.upsert_many(
+                [
+                    VectorRecord(
+                        id=str(generate_uuid()),
+                        embedding=_vector(),
+                        content="Benchmark product",
+                        metadata={
+                            "organization_id": str(random.choice(organization_ids)),
+                            "price": random.randint(100, 100_000),
+                            "category": random.choice(CATEGORIES),
+                        },
+                    )
+                    for _ in range(min(1000, vectors - start))
+                ]
+            )
+        await store.create_index(method="hnsw")
+        async with sessionmaker() as session:
+            await session.execute(text(f"ANALYZE {table_name}"))
+            await session.commit()
+
+        scenarios: list[tuple[str, Any]] = [
+            ("no filter", lambda: None),
+            (
+                "organization",
+                lambda: {"organization_id": random.choice(organization_ids)},
+            ),
+            (
+                "organization, category, price",
+                lambda: {
+                    "organization_id": random.choice(organization_ids),
+                    "category": random.choice(CATEGORIES),
+                    "max_price": 20_000,
+                },
+            ),
+        ]
+
+        typer.echo(
+            f"Vector search, {vectors} vectors of {dimensions} dimensions, "
+            f"{organizations} organizations, top {limit}"
+        )
+        for name, filters_factory in scenarios:
+            cases = [(_vector(), filters_factory()) for _ in range(queries)]
+            expected = [
+                {
+                    result.id
+                    for result in await store.search(
+                        embedding, limit, filters, exact=True
+                    )
+                }
+                for embedding, filters in cases
+            ]
+            for ef_search in [10, 40, 100, 400]:
+                durations: list[float] = []
+                recalls: list[float] = []
+                for (embedding, filters), expected_ids in zip(cases, expected):
+                    start = time.perf_counter()
+                    results = await store.search(
+                        embedding, limit, filters, ef_search=ef_search
+                    )
+                    durations.append(time.perf_counter() - start)
+                    if expected_ids:
+                        found = {result.id for result in results} & expected_ids
+                        recalls.append(len(found) / len(expected_ids))
+                report(f"{name}, ef_search={ef_search}", durations, unit="queries")
+                recall = sum(recalls) / len(recalls) if recalls else 1.0
+                typer.echo(f"{'':<40} recall@{limit}={recall:.3f}")
+    finally:
+        async with sessionmaker() as session:
+            await session.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,134 @@
+"""
+Benchmark of product embeddings indexing throughput in pgvector.
+
+Loads random vectors in a throwaway embeddings table, one upsert per vector
+like before, then with bulk `upsert_many` batches and a full offline
+`rebuild`. Requires a running PostgreSQL with the pgvector extension.
+
+    uv run python -m scripts.benchmarks.vector_upsert --vectors 100000
+"""
+
+import random
+import time
+from collections.abc import AsyncIterator
+
+import typer
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from polar.agent_knowledge.base import VectorRecord
+from polar.agent_knowledge.vector_store import FILTER_INDEXES, PgvectorStore
+from polar.kit.db.postgres import create_async_sessionmaker
+from polar.kit.utils import generate_uuid
+from polar.postgres import create_async_engine
+
+from ._utils import typer_async
+
+cli = typer.Typer()
+
+
+async def create_embeddings_table(
+    session: AsyncSession, table_name: str, dimensions: int
+) -> None:
+    """Create a throwaway embeddings table, shaped like `product_embeddings`."""
+    await session.execute(
+        text(
+            f"""
+            CREATE TABLE {table_name} (
+                id UUID PRIMARY KEY,
+                embedding vector({dimensions}) NOT NULL,
+                content TEXT NOT NULL,
+                metadata JSONB DEFAULT '{{}}'::jsonb,
+                organization_id UUID,
+                price INTEGER,
+                category TEXT,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+                modified_at TIMESTAMP WITH TIME ZONE,
+                deleted_at TIMESTAMP WITH TIME ZONE
+            )
+            """
+        )
+    )
+    for suffix, columns in FILTER_INDEXES.items():
+        await session.execute(
+            text(
+                f"CREATE INDEX {table_name}_{suffix} ON {table_name} {columns} "
+                "WHERE deleted_at IS NULL"
+            )
+        )
+    await session.commit()
+
+
+def _echo(name: str, vectors: int, elapsed: float) -> None:
+    typer.echo(f"{name:<40} {vectors / elapsed:>12.1f} vectors/s  {elapsed:.2f}s")
+
+
+@cli.command()
+@typer_async
+async def run(
+    vectors: int = typer.Option(100_000, help="Number of indexed vectors."),
+    dimensions: int = typer.Option(1536, help="Dimensions of each vector."),
+    batch_size: int = typer.Option(1000, help="Number of vectors per batch."),
+    single_upserts: int = typer.Option(
+        1000, help="Number of vectors upserted one by one, to compare."
+    ),
+) -> None:
+    engine = create_async_engine("script")
+    sessionmaker = create_async_sessionmaker(engine)
+    table_name = f"benchmark_embeddings_{generate_uuid().hex[:8]}"
+    organization_id = generate_uuid()
+    store = PgvectorStore(sessionmaker, table_name=table_name, dimensions=dimensions)
+
+    async with sessionmaker() as session:
+        await create_embeddings_table(session, table_name, dimensions)
+
+    def _records(count: int) -> list[VectorRecord]:
+        return [
+            VectorRecord(
+                id=str(generate_uuid()),
+                embedding=[random.uniform(-1, 1) for _ in range(dimensions)],
+                content="Benchmark product",
+                metadata={"organization_id": str(organization_id)},
+            )
+            for _ in range(count)
+        ]
+
+    async def _batches() -> AsyncIterator[list[VectorRecord]]:
+        for start in range(0, vectors, batch_size):
+            yield _records(min(batch_size, vectors - start))
+
+    typer.echo(f"Indexing {vectors} vectors of {dimensions} dimensions")
+    try:
+        records = _records(single_upserts)
+        start = time.perf_counter()
+        for record in records:
+            await store.upsert(
+                record.id, record.embedding, record.content, record.metadata
+            )
+        _echo("single upserts", single_upserts, time.perf_counter() - start)
+
+        # Vectors generation is excluded from the bulk measurements
+        generation = 0.0
+        elapsed = 0.0
+        for start in range(0, vectors, batch_size):
+            generation_start = time.perf_counter()
+            records = _records(min(batch_size, vectors - start))
+            generation += time.perf_counter() - generation_start
+            upsert_start = time.perf_counter()
+            await store.upsert_many(records)
+            elapsed += time.perf_counter() - upsert_start
+        _echo(f"upsert_many, batches of {batch_size}", vectors, elapsed)
+
+        start = time.perf_counter()
+        count = await store.rebuild(_batches())
+        elapsed = time.perf_counter() - start - generation
+        _echo("rebuild with index, swapped in", count, elapsed)
+    finally:
+        async with sessionmaker() as session:
+            await session.execute(text(f"DROP TABLE IF EXISTS {table_name}"))
+            await session.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,187 @@
+"""Tests for incremental streaming of agent responses."""
+
+import json
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.agent.enums import Action, Intent
+from polar.agent.streaming import StreamingHandler
+from polar.agent_core.orchestrator import agent_orchestrator
+from polar.agent_llm.anthropic_client import AnthropicClient
+from tests.fixtures.llm import anthropic_events, fake_provider
+
+
+@pytest.fixture
+def orchestrator_layers(mocker: MockerFixture) -> dict[str, AsyncMock]:
+    """Mock every orchestrator layer, except response generation."""
+    layers = {
+        "_load_history": AsyncMock(return_value=[]),
+        "_get_customer_profile": AsyncMock(return_value={}),
+        "_retrieve_knowledge": AsyncMock(return_value={}),
+        "_understand_conversation": AsyncMock(
+            return_value={
+                "intent": Intent.GREETING,
+                "entities": {},
+                "confidence": 0.95,
+                "reasoning": "Test",
+            }
+        ),
+        "_enrich_context": AsyncMock(
+            return_value={
+                "history": [],
+                "conversation_stage": "discovery",
+                "hesitation_signals": 0,
+            }
+        ),
+        "_make_decision": AsyncMock(
+            return_value={
+                "action": Action.GREET,
+                "parameters": {},
+                "reasoning": "Test",
+            }
+        ),
+        "_invoke_tools": AsyncMock(return_value=[]),
+        "_update_state": AsyncMock(),
+    }
+    for name, mock in layers.items():
+        mocker.patch.object(agent_orchestrator, name, mock)
+    return layers
+
+
+@pytest.mark.asyncio
+async def test_stream_agent_events(
+    mocker: MockerFixture,
+    orchestrator_layers: dict[str, AsyncMock],
+    conversation: Any,
+    user_message: Any,
+) -> None:
+    mocker.patch.object(
+        agent_orchestrator,
+        "llm_client",
+        AnthropicClient(
+            api_key="test",
+            http_client=fake_provider(anthropic_events(["Hi", " there", "!"])),
+        ),
+    )
+    create_agent_message = mocker.patch(
+        "polar.agent.streaming.message_service.create_agent_message",
+        new=AsyncMock(return_value=MagicMock(id=uuid4())),
+    )
+    mocker.patch("polar.agent.streaming.MessagePublic")
+    histogram = mocker.patch("polar.agent.streaming.time_to_first_token_histogram")
+
+    handler = StreamingHandler()
+    events = [
+        event
+        async for event in handler.stream_agent_events(
+            AsyncMock(), conversation, user_message
+        )
+    ]
+
+    assert [e["content"] for e in events if e["type"] == "content"] == [
+        "Hi",
+        " there",
+        "!",
+    ]
+    assert events[-1]["type"] == "done"
+    assert events[-1]["time_to_first_token_ms"] is not None
+
+    # Persisted once, with the complete response
+    create_agent_message.assert_awaited_once()
+    assert create_agent_message.call_args.kwargs["content"] == "Hi there!"
+
+    histogram.record.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_agent_events_history_and_tool_results(
+    mocker: MockerFixture,
+    orchestrator_layers: dict[str, AsyncMock],
+    conversation: Any,
+    user_message: Any,
+) -> None:
+    orchestrator_layers["_enrich_context"].return_value = {
+        "history": [
+            {"role": "user", "content": "Hello"},
+            {"role": "agent", "content": "Hi! How can I help?"},
+            {"role": "user", "content": "Running shoes, please"},
+        ],
+        "conversation_stage": "discovery",
+        "hesitation_signals": 0,
+    }
+    orchestrator_layers["_invoke_tools"].return_value = [
+        {
+            "tool": "product_lookup",
+            "success": True,
+            "data": {"products": [{"name": "Trail Runner"}]},
+            "error": None,
+        }
+    ]
+    requests: list[httpx.Request] = []
+    mocker.patch.object(
+        agent_orchestrator,
+        "llm_client",
+        AnthropicClient(
+            api_key="test",
+            http_client=fake_provider(anthropic_events(["Sure"]), requests=requests),
+        ),
+    )
+    mocker.patch(
+        "polar.agent.streaming.message_service.create_agent_message",
+        new=AsyncMock(return_value=MagicMock(id=uuid4())),
+    )
+    mocker.patch("polar.agent.streaming.MessagePublic")
+
+    handler = StreamingHandler()
+    events = [
+        event
+        async for event in handler.stream_agent_events(
+            AsyncMock(), conversation, user_message
+        )
+    ]
+
+    assert events[-1]["type"] == "done"
+
+    payload = json.loads(requests[0].content)
+    # Tool results are merged in the system prompt, agent messages are the assistant's
+    assert "Tool execution results" in payload["system"]
+    assert "Trail Runner" in payload["system"]
+    assert payload["messages"] == [
+        {"role": "user", "content": "Hello"},
+        {"role": "assistant", "content": "Hi! How can I help?"},
+        {"role": "user", "content": "Running shoes, please"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_agent_events_error(
+    mocker: MockerFixture,
+    orchestrator_layers: dict[str, AsyncMock],
+    conversation: Any,
+    user_message: Any,
+) -> None:
+    mocker.patch.object(
+        agent_orchestrator,
+        "llm_client",
+        AnthropicClient(api_key="test", http_client=fake_provider([], status_code=529)),
+    )
+    create_agent_message = mocker.patch(
+        "polar.agent.streaming.message_service.create_agent_message",
+        new=AsyncMock(),
+    )
+
+    handler = StreamingHandler()
+    events = [
+        event
+        async for event in handler.stream_agent_events(
+            AsyncMock(), conversation, user_message
+        )
+    ]
+
+    assert events[-1]["type"] == "error"
+    create_agent_message.assert_not_awaited()
@@ -0,0 +1,205 @@
+"""Tests for the WebSocket connection manager."""
+
+import asyncio
+import json
+from collections.abc import AsyncIterator
+from typing import Any
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from pytest_mock import MockerFixture
+
+from polar.agent.websocket import ConnectionManager, SlowConsumerPolicy
+from polar.redis import Redis
+
+
+@pytest_asyncio.fixture
+async def manager(decoding_redis: Redis) -> AsyncIterator[ConnectionManager]:
+    manager = ConnectionManager(decoding_redis)
+    yield manager
+    await manager.aclose()
+
+
+def _websocket(send_delay: float = 0.0) -> AsyncMock:
+    websocket = AsyncMock()
+
+    async def _send_text(data: str) -> None:
+        await asyncio.sleep(send_delay)
+
+    websocket.send_text.side_effect = _send_text
+    return websocket
+
+
+async def _wait_for_subscriptions() -> None:
+    """Let subscriber tasks subscribe to their channel."""
+    await asyncio.sleep(0.1)
+
+
+@pytest.mark.asyncio
+class TestConnectionManager:
+    async def test_broadcast(self, manager: ConnectionManager) -> None:
+        conversation_id = uuid4()
+        websockets = [_websocket(), _websocket()]
+        for websocket in websockets:
+            await manager.connect(websocket, conversation_id)
+
+        await manager.broadcast({"type": "content"}, conversation_id)
+        await asyncio.sleep(0.05)
+
+        for websocket in websockets:
+            websocket.send_text.assert_awaited_once_with(
+                json.dumps({"type": "content"})
+            )
+        # Serialized once for all clients
+        assert (
+            websockets[0].send_text.call_args.args[0]
+            is websockets[1].send_text.call_args.args[0]
+        )
+
+    async def test_broadcast_across_processes(self, decoding_redis: Redis) -> None:
+        manager_1 = ConnectionManager(decoding_redis)
+        manager_2 = ConnectionManager(decoding_redis)
+        conversation_id = uuid4()
+        websocket_1 = _websocket()
+        websocket_2 = _websocket()
+        other_conversation_websocket = _websocket()
+
+        try:
+            await manager_1.connect(websocket_1, conversation_id)
+            await manager_2.connect(websocket_2, conversation_id)
+            await manager_2.connect(other_conversation_websocket, uuid4())
+            await _wait_for_subscriptions()
+
+            await manager_1.broadcast({"type": "content"}, conversation_id)
+            await asyncio.sleep(0.1)
+
+            # Delivered once to each client, whatever its process
+            websocket_1.send_text.assert_awaited_once()
+            websocket_2.send_text.assert_awaited_once_with(
+                json.dumps({"type": "content"})
+            )
+            other_conversation_websocket.send_text.assert_not_awaited()
+        finally:
+            await manager_1.aclose()
+            await manager_2.aclose()
+
+    async def test_send_message_is_local(self, decoding_redis: Redis) -> None:
+        manager_1 = ConnectionManager(decoding_redis)
+        manager_2 = ConnectionManager(decoding_redis)
+        conversation_id = uuid4()
+        websocket_1 = _websocket()
+        websocket_2 = _websocket()
+
+        try:
+            await manager_1.connect(websocket_1, conversation_id)
+            await manager_2.connect(websocket_2, conversation_id)
+            await _wait_for_subscriptions()
+
+            await manager_1.send_message({"type": "content"}, conversation_id)
+            await asyncio.sleep(0.1)
+
+            websocket_1.send_text.assert_awaited_once()
+            websocket_2.send_text.assert_not_awaited()
+        finally:
+            await manager_1.aclose()
+            await manager_2.aclose()
+
+    async def test_slow_consumer_disconnect(self, decoding_redis: Redis) -> None:
+        manager = ConnectionManager(decoding_redis, send_queue_size=2)
+        conversation_id = uuid4()
+        slow = _websocket(send_delay=1.0)
+        fast = _websocket()
+        await manager.connect(slow, conversation_id)
+        await manager.connect(fast, conversation_id)
+
+        try:
+            # The first message is in flight, the next two fill the queue
+            for i in range(4):
+                await manager.broadcast({"index": i}, conversation_id)
+                await asyncio.sleep(0.01)
+
+            slow.close.assert_awaited_once_with(code=1013, reason="Client too slow")
+            assert list(manager.active_connections[conversation_id]) == [fast]
+            assert fast.send_text.await_count == 4
+
+            # Disconnecting again, from the connection loop, is a no-op
+            manager.disconnect(slow, conversation_id)
+            assert list(manager.active_connections[conversation_id]) == [fast]
+        finally:
+            await manager.aclose()
+
+    async def test_slow_consumer_drop(self, decoding_redis: Redis) -> None:
+        manager = ConnectionManager(
+            decoding_redis,
+            send_queue_size=2,
+            slow_consumer_policy=SlowConsumerPolicy.drop,
+        )
+        conversation_id = uuid4()
+        slow = _websocket(send_delay=0.05)
+        await manager.connect(slow, conversation_id)
+
+        try:
+            # Queued without yielding to the sender: the oldest are dropped
+            for i in range(5):
+                await manager.send_message({"index": i}, conversation_id)
+            connection = manager.active_connections[conversation_id][slow]
+            await asyncio.sleep(0.3)
+
+            assert connection.dropped == 3
+            sent: list[Any] = [
+                json.loads(call.args[0]) for call in slow.send_text.await_args_list
+            ]
+            assert sent == [{"index": 3}, {"index": 4}]
+            slow.close.assert_not_awaited()
+        finally:
+            await manager.aclose()
+
+    async def test_send_timeout(self, decoding_redis: Redis) -> None:
+        manager = ConnectionManager(decoding_redis, send_timeout=0.05)
+        conversation_id = uuid4()
+        stalled = _websocket(send_delay=1.0)
+        await manager.connect(stalled, conversation_id)
+
+        try:
+            await manager.broadcast({"type": "content"}, conversation_id)
+            await asyncio.sleep(0.2)
+
+            stalled.close.assert_awaited_once_with(code=1013, reason="Client too slow")
+            assert conversation_id not in manager.active_connections
+        finally:
+            await manager.aclose()
+
+    async def test_disconnect_unsubscribes(self, manager: ConnectionManager) -> None:
+        conversation_id = uuid4()
+        websocket = _websocket()
+        await manager.connect(websocket, conversation_id)
+        await _wait_for_subscriptions()
+
+        channel = f"agent:conversation:{conversation_id}"
+        shard = manager.multiplexer._get_shard(channel)
+        assert channel in shard.subscriptions
+
+        manager.disconnect(websocket, conversation_id)
+        await asyncio.sleep(0.1)
+
+        assert conversation_id not in manager.active_connections
+        assert channel not in shard.subscriptions
+
+    async def test_subscriber_error(
+        self, manager: ConnectionManager, mocker: MockerFixture
+    ) -> None:
+        conversation_id = uuid4()
+        subscribe = mocker.patch.object(
+            manager.multiplexer, "subscribe", side_effect=ConnectionError()
+        )
+        await manager.connect(_websocket(), conversation_id)
+        await asyncio.sleep(0.05)
+
+        # The failed subscriber is dropped, and started again by the next client
+        assert conversation_id not in manager._subscribers
+        await manager.connect(_websocket(), conversation_id)
+        assert conversation_id in manager._subscribers
+        await asyncio.sleep(0.05)
+        assert subscribe.call_count == 2
@@ -187,3 +187,74 @@ class TestIntentClassifier:
         assert entities.get("color") == "blue"
         assert entities.get("size") == "L"
         assert entities.get("quantity") == 2
+
+    def test_classify_rules_priority(self, classifier):
+        """Test rules are tried in order, whatever their position in the message."""
+        result = classifier._classify_rules("complete order")
+
+        assert result is not None
+        assert result.intent == Intent.PURCHASE_INTENT
+        assert result.reasoning == "Rule pattern matched: (purchase|get this|order)"
+
+    @pytest.mark.asyncio
+    async def test_classify_with_llm_cache(self, classifier):
+        """Test LLM classifications are cached by normalized message and context."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        classifier.llm_client = MagicMock()
+        classifier.llm_client.classify_intent = AsyncMock(
+            return_value={"intent": "product_query", "confidence": 0.8}
+        )
+
+        result = await classifier.classify_with_llm(
+            "Any  Trail shoes?", [], {"stage": "browsing"}
+        )
+        cached = await classifier.classify_with_llm(
+            "any trail shoes? ", [], {"stage": "browsing"}
+        )
+
+        assert result.intent == Intent.PRODUCT_QUERY
+        assert cached == result
+        classifier.llm_client.classify_intent.assert_awaited_once()
+
+        await classifier.classify_with_llm(
+            "any trail shoes?", [], {"stage": "checkout"}
+        )
+        assert classifier.llm_client.classify_intent.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_classify_with_llm_cache_history(self, classifier):
+        """Test the LLM cache key covers the history window of the prompt."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        classifier.llm_client = MagicMock()
+        classifier.llm_client.classify_intent = AsyncMock(
+            return_value={"intent": "product_query", "confidence": 0.8}
+        )
+        history = [
+            {"role": "user", "content": "Hi"},
+            {"role": "agent", "content": "Hello!"},
+            {"role": "user", "content": "Do you sell shoes?"},
+            {"role": "agent", "content": "Yes, we do."},
+        ]
+
+        await classifier.classify_with_llm("any trail ones?", history, {})
+        # Same last message, different earlier messages in the window
+        await classifier.classify_with_llm(
+            "any trail ones?",
+            [
+                *history[:2],
+                {"role": "user", "content": "Do you sell socks?"},
+                history[3],
+            ],
+            {},
+        )
+        assert classifier.llm_client.classify_intent.await_count == 2
+
+        # Only messages out of the window differ
+        await classifier.classify_with_llm(
+            "any trail ones?",
+            [{"role": "user", "content": "Hey"}, *history[1:]],
+            {},
+        )
+        assert classifier.llm_client.classify_intent.await_count == 2
@@ -0,0 +1,135 @@
+"""Tests for the multi-pattern matcher."""
+
+import random
+import re
+
+import pytest
+
+from polar.agent_conversation.intent_classifier import IntentClassifier
+from polar.agent_conversation.pattern_matcher import MultiPatternMatcher
+
+
+def _first_search(patterns: list[str], text: str, flags: int = 0) -> int | None:
+    for index, pattern in enumerate(patterns):
+        if re.search(pattern, text, flags):
+            return index
+    return None
+
+
+class TestMultiPatternMatcher:
+    @pytest.mark.parametrize(
+        ("text", "expected"),
+        [
+            ("hello there", 0),
+            ("well, hello", 1),
+            ("that's all", 2),
+            ("thats all", 2),
+            ("it costs $120", 3),
+            ("it costs 120 dollars", 3),
+            ("nothing to see", None),
+        ],
+    )
+    def test_first(self, text: str, expected: int | None) -> None:
+        matcher = MultiPatternMatcher(
+            [
+                r"^(hi|hello)",
+                r"(hello|hey)",
+                r"that'?s all",
+                r"(\$\d+|[0-9]+ dollars?)",
+            ]
+        )
+
+        assert matcher.first(text) == expected
+
+    def test_priority_over_position(self) -> None:
+        matcher = MultiPatternMatcher(["order", "complete order"])
+
+        # Like searching each pattern in turn, not the leftmost match
+        assert matcher.first("complete order") == 0
+
+    def test_residual_priority(self) -> None:
+        matcher = MultiPatternMatcher([r"\d+ items", "items"])
+
+        assert matcher.first("3 items") == 0
+        assert matcher.first("items") == 1
+
+    def test_ignore_case(self) -> None:
+        matcher = MultiPatternMatcher(["Hello", r"\bBYE\b"], ignore_case=True)
+
+        assert matcher.first("HELLO") == 0
+        assert matcher.first("ok bye") == 1
+
+    def test_same_as_sequential_search(self) -> None:
+        rng = random.Random(0)
+        for _ in range(200):
+            patterns = []
+            for _ in range(rng.randint(1, 8)):
+                alternatives = [
+                    "".join(rng.choices("abc", k=rng.randint(1, 4)))
+                    for _ in range(rng.randint(1, 3))
+                ]
+                pattern = f"({'|'.join(alternatives)})"
+                if rng.random() < 0.3:
+                    pattern += f"?{rng.choice('abc')}"
+                if rng.random() < 0.2:
+                    pattern = f"^{pattern}"
+                patterns.append(pattern)
+            matcher = MultiPatternMatcher(patterns)
+
+            for _ in range(20):
+                text = "".join(rng.choices("abcd", k=rng.randint(0, 12)))
+                assert matcher.first(text) == _first_search(patterns, text)
+
+    def test_intent_rules_same_as_sequential_search(self) -> None:
+        patterns = [
+            pattern
+            for patterns in IntentClassifier.PATTERNS.values()
+            for pattern in patterns
+        ]
+        matcher = MultiPatternMatcher(patterns, ignore_case=True)
+        words = [
+            "hi",
+            "hello",
+            "hey",
+            "bye",
+            "thanks",
+            "complete",
+            "order",
+            "need",
+            "discount",
+            "price",
+            "shipping",
+            "return",
+            "card",
+            "maybe",
+            "human",
+            "$100",
+            "5",
+            "dollars",
+            "sale",
+            "deal",
+            "let's",
+            "do",
+            "this",
+            "i'll",
+            "take",
+            "it",
+            "checkout",
+            "shoes",
+            "blue",
+            "xl",
+            "cost",
+            "how",
+            "much",
+            "talk",
+            "to",
+            "got",
+            "it",
+            "that's",
+            "all",
+        ]
+
+        rng = random.Random(0)
+        for _ in range(2000):
+            text = " ".join(rng.choices(words, k=rng.randint(1, 8)))
+            assert matcher.first(text) == _first_search(patterns, text, re.IGNORECASE)
@@ -1,10 +1,12 @@
 """Tests for Agent Core orchestrator."""
 
+import asyncio
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
 from polar.agent.enums import Action, Intent
-from polar.agent_core.orchestrator import AgentOrchestrator
+from polar.agent_core.orchestrator import AgentOrchestrator, TurnContext
 from polar.agent_llm.base import LLMResponse
 
 
@@ -28,20 +30,17 @@ class TestAgentOrchestrator:
         self, orchestrator, mock_session, conversation, user_message
     ):
         """Test Layer 1: Conversation Understanding."""
-        with patch(
-            "polar.agent.service.message_service.get_conversation_messages"
-        ) as mock_get_messages:
-            mock_get_messages.return_value = []
+        turn = TurnContext(
+            session=mock_session, conversation=conversation, user_message=user_message
+        )
 
-            result = await orchestrator._understand_conversation(
-                mock_session, conversation, user_message
-            )
+        result = await orchestrator._understand_conversation(turn)
 
-            assert "intent" in result
-            assert "entities" in result
-            assert "confidence" in result
-            assert "reasoning" in result
-            assert isinstance(result["intent"], Intent)
+        assert "intent" in result
+        assert "entities" in result
+        assert "confidence" in result
+        assert "reasoning" in result
+        assert isinstance(result["intent"], Intent)
 
     @pytest.mark.asyncio
     async def test_enrich_context(
@@ -55,23 +54,100 @@ class TestAgentOrchestrator:
             "reasoning": "Test",
         }
 
-        with patch(
-            "polar.agent.service.message_service.get_conversation_messages"
-        ) as mock_get_messages:
-            mock_get_messages.return_value = []
+        turn = TurnContext(
+            session=mock_session, conversation=conversation, user_message=user_message
+        )
+        knowledge_task = asyncio.create_task(
+            AsyncMock(return_value={"rag_context": "Products"})()
+        )
 
-            result = await orchestrator._enrich_context(
-                mock_session, conversation, understanding
-            )
+        result = await orchestrator._enrich_context(
+            turn, understanding, knowledge_task
+        )
+
+        assert "history" in result
+        assert "customer_profile" in result
+        assert "knowledge" in result
+        assert "conversation_stage" in result
+        assert "cart" in result
+        assert "hesitation_signals" in result
+        assert result["knowledge"] == {"rag_context": "Products"}
+        assert result["conversation_stage"] == "discovery"
+        assert result["hesitation_signals"] == 0
+
+    @pytest.mark.asyncio
+    async def test_enrich_context_cancels_knowledge(
+        self, orchestrator, mock_session, conversation, user_message
+    ):
+        """Test Layer 2: knowledge lookup is cancelled when not needed."""
+        understanding = {
+            "intent": Intent.GREETING,
+            "entities": {},
+            "confidence": 0.95,
+            "reasoning": "Test",
+        }
+        turn = TurnContext(
+            session=mock_session, conversation=conversation, user_message=user_message
+        )
+        knowledge_task = asyncio.create_task(asyncio.sleep(10, result={}))
+
+        result = await orchestrator._enrich_context(
+            turn, understanding, knowledge_task
+        )
 
-            assert "history" in result
-            assert "customer_profile" in result
-            assert "knowledge" in result
-            assert "conversation_stage" in result
-            assert "cart" in result
-            assert "hesitation_signals" in result
-            assert result["conversation_stage"] == "discovery"
-            assert result["hesitation_signals"] == 0
+        assert result["knowledge"] == {}
+        with pytest.raises(asyncio.CancelledError):
+            await knowledge_task
+
+    @pytest.mark.asyncio
+    async def test_enrich_context_retrieves_knowledge_not_started(
+        self, orchestrator, mock_session, conversation, user_message
+    ):
+        """Test Layer 2: knowledge is retrieved when the lookup wasn't started."""
+        understanding = {
+            "intent": Intent.PRODUCT_QUERY,
+            "entities": {},
+            "confidence": 0.95,
+            "reasoning": "Test",
+        }
+        turn = TurnContext(
+            session=mock_session, conversation=conversation, user_message=user_message
+        )
+
+        with patch.object(
+            orchestrator,
+            "_retrieve_knowledge",
+            AsyncMock(return_value={"rag_context": "Products"}),
+        ):
+            result = await orchestrator._enrich_context(turn, understanding, None)
+
+        assert result["knowledge"] == {"rag_context": "Products"}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("content", "started"),
+        [
+            ("I'm looking for running shoes", True),
+            ("Hello there", False),
+            ("Something without any rule", True),
+        ],
+    )
+    async def test_start_knowledge_retrieval(
+        self, orchestrator, mock_session, conversation, user_message, content, started
+    ):
+        """Test the knowledge lookup is skipped for rule-resolved intents."""
+        user_message.content = content
+        turn = TurnContext(
+            session=mock_session, conversation=conversation, user_message=user_message
+        )
+
+        with patch.object(
+            orchestrator, "_retrieve_knowledge", AsyncMock(return_value={})
+        ):
+            knowledge_task = orchestrator._start_knowledge_retrieval(turn)
+            assert (knowledge_task is not None) is started
+            if knowledge_task is not None:
+                await knowledge_task
 
     @pytest.mark.asyncio
     async def test_make_decision_product_query(
@@ -102,6 +178,9 @@ class TestAgentOrchestrator:
         assert "parameters" in result
         assert result["parameters"]["query"] == "shoes"
         assert result["parameters"]["max_price"] == 15000
+        assert result["parameters"]["organization_id"] == str(
+            conversation.organization_id
+        )
 
     @pytest.mark.asyncio
     async def test_make_decision_checkout(
@@ -336,10 +415,11 @@ class TestAgentOrchestrator:
     ):
         """Test complete message processing through all 6 layers."""
         conversation.agent = agent
+        get_conversation_messages = AsyncMock(return_value=[])
 
         with patch.multiple(
             "polar.agent.service.message_service",
-            get_conversation_messages=AsyncMock(return_value=[]),
+            get_conversation_messages=get_conversation_messages,
             create_agent_message=AsyncMock(
                 return_value=MagicMock(id="msg_123", content="Response")
             ),
@@ -359,6 +439,7 @@ class TestAgentOrchestrator:
             # Should return agent message
             assert result is not None
             mock_session.add.assert_called()  # State updated
+            get_conversation_messages.assert_awaited_once()  # History loaded once
 
     @pytest.mark.asyncio
     async def test_process_message_error_handling(
@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from pytest_mock import MockerFixture
+
+from polar.agent_knowledge.embedding_service import (
+    OpenAIEmbeddingService,
+    ProductEmbeddingGenerator,
+)
+from polar.models.product_price import ProductPriceAmountType
+
+
+def _vector(seed: int) -> list[float]:
+    # Exactly representable in float32
+    return [seed + i / 4 for i in range(4)]
+
+
+@pytest.fixture
+def embed_batch_mock(mocker: MockerFixture) -> AsyncMock:
+    mock = AsyncMock(
+        side_effect=lambda texts, model: [_vector(int(text)) for text in texts]
+    )
+    mocker.patch(
+        "polar.agent_knowledge.embedding_service._openai_client",
+        new=MagicMock(embed_batch=mock),
+    )
+    return mock
+
+
+@pytest.mark.asyncio
+class TestEmbedBatch:
+    async def test_cache_tiers(self, embed_batch_mock: AsyncMock) -> None:
+        redis = FakeAsyncRedis()
+        service = OpenAIEmbeddingService(dimensions=4, redis=redis)
+
+        results = await service.embed_batch(["1", "2", "1"])
+        assert [result.embedding for result in results] == [
+            _vector(1),
+            _vector(2),
+            _vector(1),
+        ]
+        embed_batch_mock.assert_awaited_once_with(
+            ["1", "2"], model="text-embedding-3-small"
+        )
+
+        # Stored as packed float32
+        value = await redis.get(service._cache_key("1"))
+        assert value is not None
+        assert len(value) == 4 * 4
+
+        # Served from Redis by a fresh process
+        embed_batch_mock.reset_mock()
+        other_service = OpenAIEmbeddingService(dimensions=4, redis=redis)
+        results = await other_service.embed_batch(["2", "3"])
+        assert [result.embedding for result in results] == [_vector(2), _vector(3)]
+        embed_batch_mock.assert_awaited_once_with(["3"], model="text-embedding-3-small")
+
+        # Served from the local tier
+        await redis.flushall()
+        embed_batch_mock.reset_mock()
+        results = await other_service.embed_batch(["2", "3"])
+        assert [result.embedding for result in results] == [_vector(2), _vector(3)]
+        embed_batch_mock.assert_not_awaited()
+
+    async def test_invalid_cached_value(self, embed_batch_mock: AsyncMock) -> None:
+        redis = FakeAsyncRedis()
+        service = OpenAIEmbeddingService(dimensions=4, redis=redis)
+        await redis.set(service._cache_key("1"), b"[0.1, 0.2, 0.3, 0.4]")
+
+        results = await service.embed_batch(["1"])
+
+        assert results[0].embedding == _vector(1)
+        embed_batch_mock.assert_awaited_once()
+
+
+class TestProductEmbeddingGenerator:
+    @pytest.mark.parametrize(
+        ("price", "expected_amount", "expected_text"),
+        [
+            (None, None, None),
+            (
+                SimpleNamespace(
+                    amount_type=ProductPriceAmountType.fixed, price_amount=1500
+                ),
+                1500,
+                "Price: $15.00",
+            ),
+            (
+                SimpleNamespace(amount_type=ProductPriceAmountType.free),
+                0,
+                "Price: $0.00",
+            ),
+            (SimpleNamespace(amount_type=ProductPriceAmountType.custom), None, None),
+        ],
+    )
+    def test_price(
+        self, price: Any, expected_amount: int | None, expected_text: str | None
+    ) -> None:
+        product = SimpleNamespace(
+            name="Product", description=None, get_static_price=lambda: price
+        )
+        generator = ProductEmbeddingGenerator(MagicMock())
+
+        assert generator.get_price_amount(product) == expected_amount
+        text = generator.prepare_product_text(product)
+        if expected_text is None:
+            assert "Price" not in text
+        else:
+            assert text.endswith(expected_text)
@@ -0,0 +1,90 @@
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fakeredis import FakeAsyncRedis
+
+from polar.agent_knowledge.base import VectorRecord
+from polar.agent_knowledge.local_index import LocalIndexCache, LocalVectorIndex
+
+
+def _record(
+    embedding: list[float], price: int | None = None, category: str | None = None
+) -> VectorRecord:
+    return VectorRecord(
+        id=str(uuid.uuid4()),
+        embedding=embedding,
+        content="Product",
+        metadata={"price": price, "category": category},
+    )
+
+
+class TestLocalVectorIndex:
+    def test_search(self) -> None:
+        records = [
+            _record([1.0, 0.0]),
+            _record([0.0, 2.0]),
+            _record([1.0, 1.0]),
+        ]
+        index = LocalVectorIndex(records)
+
+        results = index.search([3.0, 0.0], limit=2)
+
+        assert [result.id for result in results] == [records[0].id, records[2].id]
+        assert results[0].score == pytest.approx(1.0)
+        assert results[1].score == pytest.approx(0.7071, abs=1e-4)
+
+    def test_search_filters(self) -> None:
+        records = [
+            _record([1.0, 0.0], price=1000, category="books"),
+            _record([1.0, 0.1], price=5000, category="books"),
+            _record([1.0, 0.2], price=None, category="books"),
+            _record([1.0, 0.3], price=2000, category="software"),
+        ]
+        index = LocalVectorIndex(records)
+
+        results = index.search(
+            [1.0, 0.0], limit=5, filters={"category": "books", "min_price": 2000}
+        )
+        assert [result.id for result in results] == [records[1].id]
+
+        results = index.search([1.0, 0.0], limit=5, filters={"max_price": 2000})
+        assert [result.id for result in results] == [records[0].id, records[3].id]
+
+    def test_empty(self) -> None:
+        assert LocalVectorIndex([]).search([1.0, 0.0]) == []
+
+
+@pytest.mark.asyncio
+class TestLocalIndexCache:
+    async def test_versioning(self) -> None:
+        redis = FakeAsyncRedis()
+        vector_store = MagicMock()
+        vector_store.get_vectors = AsyncMock(return_value=[_record([1.0, 0.0])])
+        cache = LocalIndexCache(vector_store, redis=redis)
+        other_cache = LocalIndexCache(vector_store, redis=redis)
+        organization_id = uuid.uuid4()
+
+        index = await cache.get(organization_id)
+        assert index is not None
+        assert await cache.get(organization_id) is index
+        vector_store.get_vectors.assert_awaited_once()
+
+        await other_cache.invalidate(organization_id)
+
+        assert await cache.get(organization_id) is not index
+        assert vector_store.get_vectors.await_count == 2
+
+    async def test_too_large(self) -> None:
+        vector_store = MagicMock()
+        vector_store.get_vectors = AsyncMock(
+            return_value=[_record([1.0, 0.0]) for _ in range(3)]
+        )
+        cache = LocalIndexCache(vector_store, redis=FakeAsyncRedis(), max_vectors=2)
+        organization_id = uuid.uuid4()
+
+        assert await cache.get(organization_id) is None
+        assert await cache.get(organization_id) is None
+        vector_store.get_vectors.assert_awaited_once_with(
+            {"organization_id": organization_id}, limit=3
+        )
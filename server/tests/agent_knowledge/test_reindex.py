@@ -0,0 +1,172 @@
+import time
+import uuid
+from collections.abc import AsyncIterator
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import dramatiq
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.agent_knowledge.base import EmbeddingResult
+from polar.agent_knowledge.reindex import (
+    PENDING_KEY,
+    pop_due_reindexes,
+    schedule_reindex,
+)
+from polar.agent_knowledge.service import KnowledgeService
+from polar.redis import Redis
+from polar.worker import JobQueueManager
+
+
+def _product(organization_id: uuid.UUID, name: str) -> Any:
+    return SimpleNamespace(
+        id=uuid.uuid4(),
+        organization_id=organization_id,
+        name=name,
+        description=None,
+        get_static_price=lambda: None,
+    )
+
+
+@pytest.fixture
+def embedding_service() -> MagicMock:
+    embedding_service = MagicMock()
+    embedding_service.embed_batch = AsyncMock(
+        side_effect=lambda texts: [
+            EmbeddingResult(embedding=[0.1, 0.2], model="test", dimensions=2)
+            for _ in texts
+        ]
+    )
+    return embedding_service
+
+
+@pytest.fixture
+def vector_store() -> MagicMock:
+    vector_store = MagicMock()
+    vector_store.upsert_many = AsyncMock()
+    vector_store.delete_many = AsyncMock()
+    return vector_store
+
+
+@pytest.fixture
+def local_index() -> MagicMock:
+    local_index = MagicMock()
+    local_index.invalidate = AsyncMock()
+    return local_index
+
+
+@pytest.fixture
+def knowledge_service(
+    embedding_service: MagicMock, vector_store: MagicMock, local_index: MagicMock
+) -> KnowledgeService:
+    return KnowledgeService(
+        MagicMock(),
+        embedding_service=embedding_service,
+        vector_store=vector_store,
+        local_index=local_index,
+    )
+
+
+def _set_products(
+    mocker: MockerFixture, knowledge_service: KnowledgeService, products: list[Any]
+) -> None:
+    async def _iter_products(*args: Any) -> AsyncIterator[list[Any]]:
+        yield products
+
+    mocker.patch.object(knowledge_service, "_iter_products", new=_iter_products)
+
+
+@pytest.mark.asyncio
+class TestReindexOrganization:
+    async def test_only_changed(
+        self,
+        mocker: MockerFixture,
+        knowledge_service: KnowledgeService,
+        embedding_service: MagicMock,
+        vector_store: MagicMock,
+        local_index: MagicMock,
+    ) -> None:
+        organization_id = uuid.uuid4()
+        unchanged = _product(organization_id, "Unchanged")
+        changed = _product(organization_id, "Changed")
+        new = _product(organization_id, "New")
+        deleted_id = str(uuid.uuid4())
+        generator = knowledge_service.product_embedding_generator
+        vector_store.get_content_hashes = AsyncMock(
+            return_value={
+                str(unchanged.id): generator.content_hash(unchanged),
+                str(changed.id): generator.content_hash(_product(organization_id, "")),
+                deleted_id: "hash",
+            }
+        )
+        _set_products(mocker, knowledge_service, [unchanged, changed, new])
+
+        report = await knowledge_service.reindex_organization(
+            MagicMock(), organization_id
+        )
+
+        assert (report.products, report.embedded, report.skipped, report.deleted) == (
+            3,
+            2,
+            1,
+            1,
+        )
+        embedding_service.embed_batch.assert_awaited_once_with(
+            ["Name: Changed", "Name: New"]
+        )
+        [records] = vector_store.upsert_many.await_args.args
+        assert [record.id for record in records] == [str(changed.id), str(new.id)]
+        assert records[0].metadata["content_hash"] == generator.content_hash(changed)
+        vector_store.delete_many.assert_awaited_once_with([deleted_id])
+        local_index.invalidate.assert_awaited_once_with(organization_id)
+
+    async def test_unchanged(
+        self,
+        mocker: MockerFixture,
+        knowledge_service: KnowledgeService,
+        embedding_service: MagicMock,
+        vector_store: MagicMock,
+        local_index: MagicMock,
+    ) -> None:
+        organization_id = uuid.uuid4()
+        products = [_product(organization_id, f"Product {i}") for i in range(3)]
+        generator = knowledge_service.product_embedding_generator
+        vector_store.get_content_hashes = AsyncMock(
+            return_value={str(p.id): generator.content_hash(p) for p in products}
+        )
+        _set_products(mocker, knowledge_service, products)
+
+        report = await knowledge_service.reindex_organization(
+            MagicMock(), organization_id
+        )
+
+        assert (report.embedded, report.skipped, report.deleted) == (0, 3, 0)
+        embedding_service.embed_batch.assert_not_awaited()
+        vector_store.upsert_many.assert_not_awaited()
+        local_index.invalidate.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+class TestScheduleReindex:
+    async def test_debounced(self, decoding_redis: Redis) -> None:
+        organization_id = uuid.uuid4()
+
+        # Coalesced within a unit of work
+        schedule_reindex(organization_id)
+        schedule_reindex(organization_id)
+        await JobQueueManager.get().flush(dramatiq.get_broker(), decoding_redis)
+
+        assert await decoding_redis.zcard(PENDING_KEY) == 1
+        # Not due before the debounce elapsed
+        assert await pop_due_reindexes(decoding_redis) == []
+
+        settled_id = uuid.uuid4()
+        await decoding_redis.zadd(PENDING_KEY, {str(settled_id): time.time() - 120})
+
+        assert await pop_due_reindexes(decoding_redis) == [settled_id]
+        assert await pop_due_reindexes(decoding_redis) == []
+        assert (
+            await decoding_redis.zscore(PENDING_KEY, str(organization_id)) is not None
+        )
@@ -0,0 +1,134 @@
+import struct
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import TextClause
+
+from polar.agent_knowledge.base import VectorRecord
+from polar.agent_knowledge.vector_store import (
+    PgvectorStore,
+    ProductVectorStore,
+    decode_vector,
+    encode_vector,
+)
+
+
+def test_vector_binary_format() -> None:
+    data = encode_vector([1.0, -0.5, 0.25])
+
+    assert data[:4] == struct.pack(">HH", 3, 0)
+    assert data[4:] == struct.pack(">3f", 1.0, -0.5, 0.25)
+    assert decode_vector(data) == [1.0, -0.5, 0.25]
+
+
+@pytest.mark.asyncio
+async def test_upsert_products() -> None:
+    vector_store = MagicMock()
+    vector_store.upsert_many = AsyncMock()
+    product_vector_store = ProductVectorStore(vector_store)
+    organization_id = uuid.uuid4()
+    product_ids = [uuid.uuid4(), uuid.uuid4()]
+
+    await product_vector_store.upsert_products(
+        [
+            (
+                product_id,
+                [0.1, 0.2],
+                {"organization_id": organization_id, "name": "Product"},
+            )
+            for product_id in product_ids
+        ]
+    )
+
+    vector_store.upsert_many.assert_awaited_once()
+    [records] = vector_store.upsert_many.await_args.args
+    assert [record.id for record in records] == [str(id) for id in product_ids]
+    assert records[0].metadata["organization_id"] == str(organization_id)
+    assert records[0].content == "Product "
+
+
+@pytest.mark.asyncio
+async def test_search_products_pushes_down_filters() -> None:
+    vector_store = MagicMock()
+    vector_store.search = AsyncMock(return_value=[])
+    product_vector_store = ProductVectorStore(vector_store)
+    organization_id = uuid.uuid4()
+
+    await product_vector_store.search_products(
+        [0.1, 0.2],
+        limit=10,
+        organization_id=organization_id,
+        min_price=0,
+        max_price=1000,
+        category="books",
+    )
+
+    vector_store.search.assert_awaited_once_with(
+        embedding=[0.1, 0.2],
+        limit=10,
+        filters={
+            "organization_id": str(organization_id),
+            "category": "books",
+            "min_price": 0,
+            "max_price": 1000,
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_rebuild_secondary_indexes() -> None:
+    statements: list[str] = []
+
+    async def execute(statement: TextClause, *args: Any) -> MagicMock:
+        sql = " ".join(str(statement).split())
+        statements.append(sql)
+        result = MagicMock()
+        if "pg_get_constraintdef" in sql:
+            result.fetchall.return_value = [
+                ("product_embeddings_pkey", "PRIMARY KEY (id)")
+            ]
+        elif "pg_get_indexdef" in sql:
+            result.fetchall.return_value = [
+                (
+                    "ix_product_embeddings_organization_id",
+                    False,
+                    (
+                        "CREATE INDEX ix_product_embeddings_organization_id "
+                        "ON public.product_embeddings USING btree (organization_id)"
+                    ),
+                )
+            ]
+        return result
+
+    session = MagicMock()
+    session.execute = AsyncMock(side_effect=execute)
+    session.commit = AsyncMock()
+    session_maker = MagicMock()
+    session_maker.return_value.__aenter__ = AsyncMock(return_value=session)
+    session_maker.return_value.__aexit__ = AsyncMock(return_value=None)
+
+    vector_store = PgvectorStore(session_maker)
+    vector_store._copy_records = AsyncMock()  # type: ignore[method-assign]
+
+    async def batches() -> AsyncIterator[Sequence[VectorRecord]]:
+        yield [VectorRecord(id="1", embedding=[0.1, 0.2], content="", metadata={})]
+
+    count = await vector_store.rebuild(batches(), method="hnsw")
+
+    assert count == 1
+    assert (
+        "CREATE INDEX ix_product_embeddings_organization_id_rebuild "
+        "ON product_embeddings_rebuild USING btree (organization_id)"
+    ) in statements
+    assert any(
+        "CREATE INDEX product_embeddings_rebuild_embedding_idx "
+        "ON product_embeddings_rebuild USING hnsw" in sql
+        for sql in statements
+    )
+    assert (
+        "ALTER INDEX ix_product_embeddings_organization_id_rebuild "
+        "RENAME TO ix_product_embeddings_organization_id"
+    ) in statements
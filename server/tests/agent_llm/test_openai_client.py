@@ -0,0 +1,41 @@
+"""Tests for the OpenAI client."""
+
+import json
+
+import httpx
+import pytest
+
+from polar.agent_llm.openai_client import OpenAIClient
+
+
+@pytest.mark.asyncio
+async def test_embed_batch() -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        inputs = json.loads(request.content)["input"]
+        # Returned out of order
+        data = [
+            {"index": i, "embedding": [float(len(text))]}
+            for i, text in reversed(list(enumerate(inputs)))
+        ]
+        return httpx.Response(200, json={"data": data})
+
+    client = OpenAIClient(
+        api_key="test",
+        http_client=httpx.AsyncClient(
+            base_url="http://fake-provider", transport=httpx.MockTransport(handler)
+        ),
+    )
+    client.EMBED_BATCH_SIZE = 2
+
+    embeddings = await client.embed_batch(["a", "bb", "ccc"])
+
+    assert embeddings == [[1.0], [2.0], [3.0]]
+    assert [json.loads(request.content)["input"] for request in requests] == [
+        ["a", "bb"],
+        ["ccc"],
+    ]
+    assert requests[0].headers["Authorization"] == "Bearer test"
+    assert await client.embed("dddd") == [4.0]
@@ -0,0 +1,199 @@
+"""Tests for LLM clients streaming, against a local fake provider."""
+
+import json
+import time
+
+import httpx
+import pytest
+
+from polar.agent_llm.anthropic_client import AnthropicClient
+from polar.agent_llm.base import LLMMessage
+from polar.agent_llm.openai_client import OpenAIClient
+from tests.fixtures.llm import anthropic_events, fake_provider, openai_events
+
+MESSAGES = [
+    LLMMessage(role="system", content="You are a sales agent."),
+    LLMMessage(role="user", content="Hello"),
+]
+
+# Built by the orchestrator: agent history, then tool results as a system message
+CONVERSATION_MESSAGES = [
+    LLMMessage(role="system", content="You are a sales agent."),
+    LLMMessage(role="user", content="Hello"),
+    LLMMessage(role="agent", content="Hi! How can I help?"),
+    LLMMessage(role="user", content="Running shoes, please"),
+    LLMMessage(role="system", content="Tool execution results: Trail Runner"),
+]
+
+
+class TestAnthropicClientStreaming:
+    @pytest.mark.asyncio
+    async def test_yields_text_deltas(self) -> None:
+        requests: list[httpx.Request] = []
+        client = AnthropicClient(
+            api_key="test",
+            http_client=fake_provider(
+                anthropic_events(["Hel", "lo", "!"]), requests=requests
+            ),
+        )
+
+        stream = await client.chat(MESSAGES, stream=True)
+        chunks = [chunk async for chunk in stream]
+
+        assert chunks == ["Hel", "lo", "!"]
+
+        request = requests[0]
+        assert request.url.path == "/v1/messages"
+        assert request.headers["x-api-key"] == "test"
+        payload = json.loads(request.content)
+        assert payload["stream"] is True
+        assert payload["system"] == "You are a sales agent."
+        assert payload["messages"] == [{"role": "user", "content": "Hello"}]
+
+    @pytest.mark.asyncio
+    async def test_conversation_roles(self) -> None:
+        requests: list[httpx.Request] = []
+        client = AnthropicClient(
+            api_key="test",
+            http_client=fake_provider(anthropic_events(["Sure"]), requests=requests),
+        )
+
+        stream = await client.chat(CONVERSATION_MESSAGES, stream=True)
+        assert [chunk async for chunk in stream] == ["Sure"]
+
+        payload = json.loads(requests[0].content)
+        assert payload["system"] == (
+            "You are a sales agent.\n\nTool execution results: Trail Runner"
+        )
+        assert payload["messages"] == [
+            {"role": "user", "content": "Hello"},
+            {"role": "assistant", "content": "Hi! How can I help?"},
+            {"role": "user", "content": "Running shoes, please"},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_yields_first_token_before_end(self) -> None:
+        client = AnthropicClient(
+            api_key="test",
+            http_client=fake_provider(anthropic_events(["Hello", "!"]), delay=0.1),
+        )
+
+        stream = await client.chat(MESSAGES, stream=True)
+        arrivals: list[float] = []
+        async for _ in stream:
+            arrivals.append(time.perf_counter())
+        end = time.perf_counter()
+
+        # The first delta is yielded as soon as received, before the 4 next events
+        assert len(arrivals) == 2
+        assert end - arrivals[0] >= 0.3
+
+    @pytest.mark.asyncio
+    async def test_error_event(self) -> None:
+        client = AnthropicClient(
+            api_key="test",
+            http_client=fake_provider(
+                [
+                    ("message_start", {"type": "message_start"}),
+                    (
+                        "error",
+                        {
+                            "type": "error",
+                            "error": {
+                                "type": "overloaded_error",
+                                "message": "Overloaded",
+                            },
+                        },
+                    ),
+                ]
+            ),
+        )
+
+        stream = await client.chat(MESSAGES, stream=True)
+        with pytest.raises(httpx.HTTPError, match="overloaded_error"):
+            async for _ in stream:
+                pass
+
+    @pytest.mark.asyncio
+    async def test_error_status(self) -> None:
+        client = AnthropicClient(
+            api_key="test", http_client=fake_provider([], status_code=529)
+        )
+
+        stream = await client.chat(MESSAGES, stream=True)
+        with pytest.raises(httpx.HTTPStatusError):
+            async for _ in stream:
+                pass
+
+    @pytest.mark.asyncio
+    async def test_without_api_key(self) -> None:
+        requests: list[httpx.Request] = []
+        client = AnthropicClient(
+            api_key="test",
+            http_client=fake_provider(anthropic_events(["Hi"]), requests=requests),
+        )
+        client.api_key = None
+
+        stream = await client.chat(MESSAGES, stream=True)
+        chunks = [chunk async for chunk in stream]
+
+        assert chunks == ["[Streaming placeholder]"]
+        assert requests == []
+
+
+class TestOpenAIClientStreaming:
+    @pytest.mark.asyncio
+    async def test_yields_content_deltas(self) -> None:
+        requests: list[httpx.Request] = []
+        client = OpenAIClient(
+            api_key="test",
+            http_client=fake_provider(
+                openai_events(["Hel", "lo", "!"]), requests=requests
+            ),
+        )
+
+        stream = await client.chat(MESSAGES, stream=True)
+        chunks = [chunk async for chunk in stream]
+
+        assert chunks == ["Hel", "lo", "!"]
+
+        request = requests[0]
+        assert request.url.path == "/chat/completions"
+        assert request.headers["authorization"] == "Bearer test"
+        payload = json.loads(request.content)
+        assert payload["stream"] is True
+        assert payload["messages"][0] == {
+            "role": "system",
+            "content": "You are a sales agent.",
+        }
+
+    @pytest.mark.asyncio
+    async def test_conversation_roles(self) -> None:
+        requests: list[httpx.Request] = []
+        client = OpenAIClient(
+            api_key="test",
+            http_client=fake_provider(openai_events(["Sure"]), requests=requests),
+        )
+
+        stream = await client.chat(CONVERSATION_MESSAGES, stream=True)
+        assert [chunk async for chunk in stream] == ["Sure"]
+
+        payload = json.loads(requests[0].content)
+        assert [message["role"] for message in payload["messages"]] == [
+            "system",
+            "user",
+            "assistant",
+            "user",
+            "system",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_error_status(self) -> None:
+        client = OpenAIClient(
+            api_key="test", http_client=fake_provider([], status_code=429)
+        )
+
+        stream = await client.chat(MESSAGES, stream=True)
+        with pytest.raises(httpx.HTTPStatusError):
+            async for _ in stream:
+                pass
@@ -0,0 +1,222 @@
+"""Tests for the agent tool registry."""
+
+import asyncio
+import time
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from polar.agent_tools.base import BaseTool, ToolResult
+from polar.agent_tools.registry import ToolCall, ToolRegistry
+
+
+class SleepTool(BaseTool):
+    name = "sleep"
+    description = "Sleep, then echo the parameters"
+    parameters_schema = {"type": "object"}
+    timeout = 1.0
+
+    def __init__(
+        self, name: str = "sleep", idempotent: bool = False, read_only: bool = False
+    ) -> None:
+        self.name = name
+        self.idempotent = idempotent
+        self.read_only = read_only
+        self.calls = 0
+
+    async def execute(
+        self, session: AsyncSession, parameters: dict[str, Any]
+    ) -> ToolResult:
+        self.calls += 1
+        await asyncio.sleep(parameters.get("delay", 0.0))
+        if parameters.get("fail"):
+            raise ValueError("Failed")
+        return ToolResult(success=True, data={"session": session, **parameters})
+
+
+@pytest.fixture
+def histogram(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("polar.agent_tools.registry.tool_latency_histogram")
+
+
+@pytest.fixture
+def tool_sessions(mocker: MockerFixture) -> list[AsyncMock]:
+    """Sessions opened by concurrent invocations."""
+    sessions: list[AsyncMock] = []
+
+    def _sessionmaker() -> MagicMock:
+        session = AsyncMock()
+        sessions.append(session)
+        context = MagicMock()
+        context.__aenter__.return_value = session
+        return context
+
+    mocker.patch(
+        "polar.agent_tools.registry.create_async_sessionmaker",
+        return_value=_sessionmaker,
+    )
+    return sessions
+
+
+@pytest.mark.asyncio
+class TestInvoke:
+    async def test_not_found(self) -> None:
+        registry = ToolRegistry()
+
+        result = await registry.invoke(AsyncMock(), "unknown", {})
+
+        assert result.success is False
+        assert result.error == "Tool 'unknown' not found"
+
+    async def test_timeout(self, histogram: MagicMock) -> None:
+        registry = ToolRegistry()
+        tool = SleepTool()
+        tool.timeout = 0.05
+        registry.register(tool)
+
+        result = await registry.invoke(AsyncMock(), "sleep", {"delay": 1.0})
+
+        assert result.success is False
+        assert result.error == "Tool 'sleep' timed out after 0.05s"
+        histogram.record.assert_called_once()
+        assert histogram.record.call_args.kwargs["attributes"] == {
+            "tool": "sleep",
+            "outcome": "timeout",
+        }
+
+    async def test_exception(self, histogram: MagicMock) -> None:
+        registry = ToolRegistry()
+        registry.register(SleepTool())
+
+        result = await registry.invoke(AsyncMock(), "sleep", {"fail": True})
+
+        assert result.success is False
+        assert result.error == "Failed"
+        assert histogram.record.call_args.kwargs["attributes"]["outcome"] == "error"
+
+    async def test_cache_idempotent(self, histogram: MagicMock) -> None:
+        registry = ToolRegistry()
+        tool = SleepTool(idempotent=True)
+        registry.register(tool)
+        session = AsyncMock()
+
+        first = await registry.invoke(session, "sleep", {"a": 1, "b": 2})
+        second = await registry.invoke(session, "sleep", {"b": 2, "a": 1})
+        other = await registry.invoke(session, "sleep", {"a": 2})
+
+        assert first.success is True
+        assert second is first
+        assert other is not first
+        assert tool.calls == 2
+        # Cached results aren't executions
+        assert histogram.record.call_count == 2
+
+    async def test_no_cache(self, histogram: MagicMock) -> None:
+        registry = ToolRegistry()
+        tool = SleepTool()
+        registry.register(tool)
+
+        await registry.invoke(AsyncMock(), "sleep", {})
+        await registry.invoke(AsyncMock(), "sleep", {})
+
+        assert tool.calls == 2
+
+    async def test_no_cache_failure(self, histogram: MagicMock) -> None:
+        registry = ToolRegistry()
+        tool = SleepTool(idempotent=True)
+        registry.register(tool)
+
+        await registry.invoke(AsyncMock(), "sleep", {"fail": True})
+        await registry.invoke(AsyncMock(), "sleep", {"fail": True})
+
+        assert tool.calls == 2
+
+
+@pytest.mark.asyncio
+class TestInvokeMany:
+    async def test_single_call(
+        self, histogram: MagicMock, tool_sessions: list[AsyncMock]
+    ) -> None:
+        registry = ToolRegistry()
+        registry.register(SleepTool())
+        session = AsyncMock()
+
+        [result] = await registry.invoke_many(session, [ToolCall("sleep", {})])
+
+        assert result.data["session"] is session
+        assert tool_sessions == []
+
+    async def test_concurrent(
+        self, histogram: MagicMock, tool_sessions: list[AsyncMock]
+    ) -> None:
+        registry = ToolRegistry()
+        registry.register(SleepTool("first", read_only=True))
+        registry.register(SleepTool("second", read_only=True))
+        registry.register(SleepTool("failing", read_only=True))
+
+        start = time.perf_counter()
+        results = await registry.invoke_many(
+            AsyncMock(),
+            [
+                ToolCall("first", {"delay": 0.2, "index": 0}),
+                ToolCall("second", {"delay": 0.2, "index": 1}),
+                ToolCall("failing", {"delay": 0.2, "fail": True}),
+            ],
+        )
+        elapsed = time.perf_counter() - start
+
+        assert elapsed < 0.4
+        assert [r.success for r in results] == [True, True, False]
+        assert [r.data.get("index") for r in results] == [0, 1, None]
+
+        # Each call has its own session, never committed
+        assert len(tool_sessions) == 3
+        assert results[0].data["session"] is tool_sessions[0]
+        assert results[1].data["session"] is tool_sessions[1]
+        assert [s.commit.await_count for s in tool_sessions] == [0, 0, 0]
+
+    async def test_writes_in_session(
+        self, histogram: MagicMock, tool_sessions: list[AsyncMock]
+    ) -> None:
+        registry = ToolRegistry()
+        registry.register(SleepTool("read", read_only=True))
+        registry.register(SleepTool("first_write"))
+        registry.register(SleepTool("second_write"))
+        session = AsyncMock()
+
+        start = time.perf_counter()
+        results = await registry.invoke_many(
+            session,
+            [
+                ToolCall("first_write", {"delay": 0.2}),
+                ToolCall("read", {"delay": 0.2}),
+                ToolCall("second_write", {"delay": 0.2}),
+            ],
+        )
+        elapsed = time.perf_counter() - start
+
+        # Writes run one after the other in the caller's session, overlapping
+        # with the read
+        assert 0.4 <= elapsed < 0.6
+        assert results[0].data["session"] is session
+        assert results[1].data["session"] is tool_sessions[0]
+        assert results[2].data["session"] is session
+        assert len(tool_sessions) == 1
+
+    async def test_no_read_only(
+        self, histogram: MagicMock, tool_sessions: list[AsyncMock]
+    ) -> None:
+        registry = ToolRegistry()
+        registry.register(SleepTool("first"))
+        registry.register(SleepTool("second"))
+        session = AsyncMock()
+
+        results = await registry.invoke_many(
+            session, [ToolCall("first", {}), ToolCall("second", {})]
+        )
+
+        assert [r.data["session"] for r in results] == [session, session]
+        assert tool_sessions == []
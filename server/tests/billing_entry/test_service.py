@@ -6,6 +6,8 @@ import pytest
 import pytest_asyncio
 from pytest_mock.plugin import MockerFixture
 
+from polar.billing_entry.repository import BillingEntryRepository
+from polar.billing_entry.service import MeteredLineItem
 from polar.billing_entry.service import billing_entry as billing_entry_service
 from polar.enums import SubscriptionRecurringInterval
 from polar.event.system import SystemEvent
@@ -310,6 +312,7 @@ class TestCreateOrderItemsFromPending:
             "billing_entry.set_order_item",
             [entry.id for entry in entries[1:]],
             order_item.id,
+            metered_subscription.id,
         )
 
         stripe_service_mock.create_invoice_item.assert_awaited_once_with(
@@ -319,6 +322,7 @@ class TestCreateOrderItemsFromPending:
             currency=price.price_currency,
             description=order_item.label,
             metadata=ANY,
+            idempotency_key=f"invoice_item:STRIPE_INVOICE_ID:{price.id}",
         )
 
     async def test_several_metered_prices(
@@ -395,6 +399,7 @@ class TestCreateOrderItemsFromPending:
             "billing_entry.set_order_item",
             [entry.id for entry in entries[:2]],
             order_item_old_price.id,
+            metered_subscription.id,
         )
 
         order_item_current_price = next(
@@ -406,6 +411,7 @@ class TestCreateOrderItemsFromPending:
             "billing_entry.set_order_item",
             [entry.id for entry in entries[2:]],
             order_item_current_price.id,
+            metered_subscription.id,
         )
 
         stripe_service_mock.create_invoice_item.assert_has_calls(
@@ -417,6 +423,7 @@ class TestCreateOrderItemsFromPending:
                     currency=old_price.price_currency,
                     description=order_item_old_price.label,
                     metadata=ANY,
+                    idempotency_key=f"invoice_item:STRIPE_INVOICE_ID:{old_price.id}",
                 ),
                 call(
                     customer="STRIPE_CUSTOMER_ID",
@@ -425,11 +432,49 @@ class TestCreateOrderItemsFromPending:
                     currency=current_price.price_currency,
                     description=order_item_current_price.label,
                     metadata=ANY,
+                    idempotency_key=(
+                        f"invoice_item:STRIPE_INVOICE_ID:{current_price.id}"
+                    ),
                 ),
             ],
             any_order=True,
         )
 
+    async def test_stripe_retry(
+        self,
+        save_fixture: SaveFixture,
+        enqueue_job_mock: MagicMock,
+        stripe_service_mock: MagicMock,
+        session: AsyncSession,
+        customer: Customer,
+        product_metered_unit: Product,
+        metered_subscription: Subscription,
+    ) -> None:
+        price = product_metered_unit.prices[0]
+        assert is_metered_price(price)
+        await create_metered_event_billing_entry(
+            save_fixture,
+            customer=customer,
+            price=price,
+            subscription=metered_subscription,
+            tokens=10,
+        )
+
+        order_items = [
+            await billing_entry_service.create_order_items_from_pending(
+                session,
+                metered_subscription,
+                stripe_invoice_id="STRIPE_INVOICE_ID",
+                stripe_customer_id="STRIPE_CUSTOMER_ID",
+            )
+            for _ in range(2)
+        ]
+
+        # A retried invoice webhook sends the same Stripe request
+        assert order_items[0][0].id == order_items[1][0].id
+        first_call, second_call = stripe_service_mock.create_invoice_item.call_args_list
+        assert first_call == second_call
+
     async def test_credit_events(
         self,
         save_fixture: SaveFixture,
@@ -499,6 +544,7 @@ class TestCreateOrderItemsFromPending:
             "billing_entry.set_order_item",
             [entry.id for entry in entries[1:]],
             order_item.id,
+            metered_subscription.id,
         )
 
         stripe_service_mock.create_invoice_item.assert_awaited_once_with(
@@ -508,6 +554,7 @@ class TestCreateOrderItemsFromPending:
             currency=price.price_currency,
             description=order_item.label,
             metadata=ANY,
+            idempotency_key=f"invoice_item:STRIPE_INVOICE_ID:{price.id}",
         )
 
     async def test_static_price(
@@ -570,11 +617,13 @@ class TestCreateOrderItemsFromPending:
             "billing_entry.set_order_item",
             [entry.id for entry in entries[1:2]],
             order_item_1.id,
+            subscription.id,
         )
         enqueue_job_mock.assert_any_call(
             "billing_entry.set_order_item",
             [entry.id for entry in entries[2:3]],
             order_item_2.id,
+            subscription.id,
         )
 
     async def test_max_aggregation_across_product_prices(
@@ -698,3 +747,83 @@ class TestCreateOrderItemsFromPending:
         assert call_args[0] == "billing_entry.set_order_item"
         assert set(call_args[1]) == {entry.id for entry in entries}
         assert call_args[2] == order_item.id
+
+
+@pytest.mark.asyncio
+class TestComputePendingSubscriptionLineItems:
+    async def test_several_meters_single_query(
+        self,
+        save_fixture: SaveFixture,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        customer: Customer,
+        organization: Organization,
+        meter: Meter,
+    ) -> None:
+        meter_max = await create_meter(
+            save_fixture,
+            filter=Filter(conjunction=FilterConjunction.and_, clauses=[]),
+            aggregation=PropertyAggregation(
+                func=AggregationFunction.max, property="servers"
+            ),
+            organization=organization,
+        )
+        product = await create_product(
+            save_fixture,
+            organization=organization,
+            recurring_interval=SubscriptionRecurringInterval.month,
+            prices=[(meter, Decimal(100), None), (meter_max, Decimal(10_00), None)],
+        )
+        price_sum, price_max = product.prices
+        subscription = await create_active_subscription(
+            save_fixture, customer=customer, product=product
+        )
+
+        sum_entries = [
+            await create_metered_event_billing_entry(
+                save_fixture,
+                customer=customer,
+                price=price_sum,
+                subscription=subscription,
+                tokens=tokens,
+            )
+            for tokens in (10, 20)
+        ]
+        max_entries = [
+            await create_metered_event_billing_entry(
+                save_fixture,
+                customer=customer,
+                price=price_max,
+                subscription=subscription,
+                tokens=servers,
+                metadata_key="servers",
+            )
+            for servers in (1, 3, 2)
+        ]
+
+        aggregates_spy = mocker.spy(
+            BillingEntryRepository, "get_pending_metered_aggregates"
+        )
+
+        line_items = {
+            line_item.price.id: (line_item, entry_ids)
+            async for line_item, entry_ids in (
+                billing_entry_service.compute_pending_subscription_line_items(
+                    session, subscription
+                )
+            )
+        }
+
+        assert aggregates_spy.call_count == 1
+
+        sum_line_item, sum_entry_ids = line_items[price_sum.id]
+        assert isinstance(sum_line_item, MeteredLineItem)
+        assert sum_line_item.consumed_units == 30
+        assert sum_line_item.amount == 30_00
+        assert set(sum_entry_ids) == {entry.id for entry in sum_entries}
+
+        max_line_item, max_entry_ids = line_items[price_max.id]
+        assert isinstance(max_line_item, MeteredLineItem)
+        assert max_line_item.consumed_units == 3
+        assert max_line_item.amount == 30_00
+        assert set(max_entry_ids) == {entry.id for entry in max_entries}
@@ -1,10 +1,12 @@
 from typing import Any
 
+import dramatiq
 import pytest
 from pytest_mock import MockerFixture
 from sqlalchemy.exc import IntegrityError
 
 from polar.auth.models import AuthSubject, is_user
+from polar.customer.cache import customer_state_cache
 from polar.customer.schemas.customer import CustomerCreate, CustomerUpdate
 from polar.customer.service import customer as customer_service
 from polar.exceptions import PolarRequestValidationError
@@ -13,6 +15,8 @@ from polar.models import Customer, Organization, User, UserOrganization
 from polar.models.webhook_endpoint import CustomerWebhookEventType, WebhookEventType
 from polar.postgres import AsyncSession
 from polar.redis import Redis
+from polar.subscription.repository import SubscriptionRepository
+from polar.worker import JobQueueManager
 from tests.fixtures.auth import AuthSubjectFixture
 from tests.fixtures.database import SaveFixture
 from tests.fixtures.random_objects import create_customer
@@ -335,6 +339,54 @@ class TestDelete:
             )
 
 
+@pytest.mark.asyncio
+class TestGetState:
+    async def test_cached(
+        self, session: AsyncSession, redis: Redis, customer: Customer
+    ) -> None:
+        state = await customer_service.get_state(session, redis, customer)
+        cached_state = await customer_service.get_state(session, redis, customer)
+
+        assert cached_state is state
+
+    async def test_invalidate(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        customer: Customer,
+    ) -> None:
+        state = await customer_service.get_state(session, redis, customer)
+
+        customer_state_cache.invalidate(customer.id)
+        await JobQueueManager.get().flush(dramatiq.get_broker(), redis)
+
+        list_active_spy = mocker.spy(SubscriptionRepository, "list_active_by_customer")
+        refreshed_state = await customer_service.get_state(session, redis, customer)
+
+        assert refreshed_state is not state
+        list_active_spy.assert_called_once()
+
+    async def test_invalidate_meters_only(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        redis: Redis,
+        customer: Customer,
+    ) -> None:
+        state = await customer_service.get_state(session, redis, customer)
+
+        customer_state_cache.invalidate(customer.id, meters_only=True)
+        await JobQueueManager.get().flush(dramatiq.get_broker(), redis)
+
+        list_active_spy = mocker.spy(SubscriptionRepository, "list_active_by_customer")
+        refreshed_state = await customer_service.get_state(session, redis, customer)
+
+        assert refreshed_state is not state
+        assert refreshed_state.id == state.id
+        list_active_spy.assert_not_called()
+
+
 @pytest.mark.asyncio
 class TestWebhook:
     @pytest.mark.parametrize(
@@ -1,5 +1,5 @@
 import uuid
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock
 
 import pytest
 from httpx import AsyncClient
@@ -20,8 +20,8 @@ from tests.fixtures.random_objects import (
 
 
 @pytest.fixture(autouse=True)
-def email_sender_mock(mocker: MockerFixture) -> MagicMock:
-    mock = MagicMock()
+def email_sender_mock(mocker: MockerFixture) -> AsyncMock:
+    mock = AsyncMock()
     mocker.patch("polar.customer_seat.service.send_seat_invitation_email", new=mock)
     return mock
 
@@ -6,17 +6,20 @@ import stripe as stripe_lib
 from httpx import AsyncClient
 from pytest_mock import MockerFixture
 
+from polar.enums import SubscriptionRecurringInterval
 from polar.integrations.stripe.service import StripeService
 from polar.kit.utils import utc_now
-from polar.models import Customer, Product
+from polar.models import Customer, Organization, Product
 from polar.models.order import OrderStatus
 from polar.models.payment import PaymentStatus
 from polar.postgres import AsyncSession
 from tests.fixtures.auth import CUSTOMER_AUTH_SUBJECT
-from tests.fixtures.database import SaveFixture
+from tests.fixtures.database import MaxQueries, SaveFixture
 from tests.fixtures.random_objects import (
+    create_active_subscription,
     create_order,
     create_payment,
+    create_product,
     create_subscription,
 )
 
@@ -28,6 +31,47 @@ def stripe_service_mock(mocker: MockerFixture) -> MagicMock:
     return mock
 
 
+@pytest.mark.asyncio
+class TestListOrders:
+    @pytest.mark.auth(CUSTOMER_AUTH_SUBJECT)
+    async def test_queries(
+        self,
+        client: AsyncClient,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        max_queries: MaxQueries,
+        organization: Organization,
+        customer: Customer,
+    ) -> None:
+        for i in range(5):
+            product = await create_product(
+                save_fixture,
+                organization=organization,
+                recurring_interval=SubscriptionRecurringInterval.month,
+                name=f"Product {i}",
+            )
+            subscription = await create_active_subscription(
+                save_fixture, product=product, customer=customer
+            )
+            await create_order(
+                save_fixture,
+                product=product,
+                customer=customer,
+                subscription=subscription,
+            )
+        session.expunge_all()
+
+        with max_queries(8):
+            response = await client.get("/v1/customer-portal/orders/")
+
+        assert response.status_code == 200
+        json = response.json()
+        assert json["pagination"]["total_count"] == 5
+        for item in json["items"]:
+            assert item["product"]["organization"]["id"] == str(organization.id)
+            assert item["subscription"] is not None
+
+
 @pytest.mark.asyncio
 class TestGetPaymentStatus:
     async def test_anonymous(
@@ -5,13 +5,14 @@ import pytest
 from httpx import AsyncClient
 from pytest_mock import MockerFixture
 
+from polar.enums import SubscriptionRecurringInterval
 from polar.integrations.stripe.service import StripeService
 from polar.models import Customer, Organization, Product, Subscription
 from polar.models.subscription import SubscriptionStatus
 from polar.postgres import AsyncSession
 from polar.product.guard import is_static_price
 from tests.fixtures.auth import CUSTOMER_AUTH_SUBJECT
-from tests.fixtures.database import SaveFixture
+from tests.fixtures.database import MaxQueries, SaveFixture
 from tests.fixtures.random_objects import (
     create_active_subscription,
     create_canceled_subscription,
@@ -30,6 +31,41 @@ def stripe_service_mock(mocker: MockerFixture) -> MagicMock:
     return mock
 
 
+@pytest.mark.asyncio
+class TestListSubscriptions:
+    @pytest.mark.auth(CUSTOMER_AUTH_SUBJECT)
+    async def test_queries(
+        self,
+        client: AsyncClient,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        max_queries: MaxQueries,
+        organization: Organization,
+        customer: Customer,
+    ) -> None:
+        for i in range(5):
+            product = await create_product(
+                save_fixture,
+                organization=organization,
+                recurring_interval=SubscriptionRecurringInterval.month,
+                name=f"Product {i}",
+            )
+            await create_active_subscription(
+                save_fixture, product=product, customer=customer
+            )
+        session.expunge_all()
+
+        with max_queries(8):
+            response = await client.get("/v1/customer-portal/subscriptions/")
+
+        assert response.status_code == 200
+        json = response.json()
+        assert json["pagination"]["total_count"] == 5
+        for item in json["items"]:
+            assert item["product"]["organization"]["id"] == str(organization.id)
+            assert len(item["prices"]) == 1
+
+
 @pytest.mark.asyncio
 class TestCustomerSubscriptionProductUpdate:
     async def test_anonymous(
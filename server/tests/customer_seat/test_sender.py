@@ -1,3 +1,4 @@
+import pytest
 from pytest_mock import MockerFixture
 
 from polar.customer_seat.sender import send_seat_invitation_email
@@ -5,8 +6,9 @@ from polar.email.schemas import SeatInvitationEmail
 from polar.models import CustomerSeat, Organization
 
 
+@pytest.mark.asyncio
 class TestSendSeatInvitationEmail:
-    def test_send_invitation_success(
+    async def test_send_invitation_success(
         self,
         mocker: MockerFixture,
         customer_seat_pending: CustomerSeat,
@@ -18,7 +20,7 @@ class TestSendSeatInvitationEmail:
             return_value="<html>Test Email</html>",
         )
 
-        send_seat_invitation_email(
+        await send_seat_invitation_email(
             customer_email="test@example.com",
             seat=customer_seat_pending,
             organization=seat_enabled_organization,
@@ -40,7 +42,7 @@ class TestSendSeatInvitationEmail:
         assert "Test Product" in enqueue_kwargs["subject"]
         assert enqueue_kwargs["html_content"] == "<html>Test Email</html>"
 
-    def test_send_invitation_no_token(
+    async def test_send_invitation_no_token(
         self,
         mocker: MockerFixture,
         customer_seat_claimed: CustomerSeat,
@@ -51,7 +53,7 @@ class TestSendSeatInvitationEmail:
         mock_enqueue = mocker.patch("polar.customer_seat.sender.enqueue_email")
         mock_log = mocker.patch("polar.customer_seat.sender.log")
 
-        send_seat_invitation_email(
+        await send_seat_invitation_email(
             customer_email="test@example.com",
             seat=customer_seat_claimed,
             organization=seat_enabled_organization,
@@ -62,7 +64,7 @@ class TestSendSeatInvitationEmail:
         mock_log.warning.assert_called_once()
         mock_enqueue.assert_not_called()
 
-    def test_send_invitation_with_email_props(
+    async def test_send_invitation_with_email_props(
         self,
         mocker: MockerFixture,
         customer_seat_pending: CustomerSeat,
@@ -74,7 +76,7 @@ class TestSendSeatInvitationEmail:
         )
         mocker.patch("polar.customer_seat.sender.enqueue_email")
 
-        send_seat_invitation_email(
+        await send_seat_invitation_email(
             customer_email="test@example.com",
             seat=customer_seat_pending,
             organization=seat_enabled_organization,
@@ -0,0 +1,103 @@
+import asyncio
+import sys
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from pytest_mock import MockerFixture
+
+from polar.email.react import EmailRenderer, EmailRenderingError
+from polar.email.schemas import LoginCodeEmail, LoginCodeProps
+
+# Stand-in for the react-email binary, speaking the same protocol
+FAKE_RENDERER = """
+import json
+import struct
+import sys
+
+rendered = 0
+while header := sys.stdin.buffer.read(4):
+    (length,) = struct.unpack(">I", header)
+    request = json.loads(sys.stdin.buffer.read(length))
+    if request["props"]["code"] == "error":
+        response = {"id": request["id"], "error": "Rendering failed"}
+    else:
+        rendered += 1
+        html = f"<p>{request['props']['code']}</p><!-- {rendered} -->"
+        response = {"id": request["id"], "html": html}
+    body = json.dumps(response).encode("utf-8")
+    sys.stdout.buffer.write(struct.pack(">I", len(body)) + body)
+    sys.stdout.buffer.flush()
+"""
+
+
+def _email(code: str) -> LoginCodeEmail:
+    return LoginCodeEmail(
+        props=LoginCodeProps(
+            email="user@example.com", code=code, code_lifetime_minutes=30
+        )
+    )
+
+
+@pytest_asyncio.fixture
+async def renderer(
+    tmp_path: Path, mocker: MockerFixture
+) -> AsyncIterator[EmailRenderer]:
+    binary = tmp_path / "react-email-pkg"
+    binary.write_text(f"#!{sys.executable}\n{FAKE_RENDERER}")
+    binary.chmod(0o755)
+    mocker.patch("polar.email.react.settings.EMAIL_RENDERER_BINARY_PATH", binary)
+
+    renderer = EmailRenderer(processes=2, max_concurrency=4)
+    yield renderer
+    await renderer.close()
+
+
+@pytest.mark.asyncio
+class TestEmailRenderer:
+    async def test_render(self, renderer: EmailRenderer) -> None:
+        assert await renderer.render(_email("123456")) == "<p>123456</p><!-- 1 -->"
+
+    async def test_cached(self, renderer: EmailRenderer) -> None:
+        first = await renderer.render(_email("123456"))
+
+        assert await renderer.render(_email("123456")) == first
+        assert await renderer.render(_email("654321")) != first
+
+    async def test_concurrent(self, renderer: EmailRenderer) -> None:
+        codes = [f"{i:06d}" for i in range(20)]
+
+        rendered = await asyncio.gather(*(renderer.render(_email(c)) for c in codes))
+
+        assert [html.split("<!--")[0] for html in rendered] == [
+            f"<p>{code}</p>" for code in codes
+        ]
+        assert len([p for p in renderer._pool if p is not None]) == 2
+
+    async def test_error(self, renderer: EmailRenderer) -> None:
+        with pytest.raises(EmailRenderingError, match="Rendering failed"):
+            await renderer.render(_email("error"))
+
+        # The process is still usable
+        assert await renderer.render(_email("123456")) == "<p>123456</p><!-- 1 -->"
+
+    async def test_process_exited(self, renderer: EmailRenderer) -> None:
+        await renderer.render(_email("000001"))
+        await renderer.render(_email("000002"))
+        for process in renderer._pool:
+            assert process is not None
+            process.kill()
+            await process._reader
+
+        assert await renderer.render(_email("123456")) == "<p>123456</p><!-- 1 -->"
+
+    async def test_write_to_exited_process(self, renderer: EmailRenderer) -> None:
+        await renderer.render(_email("000001"))
+        process = next(p for p in renderer._pool if p is not None)
+        process.kill()
+        await process._reader
+
+        with pytest.raises(EmailRenderingError, match="renderer process exited"):
+            async with asyncio.timeout(5):
+                await process.render("login_code", "{}")
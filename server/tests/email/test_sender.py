@@ -0,0 +1,123 @@
+import json
+
+import httpx
+import pytest
+import respx
+
+from polar.email.sender import (
+    EmailMessage,
+    ResendEmailSender,
+    SendEmailError,
+)
+
+BASE_URL = "https://api.resend.test"
+
+
+def _email(i: int) -> EmailMessage:
+    return {
+        "to_email_addr": f"user-{i}@example.com",
+        "subject": f"Email {i}",
+        "html_content": f"<p>{i}</p>",
+    }
+
+
+def _batch_response(request: httpx.Request) -> httpx.Response:
+    emails = json.loads(request.content)
+    return httpx.Response(
+        200, json={"data": [{"id": str(i)} for i in range(len(emails))]}
+    )
+
+
+@pytest.fixture
+def sender() -> ResendEmailSender:
+    return ResendEmailSender(
+        base_url=BASE_URL, api_key="KEY", batch_size=2, retry_backoff=0.01
+    )
+
+
+@pytest.mark.asyncio
+class TestSendBatch:
+    async def test_chunks(
+        self, respx_mock: respx.MockRouter, sender: ResendEmailSender
+    ) -> None:
+        route = respx_mock.post(f"{BASE_URL}/emails/batch").mock(
+            side_effect=_batch_response
+        )
+
+        await sender.send_batch([_email(i) for i in range(5)], idempotency_key="KEY")
+
+        assert route.call_count == 3
+        requests = sorted(
+            (call.request for call in route.calls),
+            key=lambda r: r.headers["Idempotency-Key"],
+        )
+        assert [r.headers["Idempotency-Key"] for r in requests] == [
+            "KEY/0",
+            "KEY/1",
+            "KEY/2",
+        ]
+        assert [[email["to"] for email in json.loads(r.content)] for r in requests] == [
+            [["user-0@example.com"], ["user-1@example.com"]],
+            [["user-2@example.com"], ["user-3@example.com"]],
+            [["user-4@example.com"]],
+        ]
+        # Not supported by the batch endpoint
+        assert all(
+            "attachments" not in email
+            for r in requests
+            for email in json.loads(r.content)
+        )
+
+    async def test_attachments(
+        self, respx_mock: respx.MockRouter, sender: ResendEmailSender
+    ) -> None:
+        batch_route = respx_mock.post(f"{BASE_URL}/emails/batch").mock(
+            side_effect=_batch_response
+        )
+        route = respx_mock.post(f"{BASE_URL}/emails").mock(
+            return_value=httpx.Response(200, json={"id": "1"})
+        )
+        with_attachment: EmailMessage = {
+            **_email(1),
+            "attachments": [
+                {"remote_url": "https://example.com/invoice.pdf", "filename": "a.pdf"}
+            ],
+        }
+
+        await sender.send_batch([_email(0), with_attachment], idempotency_key="KEY")
+
+        assert batch_route.call_count == 1
+        assert batch_route.calls.last.request.headers["Idempotency-Key"] == "KEY/0"
+        assert route.call_count == 1
+        request = route.calls.last.request
+        assert request.headers["Idempotency-Key"] == "KEY/attachments/0"
+        [payload] = json.loads(request.content)["attachments"]
+        assert payload["filename"] == "a.pdf"
+
+    async def test_rate_limited(
+        self, respx_mock: respx.MockRouter, sender: ResendEmailSender
+    ) -> None:
+        route = respx_mock.post(f"{BASE_URL}/emails/batch").mock(
+            side_effect=[
+                httpx.Response(429, headers={"retry-after": "0.01"}),
+                httpx.Response(429),
+                httpx.Response(200, json={"data": [{"id": "1"}]}),
+            ]
+        )
+
+        await sender.send_batch([_email(0)])
+
+        assert route.call_count == 3
+
+    async def test_rate_limited_max_retries(self, respx_mock: respx.MockRouter) -> None:
+        sender = ResendEmailSender(
+            base_url=BASE_URL, api_key="KEY", max_retries=1, retry_backoff=0.01
+        )
+        route = respx_mock.post(f"{BASE_URL}/emails/batch").mock(
+            return_value=httpx.Response(429)
+        )
+
+        with pytest.raises(SendEmailError):
+            await sender.send_batch([_email(0)])
+
+        assert route.call_count == 2
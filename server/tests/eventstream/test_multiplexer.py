@@ -0,0 +1,112 @@
+import asyncio
+from collections.abc import AsyncIterator
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+
+from polar.eventstream.multiplexer import EventStreamMultiplexer, SubscriptionClosed
+from polar.redis import Redis
+
+
+@pytest_asyncio.fixture
+async def multiplexer(decoding_redis: Redis) -> AsyncIterator[EventStreamMultiplexer]:
+    multiplexer = EventStreamMultiplexer(decoding_redis, shards=2)
+    yield multiplexer
+    await multiplexer.aclose()
+
+
+@pytest.mark.asyncio
+class TestEventStreamMultiplexer:
+    async def test_dispatch(
+        self, decoding_redis: Redis, multiplexer: EventStreamMultiplexer
+    ) -> None:
+        async with (
+            multiplexer.subscribe(["user:1", "org:1"]) as subscription_1,
+            multiplexer.subscribe(["user:2", "org:1"]) as subscription_2,
+        ):
+            await decoding_redis.publish("org:1", "org")
+            await decoding_redis.publish("user:2", "user")
+
+            assert await subscription_1.get(timeout=1.0) == "org"
+            assert await subscription_2.get(timeout=1.0) == "org"
+            assert await subscription_2.get(timeout=1.0) == "user"
+            assert await subscription_1.get(timeout=0.1) is None
+
+    async def test_channel_refcount(self, multiplexer: EventStreamMultiplexer) -> None:
+        shard = multiplexer._get_shard("org:1")
+
+        async with multiplexer.subscribe(["org:1"]):
+            async with multiplexer.subscribe(["org:1"]):
+                assert len(shard.subscriptions["org:1"]) == 2
+            assert len(shard.subscriptions["org:1"]) == 1
+            assert "org:1" in shard.pubsub.channels
+
+        assert "org:1" not in shard.subscriptions
+        assert "org:1" not in shard.pubsub.channels
+
+    async def test_slow_consumer(self, decoding_redis: Redis) -> None:
+        multiplexer = EventStreamMultiplexer(decoding_redis, queue_maxsize=2)
+        async with multiplexer.subscribe(["user:1"]) as subscription:
+            for i in range(5):
+                await decoding_redis.publish("user:1", str(i))
+            await asyncio.sleep(0.1)
+
+            assert subscription.dropped == 3
+            assert await subscription.get(timeout=1.0) == "3"
+            assert await subscription.get(timeout=1.0) == "4"
+        await multiplexer.aclose()
+
+    async def test_close(self, multiplexer: EventStreamMultiplexer) -> None:
+        async with multiplexer.subscribe(["user:1"]) as subscription:
+            multiplexer.close()
+            with pytest.raises(SubscriptionClosed):
+                await subscription.get(timeout=1.0)
+
+    async def test_reconnect(
+        self,
+        decoding_redis: Redis,
+        multiplexer: EventStreamMultiplexer,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        shard = multiplexer._get_shard("user:1")
+        monkeypatch.setattr(shard, "RECONNECT_MIN_DELAY", 0.01)
+
+        async with multiplexer.subscribe(["user:1"]) as subscription:
+            broken_pubsub = shard.pubsub
+            monkeypatch.setattr(
+                broken_pubsub,
+                "get_message",
+                AsyncMock(side_effect=RuntimeError("Protocol error")),
+            )
+            await asyncio.sleep(0.1)
+            assert shard.pubsub is not broken_pubsub
+
+            await decoding_redis.publish("user:1", "user")
+            assert await subscription.get(timeout=1.0) == "user"
+
+    async def test_subscribe_during_backoff(
+        self,
+        decoding_redis: Redis,
+        multiplexer: EventStreamMultiplexer,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        shard = multiplexer._get_shard("user:1")
+        monkeypatch.setattr(shard, "RECONNECT_MIN_DELAY", 30.0)
+
+        async with multiplexer.subscribe(["user:1"]):
+            broken_pubsub = shard.pubsub
+            monkeypatch.setattr(
+                broken_pubsub,
+                "get_message",
+                AsyncMock(side_effect=RuntimeError("Protocol error")),
+            )
+            await asyncio.sleep(0.1)
+
+        # The reader is backing off: a new subscription wakes it up
+        async with multiplexer.subscribe(["user:1"]) as subscription:
+            await asyncio.sleep(0.1)
+            assert shard.pubsub is not broken_pubsub
+
+            await decoding_redis.publish("user:1", "user")
+            assert await subscription.get(timeout=1.0) == "user"
@@ -0,0 +1,37 @@
+import uuid
+
+import dramatiq
+import pytest
+
+from polar.eventstream.service import publish
+from polar.redis import Redis
+from polar.worker import JobQueueManager
+
+
+@pytest.mark.asyncio
+async def test_publish_on_flush(decoding_redis: Redis) -> None:
+    user_id = uuid.uuid4()
+    organization_id = uuid.uuid4()
+
+    async with decoding_redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+        await pubsub.subscribe(f"user:{user_id}", f"org:{organization_id}")
+
+        await publish(
+            "checkout.updated",
+            {"status": "confirmed"},
+            user_id=user_id,
+            organization_id=organization_id,
+        )
+        for _ in range(3):
+            # Only subscribe confirmations, ignored
+            assert await pubsub.get_message(timeout=0.1) is None
+
+        await JobQueueManager.get().flush(dramatiq.get_broker(), decoding_redis)
+
+        channels = set()
+        for _ in range(10):
+            message = await pubsub.get_message(timeout=0.1)
+            if message is not None:
+                channels.add(message["channel"])
+
+        assert channels == {f"user:{user_id}", f"org:{organization_id}"}
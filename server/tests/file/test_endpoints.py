@@ -57,7 +57,7 @@ class TestEndpoints:
         # S3 object is not available until we fully complete it
         with pytest.raises(S3FileError):
             s3_service = S3_SERVICES[created.service]
-            s3_service.get_head_or_raise(created.path)
+            await s3_service.get_head_or_raise(created.path)
 
         repository = FileRepository.from_session(session)
         record = await repository.get_by_id(created.id, include_deleted=True)
@@ -106,7 +106,7 @@ class TestEndpoints:
         # S3 object is definitely not available
         with pytest.raises(S3FileError):
             s3_service = S3_SERVICES[created.service]
-            s3_service.get_head_or_raise(created.path)
+            await s3_service.get_head_or_raise(created.path)
 
         repository = FileRepository.from_session(session)
         record = await repository.get_by_id(created.id, include_deleted=True)
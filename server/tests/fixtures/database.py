@@ -1,9 +1,12 @@
-from collections.abc import AsyncIterator, Callable, Coroutine
+import contextlib
+from collections.abc import AsyncIterator, Callable, Coroutine, Iterator
+from typing import Any
 
 import pytest
 import pytest_asyncio
 from pydantic_core import Url
 from pytest_mock import MockerFixture
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import text
 from sqlalchemy_utils import create_database, database_exists, drop_database
@@ -93,3 +96,45 @@ def save_fixture_factory(session: AsyncSession) -> SaveFixture:
 @pytest.fixture
 def save_fixture(session: AsyncSession) -> SaveFixture:
     return save_fixture_factory(session)
+
+
+MaxQueries = Callable[[int], contextlib.AbstractContextManager[list[str]]]
+
+
+@pytest.fixture
+def max_queries(session: AsyncSession) -> MaxQueries:
+    """
+    Fail the test if the wrapped block issues more than a set number of queries.
+
+    Useful to catch N+1 queries on list endpoints: load a page with several
+    items, and check the number of queries doesn't depend on the page size.
+
+    Examples:
+        with max_queries(5):
+            response = await client.get("/v1/orders/")
+    """
+
+    @contextlib.contextmanager
+    def _max_queries(limit: int) -> Iterator[list[str]]:
+        statements: list[str] = []
+
+        def _before_cursor_execute(
+            conn: Any, cursor: Any, statement: str, *args: Any
+        ) -> None:
+            statements.append(statement)
+
+        connection = session.sync_session.get_bind()
+        event.listen(connection, "before_cursor_execute", _before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(connection, "before_cursor_execute", _before_cursor_execute)
+
+        if len(statements) > limit:
+            pytest.fail(
+                f"Expected at most {limit} queries, got {len(statements)}:\n\n"
+                + "\n\n".join(statements),
+                pytrace=False,
+            )
+
+    return _max_queries
@@ -216,7 +216,7 @@ class TestFile:
         assert completed.id == created.id
         assert completed.is_uploaded is True
         s3_service = S3_SERVICES[completed.service]
-        s3_object = s3_service.get_object_or_raise(completed.path)
+        s3_object = await s3_service.get_object_or_raise(completed.path)
         metadata = s3_object["Metadata"]
 
         assert s3_object["ETag"] == completed.checksum_etag
@@ -0,0 +1,87 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator, Sequence
+from typing import Any
+
+import httpx
+
+
+class _SSEStream(httpx.AsyncByteStream):
+    def __init__(self, events: Sequence[tuple[str | None, Any]], delay: float):
+        self.events = events
+        self.delay = delay
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        for i, (event, data) in enumerate(self.events):
+            # Pause after the first event, like a provider generating tokens
+            if i > 0 and self.delay:
+                await asyncio.sleep(self.delay)
+            payload = data if isinstance(data, str) else json.dumps(data)
+            prefix = f"event: {event}\n" if event is not None else ""
+            yield f"{prefix}data: {payload}\n\n".encode()
+
+
+def fake_provider(
+    events: Sequence[tuple[str | None, Any]],
+    *,
+    delay: float = 0.0,
+    status_code: int = 200,
+    requests: list[httpx.Request] | None = None,
+) -> httpx.AsyncClient:
+    """
+    HTTP client of a local fake LLM provider, streaming `events` as SSE.
+
+    Events are sent `delay` seconds apart; received requests are appended
+    to `requests`.
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if requests is not None:
+            requests.append(request)
+        if status_code != 200:
+            return httpx.Response(status_code, json={"error": "overloaded"})
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream"},
+            stream=_SSEStream(events, delay),
+        )
+
+    return httpx.AsyncClient(
+        base_url="http://fake-provider", transport=httpx.MockTransport(handler)
+    )
+
+
+def anthropic_events(chunks: Sequence[str]) -> list[tuple[str | None, Any]]:
+    """Messages API events streaming `chunks` as text deltas."""
+    return [
+        ("message_start", {"type": "message_start", "message": {"id": "msg_1"}}),
+        ("content_block_start", {"type": "content_block_start", "index": 0}),
+        ("ping", {"type": "ping"}),
+        *(
+            (
+                "content_block_delta",
+                {
+                    "type": "content_block_delta",
+                    "index": 0,
+                    "delta": {"type": "text_delta", "text": chunk},
+                },
+            )
+            for chunk in chunks
+        ),
+        ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+        ("message_delta", {"type": "message_delta", "delta": {}}),
+        ("message_stop", {"type": "message_stop"}),
+    ]
+
+
+def openai_events(chunks: Sequence[str]) -> list[tuple[str | None, Any]]:
+    """Chat Completions events streaming `chunks` as content deltas."""
+    return [
+        (None, {"choices": [{"index": 0, "delta": {"role": "assistant"}}]}),
+        *(
+            (None, {"choices": [{"index": 0, "delta": {"content": chunk}}]})
+            for chunk in chunks
+        ),
+        (None, {"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}),
+        (None, "[DONE]"),
+    ]
@@ -9,3 +9,9 @@ from polar.redis import Redis
 @pytest_asyncio.fixture(autouse=True)
 async def redis() -> AsyncIterator[Redis]:
     yield FakeAsyncRedis()
+
+
+@pytest_asyncio.fixture
+async def decoding_redis() -> AsyncIterator[Redis]:
+    """Redis client decoding responses to strings, like the production one."""
+    yield FakeAsyncRedis(decode_responses=True)
@@ -0,0 +1,98 @@
+import pytest
+from freezegun import freeze_time
+from pytest_mock import MockerFixture
+
+from polar.config import settings
+from polar.integrations.aws.s3 import S3Service
+from polar.integrations.aws.s3 import service as s3_service_module
+from polar.integrations.aws.s3.client import get_client
+
+
+@pytest.fixture
+def s3_service() -> S3Service:
+    return S3Service(
+        settings.S3_FILES_BUCKET_NAME,
+        presign_ttl=600,
+        presign_cache_ttl=60,
+        client=get_client(),
+    )
+
+
+class TestGeneratePresignedDownloadURL:
+    def test_cached(self, mocker: MockerFixture, s3_service: S3Service) -> None:
+        spy = mocker.spy(s3_service.client, "generate_presigned_url")
+
+        with freeze_time("2025-01-01 00:00:00") as frozen_time:
+            url, expires_at = s3_service.generate_presigned_download_url(
+                path="a/b.pdf", filename="b.pdf", mime_type="application/pdf"
+            )
+
+            frozen_time.tick(59)
+            cached_url, cached_expires_at = s3_service.generate_presigned_download_url(
+                path="a/b.pdf", filename="b.pdf", mime_type="application/pdf"
+            )
+            assert cached_url == url
+            assert cached_expires_at == expires_at
+            assert spy.call_count == 1
+
+            other_url, _ = s3_service.generate_presigned_download_url(
+                path="a/b.pdf", filename="c.pdf", mime_type="application/pdf"
+            )
+            assert other_url != url
+            assert spy.call_count == 2
+
+            # Next expiry bucket
+            frozen_time.tick(1)
+            renewed_url, renewed_expires_at = (
+                s3_service.generate_presigned_download_url(
+                    path="a/b.pdf", filename="b.pdf", mime_type="application/pdf"
+                )
+            )
+            assert renewed_url != url
+            assert renewed_expires_at > expires_at
+            assert spy.call_count == 3
+
+    def test_cache_disabled(self, mocker: MockerFixture) -> None:
+        s3_service = S3Service(
+            settings.S3_FILES_BUCKET_NAME, presign_cache_ttl=0, client=get_client()
+        )
+        spy = mocker.spy(s3_service.client, "generate_presigned_url")
+
+        for _ in range(2):
+            s3_service.generate_presigned_download_url(
+                path="a/b.pdf", filename="b.pdf", mime_type="application/pdf"
+            )
+
+        assert spy.call_count == 2
+
+
+class TestGeneratePresignedDownloadURLs:
+    def test_batch(self, mocker: MockerFixture, s3_service: S3Service) -> None:
+        objects = [(f"a/{i}.pdf", f"{i}.pdf", "application/pdf") for i in range(200)]
+        spy = mocker.spy(s3_service.client, "generate_presigned_url")
+
+        with freeze_time("2025-01-01 00:00:00"):
+            presigned = s3_service.generate_presigned_download_urls(objects)
+            assert spy.call_count == 200
+
+            assert s3_service.generate_presigned_download_urls(objects) == presigned
+            assert spy.call_count == 200
+
+            for (path, filename, mime_type), (url, expires_at) in zip(
+                objects, presigned, strict=True
+            ):
+                assert path in url
+                assert s3_service.generate_presigned_download_url(
+                    path=path, filename=filename, mime_type=mime_type
+                ) == (url, expires_at)
+
+
+class TestGetPublicURL:
+    def test_cached(self, mocker: MockerFixture, s3_service: S3Service) -> None:
+        get_client_spy = mocker.spy(s3_service_module, "get_client")
+
+        url = s3_service.get_public_url("a/b.png")
+
+        assert s3_service.get_public_url("a/b.png") == url
+        assert s3_service.get_public_url("a/c.png") != url
+        assert get_client_spy.call_count == 1
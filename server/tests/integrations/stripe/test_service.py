@@ -0,0 +1,115 @@
+import asyncio
+
+import httpx
+import pytest
+import respx
+import stripe as stripe_lib
+from pytest_mock import MockerFixture
+
+from polar.integrations.stripe.service import (
+    AdaptiveRateLimiter,
+    StripeRequestExecutor,
+    StripeService,
+)
+
+
+def rate_limit_error() -> stripe_lib.RateLimitError:
+    return stripe_lib.RateLimitError("Too many requests", http_status=429)
+
+
+class TestAdaptiveRateLimiter:
+    def test_adapts(self) -> None:
+        limiter = AdaptiveRateLimiter(100, min_rate=10)
+
+        limiter.on_rate_limited(0)
+        assert limiter.rate == 50
+        for _ in range(3):
+            limiter.on_rate_limited(0)
+        assert limiter.rate == 10
+
+        limiter.on_success()
+        assert limiter.rate == pytest.approx(10.1)
+        for _ in range(10_000):
+            limiter.on_success()
+        assert limiter.rate == 100
+
+
+@pytest.mark.asyncio
+class TestStripeRequestExecutor:
+    async def test_bounded_concurrency(self) -> None:
+        executor = StripeRequestExecutor(max_concurrency=2, rate=1000)
+        in_flight = 0
+        max_in_flight = 0
+
+        async def request() -> int:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return in_flight
+
+        results = await executor.gather(request for _ in range(10))
+
+        assert len(results) == 10
+        assert max_in_flight == 2
+
+    async def test_rate_limited_retried(self) -> None:
+        executor = StripeRequestExecutor(rate=1000, retry_backoff=0)
+        attempts = 0
+
+        async def request() -> str:
+            nonlocal attempts
+            attempts += 1
+            if attempts < 3:
+                raise rate_limit_error()
+            return "ii_123"
+
+        assert await executor.run(request) == "ii_123"
+        assert attempts == 3
+        assert executor.limiter.rate < 1000
+
+    async def test_max_retries(self) -> None:
+        executor = StripeRequestExecutor(rate=1000, max_retries=2, retry_backoff=0)
+        attempts = 0
+
+        async def request() -> None:
+            nonlocal attempts
+            attempts += 1
+            raise rate_limit_error()
+
+        with pytest.raises(stripe_lib.RateLimitError):
+            await executor.run(request)
+        assert attempts == 3
+
+    async def test_stub_idempotency_key(
+        self, mocker: MockerFixture, respx_mock: respx.MockRouter
+    ) -> None:
+        mocker.patch.object(stripe_lib, "api_key", "sk_test_stub")
+        route = respx_mock.post("https://api.stripe.com/v1/invoiceitems").mock(
+            side_effect=[
+                httpx.Response(
+                    429,
+                    json={"error": {"type": "invalid_request_error"}},
+                ),
+                httpx.Response(200, json={"id": "ii_123", "object": "invoiceitem"}),
+            ]
+        )
+        executor = StripeRequestExecutor(rate=1000, retry_backoff=0)
+
+        invoice_item = await executor.run(
+            lambda: StripeService().create_invoice_item(
+                customer="cus_123",
+                invoice="in_123",
+                amount=1000,
+                currency="usd",
+                description="Tokens",
+                idempotency_key="invoice_item:in_123:price_123",
+            )
+        )
+
+        assert invoice_item.id == "ii_123"
+        assert route.call_count == 2
+        assert [call.request.headers["Idempotency-Key"] for call in route.calls] == [
+            "invoice_item:in_123:price_123"
+        ] * 2
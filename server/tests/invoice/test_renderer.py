@@ -0,0 +1,34 @@
+from collections.abc import Iterator
+
+import pytest
+
+from polar.invoice.generator import Invoice
+from polar.invoice.renderer import InvoiceRenderer
+
+
+@pytest.fixture(scope="module")
+def renderer() -> Iterator[InvoiceRenderer]:
+    renderer = InvoiceRenderer(max_workers=2, max_chunk_size=2)
+    yield renderer
+    renderer.shutdown()
+
+
+@pytest.mark.asyncio
+class TestInvoiceRenderer:
+    async def test_render(self, renderer: InvoiceRenderer, invoice: Invoice) -> None:
+        rendered = await renderer.render(invoice)
+
+        assert rendered.startswith(b"%PDF-")
+
+    async def test_render_many(
+        self, renderer: InvoiceRenderer, invoice: Invoice
+    ) -> None:
+        invoices = [invoice.model_copy(update={"number": str(i)}) for i in range(5)]
+
+        rendered = await renderer.render_many(invoices)
+
+        assert len(rendered) == 5
+        assert all(pdf.startswith(b"%PDF-") for pdf in rendered)
+
+    async def test_render_many_empty(self, renderer: InvoiceRenderer) -> None:
+        assert await renderer.render_many([]) == []
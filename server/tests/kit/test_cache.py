@@ -0,0 +1,30 @@
+from freezegun import freeze_time
+
+from polar.kit.cache import LRUCache
+
+
+def test_lru_eviction() -> None:
+    cache = LRUCache[str, int](maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_lru_ttl() -> None:
+    with freeze_time("2025-01-01 00:00:00") as frozen_time:
+        cache = LRUCache[str, int](maxsize=2, ttl=10)
+        cache.set("a", 1)
+
+        frozen_time.tick(5)
+        assert cache.get("a") == 1
+
+        frozen_time.tick(10)
+        assert cache.get("a") is None
+        assert len(cache) == 0
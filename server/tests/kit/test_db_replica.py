@@ -0,0 +1,59 @@
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from polar.kit.db.replica import ReadReplica, ReadReplicaPool
+
+
+def _replica(name: str, lag: float | None, checked_ago: float = 0.0) -> ReadReplica:
+    return ReadReplica(
+        name=name,
+        engine=MagicMock(),
+        sessionmaker=MagicMock(name=name),
+        lag=lag,
+        checked_at=time.monotonic() - checked_ago if lag is not None else None,
+    )
+
+
+PRIMARY = MagicMock(name="primary")
+
+
+class TestReadReplicaPool:
+    def test_no_replica(self) -> None:
+        pool = ReadReplicaPool(PRIMARY, [], max_lag=5.0, check_interval=1.0)
+        assert pool.get_sessionmaker() == (PRIMARY, "no_replica")
+
+    def test_round_robin_healthy(self) -> None:
+        r1, r2 = _replica("r1", 0.1), _replica("r2", 0.2)
+        pool = ReadReplicaPool(PRIMARY, [r1, r2], max_lag=5.0, check_interval=1.0)
+        assert pool.get_sessionmaker() == (r1.sessionmaker, "replica")
+        assert pool.get_sessionmaker() == (r2.sessionmaker, "replica")
+        assert pool.get_sessionmaker() == (r1.sessionmaker, "replica")
+
+    @pytest.mark.parametrize(
+        "replica",
+        [
+            pytest.param(_replica("r1", 10.0), id="lagging"),
+            pytest.param(_replica("r1", None), id="never checked"),
+            pytest.param(_replica("r1", 0.1, checked_ago=60.0), id="stale check"),
+        ],
+    )
+    def test_unhealthy_fallback(self, replica: ReadReplica) -> None:
+        pool = ReadReplicaPool(PRIMARY, [replica], max_lag=5.0, check_interval=1.0)
+        assert pool.get_sessionmaker() == (PRIMARY, "replica_lag")
+
+    def test_skip_unhealthy(self) -> None:
+        r1, r2 = _replica("r1", 10.0), _replica("r2", 0.2)
+        pool = ReadReplicaPool(PRIMARY, [r1, r2], max_lag=5.0, check_interval=1.0)
+        assert pool.get_sessionmaker() == (r2.sessionmaker, "replica")
+        assert pool.get_sessionmaker() == (r2.sessionmaker, "replica")
+
+    def test_read_after_write(self) -> None:
+        pool = ReadReplicaPool(
+            PRIMARY, [_replica("r1", 0.1)], max_lag=5.0, check_interval=1.0
+        )
+        assert pool.get_sessionmaker(read_after_write=True) == (
+            PRIMARY,
+            "read_after_write",
+        )
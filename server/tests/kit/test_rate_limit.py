@@ -0,0 +1,73 @@
+from collections.abc import AsyncIterator
+from unittest.mock import AsyncMock
+
+import pytest
+import pytest_asyncio
+from ratelimit import Rule
+
+from polar.kit.rate_limit import HybridBackend
+from polar.redis import Redis
+
+
+@pytest_asyncio.fixture
+async def backend(redis: Redis) -> AsyncIterator[HybridBackend]:
+    backend = HybridBackend(redis, strict_zones={"login"}, sync_interval=3600)
+    yield backend
+    await backend.aclose()
+
+
+@pytest.mark.asyncio
+class TestHybridBackend:
+    async def test_local_limit(self, backend: HybridBackend) -> None:
+        rule = Rule(minute=3, zone="api")
+
+        for _ in range(3):
+            assert await backend.retry_after("api", "user", rule) == 0
+
+        retry_after = await backend.retry_after("api", "user", rule)
+        assert 0 < retry_after <= 60
+
+        assert await backend.retry_after("api", "other_user", rule) == 0
+
+    async def test_sync_across_processes(
+        self, redis: Redis, backend: HybridBackend
+    ) -> None:
+        other_backend = HybridBackend(redis, sync_interval=3600)
+        rule = Rule(minute=5, zone="api")
+
+        for _ in range(3):
+            assert await backend.retry_after("api", "user", rule) == 0
+        await backend.sync()
+
+        # Primes the counter, then learns about the hits of the other backend
+        assert await other_backend.retry_after("api", "user", rule) == 0
+        await other_backend.sync()
+
+        assert await other_backend.retry_after("api", "user", rule) == 0
+        assert await other_backend.retry_after("api", "user", rule) > 0
+        await other_backend.sync()
+
+        await backend.sync()
+        assert await backend.retry_after("api", "user", rule) > 0
+
+        await other_backend.aclose()
+
+    async def test_block_time(self, backend: HybridBackend) -> None:
+        backend._strict_backend.set_block_time = AsyncMock()  # type: ignore
+        rule = Rule(second=1, block_time=300, zone="stream")
+
+        assert await backend.retry_after("stream", "user", rule) == 0
+        assert await backend.retry_after("stream", "user", rule) == 300
+        backend._strict_backend.set_block_time.assert_awaited_once_with("user", 300)
+
+        other_rule = Rule(minute=100, zone="api")
+        assert await backend.retry_after("api", "user", other_rule) > 0
+
+    async def test_strict_zone(self, backend: HybridBackend) -> None:
+        retry_after_mock = AsyncMock(return_value=42)
+        backend._strict_backend.retry_after = retry_after_mock  # type: ignore
+        rule = Rule(minute=6, zone="login")
+
+        assert await backend.retry_after("login", "user", rule) == 42
+        retry_after_mock.assert_awaited_once_with("login", "user", rule)
+        assert backend._counters == {}
@@ -0,0 +1,163 @@
+from uuid import UUID
+
+import dramatiq
+import pytest
+
+from polar.benefit.strategies.license_keys.schemas import (
+    BenefitLicenseKeysCreateProperties,
+)
+from polar.exceptions import BadRequest, ResourceNotFound
+from polar.license_key.repository import LicenseKeyRepository
+from polar.license_key.schemas import LicenseKeyUpdate, LicenseKeyValidate
+from polar.license_key.service import license_key as license_key_service
+from polar.license_key.validations import pop_pending_validations
+from polar.models import Customer, LicenseKey, Organization, Product
+from polar.models.license_key import LicenseKeyStatus
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from polar.worker import JobQueueManager
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.license_key import TestLicenseKey
+
+
+async def create_license_key(
+    session: AsyncSession,
+    redis: Redis,
+    save_fixture: SaveFixture,
+    customer: Customer,
+    organization: Organization,
+    product: Product,
+    limit_usage: int | None = None,
+) -> LicenseKey:
+    _, granted = await TestLicenseKey.create_benefit_and_grant(
+        session,
+        redis,
+        save_fixture,
+        customer=customer,
+        organization=organization,
+        product=product,
+        properties=BenefitLicenseKeysCreateProperties(
+            prefix="testing", limit_usage=limit_usage
+        ),
+    )
+    repository = LicenseKeyRepository.from_session(session)
+    license_key = await repository.get_by_id(UUID(granted["license_key_id"]))
+    assert license_key is not None
+    return license_key
+
+
+@pytest.mark.asyncio
+class TestValidateByKey:
+    async def test_cached(
+        self,
+        session: AsyncSession,
+        decoding_redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        license_key = await create_license_key(
+            session, decoding_redis, save_fixture, customer, organization, product
+        )
+        validate = LicenseKeyValidate(
+            key=license_key.key, organization_id=organization.id, conditions={}
+        )
+
+        first = await license_key_service.validate_by_key(
+            session, decoding_redis, validate=validate
+        )
+        # Changes not made through the service aren't seen until invalidated
+        license_key.status = LicenseKeyStatus.revoked
+        session.add(license_key)
+        await session.flush()
+        second = await license_key_service.validate_by_key(
+            session, decoding_redis, validate=validate
+        )
+
+        assert first.validations == 1
+        assert second.validations == 2
+        assert second.last_validated_at is not None
+
+        await license_key_service.update(
+            session,
+            license_key=license_key,
+            updates=LicenseKeyUpdate(status=LicenseKeyStatus.revoked),
+        )
+        await JobQueueManager.get().flush(dramatiq.get_broker(), decoding_redis)
+
+        with pytest.raises(ResourceNotFound):
+            await license_key_service.validate_by_key(
+                session, decoding_redis, validate=validate
+            )
+
+    async def test_write_behind(
+        self,
+        session: AsyncSession,
+        decoding_redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        license_key = await create_license_key(
+            session, decoding_redis, save_fixture, customer, organization, product
+        )
+        validate = LicenseKeyValidate(
+            key=license_key.key,
+            organization_id=organization.id,
+            increment_usage=3,
+            conditions={},
+        )
+
+        validated = await license_key_service.validate_by_key(
+            session, decoding_redis, validate=validate
+        )
+
+        assert validated.usage == 3
+        assert validated.validations == 1
+        await session.refresh(license_key)
+        assert license_key.usage == 0
+        assert license_key.validations == 0
+
+        [pending] = await pop_pending_validations(decoding_redis)
+        assert pending.license_key_id == license_key.id
+        assert pending.validations == 1
+        assert pending.usage == 3
+
+    async def test_limited_usage(
+        self,
+        session: AsyncSession,
+        decoding_redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        license_key = await create_license_key(
+            session, decoding_redis, save_fixture, customer, organization, product, 5
+        )
+        validate = LicenseKeyValidate(
+            key=license_key.key,
+            organization_id=organization.id,
+            increment_usage=3,
+            conditions={},
+        )
+
+        validated = await license_key_service.validate_by_key(
+            session, decoding_redis, validate=validate
+        )
+        await JobQueueManager.get().flush(dramatiq.get_broker(), decoding_redis)
+
+        assert validated.usage == 3
+        await session.refresh(license_key)
+        assert license_key.usage == 3
+
+        with pytest.raises(BadRequest, match="only has 2 more usages"):
+            await license_key_service.validate_by_key(
+                session, decoding_redis, validate=validate
+            )
+
+        [pending] = await pop_pending_validations(decoding_redis)
+        assert pending.validations == 1
+        assert pending.usage == 0
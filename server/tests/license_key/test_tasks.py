@@ -0,0 +1,84 @@
+import uuid
+
+import pytest
+from pytest_mock import MockerFixture
+
+from polar.benefit.strategies.license_keys.schemas import (
+    BenefitLicenseKeysCreateProperties,
+)
+from polar.license_key.repository import LicenseKeyRepository
+from polar.license_key.tasks import license_key_flush_validations
+from polar.license_key.validations import pop_pending_validations, record_validation
+from polar.models import Customer, Organization, Product
+from polar.postgres import AsyncSession
+from polar.redis import Redis
+from polar.worker import RedisMiddleware
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.license_key import TestLicenseKey
+
+
+@pytest.fixture(autouse=True)
+def worker_redis(mocker: MockerFixture, decoding_redis: Redis) -> None:
+    mocker.patch.object(RedisMiddleware, "get", new=lambda: decoding_redis)
+
+
+@pytest.mark.asyncio
+class TestFlushValidations:
+    async def test_empty(self, decoding_redis: Redis) -> None:
+        await license_key_flush_validations()
+
+        assert await pop_pending_validations(decoding_redis) == []
+
+    async def test_flushed(
+        self,
+        session: AsyncSession,
+        decoding_redis: Redis,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        organization: Organization,
+        product: Product,
+    ) -> None:
+        _, granted = await TestLicenseKey.create_benefit_and_grant(
+            session,
+            decoding_redis,
+            save_fixture,
+            customer=customer,
+            organization=organization,
+            product=product,
+            properties=BenefitLicenseKeysCreateProperties(prefix="testing"),
+        )
+        license_key_id = uuid.UUID(granted["license_key_id"])
+        await record_validation(decoding_redis, license_key_id, increment_usage=2)
+        pending = await record_validation(decoding_redis, license_key_id)
+
+        await license_key_flush_validations()
+
+        assert await pop_pending_validations(decoding_redis) == []
+        repository = LicenseKeyRepository.from_session(session)
+        license_key = await repository.get_by_id(license_key_id)
+        assert license_key is not None
+        await session.refresh(license_key)
+        assert license_key.validations == 2
+        assert license_key.usage == 2
+        assert license_key.last_validated_at == pending.last_validated_at
+
+    async def test_restored_on_failure(
+        self, mocker: MockerFixture, decoding_redis: Redis
+    ) -> None:
+        license_key_id = uuid.uuid4()
+        await record_validation(decoding_redis, license_key_id, increment_usage=2)
+        await record_validation(decoding_redis, license_key_id)
+        mocker.patch.object(
+            LicenseKeyRepository,
+            "apply_pending_validations",
+            spec=LicenseKeyRepository.apply_pending_validations,
+            side_effect=RuntimeError(),
+        )
+
+        with pytest.raises(RuntimeError):
+            await license_key_flush_validations()
+
+        [pending] = await pop_pending_validations(decoding_redis)
+        assert pending.license_key_id == license_key_id
+        assert pending.validations == 2
+        assert pending.usage == 2
@@ -1,7 +1,7 @@
 import uuid
 from datetime import timedelta
 from decimal import Decimal
-from unittest.mock import AsyncMock
+from unittest.mock import MagicMock
 
 import pytest
 import pytest_asyncio
@@ -50,8 +50,8 @@ from tests.fixtures.random_objects import (
 
 
 @pytest.fixture
-def enqueue_job_mock(mocker: MockerFixture) -> AsyncMock:
-    return mocker.patch("polar.meter.service.enqueue_job")
+def schedule_update_meters_mock(mocker: MockerFixture) -> MagicMock:
+    return mocker.patch("polar.meter.service.schedule_update_meters")
 
 
 @pytest.mark.asyncio
@@ -809,7 +809,7 @@ async def metered_subscription(
 class TestCreateBillingEntries:
     async def test_no_subscription(
         self,
-        enqueue_job_mock: AsyncMock,
+        schedule_update_meters_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
         customer: Customer,
@@ -822,11 +822,11 @@ class TestCreateBillingEntries:
         assert len(entries) == 0
         assert meter.last_billed_event == events[-3]
 
-        enqueue_job_mock.assert_not_called()
+        schedule_update_meters_mock.assert_not_called()
 
     async def test_no_last_billed_event(
         self,
-        enqueue_job_mock: AsyncMock,
+        schedule_update_meters_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
         customer: Customer,
@@ -849,13 +849,11 @@ class TestCreateBillingEntries:
 
         assert meter.last_billed_event == events[-3]
 
-        enqueue_job_mock.assert_called_once_with(
-            "subscription.update_meters", metered_subscription.id
-        )
+        schedule_update_meters_mock.assert_called_once_with(metered_subscription.id)
 
     async def test_last_billed_event(
         self,
-        enqueue_job_mock: AsyncMock,
+        schedule_update_meters_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
         customer: Customer,
@@ -879,16 +877,14 @@ class TestCreateBillingEntries:
 
         assert meter.last_billed_event == events[-3]
 
-        enqueue_job_mock.assert_called_once_with(
-            "subscription.update_meters", metered_subscription.id
-        )
+        schedule_update_meters_mock.assert_called_once_with(metered_subscription.id)
 
 
 @pytest.mark.asyncio
 class TestCreateBillingEntriesWithSeats:
     async def test_seat_holder_overage_charges_billing_manager(
         self,
-        enqueue_job_mock: AsyncMock,
+        schedule_update_meters_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
     ) -> None:
@@ -981,13 +977,13 @@ class TestCreateBillingEntriesWithSeats:
             assert entry.product_price == seat_product.prices[0]
             assert entry.direction == BillingEntryDirection.debit
 
-        enqueue_job_mock.assert_called_once_with(
-            "subscription.update_meters", billing_manager_subscription.id
+        schedule_update_meters_mock.assert_called_once_with(
+            billing_manager_subscription.id
         )
 
     async def test_seat_holder_without_metered_pricing(
         self,
-        enqueue_job_mock: AsyncMock,
+        schedule_update_meters_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
     ) -> None:
@@ -1063,11 +1059,11 @@ class TestCreateBillingEntriesWithSeats:
         entries = await meter_service.create_billing_entries(session, meter)
 
         assert len(entries) == 0
-        enqueue_job_mock.assert_not_called()
+        schedule_update_meters_mock.assert_not_called()
 
     async def test_multiple_seat_holders_same_subscription(
         self,
-        enqueue_job_mock: AsyncMock,
+        schedule_update_meters_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
     ) -> None:
@@ -1188,13 +1184,13 @@ class TestCreateBillingEntriesWithSeats:
             assert entry.product_price == seat_product.prices[0]
             assert entry.direction == BillingEntryDirection.debit
 
-        enqueue_job_mock.assert_called_once_with(
-            "subscription.update_meters", billing_manager_subscription.id
+        schedule_update_meters_mock.assert_called_once_with(
+            billing_manager_subscription.id
         )
 
     async def test_billing_manager_is_seat_holder(
         self,
-        enqueue_job_mock: AsyncMock,
+        schedule_update_meters_mock: MagicMock,
         save_fixture: SaveFixture,
         session: AsyncSession,
     ) -> None:
@@ -1309,6 +1305,6 @@ class TestCreateBillingEntriesWithSeats:
             assert entry.product_price == seat_product.prices[0]
             assert entry.direction == BillingEntryDirection.debit
 
-        enqueue_job_mock.assert_called_once_with(
-            "subscription.update_meters", billing_manager_subscription.id
+        schedule_update_meters_mock.assert_called_once_with(
+            billing_manager_subscription.id
         )
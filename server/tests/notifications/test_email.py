@@ -44,7 +44,7 @@ async def test_MaintainerNewPaidSubscriptionNotification() -> None:
         tier_price_recurring_interval="month",
     )
 
-    await check_diff(n.render())
+    await check_diff(await n.render())
 
 
 @pytest.mark.asyncio
@@ -56,7 +56,7 @@ async def test_MaintainerNewProductSaleNotification() -> None:
         organization_name="myorg",
     )
 
-    await check_diff(n.render())
+    await check_diff(await n.render())
 
 
 @pytest.mark.asyncio
@@ -66,7 +66,7 @@ async def test_MaintainerCreateAccountNotificationPayload() -> None:
         url="https://example.com/url",
     )
 
-    await check_diff(n.render())
+    await check_diff(await n.render())
 
 
 @pytest.mark.asyncio
@@ -93,7 +93,7 @@ async def test_MaintainerCreateAccountNotificationPayload() -> None:
     ],
 )
 async def test_injection_payloads(payload: NotificationPayloadBase) -> None:
-    subject, body = payload.render()
+    subject, body = await payload.render()
     assert str(123456 * 9) not in subject
     assert str(123456 * 9) not in body
 
@@ -128,7 +128,7 @@ async def test_all_notification_types() -> None:
             raise TypeError(f"Missing test case for {notification_type}")
 
     # Check that it renders!
-    subject, body = n.render()
+    subject, body = await n.render()
 
     # Check that there are no leftover placeholders
     assert re.search(r"{ ?[^\s}]+ ?}", subject) is None
@@ -5,10 +5,16 @@ import pytest_asyncio
 from httpx import AsyncClient
 
 from polar.auth.scope import Scope
-from polar.models import Customer, Order, Product, UserOrganization
+from polar.enums import SubscriptionRecurringInterval
+from polar.models import Customer, Order, Organization, Product, UserOrganization
+from polar.postgres import AsyncSession
 from tests.fixtures.auth import AuthSubjectFixture
-from tests.fixtures.database import SaveFixture
-from tests.fixtures.random_objects import create_order
+from tests.fixtures.database import MaxQueries, SaveFixture
+from tests.fixtures.random_objects import (
+    create_active_subscription,
+    create_order,
+    create_product,
+)
 
 
 @pytest_asyncio.fixture
@@ -92,6 +98,46 @@ class TestListOrders:
         json = response.json()
         assert json["pagination"]["total_count"] == 2
 
+    @pytest.mark.auth
+    async def test_queries(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        max_queries: MaxQueries,
+        client: AsyncClient,
+        user_organization: UserOrganization,
+        organization: Organization,
+        customer: Customer,
+    ) -> None:
+        for i in range(5):
+            product = await create_product(
+                save_fixture,
+                organization=organization,
+                recurring_interval=SubscriptionRecurringInterval.month,
+                name=f"Product {i}",
+            )
+            subscription = await create_active_subscription(
+                save_fixture, product=product, customer=customer
+            )
+            await create_order(
+                save_fixture,
+                product=product,
+                customer=customer,
+                subscription=subscription,
+            )
+        session.expunge_all()
+
+        with max_queries(6):
+            response = await client.get("/v1/orders/")
+
+        assert response.status_code == 200
+        json = response.json()
+        assert json["pagination"]["total_count"] == 5
+        for item in json["items"]:
+            assert item["product"] is not None
+            assert item["subscription"] is not None
+            assert item["product_price"] is not None
+
 
 @pytest.mark.asyncio
 class TestGetOrder:
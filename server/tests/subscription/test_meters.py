@@ -0,0 +1,67 @@
+import time
+import uuid
+
+import dramatiq
+import pytest
+
+from polar.redis import Redis
+from polar.subscription.meters import (
+    PENDING_KEY,
+    RECONCILE_KEY,
+    pop_due_update_meters,
+    schedule_update_meters,
+)
+from polar.worker import JobQueueManager
+
+
+@pytest.mark.asyncio
+class TestScheduleUpdateMeters:
+    async def test_debounced(self, decoding_redis: Redis) -> None:
+        subscription_id = uuid.uuid4()
+
+        # Coalesced within a unit of work
+        schedule_update_meters(subscription_id)
+        schedule_update_meters(subscription_id)
+        await JobQueueManager.get().flush(dramatiq.get_broker(), decoding_redis)
+
+        assert await decoding_redis.zcard(PENDING_KEY) == 1
+        # Not due before the debounce elapsed
+        assert await pop_due_update_meters(decoding_redis) == []
+
+        settled_id = uuid.uuid4()
+        await decoding_redis.zadd(PENDING_KEY, {str(settled_id): time.time() - 60})
+
+        assert await pop_due_update_meters(decoding_redis) == [(settled_id, False)]
+        assert await pop_due_update_meters(decoding_redis) == []
+        assert (
+            await decoding_redis.zscore(PENDING_KEY, str(subscription_id)) is not None
+        )
+
+    async def test_first_change_kept(self, decoding_redis: Redis) -> None:
+        subscription_id = uuid.uuid4()
+        first_change = time.time() - 60
+        await decoding_redis.zadd(PENDING_KEY, {str(subscription_id): first_change})
+
+        # A continuous flow of changes doesn't delay the update
+        schedule_update_meters(subscription_id)
+        await JobQueueManager.get().flush(dramatiq.get_broker(), decoding_redis)
+
+        assert (
+            await decoding_redis.zscore(PENDING_KEY, str(subscription_id))
+            == first_change
+        )
+        assert await pop_due_update_meters(decoding_redis) == [(subscription_id, False)]
+
+    async def test_reconcile(self, decoding_redis: Redis) -> None:
+        subscription_id = uuid.uuid4()
+        other_id = uuid.uuid4()
+        due = time.time() - 60
+        await decoding_redis.zadd(
+            PENDING_KEY, {str(subscription_id): due, str(other_id): due}
+        )
+        await decoding_redis.zadd(RECONCILE_KEY, {str(subscription_id): due})
+
+        assert await pop_due_update_meters(decoding_redis) == [
+            (subscription_id, True),
+            (other_id, False),
+        ]
@@ -56,6 +56,7 @@ from polar.models.discount import DiscountDuration, DiscountType
 from polar.models.order import OrderBillingReasonInternal
 from polar.models.product_price import ProductPriceSeatUnit
 from polar.models.subscription import SubscriptionStatus
+from polar.models.webhook_endpoint import WebhookEventType
 from polar.postgres import AsyncSession
 from polar.product.guard import (
     MeteredPrice,
@@ -92,6 +93,7 @@ from tests.fixtures.random_objects import (
     create_event,
     create_meter,
     create_product,
+    create_product_price_metered_unit,
     create_product_price_seat_unit,
     create_subscription,
     create_subscription_with_seats,
@@ -1105,6 +1107,125 @@ class TestCycle:
         assert second_cycle_subscription.discount is None
 
 
+@pytest.mark.asyncio
+class TestCycleMany:
+    async def test_renewals(
+        self,
+        session: AsyncSession,
+        enqueue_job_mock: MagicMock,
+        save_fixture: SaveFixture,
+        product: Product,
+        customer: Customer,
+        customer_second: Customer,
+    ) -> None:
+        subscriptions = [
+            await create_active_subscription(
+                save_fixture,
+                product=product,
+                customer=subscription_customer,
+                scheduler_locked_at=utc_now(),
+            )
+            for subscription_customer in (customer, customer, customer_second)
+        ]
+        previous_current_period_ends = [
+            subscription.current_period_end for subscription in subscriptions
+        ]
+
+        not_cycled = await subscription_service.cycle_many(session, subscriptions)
+
+        assert not_cycled == []
+
+        price = product.prices[0]
+        assert is_fixed_price(price)
+        event_repository = EventRepository.from_session(session)
+        events = await event_repository.get_all_by_name(SystemEvent.subscription_cycled)
+        assert len(events) == 3
+        billing_entry_repository = BillingEntryRepository.from_session(session)
+        for subscription, previous_current_period_end in zip(
+            subscriptions, previous_current_period_ends
+        ):
+            assert subscription.current_period_start == previous_current_period_end
+            assert subscription.scheduler_locked_at is None
+
+            event = next(
+                event
+                for event in events
+                if event.user_metadata["subscription_id"] == str(subscription.id)
+            )
+            billing_entries = (
+                await billing_entry_repository.get_pending_by_subscription(
+                    subscription.id
+                )
+            )
+            assert len(billing_entries) == 1
+            billing_entry = billing_entries[0]
+            assert billing_entry.event_id == event.id
+            assert billing_entry.type == BillingEntryType.cycle
+            assert billing_entry.start_timestamp == subscription.current_period_start
+            assert billing_entry.end_timestamp == subscription.current_period_end
+            assert billing_entry.amount == price.price_amount
+
+            enqueue_job_mock.assert_any_call(
+                "order.create_subscription_order",
+                subscription.id,
+                OrderBillingReasonInternal.subscription_cycle,
+            )
+
+        # Coalesced per customer
+        customer_state_calls = [
+            call
+            for call in enqueue_job_mock.call_args_list
+            if call.args[0] == "customer.webhook"
+        ]
+        assert len(customer_state_calls) == 2
+
+    async def test_isolation(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        enqueue_job_mock: MagicMock,
+        save_fixture: SaveFixture,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        renewed = await create_active_subscription(
+            save_fixture, product=product, customer=customer
+        )
+        revoked = await create_active_subscription(
+            save_fixture, product=product, customer=customer, cancel_at_period_end=True
+        )
+        failing = await create_active_subscription(
+            save_fixture, product=product, customer=customer
+        )
+        failing_current_period_end = failing.current_period_end
+
+        renew = subscription_service._renew
+
+        def _renew(subscription: Subscription) -> object:
+            if subscription.id == failing.id:
+                raise ValueError("Boom")
+            return renew(subscription)
+
+        mocker.patch.object(subscription_service, "_renew", side_effect=_renew)
+
+        not_cycled = await subscription_service.cycle_many(
+            session, [renewed, revoked, failing]
+        )
+
+        assert set(not_cycled) == {revoked.id, failing.id}
+        assert revoked.status == SubscriptionStatus.active
+        assert failing.current_period_end == failing_current_period_end
+        enqueue_job_mock.assert_called_with(
+            "customer.webhook", WebhookEventType.customer_state_changed, customer.id
+        )
+        order_calls = [
+            call
+            for call in enqueue_job_mock.call_args_list
+            if call.args[0] == "order.create_subscription_order"
+        ]
+        assert [call.args[1] for call in order_calls] == [renewed.id]
+
+
 @pytest.mark.asyncio
 class TestRevoke:
     async def test_already_canceled(
@@ -1708,6 +1829,117 @@ class TestUpdateMeters:
         assert updated_subscription_meter.consumed_units == 60
         assert updated_subscription_meter.credited_units == 0
         assert updated_subscription_meter.amount == 6000
+        assert updated_subscription_meter.computed_until == entries[-1].created_at
+
+    async def test_incremental(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        update_meters_fixtures: UpdateMetersFixture,
+    ) -> None:
+        meter, product, price, subscription = update_meters_fixtures
+        for tokens in (10, 20):
+            await create_event_billing_entry(
+                save_fixture,
+                customer=customer,
+                product=product,
+                price=price,
+                subscription=subscription,
+                tokens=tokens,
+            )
+        await subscription_service.update_meters(session, subscription)
+
+        entry = await create_event_billing_entry(
+            save_fixture,
+            customer=customer,
+            product=product,
+            price=price,
+            subscription=subscription,
+            tokens=30,
+        )
+        tuples_spy = mocker.spy(
+            BillingEntryRepository, "get_pending_metered_by_subscription_tuples"
+        )
+
+        updated_subscription = await subscription_service.update_meters(
+            session, subscription
+        )
+
+        # Only the new entry was aggregated
+        assert tuples_spy.call_count == 0
+        updated_subscription_meter = updated_subscription.meters[0]
+        assert updated_subscription_meter.consumed_units == 60
+        assert updated_subscription_meter.amount == 6000
+        assert updated_subscription_meter.computed_until == entry.created_at
+
+    async def test_reconcile(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        update_meters_fixtures: UpdateMetersFixture,
+    ) -> None:
+        meter, product, price, subscription = update_meters_fixtures
+        entry = await create_event_billing_entry(
+            save_fixture,
+            customer=customer,
+            product=product,
+            price=price,
+            subscription=subscription,
+            tokens=10,
+        )
+        subscription_meter = subscription.meters[0]
+        subscription_meter.consumed_units = Decimal(100)
+        subscription_meter.amount = 10000
+        subscription_meter.computed_until = entry.created_at
+        await save_fixture(subscription_meter)
+
+        updated_subscription = await subscription_service.update_meters(
+            session, subscription
+        )
+        assert updated_subscription.meters[0].consumed_units == 100
+
+        updated_subscription = await subscription_service.update_meters(
+            session, subscription, reconcile=True
+        )
+        updated_subscription_meter = updated_subscription.meters[0]
+        assert updated_subscription_meter.consumed_units == 10
+        assert updated_subscription_meter.amount == 1000
+        assert updated_subscription_meter.computed_until == entry.created_at
+
+    async def test_several_prices(
+        self,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        customer: Customer,
+        update_meters_fixtures: UpdateMetersFixture,
+    ) -> None:
+        meter, product, price, subscription = update_meters_fixtures
+        other_price = await create_product_price_metered_unit(
+            save_fixture, product=product, meter=meter, unit_amount=Decimal(250)
+        )
+        for entry_price in (other_price, price):
+            await create_event_billing_entry(
+                save_fixture,
+                customer=customer,
+                product=product,
+                price=entry_price,
+                subscription=subscription,
+                tokens=10,
+            )
+
+        updated_subscription = await subscription_service.update_meters(
+            session, subscription
+        )
+
+        # Entries of each price are billed separately
+        updated_subscription_meter = updated_subscription.meters[0]
+        assert updated_subscription_meter.consumed_units == 20
+        assert updated_subscription_meter.amount == 3500
+        assert updated_subscription_meter.computed_until is None
 
 
 @pytest.mark.asyncio
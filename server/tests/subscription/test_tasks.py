@@ -1,16 +1,22 @@
 import uuid
+from datetime import timedelta
 
 import pytest
 from pytest_mock import MockerFixture
 
-from polar.models import Product
+from polar.kit.utils import utc_now
+from polar.models import Customer, Product
 from polar.postgres import AsyncSession
+from polar.subscription.repository import SubscriptionRepository
 from polar.subscription.service import SubscriptionService
 from polar.subscription.tasks import (  # type: ignore[attr-defined]
     SubscriptionTierDoesNotExist,
+    subscription_cycle_many,
     subscription_service,
     subscription_update_product_benefits_grants,
 )
+from tests.fixtures.database import SaveFixture
+from tests.fixtures.random_objects import create_active_subscription
 
 
 @pytest.mark.asyncio
@@ -40,3 +46,79 @@ class TestSubscriptionUpdateProductBenefitsGrants:
         await subscription_update_product_benefits_grants(product.id)
 
         update_product_benefits_grants_mock.assert_called_once()
+
+
+@pytest.mark.asyncio
+class TestSubscriptionCycleMany:
+    async def test_not_due(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        subscription = await create_active_subscription(
+            save_fixture,
+            product=product,
+            customer=customer,
+            scheduler_locked_at=utc_now(),
+        )
+        cycle_many_mock = mocker.patch.object(
+            subscription_service,
+            "cycle_many",
+            spec=SubscriptionService.cycle_many,
+            return_value=[],
+        )
+        enqueue_job_mock = mocker.patch("polar.subscription.tasks.enqueue_job")
+        unknown_id = uuid.uuid4()
+
+        session.expunge_all()
+
+        await subscription_cycle_many([subscription.id, unknown_id])
+
+        cycle_many_mock.assert_called_once_with(mocker.ANY, [])
+        enqueue_job_mock.assert_not_called()
+
+        repository = SubscriptionRepository.from_session(session)
+        updated_subscription = await repository.get_by_id(subscription.id)
+        assert updated_subscription is not None
+        assert updated_subscription.scheduler_locked_at is None
+
+    async def test_fallback(
+        self,
+        mocker: MockerFixture,
+        session: AsyncSession,
+        save_fixture: SaveFixture,
+        product: Product,
+        customer: Customer,
+    ) -> None:
+        now = utc_now()
+        subscriptions = [
+            await create_active_subscription(
+                save_fixture,
+                product=product,
+                customer=customer,
+                current_period_start=now - timedelta(days=30),
+                current_period_end=now - timedelta(minutes=1),
+            )
+            for _ in range(2)
+        ]
+        mocker.patch.object(
+            subscription_service,
+            "cycle_many",
+            spec=SubscriptionService.cycle_many,
+            side_effect=RuntimeError("Boom"),
+        )
+        enqueue_job_mock = mocker.patch("polar.subscription.tasks.enqueue_job")
+
+        session.expunge_all()
+
+        subscription_ids = [subscription.id for subscription in subscriptions]
+        await subscription_cycle_many(subscription_ids)
+
+        # Cycled one by one instead
+        assert [call.args for call in enqueue_job_mock.call_args_list] == [
+            ("subscription.cycle", subscription_id)
+            for subscription_id in subscription_ids
+        ]
@@ -0,0 +1,130 @@
+from http.cookies import SimpleCookie
+from typing import Any
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import Request
+from freezegun import freeze_time
+from pytest_mock import MockerFixture
+from starlette.datastructures import Headers
+from starlette.types import Message, Receive, Scope, Send
+
+from polar.config import settings
+from polar.postgres import (
+    READ_AFTER_WRITE_HEADER,
+    AsyncSessionMiddleware,
+    get_db_read_session,
+)
+
+COOKIE_KEY = settings.DATABASE_READ_AFTER_WRITE_COOKIE_KEY
+
+
+def _build_scope(
+    headers: list[tuple[bytes, bytes]] | None = None, **state: Any
+) -> Scope:
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": headers or [],
+        "state": state,
+    }
+
+
+class _SessionMaker:
+    def __init__(self) -> None:
+        self.session = MagicMock()
+
+    def __call__(self) -> "_SessionMaker":
+        return self
+
+    async def __aenter__(self) -> MagicMock:
+        return self.session
+
+    async def __aexit__(self, *args: Any) -> None:
+        pass
+
+
+async def _call_middleware(mocker: MockerFixture, *, writes: bool) -> Headers:
+    mocker.patch("polar.postgres.has_writes", return_value=writes)
+
+    async def app(scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages: list[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: Message) -> None:
+        messages.append(message)
+
+    scope = _build_scope(async_sessionmaker=_SessionMaker())
+    await AsyncSessionMiddleware(app)(scope, receive, send)
+
+    start = messages[0]
+    assert start["type"] == "http.response.start"
+    return Headers(raw=start["headers"])
+
+
+@pytest.mark.asyncio
+class TestAsyncSessionMiddleware:
+    async def test_no_writes(self, mocker: MockerFixture) -> None:
+        headers = await _call_middleware(mocker, writes=False)
+
+        assert READ_AFTER_WRITE_HEADER not in headers
+        assert "set-cookie" not in headers
+
+    @freeze_time("2025-01-01 00:00:00")
+    async def test_writes(self, mocker: MockerFixture) -> None:
+        headers = await _call_middleware(mocker, writes=True)
+
+        ttl = settings.DATABASE_READ_AFTER_WRITE_TTL
+        expected = str(int(1735689600 + ttl.total_seconds()))
+        assert headers[READ_AFTER_WRITE_HEADER] == expected
+
+        cookie = SimpleCookie(headers["set-cookie"])
+        assert cookie[COOKIE_KEY].value == expected
+        assert cookie[COOKIE_KEY]["max-age"] == str(int(ttl.total_seconds()))
+        assert cookie[COOKIE_KEY]["httponly"]
+
+
+async def _get_read_after_write(headers: list[tuple[bytes, bytes]]) -> bool:
+    read_replica_pool = MagicMock()
+    read_replica_pool.get_sessionmaker.return_value = (_SessionMaker(), "replica")
+    request = Request(_build_scope(headers, read_replica_pool=read_replica_pool))
+
+    async for _ in get_db_read_session(request):
+        pass
+
+    return read_replica_pool.get_sessionmaker.call_args.kwargs["read_after_write"]
+
+
+@pytest.mark.asyncio
+class TestGetDBReadSession:
+    async def test_no_token(self) -> None:
+        assert await _get_read_after_write([]) is False
+
+    @pytest.mark.parametrize(
+        "headers",
+        [
+            pytest.param(
+                [(READ_AFTER_WRITE_HEADER.lower().encode(), b"1735689610")],
+                id="header",
+            ),
+            pytest.param(
+                [(b"cookie", f"{COOKIE_KEY}=1735689610".encode())], id="cookie"
+            ),
+        ],
+    )
+    async def test_token_consumed(self, headers: list[tuple[bytes, bytes]]) -> None:
+        with freeze_time("2025-01-01 00:00:00") as frozen_time:
+            assert await _get_read_after_write(headers) is True
+
+            frozen_time.tick(10)
+            assert await _get_read_after_write(headers) is False
+
+    async def test_invalid_token(self) -> None:
+        headers = [(READ_AFTER_WRITE_HEADER.lower().encode(), b"invalid")]
+        assert await _get_read_after_write(headers) is False
@@ -0,0 +1,51 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from polar.redis import Pipeline, Redis
+from polar.worker import JobQueueManager
+
+
+def _broker() -> MagicMock:
+    broker = MagicMock()
+    message = broker.get_actor.return_value.message_with_options.return_value
+    message.queue_name = "default"
+    message.encode.return_value = b"{}"
+    return broker
+
+
+def _failing_callback(pipeline: Pipeline) -> None:
+    raise RuntimeError("Callback error")
+
+
+@pytest.mark.asyncio
+class TestFlush:
+    async def test_callbacks(self, decoding_redis: Redis) -> None:
+        manager = JobQueueManager()
+        manager.enqueue_flush_callback("key", lambda p: p.set("key", "value"))
+
+        await manager.flush(_broker(), decoding_redis)
+
+        assert await decoding_redis.get("key") == "value"
+
+    async def test_failing_callback(self, decoding_redis: Redis) -> None:
+        manager = JobQueueManager()
+        manager.enqueue_job("actor")
+        manager.enqueue_flush_callback("failing", _failing_callback)
+        manager.enqueue_flush_callback("key", lambda p: p.set("key", "value"))
+
+        await manager.flush(_broker(), decoding_redis)
+
+        assert await decoding_redis.llen("dramatiq:default") == 1
+        assert await decoding_redis.get("key") == "value"
+
+    async def test_failing_pipeline(self, decoding_redis: Redis) -> None:
+        manager = JobQueueManager()
+        manager.enqueue_job("actor")
+        # LPUSH on a string: the pipeline execution raises
+        await decoding_redis.set("key", "value")
+        manager.enqueue_flush_callback("key", lambda p: p.lpush("key", "value"))
+
+        await manager.flush(_broker(), decoding_redis)
+
+        assert await decoding_redis.llen("dramatiq:default") == 1